@@ -1,4 +1,5 @@
 import { logger } from '../../../utils/logger.js';
+import { decodeSeriesPayload } from '../../../utils/seriesCodec.js';
 import { transactionState } from '../../state.js';
 import { chartLayouts } from '../state.js';
 import { mountainFill, CHART_LINE_WIDTHS } from '../../../config.js';
@@ -192,7 +193,7 @@ export async function loadPEData() {
 
         let data = null;
         if (response && response.ok) {
-            data = await response.json();
+            data = decodeSeriesPayload(await response.json());
         }
 
         // Scale realtime PEs to the historical EPS basis so the realtime point
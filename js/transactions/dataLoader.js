@@ -1,4 +1,5 @@
 import { logger } from '@utils/logger.js';
+import { decodeSeriesPayload } from '@utils/seriesCodec.js';
 export async function loadSectorsSnapshotData() {
     try {
         const response = await fetch('../data/output/figures/sectors.json');
@@ -6,7 +7,7 @@ export async function loadSectorsSnapshotData() {
             logger.warn('figures/sectors.json not found');
             return null;
         }
-        return await response.json();
+        return decodeSeriesPayload(await response.json());
     } catch (error) {
         logger.warn('Failed to load sectors snapshot:', error);
         return null;
@@ -20,7 +21,7 @@ export async function loadGeographySnapshotData() {
             logger.warn('figures/geography.json not found');
             return null;
         }
-        return await response.json();
+        return decodeSeriesPayload(await response.json());
     } catch (error) {
         logger.warn('Failed to load geography snapshot:', error);
         return null;
@@ -34,7 +35,7 @@ export async function loadMarketcapSnapshotData() {
             logger.warn('figures/marketcap.json not found');
             return null;
         }
-        return await response.json();
+        return decodeSeriesPayload(await response.json());
     } catch (error) {
         logger.warn('Failed to load market cap snapshot:', error);
         return null;
@@ -370,7 +371,7 @@ export async function loadCompositionSnapshotData() {
             return null;
         }
 
-        const data = await response.json();
+        const data = decodeSeriesPayload(await response.json());
 
         // Merge real-time composition
         if (realtime && realtime.composition && realtime.date) {
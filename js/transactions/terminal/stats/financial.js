@@ -1,4 +1,5 @@
 import { logger } from '../../../utils/logger.js';
+import { decodeSeriesPayload } from '../../../utils/seriesCodec.js';
 import {
     renderAsciiTable,
     formatNumeric,
@@ -80,7 +81,7 @@ async function loadPeRatioData() {
     try {
         const response = await fetch('../data/output/figures/pe_ratio.json', { cache: 'no-cache' });
         if (response.ok) {
-            peRatioCache = await response.json();
+            peRatioCache = decodeSeriesPayload(await response.json());
             return peRatioCache;
         }
     } catch (error) {
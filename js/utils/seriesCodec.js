@@ -0,0 +1,123 @@
+/**
+ * Columnar Series Codec
+ *
+ * Decodes the compact v2 chart payloads written by scripts/utils/series_codec.py
+ * back into the v1 shape the charts consume (one full-length array per series).
+ *
+ * v2 layout:
+ *   dates:  {start: 'YYYY-MM-DD', count} for a consecutive daily axis, else a list
+ *   series: {decimals, runs: [[offset, [int, ...]], ...]}           (single series)
+ *           {decimals, series: {name: [[offset, [int, ...]], ...]}}  (named series)
+ * Dates outside every run are null; ints are values scaled by 10^decimals.
+ * Stacked-area payloads add `fill: 0` (gaps decode to 0 instead of null) and
+ * `delta: true` (each run holds its first value, then neighbour differences).
+ */
+
+export const SERIES_CODEC_VERSION = 2;
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+/**
+ * Expand an encoded date axis into ISO date strings.
+ * @param {unknown} encoded
+ * @returns {string[]}
+ */
+export function decodeDates(encoded) {
+    if (Array.isArray(encoded)) {
+        return encoded;
+    }
+    if (!encoded || typeof encoded !== 'object') {
+        return [];
+    }
+    const { start, count } = /** @type {{start: string, count: number}} */ (encoded);
+    const startMs = Date.parse(`${start}T00:00:00Z`);
+    if (!Number.isFinite(startMs) || !Number.isFinite(count)) {
+        return [];
+    }
+    const dates = new Array(count);
+    for (let i = 0; i < count; i++) {
+        dates[i] = new Date(startMs + i * DAY_MS).toISOString().slice(0, 10);
+    }
+    return dates;
+}
+
+/**
+ * Expand offset runs into a full-length array with `fill` between runs.
+ * @param {Array<[number, number[]]>} runs
+ * @param {number} length
+ * @param {number} decimals
+ * @param {number|null} [fill]
+ * @param {boolean} [delta] runs hold a first value followed by differences
+ * @returns {Array<number|null>}
+ */
+export function decodeSeries(runs, length, decimals, fill = null, delta = false) {
+    const scale = 10 ** decimals;
+    const values = new Array(length).fill(fill);
+    if (!Array.isArray(runs)) {
+        return values;
+    }
+    for (const [offset, run] of runs) {
+        let quantized = 0;
+        for (let i = 0; i < run.length; i++) {
+            quantized = delta ? quantized + run[i] : run[i];
+            values[offset + i] = quantized / scale;
+        }
+    }
+    return values;
+}
+
+/**
+ * @param {any} value
+ * @param {'runs' | 'series'} field
+ * @returns {boolean}
+ */
+function isEncoded(value, field) {
+    return Boolean(value) && typeof value === 'object' && 'decimals' in value && field in value;
+}
+
+/**
+ * Restore the v1 shape of a v2 payload; v1 payloads are returned unchanged.
+ * @param {any} payload
+ * @returns {any}
+ */
+export function decodeSeriesPayload(payload) {
+    if (!payload || payload.version !== SERIES_CODEC_VERSION) {
+        return payload;
+    }
+    const dates = decodeDates(payload.dates);
+    const length = dates.length;
+    /** @type {Record<string, any>} */
+    const decoded = {};
+    for (const [key, value] of Object.entries(payload)) {
+        if (key === 'version') {
+            continue;
+        }
+        if (key === 'dates') {
+            decoded.dates = dates;
+        } else if (isEncoded(value, 'runs')) {
+            decoded[key] = decodeSeries(
+                value.runs,
+                length,
+                value.decimals,
+                value.fill ?? null,
+                Boolean(value.delta)
+            );
+        } else if (isEncoded(value, 'series')) {
+            /** @type {Record<string, Array<number|null>>} */
+            const named = {};
+            for (const [name, runs] of Object.entries(value.series || {})) {
+                named[name] = decodeSeries(
+                    runs,
+                    length,
+                    value.decimals,
+                    value.fill ?? null,
+                    Boolean(value.delta)
+                );
+            }
+            decoded[key] = named;
+        } else {
+            decoded[key] = value;
+        }
+    }
+    return decoded;
+}
@@ -4,10 +4,11 @@ import atexit
 import json
 import logging
 import shutil
+import sys
 import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, cast
+from typing import Any, Dict, Optional, cast
 
 try:
     import yfinance as yf
@@ -21,6 +22,14 @@ except Exception as e:
     yf = None
 
 ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+from scripts.utils.fundamentals_store import (  # noqa: E402
+    EPS_TTM,
+    EPS_TTM_CURRENT,
+    FundamentalsStore,
+    load_fundamentals_store,
+)
+
 DATA_DIR = ROOT / "data"
 ANALYSIS_DIR = DATA_DIR / "analysis"
 INDEX_FILE = ANALYSIS_DIR / "index.json"
@@ -295,6 +304,22 @@ def fetch_market_metadata(symbol: str) -> Dict[str, Any]:  # type: ignore[no-any
     return result_metadata  # Returned new variable
 
 
+def load_eps_store() -> Optional[FundamentalsStore]:
+    try:
+        return load_fundamentals_store()
+    except RuntimeError as e:
+        logging.warning(f"Fundamentals store unavailable: {e}")
+        return None
+
+
+def stored_eps(store: Optional[FundamentalsStore], symbol: str) -> Optional[float]:
+    """Latest trailing EPS the fundamentals store knows for ``symbol``."""
+    if store is None:
+        return None
+    current = store.current_value(symbol, EPS_TTM_CURRENT)
+    return current if current is not None else store.latest_value(symbol, EPS_TTM)
+
+
 def ensure_structure(symbol: str, config: dict) -> dict:
     config = dict(config)
     config['symbol'] = symbol
@@ -519,6 +544,7 @@ def main() -> None:
 
     updated = 0
     configs_cache: Dict[str, dict] = {}
+    eps_store = load_eps_store()
 
     for symbol in holding_symbols:
         config_path = ANALYSIS_DIR / f"{symbol}.json"
@@ -565,6 +591,10 @@ def main() -> None:
         price_override = overrides.get('price')
         price = fund_prices.get(symbol)
         market_metadata = fetch_market_metadata(symbol)
+        if market_metadata.get('eps') is None:
+            eps = stored_eps(eps_store, symbol)
+            if eps is not None:
+                market_metadata['eps'] = eps
 
         if price_override not in (None, 0):
             manual_price = maybe_round(float(price_override))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Write data/manifest.json: content hash and size of every pipeline output.
+
+The frontend fetches chart artifacts with cache busting, re-downloading
+multi-MB JSON on every page view. With the manifest a client can revalidate
+one small file and fetch only the artifacts whose hash changed::
+
+    {"version": 1,
+     "algorithm": "sha256",
+     "artifacts": {"output/figures/pe_ratio.json": {
+         "sha256": "3fa1...", "size": 1482330,
+         "encodings": {"gzip": 210443},
+         "hashed": "output/figures/pe_ratio.3fa1b2c4d5e6.json"}}}
+
+Paths are relative to ``data/``. ``encodings`` lists precompressed siblings
+(``.gz``/``.br``) that are present. With ``--hashed-copies`` each artifact
+is also copied to a content-addressed name (``hashed``), which never changes
+and can be cached forever; copies no longer referenced are removed. The
+manifest carries no timestamp, so it only changes when an artifact does.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.precompress import SIBLING_SUFFIXES, export_text_if_changed, sibling_path  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+MANIFEST_PATH = DATA_DIR / 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Pipeline outputs the frontend loads, relative to data/.
+ARTIFACT_PATTERNS = (
+    'output/**/*.json',
+    'output/**/*.csv',
+    'output/**/*.txt',
+    'output/**/*.png',
+    'yield_data*.json',
+    'yield_data/*.json',
+    'lod_manifest.json',
+    'historical_prices.json',
+)
+HASH_CHARS = 12
+_HASHED_NAME = re.compile(rf'\.[0-9a-f]{{{HASH_CHARS}}}$')
+
+
+def is_hashed_copy(path: Path) -> bool:
+    """``pe_ratio.3fa1b2c4d5e6.json`` is a copy written by ``--hashed-copies``."""
+    return bool(_HASHED_NAME.search(path.stem))
+
+
+def find_artifacts(
+    data_dir: Path = DATA_DIR, patterns: Iterable[str] = ARTIFACT_PATTERNS
+) -> List[Path]:
+    found = {
+        path
+        for pattern in patterns
+        for path in data_dir.glob(pattern)
+        if path.is_file() and not is_hashed_copy(path) and path != data_dir / MANIFEST_PATH.name
+    }
+    return sorted(found)
+
+
+def file_digest(path: Path) -> str:
+    sha = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hashed_path(path: Path, digest: str) -> Path:
+    """``pe_ratio.json`` -> ``pe_ratio.<first HASH_CHARS of digest>.json``."""
+    return path.with_name(f'{path.stem}.{digest[:HASH_CHARS]}{path.suffix}')
+
+
+def artifact_entry(path: Path, data_dir: Path, hashed_copies: bool = False) -> Dict[str, Any]:
+    digest = file_digest(path)
+    entry: Dict[str, Any] = {'sha256': digest, 'size': path.stat().st_size}
+    encodings = {
+        encoding: sibling.stat().st_size
+        for encoding in SIBLING_SUFFIXES
+        if (sibling := sibling_path(path, encoding)).exists()
+    }
+    if encodings:
+        entry['encodings'] = encodings
+    if hashed_copies:
+        copy = hashed_path(path, digest)
+        if not copy.exists():
+            shutil.copyfile(path, copy)
+        entry['hashed'] = copy.relative_to(data_dir).as_posix()
+    return entry
+
+
+def remove_stale_copies(data_dir: Path, keep: Iterable[str]) -> List[Path]:
+    """Delete hashed copies under ``data_dir`` that the manifest no longer references."""
+    keep = set(keep)
+    removed = []
+    for path in find_artifacts(data_dir, ARTIFACT_PATTERNS):
+        for copy in path.parent.glob(f'{path.stem}.*{path.suffix}'):
+            if is_hashed_copy(copy) and copy.relative_to(data_dir).as_posix() not in keep:
+                copy.unlink()
+                removed.append(copy)
+    return removed
+
+
+def build_manifest(data_dir: Path = DATA_DIR, hashed_copies: bool = False) -> Dict[str, Any]:
+    artifacts = {
+        path.relative_to(data_dir).as_posix(): artifact_entry(path, data_dir, hashed_copies)
+        for path in find_artifacts(data_dir)
+    }
+    if hashed_copies:
+        remove_stale_copies(data_dir, (e['hashed'] for e in artifacts.values()))
+    return {'version': MANIFEST_VERSION, 'algorithm': 'sha256', 'artifacts': artifacts}
+
+
+def write_manifest(manifest: Dict[str, Any], path: Path = MANIFEST_PATH) -> bool:
+    """Write ``manifest`` unless the file already holds it; return whether it was written."""
+    written: bool = export_text_if_changed(path, json.dumps(manifest, indent=2) + '\n')
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Write the content-hashed artifact manifest.')
+    parser.add_argument(
+        '--hashed-copies',
+        action='store_true',
+        help='Also copy each artifact to a content-addressed name next to it.',
+    )
+    args = parser.parse_args()
+
+    manifest = build_manifest(hashed_copies=args.hashed_copies)
+    changed = write_manifest(manifest)
+    total = sum(entry['size'] for entry in manifest['artifacts'].values())
+    status = 'Updated' if changed else 'Unchanged'
+    print(f"{status} {MANIFEST_PATH} ({len(manifest['artifacts'])} artifacts, {total:,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 import atexit
 import shutil
+import sys
 import tempfile
+from pathlib import Path
 
 import pandas as pd
 import yfinance as yf
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.fundamentals_store import EPS_TTM, load_fundamentals_store  # noqa: E402
+
 # Configure yfinance to use a temporary directory for timezone cache
 _yf_cache_dir = tempfile.mkdtemp(prefix="yf-cache-")
 yf.set_tz_cache_location(_yf_cache_dir)
@@ -34,14 +39,22 @@ def main():
 
     print(f"Found {len(unique_tickers)} unique tickers in history.")
 
-    # 3. Fetch current available EPS data for ALL tickers
+    # 3. EPS coverage: the fundamentals store first, yfinance for tickers it lacks
     print("Fetching EPS availability...")
+    try:
+        store_coverage = load_fundamentals_store().first_report_dates(EPS_TTM)
+    except RuntimeError as e:
+        print(f"Warning: Fundamentals store unavailable: {e}")
+        store_coverage = pd.Series(dtype='datetime64[ns]')
     eps_coverage = {}
 
     # Batch or loop? Loop for safety/progress.
     for t in unique_tickers:
         if t in ["USD", "CNY", "JPY", "HKD"]:
             continue  # currency
+        if t in store_coverage.index:
+            eps_coverage[t] = store_coverage[t]
+            continue
 
         try:
             stock = yf.Ticker(t)
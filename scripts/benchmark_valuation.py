@@ -0,0 +1,283 @@
+"""Benchmark P/E series for the PE chart (e.g. ^GSPC via its SPY proxy).
+
+Daily benchmark P/E is proxy price / proxy trailing EPS. EPS is time-interpolated
+between anchors. With no EPS anchors, EPS is implied from P/E anchors
+(``price / pe``). P/E anchors are hand-sourced curves plus
+``data/benchmark_history.json``.
+
+``BenchmarkValuation`` does all I/O once per run:
+
+* anchors and the history file are loaded once; the proxy's live trailing
+  P/E is recorded as today's anchor and the file is written at most once;
+* proxy prices come from ``data/historical_prices.parquet``, and only the
+  dates it does not cover are downloaded;
+* proxy EPS comes from the shared EPS cache (``fetch_stock_eps_data``), and each
+  proxy's quote (``info``) is fetched once.
+
+``compute_benchmark_pe`` then derives every benchmark column in one frame pass.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / "data"
+BENCHMARK_HISTORY_PATH = DATA_DIR / "benchmark_history.json"
+PRICES_PATH = DATA_DIR / "historical_prices.parquet"
+
+Anchors = Dict[str, float]
+EpsPoints = List[Dict[str, Any]]
+
+
+def load_benchmark_history(path: Path = BENCHMARK_HISTORY_PATH) -> Dict[str, Anchors]:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r") as f:
+            history = json.load(f)
+        return history if isinstance(history, dict) else {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Failed to read benchmark history {path}: {e}")
+        return {}
+
+
+def save_benchmark_history(history: Dict[str, Anchors], path: Path = BENCHMARK_HISTORY_PATH):
+    with open(path, "w") as f:
+        json.dump(history, f, indent=4, sort_keys=True)
+
+
+def _positive(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and math.isfinite(value) and value > 0:
+        return float(value)
+    return None
+
+
+def _anchor_series(anchors: Mapping[str, Any]) -> pd.Series:
+    """Anchor P/Es keyed by tz-naive timestamp, in insertion order."""
+    return pd.Series(
+        [v for v in anchors.values()],
+        index=pd.DatetimeIndex([pd.Timestamp(k).tz_localize(None) for k in anchors]),
+        dtype=float,
+    )
+
+
+def _snap_to_dates(anchors: pd.Series, dates: pd.DatetimeIndex, keep: str = "first") -> pd.Series:
+    """Place anchors on their nearest date; ``keep`` picks the winner of a shared date."""
+    if anchors.empty or dates.empty:
+        return pd.Series(dtype=float, index=dates)
+    positions = dates.get_indexer(anchors.index, method="nearest")
+    snapped = pd.Series(anchors.to_numpy(), index=positions).dropna()
+    grouped = snapped.groupby(level=0, sort=False)
+    snapped = grouped.first() if keep == "first" else grouped.last()
+    result = pd.Series(np.nan, index=dates)
+    result.iloc[snapped.index.to_numpy()] = snapped.to_numpy()
+    return result
+
+
+def _implied_eps(prices: pd.Series, anchors: pd.Series) -> pd.Series:
+    """EPS implied by P/E anchors: price on (or nearest to) the anchor date / P/E."""
+    anchors = anchors[anchors.notna() & (anchors > 0)]
+    valid_prices = prices.dropna()
+    if anchors.empty or valid_prices.empty:
+        return pd.Series(dtype=float)
+    exact = prices.reindex(anchors.index)
+    nearest = prices.index.get_indexer(anchors.index, method="nearest")
+    nearest_prices = pd.Series(prices.to_numpy()[nearest], index=anchors.index)
+    anchor_prices = exact.fillna(nearest_prices)
+    implied = anchor_prices / anchors
+    implied = implied[anchor_prices.notna() & (anchor_prices > 0)]
+    return implied[~implied.index.duplicated(keep="last")]
+
+
+def compute_benchmark_pe(
+    prices: pd.DataFrame,
+    eps_points: Mapping[str, EpsPoints],
+    dates: pd.DatetimeIndex,
+    anchors: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> pd.DataFrame:
+    """Daily P/E for every column of ``prices`` (one column per benchmark).
+
+    1. EPS per column: positive ``eps_points`` (else EPS implied by the P/E
+       anchors), time-interpolated over ``dates`` and edge-filled.
+    2. P/E = price / EPS where both are positive.
+    3. Dates still empty take a P/E anchor snapped to the nearest date.
+    4. Remaining gaps are time-interpolated and edge-filled.
+
+    Columns without any P/E are omitted from the result.
+    """
+    anchors = anchors or {}
+    columns = list(prices.columns)
+    prices_aligned = prices.reindex(dates).ffill()
+    anchor_series = {c: _anchor_series(anchors.get(c) or {}) for c in columns}
+
+    known_eps: Dict[str, pd.Series] = {}
+    for column in columns:
+        points = {p["date"]: p["eps"] for p in eps_points.get(column, []) if _positive(p["eps"])}
+        if points:
+            known_eps[column] = pd.Series(points, dtype=float)
+        else:
+            known_eps[column] = _implied_eps(prices_aligned[column], anchor_series[column])
+
+    eps = pd.DataFrame(index=dates, columns=columns, dtype=float)
+    anchored = {c: s for c, s in known_eps.items() if not s.empty}
+    if anchored:
+        anchor_frame = pd.DataFrame(anchored).sort_index()
+        full = anchor_frame.reindex(anchor_frame.index.union(dates))
+        full = full.interpolate(method="time").ffill().bfill()
+        eps.update(full.reindex(dates))
+
+    valid = (prices_aligned > 0) & (eps > 0)
+    result = (prices_aligned / eps).where(valid)
+
+    snapped = pd.DataFrame({c: _snap_to_dates(anchor_series[c], dates) for c in columns})
+    if columns:
+        result = result.fillna(snapped.reindex(columns=columns))
+
+    has_data = result.notna().any()
+    result = result.loc[:, has_data]
+    return result.interpolate(method="time").ffill().bfill()
+
+
+def anchor_curve(anchors: Mapping[str, Any], dates: pd.DatetimeIndex) -> pd.Series:
+    """P/E curve through anchors alone (snapped to the nearest date, interpolated).
+
+    Later anchors win a shared date, so recorded history overrides the curve.
+    """
+    snapped = _snap_to_dates(_anchor_series(anchors), dates, keep="last")
+    return snapped.interpolate(method="time").ffill().bfill()
+
+
+class BenchmarkValuation:
+    """Computes all benchmark P/E series for one run of ``generate_pe_data``."""
+
+    def __init__(
+        self,
+        benchmarks: Mapping[str, str],
+        dates: pd.DatetimeIndex,
+        manual_curves: Mapping[str, Mapping[str, Any]],
+        fetch_eps: Callable[[List[str]], Dict[str, Any]],
+        fetch_info: Callable[[str], Dict[str, Any]],
+        fetch_prices: Callable[[str, pd.Timestamp, pd.Timestamp], Optional[pd.Series]],
+        stored_prices: Optional[pd.DataFrame] = None,
+        history_path: Path = BENCHMARK_HISTORY_PATH,
+    ):
+        self.benchmarks = dict(benchmarks)
+        self.dates = dates
+        self.manual_curves = manual_curves
+        self.fetch_eps = fetch_eps
+        self.fetch_info = fetch_info
+        self.fetch_prices = fetch_prices
+        self.stored_prices = stored_prices
+        self.history_path = history_path
+        self.history = load_benchmark_history(history_path)
+        self._history_dirty = False
+        self._info: Dict[str, Dict[str, Any]] = {}
+
+    def info(self, proxy: str) -> Dict[str, Any]:
+        """The proxy's quote, fetched at most once per run."""
+        if proxy not in self._info:
+            try:
+                self._info[proxy] = self.fetch_info(proxy) or {}
+            except Exception as e:
+                print(f"Warning: Failed to fetch info for proxy {proxy}: {e}")
+                self._info[proxy] = {}
+        return self._info[proxy]
+
+    def anchors(self, benchmark: str) -> Anchors:
+        """Hand-sourced P/E curve overlaid with the recorded history."""
+        merged = dict(self.manual_curves.get(benchmark) or {})
+        merged.update(self.history.get(benchmark, {}))
+        return merged
+
+    def proxy_prices(self) -> pd.DataFrame:
+        """Proxy closes per benchmark: stored prices, topped up where they stop short."""
+        frame = pd.DataFrame(index=self.dates, dtype=float)
+        for benchmark, proxy in self.benchmarks.items():
+            stored = pd.Series(dtype=float)
+            if self.stored_prices is not None and proxy in self.stored_prices.columns:
+                stored = self.stored_prices[proxy].dropna()
+            start = self.dates[0] - pd.Timedelta(days=7)
+            end = self.dates[-1] + pd.Timedelta(days=1)
+            if not stored.empty:
+                if stored.index[0] <= self.dates[0] and stored.index[-1] >= self.dates[-1]:
+                    frame[benchmark] = stored.reindex(self.dates)
+                    continue
+                if stored.index[0] <= self.dates[0]:
+                    start = stored.index[-1] + pd.Timedelta(days=1)
+            fetched = None
+            try:
+                fetched = self.fetch_prices(proxy, start, end)
+            except Exception as e:
+                print(f"Warning: Failed to fetch history for proxy {proxy}: {e}")
+            if fetched is not None and not fetched.empty:
+                fetched = fetched.copy()
+                fetched.index = pd.DatetimeIndex(fetched.index).normalize().tz_localize(None)
+                stored = fetched.combine_first(stored) if not stored.empty else fetched
+            frame[benchmark] = stored.reindex(self.dates) if not stored.empty else np.nan
+        return frame
+
+    def proxy_eps_points(self) -> Dict[str, EpsPoints]:
+        """EPS anchors per benchmark from the shared EPS cache plus today's TTM."""
+        proxies = sorted(set(self.benchmarks.values()))
+        try:
+            eps_data = self.fetch_eps(proxies)
+        except Exception as e:
+            print(f"Warning: Failed to fetch proxy EPS {proxies}: {e}")
+            eps_data = {}
+        today = pd.Timestamp.now().normalize()
+        points: Dict[str, EpsPoints] = {}
+        for benchmark, proxy in self.benchmarks.items():
+            entry = eps_data.get(proxy) or {}
+            proxy_points = list(entry.get("points", []))
+            current = _positive(entry.get("current_ttm")) or _positive(
+                self.info(proxy).get("trailingEps")
+            )
+            if current is not None:
+                proxy_points.append({"date": today, "eps": current})
+            points[benchmark] = proxy_points
+        return points
+
+    def record_live_pe(self, benchmark: str, proxy: str) -> Optional[float]:
+        """Add the proxy's live trailing P/E to the history as today's anchor."""
+        live_pe = _positive(self.info(proxy).get("trailingPE"))
+        if live_pe is None:
+            return None
+        today_str = pd.Timestamp.now().strftime("%Y-%m-%d")
+        recorded = self.history.setdefault(benchmark, {})
+        if recorded.get(today_str) != live_pe:
+            recorded[today_str] = live_pe
+            self._history_dirty = True
+        return live_pe
+
+    def save_history(self) -> None:
+        """Write the history file once, and only if this run added anchors."""
+        if not self._history_dirty:
+            return
+        try:
+            save_benchmark_history(self.history, self.history_path)
+        except OSError as e:
+            print(f"Warning: Failed to save benchmark history: {e}")
+        self._history_dirty = False
+
+    def compute(self) -> Dict[str, pd.Series]:
+        """Daily P/E per benchmark; benchmarks without any data are left out."""
+        if not self.benchmarks or self.dates.empty:
+            return {}
+        for benchmark, proxy in self.benchmarks.items():
+            self.record_live_pe(benchmark, proxy)
+        anchors = {benchmark: self.anchors(benchmark) for benchmark in self.benchmarks}
+        frame = compute_benchmark_pe(
+            self.proxy_prices(), self.proxy_eps_points(), self.dates, anchors
+        )
+        self.save_history()
+        return {benchmark: frame[benchmark] for benchmark in frame.columns}
+
+    def forward_pe(self, proxy: str) -> Optional[float]:
+        return _positive(self.info(proxy).get("forwardPE"))
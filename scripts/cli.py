@@ -60,6 +60,7 @@ Examples:
 
   # Historical analysis
   fund extract-history
+  fund whatif --buy NVDA 10 2023-01-05 --sell VT 5 2024-03-01
         """,
     )
 
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+
+def _run(args: argparse.Namespace) -> None:
+    from ..portfolio.whatif import HypotheticalTrade, simulate, summarize  # lazy import
+
+    try:
+        trades = [
+            HypotheticalTrade.parse(action, *spec)
+            for action, specs in (("buy", args.buy or []), ("sell", args.sell or []))
+            for spec in specs
+        ]
+        if not trades:
+            raise ValueError("Provide at least one --buy or --sell trade.")
+        result = simulate(trades, method=args.method)
+    except (ValueError, FileNotFoundError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(summarize(result, top=args.top))
+
+
+def add_parser(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "whatif", help="Simulate hypothetical trades on top of the real ledger"
+    )
+    parser.add_argument(
+        "--buy",
+        nargs=3,
+        action="append",
+        metavar=("TICKER", "SHARES", "DATE"),
+        help="Hypothetical buy (repeatable), e.g. --buy NVDA 10 2023-01-05",
+    )
+    parser.add_argument(
+        "--sell",
+        nargs=3,
+        action="append",
+        metavar=("TICKER", "SHARES", "DATE"),
+        help="Hypothetical sell (repeatable), e.g. --sell VT 5 2024-03-01",
+    )
+    parser.add_argument(
+        "--method",
+        choices=("fifo", "lifo", "hifo", "average"),
+        default="fifo",
+        help="Lot relief method for realized gains (default: fifo)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Composition changes to show (default: 10)"
+    )
+    parser.set_defaults(func=_run)
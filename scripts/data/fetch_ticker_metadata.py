@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
-"""Fetch ticker metadata (sector, industry, name) using yfinance."""
+"""Fetch ticker metadata (sector, industry, country, name) using yfinance."""
 
 import atexit
-import json
 import logging
 import shutil
+import sys
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, List
@@ -12,6 +12,9 @@ from typing import Any, Dict, List
 import pandas as pd
 import yfinance as yf
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.ticker_classification import METADATA_PATH, classify_tickers  # noqa: E402
+
 # Configure yfinance to use a temporary directory for timezone cache
 _yf_cache_dir = tempfile.mkdtemp(prefix="yf-cache-")
 yf.set_tz_cache_location(_yf_cache_dir)
@@ -22,7 +25,7 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 HOLDINGS_DAILY_FILE = PROJECT_ROOT / "data" / "checkpoints" / "holdings_daily.parquet"
-METADATA_FILE = PROJECT_ROOT / "data" / "ticker_metadata.json"
+METADATA_FILE = METADATA_PATH
 DELISTED_TICKERS_FILE = PROJECT_ROOT / "data" / "delisted_tickers.csv"
 
 
@@ -58,60 +61,12 @@ def get_tickers_from_holdings() -> List[str]:
 
 
 def fetch_metadata(tickers: List[str]) -> Dict[str, Any]:
-    """Fetches metadata for a list of tickers."""
-    metadata = {}
-
-    # Mapper for common ticker differences between internal naming and yfinance
-    TICKER_MAP = {
-        'BRKB': 'BRK-B',
-        'BRK.B': 'BRK-B',
-        'BFB': 'BF-B',
-    }
-
-    # Load existing metadata if it exists to avoid re-fetching everything
-    if METADATA_FILE.exists():
-        try:
-            with METADATA_FILE.open("r", encoding="utf-8") as f:
-                metadata = json.load(f)
-        except Exception as e:
-            logging.warning(f"Error loading existing metadata: {e}")
-
-    for ticker_symbol in tickers:
-        # Skip delisted tickers that won't have valid metadata
-        if ticker_symbol in DELISTED_TICKERS:
-            continue
-
-        # Skip if already fetched and has valid info
-        if ticker_symbol in metadata and (
-            metadata[ticker_symbol].get("sector")
-            or metadata[ticker_symbol].get("quoteType") in ["ETF", "MUTUALFUND"]
-        ):
-            continue
-
-        yf_symbol = TICKER_MAP.get(ticker_symbol, ticker_symbol)
-        logging.info(f"Fetching metadata for {ticker_symbol} (using {yf_symbol})...")
-        try:
-            ticker = yf.Ticker(yf_symbol)
-            info = ticker.info
-
-            # Use sector if available, otherwise fallback to quoteType
-            sector = info.get("sector")
-            quote_type = info.get("quoteType")
-
-            metadata[ticker_symbol] = {
-                "sector": sector,
-                "industry": info.get("industry"),
-                "quoteType": quote_type,
-                "longName": info.get("longName"),
-                "symbol": ticker_symbol,
-                "yf_symbol": yf_symbol,
-            }
-            logging.info(f"Success: {ticker_symbol} -> {sector or quote_type}")
-        except Exception as e:
-            logging.error(f"Error fetching {ticker_symbol}: {e}")
-            if ticker_symbol not in metadata:
-                metadata[ticker_symbol] = {"symbol": ticker_symbol, "error": str(e)}
+    """Refreshes stale metadata for a list of tickers and returns the full table.
 
+    Lookups run concurrently and are cached in ``ticker_metadata.json`` with
+    TTLs (see ``utils/ticker_classification.py``); delisted tickers are skipped.
+    """
+    metadata: Dict[str, Any] = classify_tickers(tickers, skip=DELISTED_TICKERS, path=METADATA_FILE)
     return metadata
 
 
@@ -124,13 +79,7 @@ def main():
 
     logging.info(f"Found {len(tickers)} tickers in holdings.")
     metadata = fetch_metadata(tickers)
-
-    try:
-        with METADATA_FILE.open("w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=4, ensure_ascii=False)
-        logging.info(f"Metadata saved to {METADATA_FILE}")
-    except Exception as e:
-        logging.error(f"Error saving metadata: {e}")
+    logging.info(f"Metadata for {len(metadata)} tickers in {METADATA_FILE}")
 
 
 if __name__ == "__main__":
@@ -4,17 +4,74 @@ Usage:  python3 scripts/dev_server.py [port]   (default 8000)
 
 Serves the repo root with Cache-Control: no-store so the browser
 always fetches fresh files — no stale disk-cache surprises.
+
+When a file has a precompressed sibling (``pe_ratio.json.br`` /
+``.gz``, see scripts/utils/precompress.py) at least as new as itself and
+the request's Accept-Encoding allows it, the sibling is sent with
+Content-Encoding instead.
 """
 
 import http.server
+import os
 import sys
 
+# Preferred first.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepts_encoding(header, coding):
+    """Whether an Accept-Encoding header allows ``coding`` (by name or ``*``, q > 0)."""
+    weights = {}
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        q = params.strip()
+        try:
+            weights[name] = float(q[2:]) if q.startswith("q=") else 1.0
+        except ValueError:
+            weights[name] = 0.0
+    return weights.get(coding, weights.get("*", 0.0)) > 0
+
 
 class NoCacheHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         self.send_header("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0")
         super().end_headers()
 
+    def precompressed_variant(self, path):
+        """``(coding, sibling path)`` to serve for ``path``, or None."""
+        if not os.path.isfile(path):
+            return None
+        header = self.headers.get("Accept-Encoding")
+        mtime = os.path.getmtime(path)
+        for coding, suffix in PRECOMPRESSED:
+            sibling = path + suffix
+            if accepts_encoding(header, coding) and os.path.isfile(sibling):
+                if os.path.getmtime(sibling) >= mtime:
+                    return coding, sibling
+        return None
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        variant = self.precompressed_variant(path)
+        if variant is None:
+            return super().send_head()
+        coding, sibling = variant
+        f = open(sibling, "rb")  # do_GET / do_HEAD close it
+        try:
+            fs = os.fstat(f.fileno())
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Encoding", coding)
+            self.send_header("Content-Length", str(fs.st_size))
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Last-Modified", self.date_time_string(fs.st_mtime))
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
 
 if __name__ == "__main__":
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
@@ -15,6 +15,7 @@ from pathlib import Path
 import requests
 
 sys.path.append(str(Path(__file__).resolve().parent))
+from utils.allocation_history import record_allocation_snapshot
 from utils.security_utils import scrub_secrets
 
 
@@ -201,6 +202,7 @@ def main():
                 normalized[norm_country] = pct
 
             allocations[etf] = normalized
+            record_allocation_snapshot('country', etf, normalized)
             print(f"  {etf}: {len(normalized)} countries")
         else:
             print(f"  {etf}: Failed to fetch")
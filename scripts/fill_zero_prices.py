@@ -17,7 +17,6 @@ import csv
 import datetime as dt
 import logging
 import sys
-from collections import defaultdict
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
@@ -35,6 +34,9 @@ try:
 except ImportError as exc:  # pragma: no cover - guidance for users
     raise SystemExit("Please install yfinance (pip install yfinance)") from exc
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.split_index import SplitIndex  # noqa: E402
+
 DEFAULT_TRANSACTIONS = Path("data") / "transactions.csv"
 DEFAULT_SPLITS = Path("data") / "split_history.csv"
 DATE_FORMAT = "%m/%d/%Y"
@@ -77,34 +79,8 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def load_split_history(path: Path) -> Dict[str, List[Tuple[dt.date, float]]]:
-    history: Dict[str, List[Tuple[dt.date, float]]] = defaultdict(list)
-    if not path.exists():
-        return history
-
-    with path.open("r", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            symbol = (row.get("Symbol") or "").strip()
-            split_date = (row.get("Split Date") or "").strip()
-            multiplier_raw = row.get("Split Multiplier") or row.get("split_multiplier")
-
-            if not symbol or not split_date or not multiplier_raw:
-                continue
-
-            try:
-                multiplier = float(multiplier_raw)
-                date_obj = dt.date.fromisoformat(split_date)
-            except (ValueError, TypeError):
-                continue
-
-            normalized_symbol = normalize_symbol(symbol)
-            history[normalized_symbol].append((date_obj, multiplier))
-
-    for entries in history.values():
-        entries.sort(key=lambda item: item[0])
-
-    return history
+def load_split_history(path: Path) -> SplitIndex:
+    return SplitIndex.from_csv(path)
 
 
 def normalize_symbol(symbol: str) -> str:
@@ -112,17 +88,12 @@ def normalize_symbol(symbol: str) -> str:
 
 
 def compute_split_adjustment(
-    splits: Dict[str, List[Tuple[dt.date, float]]],
+    splits: SplitIndex,
     symbol: str,
     trade_date: dt.date,
 ) -> float:
     """Return multiplier to undo future splits relative to trade_date."""
-    normalized = normalize_symbol(symbol)
-    total = 1.0
-    for split_date, multiplier in splits.get(normalized, []):
-        if split_date > trade_date:
-            total *= multiplier
-    return total
+    return float(splits.factor_at(symbol, trade_date))
 
 
 def fetch_close_price(symbol: str, trade_date: dt.date) -> float | None:
@@ -163,7 +134,7 @@ def maybe_parse_price(value: str) -> float | None:
 
 def update_transactions(
     rows: Iterable[Dict[str, str]],
-    splits: Dict[str, List[Tuple[dt.date, float]]],
+    splits: SplitIndex,
     reset_zero_net: bool,
 ) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
     updated_rows: List[Dict[str, str]] = []
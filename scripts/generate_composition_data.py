@@ -1,12 +1,37 @@
 #!/usr/bin/env python3
-"""Generate portfolio composition data for stacked area chart."""
+"""Generate portfolio composition, sector and market-cap data for stacked area charts.
 
-import bisect
+All three charts come out of one pass over the daily market values (see
+``utils/exposure.py``): composition per ticker, look-through sectors, and
+market-cap buckets from a tickers x bucket matrix.
+"""
+
+import argparse
 import json
+import sys
 from pathlib import Path
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.allocation_history import allocation_snapshots, load_allocation_history  # noqa: E402
+from utils.exposure import (  # noqa: E402
+    META_COLUMNS,
+    Breakdown,
+    aligned_price_matrix,
+    compute_exposures,
+    market_value_matrix,
+    weight_history,
+    weight_matrix,
+)
+from utils.lod import STACKED_AGGREGATIONS, downsample_payload, write_lod_levels  # noqa: E402
+from utils.partitions import write_year_partitions  # noqa: E402
+from utils.precompress import export_json  # noqa: E402
+from utils.series_codec import encode_stacked_payload  # noqa: E402
+from utils.ticker_classification import load_ticker_metadata  # noqa: E402
+
 
 def load_data():
     """Load holdings, price, and metadata data."""
@@ -18,12 +43,8 @@ def load_data():
     with open('data/historical_prices.json', 'r') as f:
         prices_data = json.load(f)
 
-    # Load ticker metadata for sectors
-    metadata_path = Path('data/ticker_metadata.json')
-    metadata = {}
-    if metadata_path.exists():
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+    # Load ticker classifications (refreshed by scripts/data/fetch_ticker_metadata.py)
+    metadata = load_ticker_metadata()
 
     # Load granular fund allocations
     fund_alloc_path = Path('data/fund_sector_allocations.json')
@@ -35,151 +56,243 @@ def load_data():
     return holdings_df, prices_data, metadata, fund_allocations
 
 
-def calculate_daily_composition(holdings_df, prices_data, metadata, fund_allocations):
+def load_marketcap_data():
+    """Load fund market-cap breakdowns and individual stock market caps.
+
+    Fund breakdowns are None when ``fund_marketcap_breakdown.json`` is missing,
+    in which case no market-cap chart is generated.
+    """
+    fund_mc_path = Path('data/fund_marketcap_breakdown.json')
+    fund_market_caps = None
+    if fund_mc_path.exists():
+        with open(fund_mc_path, 'r') as f:
+            fund_market_caps = json.load(f)
+
+    market_cap_path = Path('data/market_caps.json')
+    market_caps = {}
+    if market_cap_path.exists():
+        with open(market_cap_path, 'r') as f:
+            market_caps = json.load(f)
+
+    return fund_market_caps, market_caps
+
+
+# Normalize sector names to match fund_sector_allocations format
+SECTOR_NAME_MAP = {
+    'Information Technology': 'Technology',
+    'Health Care': 'Healthcare',
+    'Communication': 'Communication Services',
+    'Communication Services': 'Communication Services',
+    'Basic Material': 'Basic Materials',
+    'Financial Services': 'Financials',
+    'Basic Materials': 'Basic Materials',
+}
+
+
+def ticker_sector(ticker_meta):
+    """Sector label for a ticker without a granular fund breakdown."""
+    sector = ticker_meta.get('sector') or ticker_meta.get('quoteType') or 'Unknown'
+
+    # Combine Mutual Funds and ETFs if not broken down
+    if sector in ['ETF', 'MUTUALFUND']:
+        sector = 'ETF'
+
+    if sector == 'EQUITY':
+        sector = 'Other Stocks'
+
+    return SECTOR_NAME_MAP.get(sector, sector)
+
+
+def sector_weight_matrix(tickers, metadata, fund_allocations):
+    """Fraction of each ticker's value per sector (``tickers`` x sectors).
+
+    Funds in ``fund_allocations`` are spread by their breakdown, normalized to
+    sum to 100%; every other ticker counts fully toward its own sector.
+    """
+    rows = {}
+    for ticker in tickers:
+        if ticker in fund_allocations:
+            allocation = fund_allocations[ticker]
+            alloc_sum = sum(allocation.values())
+            scale = 100.0 / alloc_sum if alloc_sum > 0 else 1.0
+            rows[ticker] = {sector: pct * scale for sector, pct in allocation.items()}
+        else:
+            rows[ticker] = {ticker_sector(metadata.get(ticker, {})): 100.0}
+    return weight_matrix(rows, tickers, scale=0.01)
+
+
+def composition_breakdowns(tickers, metadata, fund_allocations, sector_history=None):
+    """Per-ticker composition and look-through sectors, as exposure breakdowns.
+
+    ``sector_history`` holds dated fund breakdowns (see
+    ``utils/allocation_history.py``); each day uses the ones in effect then.
+    """
+    sector_weights = weight_history(
+        [
+            (start, sector_weight_matrix(tickers, metadata, allocations))
+            for start, allocations in allocation_snapshots(sector_history or {}, fund_allocations)
+        ]
+    )
+    return [
+        # Close to 100% is rounding; a larger gap is reported as "Others".
+        Breakdown('composition', min_pct=1e-6, others_below=99.0),
+        Breakdown('sectors', sector_weights, min_pct=1e-6),
+    ]
+
+
+MARKET_CAP_CATEGORIES = [
+    'Mega Cap',
+    'Large Cap',
+    'Mid Cap',
+    'Small Cap',
+    'Bond',
+    'Commodity',
+    'Real Estate',
+    'Cash/Other',
+]
+
+# Lower bounds in USD, largest first; anything smaller counts as Cash/Other.
+MARKET_CAP_THRESHOLDS = [
+    (200e9, 'Mega Cap'),
+    (10e9, 'Large Cap'),
+    (2e9, 'Mid Cap'),
+    (0.3e9, 'Small Cap'),
+]
+
+
+def cap_bucket(market_cap):
+    """Market-cap bucket of a single stock."""
+    for floor, bucket in MARKET_CAP_THRESHOLDS:
+        if market_cap >= floor:
+            return bucket
+    return 'Cash/Other'
+
+
+def cap_breakdown(ticker, fund_market_caps, market_caps):
+    """Percent of a ticker's value per market-cap bucket."""
+    ticker_upper = ticker.upper()
+
+    if ticker_upper in ('OTHERS', 'CASH', 'NET_OTHER_ASSETS'):
+        return {'Cash/Other': 100}
+
+    if ticker_upper in fund_market_caps:
+        return {k: v for k, v in fund_market_caps[ticker_upper].items() if not k.startswith('_')}
+
+    if ticker_upper in market_caps:
+        return {cap_bucket(market_caps[ticker_upper]): 100}
+
+    return {'Large Cap': 100}
+
+
+def historical_market_caps(prices, market_caps):
+    """Daily market cap per ticker (``prices``' dates x tickers) as price x shares outstanding.
+
+    Shares outstanding are implied by the ``market_caps`` snapshot at the latest
+    known price. Tickers without a snapshot stay NaN.
+    """
+    latest = prices.ffill().iloc[-1] if len(prices) else pd.Series(dtype=float)
+    shares = {}
+    for ticker in prices.columns:
+        if ticker.upper() in market_caps and latest.get(ticker, 0) > 0:
+            shares[ticker] = market_caps[ticker.upper()] / latest[ticker]
+    return prices * pd.Series(shares, index=prices.columns, dtype=float)
+
+
+def marketcap_weights(
+    tickers, fund_market_caps, market_caps, marketcap_history=None, daily_caps=None
+):
+    """Fraction of each ticker's value per market-cap bucket, as a ``WeightHistory``.
+
+    A new matrix starts whenever a fund breakdown changes (``marketcap_history``)
+    or, given ``daily_caps`` from ``historical_market_caps``, whenever a stock
+    moves to another bucket. Stocks without a daily cap keep their bucket from
+    ``market_caps``.
+    """
+    snapshots = allocation_snapshots(marketcap_history or {}, fund_market_caps)
+    fund_starts = pd.DatetimeIndex(
+        [pd.Timestamp.min if start is None else pd.Timestamp(start) for start, _ in snapshots]
+    )
+    starts = fund_starts
+    if daily_caps is not None and len(daily_caps):
+        # Funds use their breakdown whatever their cap, so only stocks can move.
+        stocks = [t for t in daily_caps.columns if t.upper() not in fund_market_caps]
+        stock_caps = daily_caps[stocks].to_numpy(dtype=float)
+        floors = [floor for floor, _ in reversed(MARKET_CAP_THRESHOLDS)]
+        buckets = np.where(np.isnan(stock_caps), -1, np.digitize(stock_caps, floors))
+        moved = np.flatnonzero((buckets[1:] != buckets[:-1]).any(axis=1)) + 1
+        starts = starts.union(pd.DatetimeIndex(daily_caps.index[moved]))
+
+    matrices = []
+    for start in starts:
+        fund_index = max(fund_starts.searchsorted(start, side='right') - 1, 0)
+        caps = dict(market_caps)
+        if daily_caps is not None and len(daily_caps):
+            row = max(daily_caps.index.searchsorted(start, side='right') - 1, 0)
+            day = daily_caps.iloc[row].dropna()
+            caps.update({t.upper(): cap for t, cap in day.items()})
+        rows = {t: cap_breakdown(t, snapshots[fund_index][1], caps) for t in tickers}
+        matrices.append((start, weight_matrix(rows, tickers, scale=0.01)))
+    return weight_history(matrices)
+
+
+def marketcap_frame(frame):
+    """Market-cap exposure with every bucket as a column, in chart order."""
+    return frame.reindex(columns=[*META_COLUMNS, *MARKET_CAP_CATEGORIES]).fillna(0.0)
+
+
+def calculate_daily_exposures(
+    holdings_df,
+    prices_data,
+    metadata,
+    fund_allocations,
+    sector_history=None,
+    fund_market_caps=None,
+    market_caps=None,
+    marketcap_history=None,
+    historical_caps=False,
+):
+    """Daily composition, sector and (given ``fund_market_caps``) market-cap exposure.
+
+    Returns ``{'composition', 'sectors'[, 'marketcap']}`` frames. With
+    ``historical_caps`` each stock's bucket follows its daily market cap (see
+    ``historical_market_caps``) instead of staying at today's.
+    """
+    tickers = list(holdings_df.columns)
+    prices = aligned_price_matrix(prices_data, holdings_df.index, tickers)
+    market_values = market_value_matrix(holdings_df, prices)
+    breakdowns = composition_breakdowns(tickers, metadata, fund_allocations, sector_history)
+
+    if fund_market_caps is not None:
+        market_caps = market_caps or {}
+        daily_caps = historical_market_caps(prices, market_caps) if historical_caps else None
+        weights = marketcap_weights(
+            tickers, fund_market_caps, market_caps, marketcap_history, daily_caps
+        )
+        # Fund breakdowns already cover each fund's value; nothing is rescaled.
+        breakdowns.append(Breakdown('marketcap', weights, rescale=False))
+
+    exposures = compute_exposures(market_values, breakdowns)
+    if 'marketcap' in exposures:
+        exposures['marketcap'] = marketcap_frame(exposures['marketcap'])
+    return exposures
+
+
+def calculate_daily_composition(
+    holdings_df, prices_data, metadata, fund_allocations, sector_history=None
+):
     """Calculate daily portfolio composition and sector allocation."""
-    composition_data = []
-    sector_data = []
-
-    # Helper to align portfolio tickers with price symbols (remove punctuation etc.)
-    def map_ticker(ticker: str) -> str:
-        if not isinstance(ticker, str):
-            return ticker
-        return ticker.replace('-', '').upper()
-
-    # Pre-sort available price dates for each ticker for O(log N) lookup
-    sorted_price_dates = {}
-    for ticker, dates_dict in prices_data.items():
-        sorted_price_dates[ticker] = sorted(dates_dict.keys())
-
-    # Precalculate column indices to avoid inner loop lookups and .loc
-    ticker_indices = {
-        ticker: holdings_df.columns.get_loc(ticker) + 1 for ticker in holdings_df.columns
-    }
-
-    for _i, row in enumerate(holdings_df.itertuples(index=True, name=None)):
-        date = row[0]
-        date_str = date.strftime('%Y-%m-%d')
-        daily_composition = {'date': date_str, 'total_value': 0}
-        daily_sectors = {'date': date_str, 'total_value': 0}
-
-        # Calculate market value for each ticker
-        ticker_values = {}
-        for ticker, idx in ticker_indices.items():
-            shares = row[idx]
-
-            if shares > 0:
-                price_ticker = map_ticker(ticker)
-                if price_ticker in prices_data:
-                    price = prices_data[price_ticker].get(date_str)
-                    # If no price for this date, use the last available price
-                    if not price:
-                        ticker_dates = sorted_price_dates[price_ticker]
-                        # Find the insertion point for date_str
-                        idx = bisect.bisect_left(ticker_dates, date_str)
-                        # If idx > 0, the previous element is the largest date < date_str
-                        if idx > 0:
-                            last_date = ticker_dates[idx - 1]
-                            price = prices_data[price_ticker].get(last_date)
-
-                    if price:
-                        market_value = shares * price
-                        ticker_values[ticker] = market_value
-                        daily_composition['total_value'] += market_value
-                        daily_sectors['total_value'] += market_value
-
-        # Calculate percentages for tickers
-        total_percentage = 0
-        if daily_composition['total_value'] > 0:
-            for ticker, value in ticker_values.items():
-                percentage = (value / daily_composition['total_value']) * 100
-                if percentage < 1e-6:
-                    continue
-                daily_composition[ticker] = percentage
-                total_percentage += percentage
-
-            # Normalize to exactly 100% to avoid floating point issues
-            if total_percentage > 0:
-                scale = 100.0 / total_percentage
-                # If we are close to 100, just scale. If we are far (e.g. 91%), the rest is "Others"
-                if total_percentage > 99.0:
-                    for ticker in ticker_values:
-                        if ticker in daily_composition:
-                            daily_composition[ticker] *= scale
-                else:
-                    daily_composition['Others'] = daily_composition.get('Others', 0) + (
-                        100 - total_percentage
-                    )
-
-        composition_data.append(daily_composition)
-
-        # Calculate sector allocation
-        sector_values = {}
-        for ticker, value in ticker_values.items():
-            ticker_meta = metadata.get(ticker, {})
-
-            # Check if we have granular breakdown for this ticker (ETF/Fund)
-            if ticker in fund_allocations:
-                allocation = fund_allocations[ticker]
-                # Normalize allocation weights for this specific fund
-                alloc_sum = sum(allocation.values())
-                scale = 1.0
-                if alloc_sum > 0:
-                    scale = 100.0 / alloc_sum
-
-                for sector_name, weight_pct in allocation.items():
-                    # weight_pct is percentage (e.g., 25.03)
-                    # Use normalized weight
-                    normalized_weight = weight_pct * scale
-                    sector_value = (value * normalized_weight) / 100
-                    sector_values[sector_name] = sector_values.get(sector_name, 0) + sector_value
-                continue
-
-            sector = ticker_meta.get('sector') or ticker_meta.get('quoteType') or 'Unknown'
-
-            # Combine Mutual Funds and ETFs if not broken down
-            if sector in ['ETF', 'MUTUALFUND']:
-                sector = 'ETF'
-
-            if sector == 'EQUITY':
-                sector = 'Other Stocks'
-
-            # Normalize sector names to match fund_sector_allocations format
-            sector_map = {
-                'Information Technology': 'Technology',
-                'Health Care': 'Healthcare',
-                'Communication': 'Communication Services',
-                'Communication Services': 'Communication Services',
-                'Basic Material': 'Basic Materials',
-                'Financial Services': 'Financials',
-                'Basic Materials': 'Basic Materials',
-            }
-            sector = sector_map.get(sector, sector)
-
-            sector_values[sector] = sector_values.get(sector, 0) + value
-
-        total_sector_percentage = 0
-        if daily_sectors['total_value'] > 0:
-            for sector, value in sector_values.items():
-                percentage = (value / daily_sectors['total_value']) * 100
-                if percentage < 1e-6:
-                    continue
-                daily_sectors[sector] = percentage
-                total_sector_percentage += percentage
-
-            # Normalize to exactly 100%
-            if total_sector_percentage > 0:
-                scale = 100.0 / total_sector_percentage
-                for sector in sector_values:
-                    if sector in daily_sectors:
-                        daily_sectors[sector] *= scale
-
-        sector_data.append(daily_sectors)
-
-    return pd.DataFrame(composition_data), pd.DataFrame(sector_data)
+    exposures = calculate_daily_exposures(
+        holdings_df, prices_data, metadata, fund_allocations, sector_history
+    )
+    return exposures['composition'], exposures['sectors']
 
 
 def save_json_data(df, output_path, label='composition'):
-    """Save data to JSON file in stacked area chart format."""
+    """Save data to JSON file in stacked area chart format (compact v2 encoding).
+
+    Weekly and monthly levels (see ``utils/lod.py``) and per-year partitions
+    (see ``utils/partitions.py``) are written next to it.
+    """
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Convert to format suitable for frontend
@@ -195,29 +308,78 @@ def save_json_data(df, output_path, label='composition'):
     for key in keys:
         data['series'][key] = df[key].fillna(0).tolist()
 
-    with open(output_path, 'w') as f:
-        json.dump(data, f, separators=(",", ":"))
+    encoded = encode_stacked_payload(data)
+    export_json(output_path, encoded, separators=(",", ":"))
+    write_lod_levels(
+        output_path,
+        encoded,
+        lambda freq: encode_stacked_payload(downsample_payload(data, STACKED_AGGREGATIONS, freq)),
+    )
+    write_year_partitions(output_path, data, encode_stacked_payload)
 
     print(f"{label.capitalize()} data saved to {output_path}")
     print(f"Date range: {df['date'].min()} to {df['date'].max()}")
     print(f"Categories: {len(keys)}")
 
 
-def main():
+def print_marketcap_summary(marketcap_df):
+    """Print the latest day's market-cap breakdown."""
+    latest = marketcap_df.iloc[-1]
+    print("\nLatest market cap breakdown:")
+    for cat in MARKET_CAP_CATEGORIES:
+        pct = latest[cat]
+        bar = '█' * int(pct / 2)
+        print(f"  {cat:15s} {pct:6.2f}%  {bar}")
+    print(f"  {'TOTAL':15s} {latest[MARKET_CAP_CATEGORIES].sum():6.2f}%")
+
+
+def main(argv: Optional[List[str]] = None):
     """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Generate composition, sector and market-cap data."
+    )
+    parser.add_argument(
+        '--historical-market-caps',
+        action='store_true',
+        help="Bucket stocks by their daily market cap (price x shares outstanding) "
+        "instead of today's.",
+    )
+    args = parser.parse_args(argv)
+
     print("Loading data...")
     holdings_df, prices_data, metadata, fund_allocations = load_data()
-
-    print("Calculating daily composition and sectors...")
-    composition_df, sector_df = calculate_daily_composition(
-        holdings_df, prices_data, metadata, fund_allocations
+    fund_market_caps, market_caps = load_marketcap_data()
+    if fund_market_caps is None:
+        print("⚠ data/fund_marketcap_breakdown.json not found, skipping market cap generation")
+
+    print("Calculating daily composition, sectors and market caps...")
+    history = load_allocation_history()
+    exposures = calculate_daily_exposures(
+        holdings_df,
+        prices_data,
+        metadata,
+        fund_allocations,
+        sector_history=history['sector'],
+        fund_market_caps=fund_market_caps,
+        market_caps=market_caps,
+        marketcap_history=history['marketcap'],
+        historical_caps=args.historical_market_caps,
     )
 
     print("Saving composition data...")
-    save_json_data(composition_df, Path('data/output/figures/composition.json'), 'composition')
+    save_json_data(
+        exposures['composition'], Path('data/output/figures/composition.json'), 'composition'
+    )
 
     print("Saving sector data...")
-    save_json_data(sector_df, Path('data/output/figures/sectors.json'), 'sectors')
+    save_json_data(exposures['sectors'], Path('data/output/figures/sectors.json'), 'sectors')
+
+    if 'marketcap' in exposures:
+        print("Saving market cap data...")
+        save_json_data(
+            exposures['marketcap'], Path('data/output/figures/marketcap.json'), 'market cap'
+        )
+        print_marketcap_summary(exposures['marketcap'])
 
     print("Done!")
 
@@ -1,21 +1,130 @@
 #!/usr/bin/env python3
 """Generate portfolio geography/country distribution data for stacked area chart."""
 
-import atexit
 import functools
 import json
-import shutil
-import tempfile
-from collections import defaultdict
+import sys
 from pathlib import Path
 
 import pandas as pd
-import yfinance as yf
 
-# Configure yfinance to use a temporary directory for timezone cache to avoid [Errno 17] in CI
-_yf_cache_dir = tempfile.mkdtemp(prefix="yf-cache-")
-yf.set_tz_cache_location(_yf_cache_dir)
-atexit.register(shutil.rmtree, _yf_cache_dir, ignore_errors=True)
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.allocation_history import allocation_snapshots, load_allocation_history  # noqa: E402
+from utils.exposure import (  # noqa: E402
+    Breakdown,
+    aligned_price_matrix,
+    category_columns,
+    compute_exposures,
+    exposure_records,
+    mapping_matrix,
+    market_value_matrix,
+    rollup,
+    weight_history,
+    weight_matrix,
+)
+from utils.lod import STACKED_AGGREGATIONS, downsample_payload, write_lod_levels  # noqa: E402
+from utils.partitions import write_year_partitions  # noqa: E402
+from utils.precompress import export_json  # noqa: E402
+from utils.series_codec import encode_stacked_payload  # noqa: E402
+from utils.ticker_classification import load_ticker_metadata  # noqa: E402
+
+# US-domiciled broad market funds (100% or ~99% US), used when a fund has no
+# allocation data.
+US_DOMICILED_FUNDS = frozenset(
+    {
+        'VTI',
+        'VOO',
+        'SPY',
+        'QQQ',
+        'IVV',
+        'SCHD',
+        'DIA',
+        'IWM',
+        'MDY',
+        'SLY',
+        'VTWO',
+        'VUG',
+        'VTV',
+        'VO',
+        'VB',
+        'VGT',
+        'VHT',
+        'VDC',
+        'VNQ',
+        'VOX',
+        'VDE',
+        'VFH',
+        'VIS',
+        'XLF',
+        'XLK',
+        'XLV',
+        'XLE',
+        'XLI',
+        'XLP',
+        'XLY',
+        'XLB',
+        'XLRE',
+        'ARKK',
+        'ARKG',
+        'ARKW',
+        'ARKF',
+        'ARKQ',
+        'JEPI',
+        'JEPQ',
+        'TQQQ',
+        'SQQQ',
+        'UPRO',
+        'SPXL',
+        'SPXU',
+        'QLD',
+        'QID',
+        'PSQ',
+        'RWM',
+        'SH',
+        'SJB',
+        'REK',
+        'SOXL',
+        'TLT',
+        'IEF',
+        'SHY',
+        'BND',
+        'AGG',
+        'LQD',
+        'HYG',
+        'JNK',
+        'BNDW',
+        'GLD',
+        'SLV',
+        'USO',
+        'UNG',
+        'VIXY',
+        'UVXY',
+        'VXX',
+        'SVXY',
+        'BOXX',
+        'PTLC',
+        'FNSFX',
+        'FSKAX',
+        'FXAIX',
+        'VSIAX',
+        'VMVAX',
+        'VGSNX',
+        'VTSAX',  # Vanguard Total Stock Market Index
+        'VTIAX',  # Vanguard Total International Stock Index
+        'VBTLX',  # Vanguard Total Bond Market Index
+        'VWELX',  # Vanguard Wellington Fund
+        'VWINX',  # Vanguard Wellesley Income Fund
+        'VGTSX',  # Vanguard Total International Stock Index
+        'VFIAX',  # Vanguard 500 Index Fund
+        'VIMAX',  # Vanguard Mid-Cap Index Fund
+        'VSMAX',  # Vanguard Small-Cap Index Fund
+        'VTISX',  # Vanguard Short-Term Inflation-Protected Securities
+        'FZROX',  # Fidelity ZERO Total Market Index
+        'FZILX',  # Fidelity ZERO International Index
+        'FXNAX',  # Fidelity US Bond Index
+        'FTBFX',  # Fidelity Total Bond Fund
+    }
+)
 
 
 def load_data():
@@ -28,12 +137,8 @@ def load_data():
     with open('data/historical_prices.json', 'r') as f:
         prices_data = json.load(f)
 
-    # Load ticker metadata
-    metadata_path = Path('data/ticker_metadata.json')
-    metadata = {}
-    if metadata_path.exists():
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+    # Load ticker classifications (refreshed by scripts/data/fetch_ticker_metadata.py)
+    metadata = load_ticker_metadata()
 
     return holdings_df, prices_data, metadata
 
@@ -42,7 +147,8 @@ def get_country_for_ticker(ticker: str, metadata: dict) -> str:
     """
     Get country for a ticker.
 
-    For individual stocks: Returns country of headquarters.
+    For individual stocks: Returns country of headquarters from the ticker
+    metadata (see ``utils/ticker_classification.py``).
     For ETFs/Mutual Funds: Returns 'Fund' to indicate we need to look up holdings.
 
     Returns normalized country name.
@@ -93,30 +199,13 @@ def get_country_for_ticker(ticker: str, metadata: dict) -> str:
     if quote_type in ('ETF', 'MUTUALFUND'):
         return 'Fund'
 
-    # For individual stocks, try to get country from yfinance
-    try:
-        yf_ticker = yf.Ticker(ticker_upper)
-        info = yf_ticker.info
-
-        # Try different country fields
-        country = info.get('country')
-        if country:
-            return normalize_country_name(country)
-
-        # Fallback to city/state for US companies
-        state = info.get('state', '')
-
-        if state and state.upper() in ('CA', 'NY', 'TX', 'WA', 'DE', 'MA', 'NJ', 'PA', 'IL', 'FL'):
-            return 'United States'
+    country = ticker_meta.get('country')
+    if country:
+        return normalize_country_name(country)
 
-        # Default to United States for most US-listed stocks
-        if ticker_upper.endswith('.US') or '.' not in ticker_upper:
-            return 'United States'
-
-    except Exception as e:  # pylint: disable=broad-except
-        import logging
-
-        logging.warning(f"Failed to resolve country for {ticker_upper}: {e}")
+    # Default to United States for most US-listed stocks
+    if ticker_upper.endswith('.US') or '.' not in ticker_upper:
+        return 'United States'
 
     # Default fallback
     return 'Other'
@@ -193,7 +282,8 @@ def get_etf_country_allocation(ticker: str) -> dict[str, float]:
     Priority:
     1. Load from data/fund_country_allocations.json (auto-updated via ScraperAPI)
     2. Use hardcoded allocations for mutual funds (not tracked by stockanalysis.com)
-    3. Try yfinance API as fallback
+
+    yfinance's ``funds_data`` has no country breakdown, so other funds get ``{}``.
     """
     ticker_upper = ticker.upper().replace('-', '')
 
@@ -448,57 +538,48 @@ def get_etf_country_allocation(ticker: str) -> dict[str, float]:
     if ticker_upper in US_ONLY_FUNDS:
         return US_ONLY_FUNDS[ticker_upper]
 
-    # Try to fetch from yfinance as fallback
-    try:
-        yf_ticker = yf.Ticker(ticker_upper)
-        funds_data = yf_ticker.funds_data
-
-        if funds_data is None:
-            return {}
-
-        # Try to get country allocation (attribute removed in newer yfinance)
-        country_alloc = getattr(funds_data, 'country_allocation', None)
-
-        if country_alloc is None or len(country_alloc) == 0:
-            return {}
-
-        # Normalize country names
-        normalized: dict[str, float] = {}
-        for country, pct in country_alloc.items():
-            norm_country = normalize_country_name(country)
-            normalized[norm_country] = pct
-
-        return normalized
-
-    except Exception as e:  # pylint: disable=broad-except
-        print(f"    Error fetching allocation for {ticker_upper}: {e}")
-        return {}
-
-
-def calculate_daily_geography(holdings_df, prices_data, metadata):
-    """Calculate daily portfolio geography/country distribution."""
-    geography_data = []
+    return {}
 
-    # Helper to align portfolio tickers with price symbols
-    def map_ticker(ticker: str) -> str:
-        if not isinstance(ticker, str):
-            return ticker
-        return ticker.replace('-', '').upper()
 
+def country_allocation_matrix(tickers, country_cache, etf_allocation_cache) -> pd.DataFrame:
+    """Fraction of each ticker's value per country (``tickers`` x countries)."""
+    fallback_allocations = load_country_allocations()
+    rows = {}
+    for ticker in tickers:
+        country = country_cache.get(ticker, 'Other')
+        if country != 'Fund':
+            rows[ticker] = {country: 1.0}
+            continue
+        ticker_upper = ticker.upper().replace('-', '')
+        allocation = etf_allocation_cache.get(ticker) or fallback_allocations.get(ticker_upper)
+        if allocation:
+            rows[ticker] = {c: pct / 100.0 for c, pct in allocation.items()}
+        elif ticker_upper in US_DOMICILED_FUNDS:
+            rows[ticker] = {'United States': 1.0}
+        else:
+            # Unknown fund or missing allocation data
+            rows[ticker] = {'Other': 1.0}
+    return weight_matrix(rows, tickers)
+
+
+def calculate_daily_geography(holdings_df, prices_data, metadata, country_history=None):
+    """Calculate daily portfolio geography/country distribution.
+
+    Market values (days x tickers) times the country allocation matrix
+    (tickers x countries) gives country values per day (see
+    ``utils/exposure.py``); each row is then converted to percentages,
+    allocations under 0.01% are dropped and the rest rescaled to 100% (fund
+    allocations can overlap with single stocks). ``country_history`` holds
+    dated fund allocations (``utils/allocation_history.py``); each day uses
+    the ones in effect then.
+    """
     # Cache for country lookups to avoid repeated API calls
     country_cache = {}
     etf_allocation_cache = {}
 
-    # Load allocations once for the fallback check
-    fallback_allocations = load_country_allocations()
-
-    # Get all dates from holdings
-    dates = holdings_df.index.tolist()
-
-    # Get all unique tickers
-    all_tickers = [t for t in holdings_df.columns]
+    dates = holdings_df.index
+    all_tickers = list(holdings_df.columns)
 
-    # Pre-populate country cache for all tickers
     print("Looking up countries for tickers...")
     for ticker in all_tickers:
         country_cache[ticker] = get_country_for_ticker(ticker, metadata)
@@ -511,190 +592,28 @@ def calculate_daily_geography(holdings_df, prices_data, metadata):
 
     print(f"\nProcessing {len(dates)} dates...")
 
-    # Pre-calculate ticker column indices for fast iteration
-    ticker_indices = {
-        ticker: holdings_df.columns.get_loc(ticker) + 1 for ticker in holdings_df.columns
-    }
+    prices = aligned_price_matrix(prices_data, dates, all_tickers)
+    market_values = market_value_matrix(holdings_df, prices)
+    allocation = weight_history(
+        [
+            (start, country_allocation_matrix(all_tickers, country_cache, allocations))
+            for start, allocations in allocation_snapshots(
+                country_history or {}, etf_allocation_cache
+            )
+        ]
+    )
+    geography = Breakdown('geography', allocation, min_pct=0.01)
+    return exposure_records(compute_exposures(market_values, [geography])['geography'])
 
-    for i, row in enumerate(holdings_df.itertuples(index=True, name=None)):
-        date = row[0]
-        if (i + 1) % 100 == 0:
-            print(f"  Processing date {i + 1}/{len(dates)}...")
-
-        date_str = date.strftime('%Y-%m-%d')
-        daily_geography = {'date': date_str, 'total_value': 0}
-
-        # Calculate market value for each ticker
-        ticker_values = {}
-        for ticker, idx in ticker_indices.items():
-            shares = row[idx]
-
-            if shares > 0:
-                price_ticker = map_ticker(ticker)
-                if price_ticker in prices_data:
-                    price = prices_data[price_ticker].get(date_str)
-                    # If no price for this date, use the last available price
-                    if not price:
-                        available_dates = [d for d in prices_data[price_ticker] if d < date_str]
-                        if available_dates:
-                            last_date = max(available_dates)
-                            price = prices_data[price_ticker].get(last_date)
-
-                    if price:
-                        market_value = shares * price
-                        ticker_values[ticker] = market_value
-                        daily_geography['total_value'] += market_value
-
-        # Calculate country distribution
-        country_values = defaultdict(float)
-
-        for ticker, value in ticker_values.items():
-            country = country_cache.get(ticker, 'Other')
-
-            if country == 'Fund':
-                # Distribute value across ETF's country holdings
-                etf_alloc = etf_allocation_cache.get(ticker, {})
-                if etf_alloc:
-                    for alloc_country, pct in etf_alloc.items():
-                        country_values[alloc_country] += value * (pct / 100.0)
-                else:
-                    # If no allocation data available, use known fund classifications
-                    ticker_upper = ticker.upper().replace('-', '')
-
-                    # US-domiciled broad market ETFs (100% or ~99% US)
-                    us_etfs = (
-                        'VTI',
-                        'VOO',
-                        'SPY',
-                        'QQQ',
-                        'IVV',
-                        'SCHD',
-                        'DIA',
-                        'IWM',
-                        'MDY',
-                        'SLY',
-                        'VTWO',
-                        'VUG',
-                        'VTV',
-                        'VO',
-                        'VB',
-                        'VGT',
-                        'VHT',
-                        'VDC',
-                        'VNQ',
-                        'VOX',
-                        'VDE',
-                        'VFH',
-                        'VIS',
-                        'XLF',
-                        'XLK',
-                        'XLV',
-                        'XLE',
-                        'XLI',
-                        'XLP',
-                        'XLY',
-                        'XLB',
-                        'XLRE',
-                        'ARKK',
-                        'ARKG',
-                        'ARKW',
-                        'ARKF',
-                        'ARKQ',
-                        'JEPI',
-                        'JEPQ',
-                        'TQQQ',
-                        'SQQQ',
-                        'UPRO',
-                        'SPXL',
-                        'SPXU',
-                        'QLD',
-                        'QID',
-                        'PSQ',
-                        'RWM',
-                        'SH',
-                        'SJB',
-                        'REK',
-                        'SOXL',
-                        'TLT',
-                        'IEF',
-                        'SHY',
-                        'BND',
-                        'AGG',
-                        'LQD',
-                        'HYG',
-                        'JNK',
-                        'BNDW',
-                        'GLD',
-                        'SLV',
-                        'USO',
-                        'UNG',
-                        'VIXY',
-                        'UVXY',
-                        'VXX',
-                        'SVXY',
-                        'BOXX',
-                        'PTLC',
-                        'FNSFX',
-                        'FSKAX',
-                        'FXAIX',
-                        'VSIAX',
-                        'VMVAX',
-                        'VGSNX',
-                        'VTSAX',  # Vanguard Total Stock Market Index
-                        'VTIAX',  # Vanguard Total International Stock Index
-                        'VBTLX',  # Vanguard Total Bond Market Index
-                        'VWELX',  # Vanguard Wellington Fund
-                        'VWINX',  # Vanguard Wellesley Income Fund
-                        'VGTSX',  # Vanguard Total International Stock Index
-                        'VFIAX',  # Vanguard 500 Index Fund
-                        'VIMAX',  # Vanguard Mid-Cap Index Fund
-                        'VSMAX',  # Vanguard Small-Cap Index Fund
-                        'VTISX',  # Vanguard Short-Term Inflation-Protected Securities
-                        'FZROX',  # Fidelity ZERO Total Market Index
-                        'FZILX',  # Fidelity ZERO International Index
-                        'FXNAX',  # Fidelity US Bond Index
-                        'FTBFX',  # Fidelity Total Bond Fund
-                    )
-
-                    # Check against known fund lists
-                    # First, try to use auto-updated allocations from file
-                    loaded_alloc = fallback_allocations.get(ticker_upper)
-                    if loaded_alloc:
-                        for c, pct in loaded_alloc.items():
-                            country_values[c] += value * (pct / 100.0)
-                    elif ticker_upper in us_etfs:
-                        # US-domiciled ETFs are treated as 100% US
-                        country_values['United States'] += value
-                    else:
-                        # Unknown fund or missing allocation data - use 'Other'
-                        # This should rarely happen now that we fetch data for all ETFs
-                        country_values['Other'] += value
-            else:
-                country_values[country] += value
-
-        # Calculate percentages for countries
-        total_percentage = 0
-        if daily_geography['total_value'] > 0:
-            for country, value in country_values.items():
-                if value <= 0:
-                    continue
-                percentage = (value / daily_geography['total_value']) * 100
-                if percentage < 0.01:  # Skip very small allocations
-                    continue
-                daily_geography[country] = percentage
-                total_percentage += percentage
-
-            # Normalize to exactly 100% to avoid floating point issues and double-counting
-            # This is necessary because ETF country allocations may overlap with individual stocks
-            if total_percentage > 0:
-                scale = 100.0 / total_percentage
-                for country in list(daily_geography.keys()):
-                    if country not in ('date', 'total_value'):
-                        daily_geography[country] *= scale
-
-        geography_data.append(daily_geography)
-
-    return geography_data
+
+def latest_region_breakdown(geography_data, country_to_region):
+    """Latest day's percentages rolled up from countries to regions (unmapped: 'Other')."""
+    if not geography_data:
+        return {}
+    frame = pd.DataFrame(geography_data)
+    mapping = mapping_matrix(country_to_region, category_columns(frame))
+    latest = rollup(frame, mapping).iloc[-1].drop(['date', 'total_value'])
+    return {region: float(pct) for region, pct in latest.items() if pct > 0}
 
 
 def convert_to_chart_format(geography_data):
@@ -727,9 +646,7 @@ def convert_to_chart_format(geography_data):
 
 def save_chart_json(data, output_path):
     """Save chart data to JSON, compact (no indentation)."""
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(data, f, separators=(",", ":"))
+    export_json(output_path, data, separators=(",", ":"))
 
 
 def main():
@@ -738,14 +655,24 @@ def main():
     holdings_df, prices_data, metadata = load_data()
 
     print("Calculating daily geography distribution...")
-    geography_data = calculate_daily_geography(holdings_df, prices_data, metadata)
+    country_history = load_allocation_history()['country']
+    geography_data = calculate_daily_geography(holdings_df, prices_data, metadata, country_history)
 
     print("Converting to chart format...")
     chart_format = convert_to_chart_format(geography_data)
 
     # Save to output file
     output_path = Path('data/output/figures/geography.json')
-    save_chart_json(chart_format, output_path)
+    encoded = encode_stacked_payload(chart_format)
+    save_chart_json(encoded, output_path)
+    write_lod_levels(
+        output_path,
+        encoded,
+        lambda freq: encode_stacked_payload(
+            downsample_payload(chart_format, STACKED_AGGREGATIONS, freq)
+        ),
+    )
+    write_year_partitions(output_path, chart_format, encode_stacked_payload)
 
     print(f"\nGeography data saved to {output_path}")
 
@@ -775,8 +702,8 @@ def main():
 
     sys.path.insert(0, str(Path(__file__).parent))
     from analysis.continent_regions import (
-        aggregate_by_continent,
-        aggregate_by_subregion,
+        COUNTRY_TO_CONTINENT,
+        COUNTRY_TO_SUBREGION,
         format_summary_report,
     )
 
@@ -791,8 +718,8 @@ def main():
     print(f"\nSummary saved to {summary_path}")
 
     # Also save continent and sub-region aggregated data
-    continent_data = aggregate_by_continent(latest_country_data)
-    subregion_data = aggregate_by_subregion(latest_country_data)
+    continent_data = latest_region_breakdown(geography_data, COUNTRY_TO_CONTINENT)
+    subregion_data = latest_region_breakdown(geography_data, COUNTRY_TO_SUBREGION)
 
     aggregated_output = {
         'dates': chart_format['dates'],
@@ -15,8 +15,10 @@ Methodology (V5):
 
 from __future__ import annotations
 
+import argparse
 import atexit
 import concurrent.futures
+import contextlib
 import json
 import math
 import os
@@ -24,16 +26,40 @@ import re
 import shutil
 import sys
 import tempfile
+import threading
 import urllib.parse
+from collections import Counter
 from datetime import date, datetime, timedelta
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent))
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Dict, Iterator, List, Optional, cast
 
+import numpy as np
 import pandas as pd
 import requests
+from benchmark_valuation import (
+    PRICES_PATH,
+    BenchmarkValuation,
+    anchor_curve,
+    compute_benchmark_pe,
+)
+from utils.fetch_scheduler import FetchScheduler, TickerRequests
+from utils.fundamentals_store import (
+    EPS_TTM,
+    EPS_TTM_CURRENT,
+    SOURCE_MANUAL,
+    SOURCE_VENDOR,
+    FundamentalsStore,
+    load_fundamentals_store,
+)
+from utils.fx_history import FxHistory, convert_asof
+from utils.lod import downsample_payload, write_lod_levels
+from utils.partitions import write_year_partitions
+from utils.precompress import export_json
 from utils.security_utils import scrub_secrets
+from utils.series_codec import decode_payload, encode_payload
+from utils.split_index import SplitIndex
 
 try:
     import yfinance as yf
@@ -55,7 +81,27 @@ PRICES_JSON_PATH = DATA_DIR / "historical_prices.json"
 EPS_CACHE_PATH = DATA_DIR / "checkpoints" / "fetched_eps_cache.json"
 MANUAL_PATCH_PATH = DATA_DIR / "manual_eps_patch.json"
 SPLIT_HISTORY_PATH = DATA_DIR / "split_history.csv"
-BENCHMARK_HISTORY_PATH = DATA_DIR / "benchmark_history.json"
+
+# EPS only moves when a company reports, so cached tickers are refetched once
+# their next report date (plus a day for Yahoo to post the figure) has passed,
+# or when the cache entry is older than the TTL. Tickers without a known
+# report date get the shorter TTL.
+EPS_CACHE_TTL_DAYS = 30
+EPS_CACHE_TTL_NO_CALENDAR_DAYS = 7
+EPS_REPORT_GRACE_DAYS = 1
+
+# pe_ratio.json is written in the compact v2 encoding (see utils/series_codec.py),
+# quantized to the precision the charts display.
+PE_SERIES_DECIMALS = {"portfolio_pe": 2, "ticker_pe": 2, "ticker_weights": 5, "benchmark_pe": 2}
+# Weekly/monthly levels of pe_ratio.json (see utils/lod.py): ratios and weights
+# are averaged. ticker_prices is a {ticker: latest price} map, not a daily
+# series, so it is left out and copied to every level unchanged.
+PE_LOD_AGGREGATIONS = {
+    "portfolio_pe": "mean",
+    "ticker_pe": "mean",
+    "ticker_weights": "mean",
+    "benchmark_pe": "mean",
+}
 
 # Tickers classified as ETFs
 ETF_TICKERS = frozenset(
@@ -389,7 +435,17 @@ BENCHMARK_PE_TICKERS: Dict[str, str] = {
     "^GSPC": "SPY",
 }
 
-FX_CACHE: Dict[str, pd.Series] = {}
+# Everything fetch_single_stock_eps reads from a ticker, fanned out in parallel.
+EPS_REQUESTS = (
+    "info",
+    "splits",
+    "income_stmt",
+    "quarterly_income_stmt",
+    ("get_earnings_dates", {"limit": 40}),
+)
+
+FX_STORE: Optional[FxHistory] = None
+FX_STORE_LOCK = threading.Lock()
 
 
 def is_etf(ticker: str) -> bool:
@@ -406,32 +462,54 @@ def yf_symbol(ticker: str) -> str:
     return YFINANCE_ALIASES.get(normalized, ticker)
 
 
-def get_fx_history(pair: str) -> Optional[pd.Series]:
-    if pair in FX_CACHE:
-        return FX_CACHE[pair]
+def _yf_ticker(symbol: str) -> Any:
+    return yf.Ticker(symbol)
+
+
+@contextlib.contextmanager
+def _ticker_requests(yahoo: Optional[TickerRequests]) -> Iterator[TickerRequests]:
+    """Use the run's shared requests, or a private scheduler for a standalone call."""
+    if yahoo is not None:
+        yield yahoo
+        return
+    with FetchScheduler() as scheduler:
+        yield TickerRequests(scheduler, _yf_ticker)
+
+
+def _download_fx_pair(pair: str, start: Optional[pd.Timestamp]) -> Optional[pd.Series]:
     try:
-        hist = yf.Ticker(pair).history(period="5y")
+        ticker = yf.Ticker(pair)
+        if start is None:
+            hist = ticker.history(period="max")
+        else:
+            hist = ticker.history(start=start.strftime("%Y-%m-%d"))
         if not hist.empty and "Close" in hist.columns:
-            series = hist["Close"]
-            series.index = series.index.normalize().tz_localize(None)
-            FX_CACHE[pair] = series
-            return cast(pd.Series, series)
+            return cast(pd.Series, hist["Close"])
     except Exception as exc:
         print(f"    Warning: Failed to fetch FX {pair}: {exc}")
     return None
 
 
-def get_closest_fx(fx_series: pd.Series, date: pd.Timestamp) -> float:
+def get_fx_store() -> FxHistory:
+    """Process-wide FX history, loaded on first use."""
+    global FX_STORE
+    with FX_STORE_LOCK:
+        if FX_STORE is None:
+            FX_STORE = FxHistory.load(fetcher=_download_fx_pair)
+        return FX_STORE
+
+
+def get_fx_history(pair: str) -> Optional[pd.Series]:
+    return get_fx_store().history(pair)
+
+
+def save_fx_history() -> None:
+    if FX_STORE is None:
+        return
     try:
-        idx = fx_series.index.get_indexer([date], method="pad")[0]
-        if idx != -1:
-            return float(fx_series.iloc[idx])
-        idx = fx_series.index.get_indexer([date], method="bfill")[0]
-        if idx != -1:
-            return float(fx_series.iloc[idx])
+        FX_STORE.save()
     except Exception as e:
-        print(f"Warning: Exception fetching closest FX rate: {e}", file=sys.stderr)
-    return 1.0
+        print(f"Error saving FX history: {e}")
 
 
 def load_eps_cache() -> Dict[str, Any]:
@@ -448,11 +526,63 @@ def save_eps_cache(cache: Dict[str, Any]):
     try:
         EPS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
         with open(EPS_CACHE_PATH, "w") as f:
-            json.dump(cache, f, indent=4)
+            # Compact: the revision history lives in the fundamentals store.
+            json.dump(cache, f, separators=(",", ":"))
     except Exception as e:
         print(f"Error saving EPS cache: {e}")
 
 
+def eps_refresh_reason(
+    entry: Optional[Dict[str, Any]],
+    today: date,
+    last_split_date: Optional[pd.Timestamp] = None,
+) -> Optional[str]:
+    """Return why a cached EPS entry must be refetched, or None if it is still fresh."""
+    if not entry or not entry.get("fetched_at"):
+        return "uncached"
+    try:
+        fetched = date.fromisoformat(str(entry["fetched_at"])[:10])
+    except ValueError:
+        return "uncached"
+    if last_split_date is not None and last_split_date.date() > fetched:
+        return "split"
+    next_report = entry.get("next_report_date")
+    if next_report:
+        try:
+            due = date.fromisoformat(str(next_report)[:10]) + timedelta(days=EPS_REPORT_GRACE_DAYS)
+        except ValueError:
+            due = None
+        if due is not None and fetched < due <= today:
+            return "reported"
+        ttl = EPS_CACHE_TTL_DAYS
+    else:
+        ttl = EPS_CACHE_TTL_NO_CALENDAR_DAYS
+    if (today - fetched).days >= ttl:
+        return "expired"
+    return None
+
+
+def next_report_date(
+    earnings_dates: Optional[pd.DataFrame], info: Dict[str, Any], today: date
+) -> Optional[str]:
+    """Earliest upcoming report date from the earnings calendar (or ``info`` as fallback)."""
+    upcoming: List[date] = []
+    if earnings_dates is not None and not earnings_dates.empty:
+        index = pd.DatetimeIndex(earnings_dates.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        upcoming = [d.date() for d in index.normalize() if d.date() >= today]
+    if not upcoming:
+        for key in ("earningsTimestampStart", "earningsTimestamp"):
+            stamp = info.get(key)
+            if isinstance(stamp, (int, float)) and stamp > 0:
+                report = datetime.fromtimestamp(stamp).date()
+                if report >= today:
+                    upcoming.append(report)
+                    break
+    return min(upcoming).isoformat() if upcoming else None
+
+
 def load_manual_patch() -> Dict[str, Dict[str, float]]:
     if MANUAL_PATCH_PATH.exists():
         try:
@@ -463,6 +593,42 @@ def load_manual_patch() -> Dict[str, Dict[str, float]]:
     return {}
 
 
+def record_eps_fundamentals(
+    store: FundamentalsStore,
+    tickers: List[str],
+    cache: Dict[str, Any],
+    manual_patch: Dict[str, Dict[str, float]],
+    as_of: date,
+) -> int:
+    """Append this run's EPS anchors to ``store``; return the number of new rows.
+
+    Cached vendor points and manual patches are recorded as separate sources so
+    a patch overrides the vendor without erasing it from the history. A ticker
+    removed from the patch file has its manual points tombstoned, so the vendor
+    values apply again.
+    """
+    appended = 0
+    patched = store.latest(EPS_TTM, sources=(SOURCE_MANUAL,))
+    for t, currency in patched.groupby("ticker")["currency"].last().items():
+        if t not in manual_patch:
+            appended += store.record_snapshot(t, EPS_TTM, {}, SOURCE_MANUAL, as_of, currency)
+    for t in tickers:
+        entry = cache.get(t, {})
+        currency = entry.get("currency", "USD")
+        if t in cache:
+            appended += store.record_snapshot(
+                t, EPS_TTM, entry.get("points", {}), SOURCE_VENDOR, as_of, currency
+            )
+            appended += store.record_value(
+                t, EPS_TTM_CURRENT, entry.get("current_ttm"), SOURCE_VENDOR, as_of, currency
+            )
+        if t in manual_patch:
+            appended += store.record_snapshot(
+                t, EPS_TTM, manual_patch[t], SOURCE_MANUAL, as_of, currency
+            )
+    return appended
+
+
 def load_split_history() -> pd.DataFrame:
     if SPLIT_HISTORY_PATH.exists():
         try:
@@ -474,14 +640,19 @@ def load_split_history() -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def get_split_adjustment(symbol: str, date: pd.Timestamp, split_df: pd.DataFrame) -> float:
-    if split_df.empty:
-        return 1.0
-    relevant = split_df[(split_df["Symbol"] == symbol) & (split_df["Split Date"] > date)]
-    if relevant.empty:
+def get_split_adjustment(
+    symbol: str, date: pd.Timestamp, split_df: pd.DataFrame | SplitIndex
+) -> float:
+    """Return the price multiplier that restates a pre-split value in today's share basis."""
+    if isinstance(split_df, SplitIndex):
+        split_index = split_df
+    elif split_df.empty:
         return 1.0
-    total_multiplier = relevant["Split Multiplier"].prod()
-    return 1.0 / float(total_multiplier)  # type: ignore[arg-type]
+    else:
+        split_index = SplitIndex.from_frame(
+            split_df, symbol_col="Symbol", date_col="Split Date", factor_col="Split Multiplier"
+        )
+    return 1.0 / float(split_index.factor_at(symbol, date))
 
 
 def cumulative_forward_split_factor(date: pd.Timestamp, splits_series: pd.Series) -> float:
@@ -491,19 +662,21 @@ def cumulative_forward_split_factor(date: pd.Timestamp, splits_series: pd.Series
     To normalize EPS reported on `date` to today's fully-split-adjusted basis,
     divide by this factor.
     """
-    factor = 1.0
     if splits_series is None or splits_series.empty:
-        return factor
-    for split_date, ratio in splits_series.items():
-        sd = pd.Timestamp(str(split_date)).tz_localize(None)
-        if sd > date:
-            factor *= ratio
-    return factor
+        return 1.0
+    return float(SplitIndex.from_series("_", splits_series).factor_at("_", date))
 
 
-def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
+def fetch_stock_eps_data(
+    tickers: List[str], force: bool = False, yahoo: Optional[TickerRequests] = None
+) -> Dict[str, Any]:
     """Fetch EPS data for stocks with caching and manual patches.
 
+    Only tickers whose cache entry is stale (see ``eps_refresh_reason``) hit
+    yfinance; ``force`` refetches every ticker. All of their sub-requests are
+    fanned out on the run's shared scheduler (``yahoo``) before any ticker is
+    assembled.
+
     Strategy:
     1. income_stmt (annual) → Already fully split-adjusted by Yahoo. Use directly.
     2. quarterly_income_stmt → Already fully split-adjusted. Use for recent quarters.
@@ -513,17 +686,27 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
     """
     cache = load_eps_cache()
     manual_patch = load_manual_patch()
+    # Curated split history, topped up per ticker with yfinance's split series.
+    split_index = SplitIndex.from_csv(SPLIT_HISTORY_PATH)
+    today = date.today()
 
     from typing import Tuple
 
-    def fetch_single_stock_eps(t: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    def fetch_single_stock_eps(
+        t: str, yahoo: TickerRequests
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
         symbol = yf_symbol(t)
         try:
-            stock = yf.Ticker(symbol)
+            fetched = yahoo.fetch(symbol, EPS_REQUESTS)
+            concurrent.futures.wait(fetched.values())
+            errors = [f.exception() for f in fetched.values()]
+            if all(errors):
+                # Nothing came back (bad symbol, network down): don't cache it.
+                raise cast(BaseException, errors[0])
             # Try to get info safely
             info = {}
             try:
-                info = stock.info
+                info = fetched["info"].result()
                 if info is None:
                     info = {}
             except Exception as e:
@@ -537,6 +720,8 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                 "points": {},
                 "current_ttm": current_ttm,
                 "currency": currency,
+                "fetched_at": today.isoformat(),
+                "next_report_date": None,
             }
 
             fx_series = None
@@ -546,27 +731,21 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
 
             # Fetch the yfinance splits series for this ticker
             try:
-                yf_splits = stock.splits
+                yf_splits = fetched["splits"].result()
                 if yf_splits is None or yf_splits.empty:
                     yf_splits = pd.Series(dtype=float)
             except Exception as e:
                 print(f"Warning: Exception fetching splits for {symbol}: {e}", file=sys.stderr)
                 yf_splits = pd.Series(dtype=float)
+            split_index.merge_vendor_splits(t, yf_splits)
+            last_split_date = split_index.last_split_date(t)
 
-            def add_point(
-                d_str: str,
-                val: float,
-                current_fx_series: Optional[pd.Series],
-                current_currency: str,
-                current_fin_curr: str,
-            ):
-                """Add a single EPS data point to result, applying FX if needed."""
-                if current_fx_series is not None:
-                    rate = get_closest_fx(current_fx_series, pd.Timestamp(d_str))
-                    val *= rate
-                elif current_currency == "GBP" and current_fin_curr == "GBp":
-                    val /= 100.0
-                result_entry["points"][d_str] = val
+            # Points are collected in reporting currency (later sources win per
+            # date) and converted in one as-of join once all are known.
+            raw_points: Dict[str, float] = {}
+
+            def add_point(d_str: str, val: float):
+                raw_points[d_str] = val
 
             # 1. Annual income_stmt → fully split-adjusted. Collected but only
             # used as deep-history fallback (step 4) — where quarterly reports
@@ -576,7 +755,7 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
             # the quarterly series and produces single-day PE cliffs.
             annual_points: List[Tuple[str, float]] = []
             try:
-                annual = stock.income_stmt
+                annual = fetched["income_stmt"].result()
             except Exception as e:
                 print(
                     f"Warning: Exception fetching annual income statement for {symbol}: {e}",
@@ -591,7 +770,7 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
 
             # 2. Quarterly income_stmt → fully split-adjusted, build TTM
             try:
-                quarterly = stock.quarterly_income_stmt
+                quarterly = fetched["quarterly_income_stmt"].result()
             except Exception as e:
                 print(
                     f"Warning: Exception fetching quarterly income statement for {symbol}: {e}",
@@ -611,15 +790,13 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                         add_point(
                             pd.Timestamp(d_val).strftime("%Y-%m-%d"),
                             float(ttm_v),
-                            fx_series,
-                            currency,
-                            fin_curr,
                         )
 
             # 3. get_earnings_dates() → REQUIRES split normalization
             q_eps_index: Optional[pd.Index] = None
+            ed = None
             try:
-                ed = stock.get_earnings_dates(limit=40)
+                ed = fetched["get_earnings_dates"].result()
                 if ed is not None and not ed.empty and "Reported EPS" in ed.columns:
                     q_eps_raw = ed["Reported EPS"].dropna().sort_index()
                     q_eps_raw.index = q_eps_raw.index.normalize().tz_localize(None)
@@ -656,11 +833,9 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                             q_eps_normalized.append(quarterly_anchors[d])
                             continue
 
-                        if not yf_splits.empty:
-                            last_split_date = pd.Timestamp(yf_splits.index[-1]).tz_localize(None)
-                            if d >= last_split_date:
-                                q_eps_normalized.append(v)
-                                continue
+                        if last_split_date is not None and d >= last_split_date:
+                            q_eps_normalized.append(v)
+                            continue
 
                         normalized = v / calibration_factor
                         q_eps_normalized.append(normalized)
@@ -672,9 +847,6 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                             add_point(
                                 pd.Timestamp(str(d_val)).strftime("%Y-%m-%d"),
                                 float(ttm_v),
-                                fx_series,
-                                currency,
-                                fin_curr,
                             )
             except Exception as e:
                 if "NoneType" not in str(e):
@@ -697,17 +869,46 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                     )
                     if covered >= 4:
                         continue
-                add_point(d_str, v, fx_series, currency, fin_curr)
+                add_point(d_str, v)
+            if raw_points:
+                points = pd.Series(raw_points, dtype=float)
+                points.index = pd.to_datetime(points.index)
+                if fx_series is not None:
+                    points = convert_asof(points, fx_series)
+                elif currency == "GBP" and fin_curr == "GBp":
+                    points = points / 100.0
+                result_entry["points"] = dict(zip(raw_points, points.tolist(), strict=True))
+            result_entry["next_report_date"] = next_report_date(
+                ed if isinstance(ed, pd.DataFrame) else None, info, today
+            )
             return (t, result_entry)
         except Exception as e:
             if "NoneType" not in str(e):
                 print(f"Warning: Error fetching {symbol}: {e}")
             return (t, None)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_ticker = {executor.submit(fetch_single_stock_eps, t): t for t in tickers}
-        for future in concurrent.futures.as_completed(future_to_ticker):
-            result = future.result()
+    reasons: Dict[str, str] = {}
+    for t in tickers:
+        reason = (
+            "forced"
+            if force
+            else eps_refresh_reason(cache.get(t), today, split_index.last_split_date(t))
+        )
+        if reason:
+            reasons[t] = reason
+    stale = list(reasons)
+    breakdown = ", ".join(
+        f"{reason}: {count}" for reason, count in sorted(Counter(reasons.values()).items())
+    )
+    print(
+        f"  EPS cache: refreshing {len(stale)} of {len(tickers)} stocks"
+        + (f" ({breakdown})" if breakdown else "")
+    )
+
+    with _ticker_requests(yahoo) as yahoo:
+        yahoo.prefetch([yf_symbol(t) for t in stale], EPS_REQUESTS)
+        for t in stale:
+            result = fetch_single_stock_eps(t, yahoo)
             if result:
                 t, entry = result
                 if entry is not None:
@@ -717,8 +918,11 @@ def fetch_stock_eps_data(tickers: List[str]) -> Dict[str, Any]:
                     cache[t]["points"] = entry["points"]
                     cache[t]["current_ttm"] = entry["current_ttm"]
                     cache[t]["currency"] = entry["currency"]
+                    cache[t]["fetched_at"] = entry["fetched_at"]
+                    cache[t]["next_report_date"] = entry["next_report_date"]
 
     save_eps_cache(cache)
+    save_fx_history()
     results = {}
     for t in tickers:
         base = cache.get(t, {"points": {}, "current_ttm": None, "currency": "USD"})
@@ -757,241 +961,45 @@ def compute_benchmark_pe_from_proxy(
     Returns:
         pd.Series of daily PE values, or None if no data available.
     """
-    result = pd.Series(index=dates, dtype=float)
-    prices_aligned = prices.reindex(dates).ffill()
-
-    # 1. Build EPS series — from explicit eps_points, or derived from anchors + prices
-    known_eps = {}
-    if eps_points:
-        for p in eps_points:
-            if p["eps"] is not None and p["eps"] > 0:
-                known_eps[p["date"]] = p["eps"]
-
-    # Derive EPS from manual PE anchors: implied_EPS = price / anchor_PE
-    if manual_anchors and not known_eps:
-        for date_str, pe_val in manual_anchors.items():
-            if pe_val is None or pe_val <= 0:
-                continue
-            ts = pd.Timestamp(date_str).tz_localize(None)
-            # Find price at anchor date
-            price_at_anchor = None
-            if ts in prices_aligned.index and pd.notna(prices_aligned.loc[ts]):
-                price_at_anchor = float(prices_aligned.loc[ts])
-            elif len(prices_aligned.dropna()) > 0:
-                idx = prices_aligned.index.get_indexer([ts], method="nearest")[0]
-                if idx != -1 and pd.notna(prices_aligned.iloc[idx]):
-                    price_at_anchor = float(prices_aligned.iloc[idx])
-            if price_at_anchor and price_at_anchor > 0:
-                known_eps[ts] = price_at_anchor / pe_val
-
-    has_eps = bool(known_eps)
-
-    if has_eps:
-        eps_series = pd.Series(known_eps).sort_index()
-        eps_series = eps_series[~eps_series.index.duplicated(keep="last")]
-        full_eps = eps_series.reindex(eps_series.index.union(dates))
-        full_eps = full_eps.interpolate(method="time").ffill().bfill()
-        eps_daily = full_eps.reindex(dates)
-    else:
-        eps_daily = pd.Series(dtype=float, index=dates)
-
-    # 2. Compute PE = price / EPS for dates with valid price and EPS
-    if has_eps:
-        valid_mask = (
-            prices_aligned.notna() & (prices_aligned > 0) & eps_daily.notna() & (eps_daily > 0)
-        )
-        result[valid_mask] = prices_aligned[valid_mask] / eps_daily[valid_mask]
-
-    # 3. Fill gaps from manual anchors (for dates without price data)
-    if manual_anchors:
-        for date_str, pe_val in manual_anchors.items():
-            ts = pd.Timestamp(date_str).tz_localize(None)
-            if ts in dates:
-                if pd.isna(result.loc[ts]):
-                    result.loc[ts] = pe_val  # type: ignore[call-overload]
-            else:
-                idx = dates.get_indexer([ts], method="nearest")[0]
-                if idx != -1 and pd.isna(result.iloc[idx]):
-                    result.iloc[idx] = pe_val
-
-    # 4. Interpolate remaining gaps and forward/back fill edges
-    if result.notna().sum() == 0:
+    frame = compute_benchmark_pe(
+        pd.DataFrame({"pe": prices.reindex(dates)}, index=dates),
+        {"pe": eps_points},
+        dates,
+        {"pe": manual_anchors or {}},
+    )
+    if "pe" not in frame.columns:
         return None
-
-    result = result.interpolate(method="time").ffill().bfill()
-    return result
+    return frame["pe"].rename(None)
 
 
-def fetch_benchmark_pe_daily(
-    proxy_ticker: str,
-    dates: pd.DatetimeIndex,
-    manual_anchors: Optional[Dict[str, float]] = None,
-) -> Optional[pd.Series]:
-    """Fetch daily PE for a benchmark index via its ETF proxy.
-
-    Uses the proxy's price history and trailing EPS to compute daily PE,
-    giving true daily granularity instead of interpolated monthly anchors.
-
-    Args:
-        proxy_ticker: ETF ticker to use as proxy (e.g. "SPY" for ^GSPC).
-        dates: DatetimeIndex of all dates to produce PE for.
-        manual_anchors: Optional dict of date_str → PE for fallback.
-
-    Returns:
-        pd.Series of daily PE values, or None on failure.
-    """
+def load_stored_prices() -> Optional[pd.DataFrame]:
+    """Adjusted closes already fetched by the TWRR pipeline, if present."""
+    if not PRICES_PATH.exists():
+        return None
     try:
-        stock = yf.Ticker(proxy_ticker)
-        info = stock.info or {}
-
-        # Get trailing EPS from info
-        trailing_eps = info.get("trailingEps")
-
-        # Build EPS points from financial statements
-        eps_points: List[Dict] = []
-
-        try:
-            annual = stock.income_stmt
-            if annual is not None and not annual.empty and "Basic EPS" in annual.index:
-                for d_val, v in annual.loc["Basic EPS"].items():
-                    if pd.notna(v) and v > 0:
-                        eps_points.append(
-                            {
-                                "date": pd.Timestamp(d_val).tz_localize(None),
-                                "eps": float(v),
-                            }
-                        )
-        except Exception as e:
-            print(f"Warning: Failed to fetch annual EPS for {proxy_ticker}: {e}")
-
-        try:
-            quarterly = stock.quarterly_income_stmt
-            if quarterly is not None and not quarterly.empty and "Basic EPS" in quarterly.index:
-                q_series = quarterly.loc["Basic EPS"].dropna().sort_index()
-                if len(q_series) >= 4:
-                    q_ttm = q_series.rolling(4).sum().dropna()
-                    for d_val, ttm_v in q_ttm.items():
-                        if ttm_v > 0:
-                            eps_points.append(
-                                {
-                                    "date": pd.Timestamp(d_val).tz_localize(None),
-                                    "eps": float(ttm_v),
-                                }
-                            )
-        except Exception as e:
-            print(f"Warning: Failed to fetch quarterly EPS for {proxy_ticker}: {e}")
-
-        # Add current trailing EPS as today's anchor
-        if trailing_eps and trailing_eps > 0:
-            eps_points.append(
-                {
-                    "date": pd.Timestamp.now().normalize(),
-                    "eps": float(trailing_eps),
-                }
-            )
-
-        # Fetch price history
-        start_date = dates[0] - pd.Timedelta(days=7)
-        end_date = dates[-1] + pd.Timedelta(days=1)
-        try:
-            hist = stock.history(start=start_date, end=end_date)
-            if hist is not None and not hist.empty and "Close" in hist.columns:
-                prices = hist["Close"]
-                prices.index = prices.index.normalize().tz_localize(None)
-            else:
-                prices = pd.Series(dtype=float)
-        except Exception as exc:
-            # security: remediate silent catch block hiding failures
-            print(f"Warning: Failed to fetch history for proxy {proxy_ticker}: {exc}")
-            prices = pd.Series(dtype=float)
-
-        # For ETF proxies: if no EPS data but trailingPE is available,
-        # add today's PE as a manual anchor so EPS can be derived from price/PE
-        if not eps_points:
-            trailing_pe = info.get("trailingPE")
-            if trailing_pe and math.isfinite(trailing_pe) and trailing_pe > 0:
-                today_str = pd.Timestamp.now().normalize().strftime("%Y-%m-%d")
-                if manual_anchors is None:
-                    manual_anchors = {}
-                else:
-                    manual_anchors = dict(manual_anchors)
-                manual_anchors[today_str] = float(trailing_pe)
+        return pd.read_parquet(PRICES_PATH)
+    except Exception as e:
+        print(f"Warning: Failed to read stored prices {PRICES_PATH}: {e}")
+        return None
 
-        return compute_benchmark_pe_from_proxy(
-            prices, eps_points, dates, manual_anchors=manual_anchors
-        )
 
-    except Exception as e:
-        print(f"Warning: fetch_benchmark_pe_daily({proxy_ticker}) failed: {e}")
-        if manual_anchors:
-            return compute_benchmark_pe_from_proxy(
-                pd.Series(dtype=float), [], dates, manual_anchors=manual_anchors
-            )
+def _download_close(symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> Optional[pd.Series]:
+    hist = yf.Ticker(symbol).history(start=start, end=end)
+    if hist is None or hist.empty or "Close" not in hist.columns:
         return None
+    return cast(pd.Series, hist["Close"])
 
 
-def fetch_etf_pe(ticker: str, dates: pd.DatetimeIndex) -> Optional[pd.Series]:
+def fetch_etf_pe(
+    ticker: str, dates: pd.DatetimeIndex, yahoo: Optional[TickerRequests] = None
+) -> Optional[pd.Series]:
     symbol = yf_symbol(ticker)
     if ticker in MANUAL_TICKER_PE_CURVES:
-        points = MANUAL_TICKER_PE_CURVES[ticker].copy()  # Copy to avoid mutating global constant
-
-        # Auto-append current PE for benchmarks to history file
-        if ticker in BENCHMARK_PE_TICKERS:
-            proxy = BENCHMARK_PE_TICKERS[ticker]
-            try:
-                # Load existing history
-                history = {}
-                if BENCHMARK_HISTORY_PATH.exists():
-                    with open(BENCHMARK_HISTORY_PATH, "r") as f:
-                        try:
-                            history = json.load(f)
-                        except json.JSONDecodeError:
-                            history = {}
-
-                # Fetch current proxy PE
-                info = yf.Ticker(proxy).info
-                current_pe = info.get("trailingPE") if info else None
-
-                if current_pe and current_pe > 0:
-                    today_str = datetime.now().strftime("%Y-%m-%d")
-                    if ticker not in history:
-                        history[ticker] = {}
-
-                    # Update history
-                    history[ticker][today_str] = float(current_pe)
-
-                    # Save updated history
-                    with open(BENCHMARK_HISTORY_PATH, "w") as f:
-                        json.dump(history, f, indent=4, sort_keys=True)
-
-                    print(f"  Updated history for {ticker}: {today_str}={current_pe}")
-
-                # Merge history into points (live data overrides manual if duplicate date)
-                if ticker in history:
-                    points.update(history[ticker])
-
-            except Exception as e:
-                print(f"Warning: Failed to update benchmark history for {ticker}: {e}")
-
-        s = pd.Series(index=dates, dtype=float)
-        # Convert keys to timestamps and sort
-        ts_points = {pd.Timestamp(k).tz_localize(None): v for k, v in points.items()}
-
-        for dt, val in ts_points.items():
-            if dt in dates:
-                s.loc[dt] = float(val)  # type: ignore[call-overload]
-            else:
-                # Map to nearest date in index
-                idx = dates.get_indexer([dt], method="nearest")[0]
-                if idx != -1:
-                    s.iloc[idx] = val
-
-        return s.interpolate(method="time").ffill().bfill()
+        return anchor_curve(MANUAL_TICKER_PE_CURVES[ticker], dates)
 
     try:
-        t_obj = yf.Ticker(symbol)
         # Some yf versions return None for .info on failure
-        info = t_obj.info
+        info = yahoo.get(symbol, "info") if yahoo is not None else yf.Ticker(symbol).info
         if info is None:
             return None
         pe = info.get("trailingPE")
@@ -1062,12 +1070,86 @@ def calculate_harmonic_pe(mv_map: Dict[str, float], pe_map: Dict[str, float]) ->
     return None
 
 
-def fetch_forward_pe() -> Optional[Dict[str, Any]]:
+def _rounded_list(values: np.ndarray, valid: np.ndarray, decimals: int) -> List[Any]:
+    rounded = np.round(values, decimals)
+    return [
+        float(v) if ok else None for v, ok in zip(rounded.tolist(), valid.tolist(), strict=True)
+    ]
+
+
+def compute_portfolio_pe(
+    holdings_df: pd.DataFrame,
+    prices_df: pd.DataFrame,
+    tickers: List[str],
+    etf_pe_daily: pd.DataFrame,
+    stock_eps_daily: pd.DataFrame,
+) -> Dict[str, Any]:
+    """Daily portfolio and per-ticker P/E as aligned tickers x dates matrices.
+
+    A holding counts on a date when it has more than 1e-6 shares, a positive
+    price and at least $1 of market value. ETFs take their P/E series as-is;
+    stocks use price / point-in-time EPS where EPS is positive. The portfolio
+    P/E is the market-value-weighted harmonic mean over holdings with a
+    positive P/E (same arithmetic as ``calculate_harmonic_pe``).
+
+    Rows are reduced along the ticker axis in ticker order, so the sums match
+    the scalar accumulation bit for bit.
+    """
+    dates = holdings_df.index
+    shares = holdings_df.reindex(columns=tickers).to_numpy(dtype=float).T
+
+    price_columns = [t.strip().upper().replace("-", "") for t in tickers]
+    prices = prices_df.reindex(index=dates, columns=price_columns).to_numpy(dtype=float).T
+    price_ok = np.isfinite(prices) & (prices > 0)
+
+    market_value = np.where(price_ok, shares * np.where(price_ok, prices, 0.0), 0.0)
+    held = (shares > 1e-6) & price_ok & (market_value >= 1.0)
+    market_value = np.where(held, market_value, 0.0)
+    total_mv = market_value.sum(axis=0)
+
+    is_etf_column = np.array([t in etf_pe_daily.columns for t in tickers], dtype=bool)
+    etf_pe = etf_pe_daily.reindex(index=dates, columns=tickers).to_numpy(dtype=float).T
+    eps = stock_eps_daily.reindex(index=dates, columns=tickers).to_numpy(dtype=float).T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stock_pe = prices / eps
+    eps_ok = ~is_etf_column[:, None] & np.isfinite(eps) & (eps > 0)
+
+    pe = np.where(is_etf_column[:, None], etf_pe, np.where(eps_ok, stock_pe, np.nan))
+    # ETFs enter pe_map even when their series is NaN (mirrors the scalar loop).
+    has_pe = held & (is_etf_column[:, None] | eps_ok)
+    pe_ok = has_pe & (pe > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(total_mv > 0, market_value / total_mv, 0.0)
+        inverse_pe = np.where(pe_ok, 1.0 / np.where(pe_ok, pe, 1.0), 0.0)
+        weighted_yield = (np.where(pe_ok, weights, 0.0) * inverse_pe).sum(axis=0)
+        weight_sum = np.where(pe_ok, weights, 0.0).sum(axis=0)
+        portfolio_pe = 1.0 / (weighted_yield / weight_sum)
+    portfolio_ok = (total_mv > 0) & (weight_sum > 0) & (weighted_yield > 0)
+
+    ticker_pe: Dict[str, List[Any]] = {}
+    ticker_weights: Dict[str, List[Any]] = {}
+    weight_ok = weights > 0
+    for row in np.flatnonzero(has_pe.any(axis=1)):
+        ticker_pe[tickers[row]] = _rounded_list(pe[row], has_pe[row], 2)
+        ticker_weights[tickers[row]] = _rounded_list(weights[row], weight_ok[row], 5)
+
+    return {
+        "dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "portfolio_pe": _rounded_list(portfolio_pe, portfolio_ok, 2),
+        "ticker_pe": ticker_pe,
+        "ticker_weights": ticker_weights,
+    }
+
+
+def fetch_forward_pe(yahoo: Optional[TickerRequests] = None) -> Optional[Dict[str, Any]]:
     """Fetch forward PE for current holdings and compute portfolio forward PE.
 
     Reads current holdings from holdings_details.json, fetches forwardPE from
     Yahoo for each stock/ETF, and computes a weighted harmonic mean.
     Returns a dict with target_date, portfolio_forward_pe, and per-ticker values.
+    ``info`` requests go through the run's shared scheduler (``yahoo``), so
+    quotes already fetched for ETF P/E are reused.
     """
     if not HOLDINGS_DETAILS_PATH.exists():
         print("Warning: holdings_details.json not found, skipping forward PE")
@@ -1084,18 +1166,19 @@ def fetch_forward_pe() -> Optional[Dict[str, Any]]:
     fwd_pe_map: Dict[str, float] = {}
     ticker_fwd_pe: Dict[str, float] = {}
 
-    # Scrape MSCI data once, share across threads
+    # Scrape MSCI data once, share across holdings
     msci_data = scrape_msci_pe_data()
 
-    def fetch_single_forward_pe(ticker: str, details: dict) -> Optional[dict]:
+    def fetch_single_forward_pe(
+        ticker: str, details: dict, yahoo: TickerRequests
+    ) -> Optional[dict]:
         shares = float(details.get("shares", 0))
         if shares <= 0:
             return None
 
         symbol = yf_symbol(ticker)
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            info = yahoo.get(symbol, "info")
             if info is None:
                 return None
 
@@ -1118,12 +1201,10 @@ def fetch_forward_pe() -> Optional[Dict[str, Any]]:
             print(f"Warning: Exception computing forward PE for {ticker}: {e}", file=sys.stderr)
             return None
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_ticker = {
-            executor.submit(fetch_single_forward_pe, t, det): t for t, det in holdings.items()
-        }
-        for future in concurrent.futures.as_completed(future_to_ticker):
-            fetch_result = future.result()
+    with _ticker_requests(yahoo) as yahoo:
+        yahoo.prefetch([yf_symbol(t) for t in holdings], ["info"])
+        for t, det in holdings.items():
+            fetch_result = fetch_single_forward_pe(t, det, yahoo)
             if fetch_result:
                 ticker = fetch_result["ticker"]
                 shares = fetch_result["shares"]
@@ -1468,31 +1549,69 @@ def scrape_wsj_forward_pe() -> Optional[float]:
     return None
 
 
-def write_pe_outputs(final_output: Dict[str, Any], output_dir: Path = OUTPUT_DIR) -> None:
-    """Write pe_ratio.json plus a compact forward_pe.json sidecar.
+def write_pe_outputs(
+    final_output: Dict[str, Any],
+    output_dir: Path = OUTPUT_DIR,
+    precompress: Optional[bool] = None,
+) -> None:
+    """Write pe_ratio.json (v2 columnar encoding) plus a compact forward_pe.json sidecar.
 
     The position page only needs the small ``forward_pe`` section; giving it
-    its own file saves it from downloading the multi-MB historical series.
+    its own file saves it from downloading the historical series. Weekly and
+    monthly levels and per-year partitions go next to pe_ratio.json.
+    ``precompress`` (default: ``PRECOMPRESS_ARTIFACTS``, see
+    ``utils/precompress.py``) also writes ``.gz``/``.br`` siblings of both files.
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
-    with open(output_dir / "pe_ratio.json", "w") as f:
-        json.dump(final_output, f, separators=(",", ":"))
-    print(f"\nSaved to {output_dir / 'pe_ratio.json'}")
+    pe_path = output_dir / "pe_ratio.json"
+    encoded = encode_payload(final_output, PE_SERIES_DECIMALS)
+    written = export_json(pe_path, encoded, precompress=precompress, separators=(",", ":"))
+    print(f"\nSaved to {pe_path}")
+    if isinstance(final_output.get("dates"), list):
+        write_lod_levels(
+            pe_path,
+            encoded,
+            lambda freq: encode_payload(
+                downsample_payload(final_output, PE_LOD_AGGREGATIONS, freq), PE_SERIES_DECIMALS
+            ),
+        )
+        write_year_partitions(
+            pe_path, final_output, lambda part: encode_payload(part, PE_SERIES_DECIMALS)
+        )
+    for sibling in written[1:]:
+        print(f"Saved to {sibling}")
     forward_pe_section = final_output.get("forward_pe")
     if isinstance(forward_pe_section, dict):
-        with open(output_dir / "forward_pe.json", "w") as f:
-            json.dump(forward_pe_section, f, separators=(",", ":"))
+        export_json(
+            output_dir / "forward_pe.json",
+            forward_pe_section,
+            precompress=precompress,
+            separators=(",", ":"),
+        )
         print(f"Saved to {output_dir / 'forward_pe.json'}")
 
 
-def main():
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate portfolio P/E time series.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Refetch EPS for every stock, ignoring the earnings-calendar cache.",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        default=None,
+        help="Also write .gz/.br siblings of the outputs (default: $PRECOMPRESS_ARTIFACTS).",
+    )
+    args = parser.parse_args(argv)
+
     print("Loading existing PE data for fail-open fallback...")
     existing_pe_data = {}
     pe_file_path = OUTPUT_DIR / "pe_ratio.json"
     if pe_file_path.exists():
         try:
             with open(pe_file_path, "r") as f:
-                existing_pe_data = json.load(f)
+                existing_pe_data = decode_payload(json.load(f))
         except Exception as e:
             print(f"Failed to load existing pe_ratio.json: {e}")
 
@@ -1511,198 +1630,142 @@ def main():
     etf_tickers = [t for t in filtered_tickers if is_etf(t)]
     print(f"Processing {len(stock_tickers)} stocks and {len(etf_tickers)} ETFs...")
     print("Fetching ETF PEs...")
-    etf_pe_series = {}
-
-    # Use ThreadPoolExecutor to fetch ETF PEs concurrently
-    # max_workers=10 is a reasonable default to speed up requests without getting aggressively rate-limited
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        # Submit all tasks and keep track of futures
-        future_to_ticker = {executor.submit(fetch_etf_pe, t, dates): t for t in etf_tickers}
-        for future in concurrent.futures.as_completed(future_to_ticker):
-            t = future_to_ticker[future]
-            try:
-                pe_series = future.result()
-                if pe_series is not None:
-                    etf_pe_series[t] = pe_series
-            except Exception as exc:
-                print(f"  Warning: fetching ETF PE for {t} generated an exception: {exc}")
-
-    etf_pe_daily = pd.concat(etf_pe_series, axis=1) if etf_pe_series else pd.DataFrame(index=dates)
-    print("Fetching Stock EPS...")
-    all_stock_data = fetch_stock_eps_data(stock_tickers)
-    stock_eps_series = {}
-    for t, data in all_stock_data.items():
-        if not data["points"] and data["current_ttm"] is None:
-            continue
-        stock_eps_series[t] = build_point_in_time_eps_series(data, dates)
-        p0 = data["points"][0]["eps"] if data["points"] else 0
-        curr = data["current_ttm"] if data["current_ttm"] else 0
-        print(f"  {t}: HistPts={len(data['points'])}, First={p0:.2f}, Curr={curr:.2f}")
-    stock_eps_daily = (
-        pd.concat(stock_eps_series, axis=1) if stock_eps_series else pd.DataFrame(index=dates)
-    )
-    print("\nComputing Portfolio PE...")
-    result_dates, result_portfolio_pe = [], []
-    result_ticker_pe = {t: [] for t in all_tickers}
-    result_ticker_weights = {t: [] for t in all_tickers}
-    valid_ticker_mask = {}
-    for dt in dates:
-        mv_map, pe_map = {}, {}
-        total_mv = 0.0
+    # One scheduler for the whole run: every stage's Yahoo requests share its
+    # concurrency limits, and a symbol's quote is fetched once for all stages.
+    with FetchScheduler() as scheduler:
+        yahoo = TickerRequests(scheduler, _yf_ticker)
+        yahoo.prefetch(
+            [yf_symbol(t) for t in etf_tickers if t not in MANUAL_TICKER_PE_CURVES], ["info"]
+        )
+        etf_pe_series = {}
+        for t in etf_tickers:
+            pe_series = fetch_etf_pe(t, dates, yahoo)
+            if pe_series is not None:
+                etf_pe_series[t] = pe_series
+
+        etf_pe_daily = (
+            pd.concat(etf_pe_series, axis=1) if etf_pe_series else pd.DataFrame(index=dates)
+        )
+        print("Fetching Stock EPS...")
+        # Benchmark proxies share the EPS cache (and its refresh schedule) with holdings.
+        proxy_tickers = sorted(set(BENCHMARK_PE_TICKERS.values()) - set(stock_tickers))
+        eps_data = fetch_stock_eps_data(
+            stock_tickers + proxy_tickers, force=args.force, yahoo=yahoo
+        )
+        all_stock_data = {t: eps_data[t] for t in stock_tickers if t in eps_data}
+        for t, data in all_stock_data.items():
+            p0 = data["points"][0]["eps"] if data["points"] else 0
+            curr = data["current_ttm"] if data["current_ttm"] else 0
+            print(f"  {t}: HistPts={len(data['points'])}, First={p0:.2f}, Curr={curr:.2f}")
+        store = load_fundamentals_store()
+        appended = record_eps_fundamentals(
+            store, stock_tickers, load_eps_cache(), load_manual_patch(), date.today()
+        )
+        store.save()
+        print(f"  Fundamentals store: {appended} new revision(s), {len(store)} rows")
+        stock_eps_daily = store.as_of_matrix(
+            EPS_TTM,
+            list(all_stock_data),
+            dates,
+            current_metric=EPS_TTM_CURRENT,
+            today=pd.Timestamp.now().normalize(),
+        )
+        print("\nComputing Portfolio PE...")
+        pe_result = compute_portfolio_pe(
+            holdings_df, prices_df, all_tickers, etf_pe_daily, stock_eps_daily
+        )
+        valid_ticker_mask = pe_result["ticker_pe"]
+        # Record the last known price for each valid ticker so the frontend can
+        # scale the historical PE by the live price change without re-deriving EPS
+        # from a different source (which causes chart jumps).
+        result_ticker_last_prices: Dict[str, float] = {}
         for t in all_tickers:
-            shares = holdings_df.loc[dt, t]
-            if shares <= 1e-6:
-                continue
-            price = None
             t_clean = t.strip().upper().replace("-", "")
             if t_clean in prices_df.columns:
-                price_val = prices_df.loc[dt, t_clean]
-                if pd.notna(price_val) and price_val > 0:
-                    price = float(price_val)
-            if not price:
-                continue
-            mv = shares * price
-            if mv < 1.0:
-                continue
-            mv_map[t], total_mv = mv, total_mv + mv
-            if t in etf_pe_daily.columns:
-                pe_map[t] = etf_pe_daily.loc[dt, t]
-            elif t in stock_eps_daily.columns:
-                eps = stock_eps_daily.loc[dt, t]
-                if eps > 0:
-                    pe_map[t] = price / eps
-        portfolio_pe = calculate_harmonic_pe(mv_map, pe_map)
-        result_dates.append(dt.strftime("%Y-%m-%d"))
-        result_portfolio_pe.append(round(portfolio_pe, 2) if portfolio_pe else None)
-        for t in all_tickers:
-            val = pe_map.get(t)
-            if val is not None:
-                val = round(val, 2)
-                valid_ticker_mask[t] = True
-            result_ticker_pe[t].append(val)
-            w = mv_map.get(t, 0) / total_mv if total_mv > 0 else 0
-            result_ticker_weights[t].append(round(w, 5) if w > 0 else None)
-    # Record the last known price for each valid ticker so the frontend can
-    # scale the historical PE by the live price change without re-deriving EPS
-    # from a different source (which causes chart jumps).
-    result_ticker_last_prices: Dict[str, float] = {}
-    for t in all_tickers:
-        t_clean = t.strip().upper().replace("-", "")
-        if t_clean in prices_df.columns:
-            price_series = prices_df[t_clean].dropna()
-            if not price_series.empty:
-                result_ticker_last_prices[t] = round(float(price_series.iloc[-1]), 4)
-    final_output = {
-        "dates": result_dates,
-        "portfolio_pe": result_portfolio_pe,
-        "ticker_pe": {t: v for t, v in result_ticker_pe.items() if t in valid_ticker_mask},
-        "ticker_weights": {
-            t: v for t, v in result_ticker_weights.items() if t in valid_ticker_mask
-        },
-        "ticker_prices": {
-            t: v for t, v in result_ticker_last_prices.items() if t in valid_ticker_mask
-        },
-    }
+                price_series = prices_df[t_clean].dropna()
+                if not price_series.empty:
+                    result_ticker_last_prices[t] = round(float(price_series.iloc[-1]), 4)
+        final_output = {
+            **pe_result,
+            "ticker_prices": {
+                t: v for t, v in result_ticker_last_prices.items() if t in valid_ticker_mask
+            },
+        }
 
-    # Compute forward PE from current holdings
-    print("Fetching Forward PE...")
-    forward_pe = fetch_forward_pe()
-    if forward_pe:
-        # Fail-open: keep the last good msci_pe_ratio if this run's MSCI scrape
-        # failed, so VT's frontend-derived forward P/E doesn't disappear.
-        forward_pe = carry_forward_msci_pe_ratio(forward_pe, existing_pe_data)
-        warn_if_msci_ratio_stale(forward_pe)
-        final_output["forward_pe"] = forward_pe
-        print(
-            f"  Portfolio Forward PE: {forward_pe['portfolio_forward_pe']}x "
-            f"(target: {forward_pe['target_date']})"
-        )
-        for t, pe in sorted(forward_pe["ticker_forward_pe"].items()):
-            print(f"    {t}: {pe}x")
-    else:
-        print("  No forward PE data available. Attempting fallback...")
-        if "forward_pe" in existing_pe_data:
-            final_output["forward_pe"] = existing_pe_data["forward_pe"]
+        # Compute forward PE from current holdings
+        print("Fetching Forward PE...")
+        forward_pe = fetch_forward_pe(yahoo)
+        if forward_pe:
+            # Fail-open: keep the last good msci_pe_ratio if this run's MSCI scrape
+            # failed, so VT's frontend-derived forward P/E doesn't disappear.
+            forward_pe = carry_forward_msci_pe_ratio(forward_pe, existing_pe_data)
+            assert forward_pe is not None  # carry-forward only returns None for None
+            warn_if_msci_ratio_stale(forward_pe)
+            final_output["forward_pe"] = forward_pe
             print(
-                f"  Fallback successful. Loaded old Portfolio Forward PE: {final_output['forward_pe'].get('portfolio_forward_pe')}x"
+                f"  Portfolio Forward PE: {forward_pe['portfolio_forward_pe']}x "
+                f"(target: {forward_pe['target_date']})"
             )
+            for t, pe in sorted(forward_pe["ticker_forward_pe"].items()):
+                print(f"    {t}: {pe}x")
         else:
-            print("  Fallback failed. No existing portfolio forward PE data found.")
-
-    # Compute benchmark PE series (^GSPC, ^IXIC)
-    print("Fetching Benchmark PE...")
-    benchmark_pe: Dict[str, Any] = {}
-    benchmark_fwd_pe: Dict[str, float] = {}
-    for bmk_ticker, proxy_etf in BENCHMARK_PE_TICKERS.items():
-        # Use daily price/EPS approach for true daily granularity
-        manual_anchors = MANUAL_TICKER_PE_CURVES.get(bmk_ticker)
-
-        # Merge benchmark_history.json entries into manual anchors
-        if BENCHMARK_HISTORY_PATH.exists():
-            try:
-                with open(BENCHMARK_HISTORY_PATH, "r") as f:
-                    history = json.load(f)
-                if bmk_ticker in history:
-                    if manual_anchors is None:
-                        manual_anchors = {}
-                    else:
-                        manual_anchors = manual_anchors.copy()
-                    manual_anchors.update(history[bmk_ticker])
-            except Exception as e:
+            print("  No forward PE data available. Attempting fallback...")
+            if "forward_pe" in existing_pe_data:
+                final_output["forward_pe"] = existing_pe_data["forward_pe"]
                 print(
-                    f"Warning: Failed to merge manual anchors from BENCHMARK_HISTORY_PATH for {bmk_ticker}: {e}"
+                    f"  Fallback successful. Loaded old Portfolio Forward PE: {final_output['forward_pe'].get('portfolio_forward_pe')}x"
                 )
-
-        pe_series = fetch_benchmark_pe_daily(proxy_etf, dates, manual_anchors=manual_anchors)
-        if pe_series is None:
-            # Fallback to old interpolation method
-            pe_series = fetch_etf_pe(bmk_ticker, dates)
+            else:
+                print("  Fallback failed. No existing portfolio forward PE data found.")
+
+        # Compute benchmark PE series (^GSPC, ^IXIC)
+        print("Fetching Benchmark PE...")
+        benchmark_pe: Dict[str, Any] = {}
+        benchmark_fwd_pe: Dict[str, float] = {}
+        valuation = BenchmarkValuation(
+            BENCHMARK_PE_TICKERS,
+            dates,
+            MANUAL_TICKER_PE_CURVES,
+            fetch_eps=lambda proxies: {p: eps_data[p] for p in proxies if p in eps_data},
+            fetch_info=lambda proxy: yahoo.get(proxy, "info"),
+            fetch_prices=_download_close,
+            stored_prices=load_stored_prices(),
+        )
+        benchmark_series = valuation.compute()
+        for bmk_ticker, proxy_etf in BENCHMARK_PE_TICKERS.items():
+            pe_series = benchmark_series.get(bmk_ticker)
             if pe_series is None:
                 print(f"  {bmk_ticker}: No PE data available")
                 continue
-            # Update last point with live PE
-            try:
-                proxy_info = yf.Ticker(proxy_etf).info
-                if proxy_info:
-                    live_pe = proxy_info.get("trailingPE")
-                    if live_pe and math.isfinite(live_pe) and live_pe > 0:
-                        pe_series.iloc[-1] = float(live_pe)
-            except Exception as e:
-                print(f"  {bmk_ticker} proxy info error: {e}")
-
-        # Fetch forward PE
-        if bmk_ticker == "^GSPC":
-            wsj_pe = scrape_wsj_forward_pe()
-            if wsj_pe is not None:
-                benchmark_fwd_pe[bmk_ticker] = round(wsj_pe, 2)
-                print(f"  {bmk_ticker}: Fetched Forward PE {wsj_pe} from WSJ")
+
+            # Fetch forward PE
+            if bmk_ticker == "^GSPC":
+                wsj_pe = scrape_wsj_forward_pe()
+                if wsj_pe is not None:
+                    benchmark_fwd_pe[bmk_ticker] = round(wsj_pe, 2)
+                    print(f"  {bmk_ticker}: Fetched Forward PE {wsj_pe} from WSJ")
+                else:
+                    fwd_pe_dict = existing_pe_data.get("forward_pe", {})
+                    bmk_fwd_pe_dict = fwd_pe_dict.get("benchmark_forward_pe", {})
+                    if bmk_ticker in bmk_fwd_pe_dict:
+                        benchmark_fwd_pe[bmk_ticker] = bmk_fwd_pe_dict[bmk_ticker]
+                        print(
+                            f"  {bmk_ticker}: Fetched Forward PE {benchmark_fwd_pe[bmk_ticker]} from existing pe_ratio.json (fallback)"
+                        )
             else:
-                fwd_pe_dict = existing_pe_data.get("forward_pe", {})
-                bmk_fwd_pe_dict = fwd_pe_dict.get("benchmark_forward_pe", {})
-                if bmk_ticker in bmk_fwd_pe_dict:
-                    benchmark_fwd_pe[bmk_ticker] = bmk_fwd_pe_dict[bmk_ticker]
-                    print(
-                        f"  {bmk_ticker}: Fetched Forward PE {benchmark_fwd_pe[bmk_ticker]} from existing pe_ratio.json (fallback)"
-                    )
-        else:
-            try:
-                proxy_info = yf.Ticker(proxy_etf).info
-                if proxy_info:
-                    fwd_pe = proxy_info.get("forwardPE")
-                    if fwd_pe and math.isfinite(fwd_pe) and fwd_pe > 0:
-                        benchmark_fwd_pe[bmk_ticker] = round(float(fwd_pe), 2)
-            except Exception as e:
-                print(f"  {bmk_ticker} forward PE error: {e}")
-
-        pe_values = [
-            round(float(v), 2) if pd.notna(v) and math.isfinite(v) else None for v in pe_series
-        ]
-        benchmark_pe[bmk_ticker] = pe_values
-        latest = next((v for v in reversed(pe_values) if v is not None), None)
-        fwd_label = (
-            f", Fwd={benchmark_fwd_pe[bmk_ticker]}x" if bmk_ticker in benchmark_fwd_pe else ""
-        )
-        print(f"  {bmk_ticker} ({proxy_etf}): Latest={latest}x{fwd_label}")
+                fwd_pe = valuation.forward_pe(proxy_etf)
+                if fwd_pe is not None:
+                    benchmark_fwd_pe[bmk_ticker] = round(fwd_pe, 2)
+
+            pe_values = [
+                round(float(v), 2) if pd.notna(v) and math.isfinite(v) else None for v in pe_series
+            ]
+            benchmark_pe[bmk_ticker] = pe_values
+            latest = next((v for v in reversed(pe_values) if v is not None), None)
+            fwd_label = (
+                f", Fwd={benchmark_fwd_pe[bmk_ticker]}x" if bmk_ticker in benchmark_fwd_pe else ""
+            )
+            print(f"  {bmk_ticker} ({proxy_etf}): Latest={latest}x{fwd_label}")
 
     if benchmark_pe:
         final_output["benchmark_pe"] = benchmark_pe
@@ -1726,7 +1789,7 @@ def main():
     # so a carried ticker is part of the harmonic mean too.
     final_output = recompute_portfolio_pe_from_ticker_series(final_output)
 
-    write_pe_outputs(final_output)
+    write_pe_outputs(final_output, precompress=args.precompress)
 
 
 if __name__ == "__main__":
@@ -11,14 +11,29 @@ import atexit
 import json
 import logging
 import shutil
+import sys
 import tempfile
-from datetime import timedelta
+from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.dividend_cache import (  # noqa: E402
+    FETCHED_KEY,
+    decode_dividend_cache,
+    dividend_matrix,
+    dividend_series,
+    encode_dividend_cache,
+)
+from utils.fetch_scheduler import FetchScheduler, TickerRequests  # noqa: E402
+from utils.lod import downsample_records, write_lod_levels  # noqa: E402
+from utils.partitions import write_year_partitions  # noqa: E402
+from utils.precompress import export_json  # noqa: E402
+
 # Configure yfinance to use a temporary directory for timezone cache
 _yf_cache_dir = tempfile.mkdtemp(prefix="yf-cache-")
 yf.set_tz_cache_location(_yf_cache_dir)
@@ -36,6 +51,25 @@ HOLDINGS_PATH = CHECKPOINT_DIR / "holdings_daily.parquet"
 PRICES_PATH = DATA_DIR / "historical_prices.parquet"
 DIVIDEND_CACHE_PATH = CHECKPOINT_DIR / "dividend_cache.json"
 OUTPUT_FILE = DATA_DIR / "yield_data.json"
+# Weekly/monthly levels of yield_data.json (see utils/lod.py). Dividend fields
+# become the period's total.
+YIELD_LOD_AGGREGATIONS = {
+    "forward_yield": "mean",
+    "ttm_income": "last",
+    "market_value": "last",
+    "daily_dividend": "sum",
+    "daily_dividends_by_ticker": "sum",
+}
+YIELD_DECIMALS = {
+    "forward_yield": 4,
+    "ttm_income": 2,
+    "market_value": 2,
+    "daily_dividend": 2,
+    "daily_dividends_by_ticker": 2,
+}
+
+# Closed positions can still see vendor corrections and split re-adjustments.
+DIVIDEND_CACHE_TTL_DAYS = 30
 
 TICKER_MAP = {
     'BRKB': 'BRK-B',
@@ -45,111 +79,201 @@ TICKER_MAP = {
 
 
 def load_dividend_cache() -> Dict[str, Any]:
-    """Load cached dividend data."""
+    """Load cached dividend data (layout in ``utils/dividend_cache.py``).
+
+    A v1 file loads without fetch dates, so every ticker is refetched once.
+    """
     if DIVIDEND_CACHE_PATH.exists():
         try:
             with DIVIDEND_CACHE_PATH.open("r", encoding="utf-8") as f:
                 data = json.load(f)
-                return dict(data)
+            cache: Dict[str, Any] = decode_dividend_cache(data)
+            return cache
         except Exception as e:
             logging.warning(f"Error loading dividend cache: {e}")
     return {}
 
 
 def save_dividend_cache(cache: Dict[str, Any]):
-    """Save dividend data to cache."""
+    """Save dividend data to cache as compact columns."""
     CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    payload = encode_dividend_cache(cache)
     try:
         with DIVIDEND_CACHE_PATH.open("w", encoding="utf-8") as f:
-            json.dump(cache, f, indent=4)
+            json.dump(payload, f, separators=(",", ":"))
     except Exception as e:
         logging.error(f"Error saving dividend cache: {e}")
 
 
-def fetch_dividends(tickers: List[str], cache: Dict[str, Any]) -> Dict[str, Any]:
-    """Fetch historical dividends for all tickers."""
-    updated = False
-    for ticker_symbol in tickers:
-        yf_sym = TICKER_MAP.get(ticker_symbol, ticker_symbol)
+def dividend_refresh_reason(fetched: Optional[str], held: bool, today: date) -> Optional[str]:
+    """Return why a ticker's dividends must be refetched, or None if the cache is fresh.
 
-        logging.info(f"Fetching dividends for {ticker_symbol}...")
-        try:
-            t = yf.Ticker(yf_sym)
-            divs = t.dividends
-            if divs.empty:
-                cache[ticker_symbol] = []
+    ``"uncached"``/``"expired"`` need the full history; ``"held"`` only needs
+    the events since the last cached ex-date.
+    """
+    try:
+        fetched_date = date.fromisoformat(str(fetched)[:10])
+    except ValueError:
+        return "uncached"
+    if (today - fetched_date).days >= DIVIDEND_CACHE_TTL_DAYS:
+        return "expired"
+    if held and fetched_date < today:
+        return "held"
+    return None
+
+
+def _dividend_events(divs: Any) -> List[List[Any]]:
+    if divs is None or divs.empty:
+        return []
+    # Store as list of [date_str, amount]
+    return [[d.strftime("%Y-%m-%d"), float(v)] for d, v in divs.items() if v > 0]
+
+
+def _yf_ticker(symbol: str) -> Any:
+    return yf.Ticker(symbol)
+
+
+def _tail_request(events: List[List[Any]], fetched: str) -> Tuple[str, Dict[str, Any]]:
+    # Re-read from the last cached ex-date so a corrected latest amount is picked up.
+    start = events[-1][0] if events else str(fetched)[:10]
+    return ("history", {"start": start, "actions": True})
+
+
+def fetch_dividends(
+    tickers: List[str],
+    cache: Dict[str, Any],
+    held: Optional[Iterable[str]] = None,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Refresh historical dividends for the tickers that need it.
+
+    Closed positions are refetched only once their cache entry is older than
+    ``DIVIDEND_CACHE_TTL_DAYS``; ``held`` tickers (default: all) are topped up
+    daily with the events since their last cached ex-date. A stock split in
+    that window invalidates the cached split-adjusted amounts, so the full
+    history is refetched instead. Fetches run in parallel on a
+    ``FetchScheduler``; the cache is saved only if something was fetched.
+    """
+    today = today or date.today()
+    held_set = set(tickers if held is None else held)
+    fetched = cache.setdefault(FETCHED_KEY, {})
+
+    reasons = {t: dividend_refresh_reason(fetched.get(t), t in held_set, today) for t in tickers}
+    stale = [t for t in tickers if reasons[t]]
+    logging.info(f"Dividends: {len(tickers) - len(stale)} cached, {len(stale)} to fetch")
+    if not stale:
+        return cache
+
+    with FetchScheduler() as scheduler:
+        yahoo = TickerRequests(scheduler, _yf_ticker)
+        requests: Dict[str, Union[str, Tuple[str, Dict[str, Any]]]] = {}
+        for t in stale:
+            if reasons[t] == "held" and t in cache:
+                requests[t] = _tail_request(cache[t], fetched[t])
             else:
-                # Store as list of [date_str, amount]
-                cache[ticker_symbol] = [[d.strftime("%Y-%m-%d"), float(v)] for d, v in divs.items()]
-            updated = True
-        except Exception as e:
-            logging.error(f"Error fetching {ticker_symbol}: {e}")
-            cache[ticker_symbol] = []
-
-    if updated:
-        save_dividend_cache(cache)
+                requests[t] = "dividends"
+            yahoo.request(TICKER_MAP.get(t, t), requests[t])
+
+        for t in stale:
+            yf_sym = TICKER_MAP.get(t, t)
+            logging.info(f"Fetching dividends for {t} ({reasons[t]})...")
+            request = requests[t]
+            try:
+                if isinstance(request, str):
+                    cache[t] = _dividend_events(yahoo.get(yf_sym, request))
+                else:
+                    tail = yahoo.get(yf_sym, request)
+                    if tail is None or tail.empty:
+                        # The window starts at a cached ex-date, so it is never
+                        # legitimately empty: keep the cache and retry next run.
+                        logging.warning(f"Empty dividend history for {t}; keeping cache")
+                        continue
+                    splits = tail.get("Stock Splits")
+                    if splits is not None and (splits > 0).any():
+                        # Cached amounts predate the split adjustment.
+                        cache[t] = _dividend_events(yahoo.get(yf_sym, "dividends"))
+                    else:
+                        start = request[1]["start"]
+                        new_events = _dividend_events(tail.get("Dividends"))
+                        cache[t] = [e for e in cache[t] if e[0] < start] + new_events
+                fetched[t] = today.isoformat()
+            except Exception as e:
+                logging.error(f"Error fetching {t}: {e}")
+                cache.setdefault(t, [])
+
+    save_dividend_cache(cache)
     return cache
 
 
-def _calculate_daily_yield(
-    current_date, holdings_df, prices_df, ticker_ttm_divs, ticker_divs, tickers
-):
-    portfolio_market_value = 0.0
-    portfolio_forward_dividend_income = 0.0
-    portfolio_ttm_dividend_collected = 0.0
-    portfolio_daily_dividend = 0.0
-    daily_dividends_by_ticker = {}
-
-    date_str = current_date.strftime("%Y-%m-%d")
-    ttm_start = current_date - timedelta(days=365)
-
-    for t in tickers:
-        shares = holdings_df.at[current_date, t]
-        if shares <= 0:
-            continue
-
-        # Skip tickers without price data (e.g., delisted stocks not in prices DataFrame)
-        if t not in prices_df.columns:
-            continue
-
-        price = prices_df.at[current_date, t]
-        if pd.isna(price) or price <= 0:
-            continue
-
-        portfolio_market_value += shares * price
-
-        # 1. Forward Dividend Income (Proxy using TTM sum at this date)
-        annual_div_per_share = ticker_ttm_divs[t].at[current_date]
-        portfolio_forward_dividend_income += shares * annual_div_per_share
-
-        # 2. TTM Dividends Collected (Actual cash based on historical shares)
-        div_series = ticker_divs[t]
-        ttm_div_events = div_series[
-            (div_series.index > ttm_start) & (div_series.index <= current_date)
-        ]
-        for ex_date, amt in ttm_div_events.items():
-            if ex_date in holdings_df.index:
-                portfolio_ttm_dividend_collected += holdings_df.at[ex_date, t] * amt
-
-        # 3. Daily dividends received on exactly this date
-        if current_date in div_series.index:
-            ticker_div = holdings_df.at[current_date, t] * div_series.at[current_date]
-            if ticker_div > 0:
-                portfolio_daily_dividend += ticker_div
-                daily_dividends_by_ticker[t] = round(ticker_div, 2)
-
-    forward_yield = 0.0
-    if portfolio_market_value > 0:
-        forward_yield = (portfolio_forward_dividend_income / portfolio_market_value) * 100.0
-
-    return {
-        "date": date_str,
-        "forward_yield": round(forward_yield, 4),
-        "ttm_income": round(portfolio_ttm_dividend_collected, 2),
-        "market_value": round(portfolio_market_value, 2),
-        "daily_dividend": round(portfolio_daily_dividend, 2),
-        "daily_dividends_by_ticker": daily_dividends_by_ticker,
-    }
+def _ttm_sum(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sum over the trailing 365 days, i.e. ``(d - 365 days, d]``, per column."""
+    return frame.rolling(window=pd.Timedelta(days=365)).sum()
+
+
+def _round(values: np.ndarray, decimals: int) -> List[float]:
+    # Rolling sums leave float dust such as -1e-13; adding 0.0 turns -0.0 into 0.0.
+    rounded: List[float] = (np.round(values, decimals) + 0.0).tolist()
+    return rounded
+
+
+def _calculate_yield_records(
+    dates: pd.DatetimeIndex,
+    holdings_df: pd.DataFrame,
+    prices_df: pd.DataFrame,
+    ttm_divs: pd.DataFrame,
+    ex_date_divs: pd.DataFrame,
+) -> List[Dict[str, Any]]:
+    """Daily yield records for the (date x ticker) matrices, all days at once.
+
+    A ticker counts on a date only while held with a positive price. Its
+    forward income is shares x TTM dividend per share; TTM income is the cash
+    actually collected (shares on each ex-date x dividend) over the trailing
+    365 days.
+    """
+    tickers = list(ttm_divs.columns)
+    shares = holdings_df[tickers].to_numpy(dtype=float)
+    # Tickers without price data (e.g. delisted) become NaN columns and never count.
+    prices = prices_df.reindex(columns=tickers).to_numpy(dtype=float)
+    counted = (shares > 0) & (prices > 0)
+
+    cash = shares * ex_date_divs.to_numpy(dtype=float)
+    ttm_cash = _ttm_sum(pd.DataFrame(cash, index=dates)).to_numpy()
+    daily_cash = np.where(counted & (cash > 0), cash, 0.0)
+
+    market_value = np.where(counted, shares * prices, 0.0).sum(axis=1)
+    forward_income = np.where(counted, shares * ttm_divs.to_numpy(dtype=float), 0.0).sum(axis=1)
+    ttm_income = np.where(counted, ttm_cash, 0.0).sum(axis=1)
+    forward_yield = np.divide(
+        forward_income * 100.0,
+        market_value,
+        out=np.zeros_like(market_value),
+        where=market_value > 0,
+    )
+
+    by_ticker: List[Dict[str, float]] = [{} for _ in range(len(dates))]
+    rows, cols = np.nonzero(daily_cash)
+    for row, col, amount in zip(rows, cols, _round(daily_cash[rows, cols], 2), strict=True):
+        by_ticker[row][tickers[col]] = amount
+
+    return [
+        {
+            "date": date_str,
+            "forward_yield": fy,
+            "ttm_income": ttm,
+            "market_value": mv,
+            "daily_dividend": daily,
+            "daily_dividends_by_ticker": per_ticker,
+        }
+        for date_str, fy, ttm, mv, daily, per_ticker in zip(
+            dates.strftime("%Y-%m-%d"),
+            _round(forward_yield, 4),
+            _round(ttm_income, 2),
+            _round(market_value, 2),
+            _round(daily_cash.sum(axis=1), 2),
+            by_ticker,
+            strict=True,
+        )
+    ]
 
 
 def calculate_yield_data():
@@ -177,46 +301,30 @@ def calculate_yield_data():
 
     tickers = [c for c in holdings_df.columns if c != 'date']
     dividend_cache = load_dividend_cache()
-    dividend_cache = fetch_dividends(tickers, dividend_cache)
-
-    # Pre-process dividends into Series for faster access and pre-calculate TTM
-    ticker_divs = {}
-    ticker_ttm_divs = {}  # Pre-calculated TTM sum for forward yield proxy
-
-    for t in tickers:
-        div_data = dividend_cache.get(t, [])
-        if div_data:
-            df = pd.DataFrame(div_data, columns=['date', 'amount'])
-            df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
-            df = df.set_index('date')['amount']
-            s = df.sort_index()
-            ticker_divs[t] = s
-
-            # Pre-calculate TTM sum for each possible date in our range
-            # We want the sum of dividends in [d - 365 days, d]
-            full_range_s = s.reindex(dates.union(s.index)).fillna(0)
-            # Rolling 365D sum
-            ticker_ttm_divs[t] = (
-                full_range_s.rolling(window=pd.Timedelta(days=365)).sum().reindex(dates)
-            )
-        else:
-            ticker_divs[t] = pd.Series(dtype=float, index=pd.DatetimeIndex([]))
-            ticker_ttm_divs[t] = pd.Series(0.0, index=dates)
-
-    results = []
+    held = [t for t in tickers if holdings_df[t].iloc[-1] > 0]
+    dividend_cache = fetch_dividends(tickers, dividend_cache, held=held)
 
-    logging.info(f"Processing {len(dates)} days...")
+    ticker_divs = dividend_series(dividend_cache, tickers)
 
-    for current_date in dates:
-        results.append(
-            _calculate_daily_yield(
-                current_date, holdings_df, prices_df, ticker_ttm_divs, ticker_divs, tickers
-            )
-        )
+    # Ex-dates before the first holding date still count toward the TTM per-share sum.
+    div_dates = [s.index for s in ticker_divs.values()]
+    per_share = dividend_matrix(ticker_divs, dates.append(div_dates).unique().sort_values())
+    ttm_divs = _ttm_sum(per_share).reindex(dates)
+    ex_date_divs = per_share.reindex(dates)
+
+    logging.info(f"Processing {len(dates)} days...")
+    results = _calculate_yield_records(dates, holdings_df, prices_df, ttm_divs, ex_date_divs)
 
     # Save to JSON
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
+    export_json(OUTPUT_FILE, results, indent=2)
+    write_lod_levels(
+        OUTPUT_FILE,
+        results,
+        lambda freq: downsample_records(
+            results, YIELD_LOD_AGGREGATIONS, freq, decimals=YIELD_DECIMALS
+        ),
+    )
+    write_year_partitions(OUTPUT_FILE, results)
 
     logging.info(f"Yield data saved to {OUTPUT_FILE}")
 
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Array-backed tax-lot engine for cost basis and realized/unrealized P&L.
+
+Trades are matched against open lots with one of four relief methods:
+
+* ``fifo``    - oldest lots first (vectorized, see ``_match_fifo``)
+* ``lifo``    - newest lots first
+* ``hifo``    - highest-cost lots first
+* ``average`` - every sale relieves the running average cost
+
+FIFO is solved without a per-trade loop: sells consume a contiguous range of
+the cumulative buy quantity, so their cost is a difference of one
+interpolated cumulative-cost curve. The other methods need lot state and run a
+tight loop over plain arrays (a stack, a heap, or two running totals).
+
+Sales that exceed the open position are treated as zero cost basis, matching
+the historical behaviour of ``calculate_ratios.calculate_stats``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+CHECKPOINT_DIR = DATA_DIR / 'checkpoints'
+TRANSACTIONS_PATH = CHECKPOINT_DIR / 'transactions_with_splits.parquet'
+PRICES_PATH = DATA_DIR / 'historical_prices.parquet'
+REALIZED_PNL_PATH = CHECKPOINT_DIR / 'realized_pnl_daily.parquet'
+UNREALIZED_PNL_PATH = CHECKPOINT_DIR / 'unrealized_pnl_daily.parquet'
+
+LOT_METHODS = ('fifo', 'lifo', 'hifo', 'average')
+QUANTITY_EPSILON = 1e-9
+
+
+@dataclass(frozen=True)
+class LotMatchResult:
+    """Per-trade outputs, aligned with the input rows."""
+
+    method: str
+    realized: np.ndarray
+    open_shares: np.ndarray
+    open_cost: np.ndarray
+
+
+def _prepare_inputs(
+    securities, quantities, trade_values, is_buy
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    codes, _ = pd.factorize(np.asarray(securities, dtype=object))
+    qty = np.asarray(quantities, dtype=float)
+    value = np.asarray(trade_values, dtype=float)
+    buy = np.asarray(is_buy, dtype=bool)
+
+    # Like calculate_stats, trades without a positive quantity and value are
+    # ignored: they neither open nor relieve lots.
+    active = np.isfinite(qty) & (qty > 0) & np.isfinite(value) & (value > 0)
+    qty = np.where(active, qty, 0.0)
+    value = np.where(active, value, 0.0)
+    return codes.astype(np.int64), qty, value, buy
+
+
+def _match_fifo(
+    codes: np.ndarray, qty: np.ndarray, value: np.ndarray, buy: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_rows = len(codes)
+    # Stable sort by security keeps each security's trades in input order.
+    order = np.argsort(codes, kind='stable')
+    codes_s, qty_s, value_s, buy_s = codes[order], qty[order], value[order], buy[order]
+
+    buy_qty = np.where(buy_s, qty_s, 0.0)
+    buy_cost = np.where(buy_s, value_s, 0.0)
+    sell_qty = np.where(buy_s, 0.0, qty_s)
+
+    groups = pd.Series(codes_s)
+    bought = pd.Series(buy_qty).groupby(groups).cumsum().to_numpy()
+    sold = pd.Series(sell_qty).groupby(groups).cumsum().to_numpy()
+
+    # Quantity actually relieved from lots. Oversold shares never consume
+    # future buys: relieved_k = min(relieved_{k-1} + sell_k, bought_k), which
+    # unrolls to sold_k + min(0, min_{j<=k}(bought_j - sold_j)).
+    slack = pd.Series(bought - sold).groupby(groups).cummin().to_numpy()
+    relieved = sold + np.minimum(slack, 0.0)
+
+    # Lay every security's cumulative-buy axis end to end (with a gap) so a
+    # single np.interp evaluates the cost of any relieved quantity.
+    group_start = np.r_[True, codes_s[1:] != codes_s[:-1]] if n_rows else np.array([], bool)
+    group_total = pd.Series(buy_qty).groupby(groups).transform('sum').to_numpy()
+    span = np.where(group_start, group_total + 1.0, 0.0)
+    group_id = np.cumsum(group_start) - 1
+    offset = (np.cumsum(span) - span)[group_start][group_id]
+
+    cost_before_group = (
+        np.cumsum(buy_cost) - pd.Series(buy_cost).groupby(groups).cumsum().to_numpy()
+    )
+
+    starts = np.flatnonzero(group_start)
+    points_x = [offset[starts]]
+    points_y = [cost_before_group[starts]]
+    buy_rows = np.flatnonzero(buy_s & (qty_s > 0))
+    points_x.append(offset[buy_rows] + bought[buy_rows])
+    points_y.append(np.cumsum(buy_cost)[buy_rows])
+    xp = np.concatenate(points_x)
+    yp = np.concatenate(points_y)
+    curve = np.argsort(xp, kind='stable')
+    xp, yp = xp[curve], yp[curve]
+
+    def cost_at(quantity: np.ndarray) -> np.ndarray:
+        return np.asarray(np.interp(offset + quantity, xp, yp) - cost_before_group)
+
+    relieved_cost = cost_at(relieved)
+    previous_cost = np.where(group_start, 0.0, np.r_[0.0, relieved_cost[:-1]])
+    realized_s = np.where(buy_s, 0.0, value_s - (relieved_cost - previous_cost))
+
+    open_shares_s = bought - relieved
+    open_cost_s = cost_at(bought) - relieved_cost
+
+    realized = np.empty(n_rows)
+    open_shares = np.empty(n_rows)
+    open_cost = np.empty(n_rows)
+    realized[order] = realized_s
+    open_shares[order] = open_shares_s
+    open_cost[order] = open_cost_s
+    return realized, open_shares, open_cost
+
+
+def _match_sequential(
+    codes: np.ndarray, qty: np.ndarray, value: np.ndarray, buy: np.ndarray, method: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_rows = len(codes)
+    realized = np.zeros(n_rows)
+    open_shares = np.zeros(n_rows)
+    open_cost = np.zeros(n_rows)
+
+    n_securities = int(codes.max()) + 1 if n_rows else 0
+    shares = np.zeros(n_securities)
+    cost = np.zeros(n_securities)
+    # Open lots hold [remaining_qty, unit_cost]; HIFO keeps a heap keyed on
+    # (-unit_cost, sequence) so the most expensive lot pops first.
+    books: List[list] = [[] for _ in range(n_securities)]
+
+    for row in range(n_rows):
+        code = codes[row]
+        quantity = qty[row]
+        if quantity <= 0:
+            open_shares[row], open_cost[row] = shares[code], cost[code]
+            continue
+
+        if buy[row]:
+            unit_cost = value[row] / quantity
+            if method == 'lifo':
+                books[code].append([quantity, unit_cost])
+            elif method == 'hifo':
+                heapq.heappush(books[code], (-unit_cost, row, [quantity]))
+            shares[code] += quantity
+            cost[code] += value[row]
+        else:
+            remaining = quantity
+            relieved_cost = 0.0
+            if method == 'average':
+                used = min(remaining, shares[code])
+                if shares[code] > QUANTITY_EPSILON:
+                    relieved_cost = cost[code] * used / shares[code]
+                remaining -= used
+            else:
+                book = books[code]
+                while remaining > QUANTITY_EPSILON and book:
+                    if method == 'lifo':
+                        lot_qty, unit_cost = book[-1]
+                    else:
+                        neg_cost, _, holder = book[0]
+                        lot_qty, unit_cost = holder[0], -neg_cost
+                    used = min(remaining, lot_qty)
+                    relieved_cost += used * unit_cost
+                    remaining -= used
+                    if lot_qty - used <= QUANTITY_EPSILON:
+                        if method == 'lifo':
+                            book.pop()
+                        else:
+                            heapq.heappop(book)
+                    elif method == 'lifo':
+                        book[-1][0] = lot_qty - used
+                    else:
+                        holder[0] = lot_qty - used
+            used_total = quantity - max(remaining, 0.0)
+            realized[row] = value[row] - relieved_cost
+            shares[code] = max(shares[code] - used_total, 0.0)
+            cost[code] = max(cost[code] - relieved_cost, 0.0) if shares[code] > 0 else 0.0
+
+        open_shares[row], open_cost[row] = shares[code], cost[code]
+
+    return realized, open_shares, open_cost
+
+
+def match_lots(
+    securities, quantities, trade_values, is_buy, method: str = 'fifo'
+) -> LotMatchResult:
+    """Match chronologically ordered trades against open lots.
+
+    ``quantities`` are positive share counts (split-adjusted) and
+    ``trade_values`` the gross cash amount of each trade. Returns realized
+    gain per row and each row's security's open shares and cost basis after
+    the row.
+    """
+    method = method.lower()
+    if method not in LOT_METHODS:
+        raise ValueError(f'Unknown lot method {method!r}; expected one of {LOT_METHODS}')
+
+    codes, qty, value, buy = _prepare_inputs(securities, quantities, trade_values, is_buy)
+    if method == 'fifo':
+        realized, open_shares, open_cost = _match_fifo(codes, qty, value, buy)
+    else:
+        realized, open_shares, open_cost = _match_sequential(codes, qty, value, buy, method)
+    return LotMatchResult(method, realized, open_shares, open_cost)
+
+
+def match_transactions(transactions: pd.DataFrame, method: str = 'fifo') -> pd.DataFrame:
+    """Run ``match_lots`` over a split-adjusted transactions frame.
+
+    Expects ``trade_date``, ``security``, ``order_type``, ``adjusted_quantity``
+    and ``trade_value`` columns; returns the rows in chronological order with
+    ``realized_gain``, ``open_shares`` and ``open_cost`` appended.
+    """
+    ordered = transactions.sort_values(by=['trade_date', 'security', 'order_type'])
+    ordered = ordered.reset_index(drop=True)
+    order_type = ordered['order_type'].astype(str).str.strip().str.lower()
+    trades = order_type.isin(['buy', 'sell']).to_numpy()
+
+    result = match_lots(
+        ordered['security'].to_numpy(),
+        np.where(trades, ordered['adjusted_quantity'].to_numpy(dtype=float), 0.0),
+        ordered['trade_value'].to_numpy(dtype=float),
+        (order_type == 'buy').to_numpy(),
+        method,
+    )
+    return ordered.assign(
+        realized_gain=result.realized,
+        open_shares=result.open_shares,
+        open_cost=result.open_cost,
+    )
+
+
+def summarize_positions(matched: pd.DataFrame) -> pd.DataFrame:
+    """Return the final open shares, cost basis and average cost per security."""
+    if matched.empty:
+        return pd.DataFrame(columns=['shares', 'cost_basis', 'average_cost'])
+    last = matched.groupby('security', sort=True)[['open_shares', 'open_cost']].last()
+    last = last.rename(columns={'open_shares': 'shares', 'open_cost': 'cost_basis'})
+    shares = last['shares'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        last['average_cost'] = np.where(
+            shares > QUANTITY_EPSILON, last['cost_basis'].to_numpy() / shares, np.nan
+        )
+    return last
+
+
+def build_daily_pnl(
+    matched: pd.DataFrame, prices: pd.DataFrame, date_index: pd.DatetimeIndex
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Return (cumulative realized, unrealized) P&L as dates x securities frames."""
+    days = pd.to_datetime(matched['trade_date']).dt.tz_localize(None).dt.normalize()
+    keyed = matched.assign(day=days)
+
+    realized = keyed.pivot_table(
+        index='day', columns='security', values='realized_gain', aggfunc='sum', fill_value=0.0
+    )
+    realized = realized.reindex(date_index, fill_value=0.0).cumsum()
+
+    positions = keyed.groupby(['day', 'security'])[['open_shares', 'open_cost']].last()
+    shares = positions['open_shares'].unstack().reindex(date_index).ffill().fillna(0.0)
+    cost = positions['open_cost'].unstack().reindex(date_index).ffill().fillna(0.0)
+
+    aligned_prices = prices.reindex(date_index).ffill().bfill()
+    aligned_prices = aligned_prices.reindex(columns=shares.columns).fillna(0.0)
+    unrealized = shares * aligned_prices - cost
+    unrealized = unrealized.where(shares > QUANTITY_EPSILON, 0.0)
+
+    columns = sorted(set(realized.columns) | set(unrealized.columns))
+    realized = realized.reindex(columns=columns, fill_value=0.0)
+    unrealized = unrealized.reindex(columns=columns, fill_value=0.0)
+    realized.columns.name = unrealized.columns.name = 'security'
+    return realized, unrealized
+
+
+def _read_parquet(path: Path, hint: str) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f'Missing {path.name}: {path}. {hint}')
+    try:
+        return pd.read_parquet(path)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+        ) from exc
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--method', choices=LOT_METHODS, default='fifo', help='Lot relief method (default: fifo)'
+    )
+    args = parser.parse_args(argv)
+
+    transactions = _read_parquet(TRANSACTIONS_PATH, 'Run twrr step-02 first.')
+    prices = _read_parquet(PRICES_PATH, 'Run twrr step-03 first.')
+    prices.index = pd.DatetimeIndex(prices.index).tz_localize(None)
+    transactions['trade_date'] = pd.to_datetime(transactions['trade_date']).dt.tz_localize(None)
+
+    start = transactions['trade_date'].min().normalize()
+    date_index = pd.date_range(start=start, end=prices.index.max().normalize(), freq='D')
+
+    matched = match_transactions(transactions, args.method)
+    realized, unrealized = build_daily_pnl(matched, prices, date_index)
+
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    realized.to_parquet(REALIZED_PNL_PATH)
+    unrealized.to_parquet(UNREALIZED_PNL_PATH)
+
+    totals: Dict[str, float] = {
+        'realized': float(realized.iloc[-1].sum()) if not realized.empty else 0.0,
+        'unrealized': float(unrealized.iloc[-1].sum()) if not unrealized.empty else 0.0,
+    }
+    print(f'Lot method: {args.method}')
+    print(f"Realized P&L:   ${totals['realized']:,.2f}")
+    print(f"Unrealized P&L: ${totals['unrealized']:,.2f}")
+    print(f'P&L series written to {REALIZED_PNL_PATH} and {UNREALIZED_PNL_PATH}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""What-if simulator: replay hypothetical trades on top of the real ledger.
+
+The pipeline checkpoints (holdings, market value, cashflow, TWRR) are reused as
+the baseline. A scenario only touches what the hypothetical trades can change:
+
+* holdings   - the traded tickers' columns, from the earliest trade date on
+* market value - baseline plus the holdings delta times the aligned price
+* cashflow   - baseline plus the trades' external flows (step-05 signs)
+* TWRR       - the baseline index up to the day before the earliest trade,
+  then re-chained with step-06's daily factor
+* realized   - lot matching re-run for the traded tickers only
+
+Hypothetical share counts are entered in the basis of their trade date and
+split-adjusted with the shared ``SplitIndex``; trades execute at that day's
+aligned close.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from scripts.portfolio.lot_engine import match_transactions  # noqa: E402
+from scripts.utils.split_index import load_split_index  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+CHECKPOINT_DIR = DATA_DIR / 'checkpoints'
+TRANSACTIONS_PATH = CHECKPOINT_DIR / 'transactions_with_splits.parquet'
+HOLDINGS_PATH = CHECKPOINT_DIR / 'holdings_daily.parquet'
+PRICES_PATH = DATA_DIR / 'historical_prices.parquet'
+MARKET_VALUE_PATH = DATA_DIR / 'daily_market_value.parquet'
+CASHFLOW_PATH = DATA_DIR / 'daily_cash_flow.parquet'
+TWRR_PATH = DATA_DIR / 'twrr_series.parquet'
+
+TRADE_ACTIONS = ('buy', 'sell')
+DENOMINATOR_EPSILON = 1e-9
+SHARE_EPSILON = 1e-9
+WEIGHT_EPSILON = 1e-6
+
+
+@dataclass(frozen=True)
+class HypotheticalTrade:
+    """A trade that never happened: ``shares`` are in the trade date's basis."""
+
+    action: str
+    ticker: str
+    shares: float
+    date: pd.Timestamp
+
+    @classmethod
+    def parse(
+        cls, action: str, ticker: str, shares: Union[str, float], date: object
+    ) -> 'HypotheticalTrade':
+        action = str(action).strip().lower()
+        if action not in TRADE_ACTIONS:
+            raise ValueError(f'Unknown trade action {action!r}; expected one of {TRADE_ACTIONS}')
+        try:
+            quantity = float(shares)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f'Invalid share count {shares!r} for {ticker}') from exc
+        if not np.isfinite(quantity) or quantity <= 0:
+            raise ValueError(f'Share count must be positive for {ticker}: {shares!r}')
+        try:
+            day = pd.Timestamp(date)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f'Invalid trade date {date!r} for {ticker}') from exc
+        if day.tzinfo is not None:
+            day = day.tz_localize(None)
+        return cls(action, str(ticker).strip().upper(), quantity, day.normalize())
+
+
+@dataclass(frozen=True)
+class Baseline:
+    """Pipeline outputs the scenarios are layered on, all on the holdings date grid."""
+
+    transactions: pd.DataFrame
+    holdings: pd.DataFrame
+    prices: pd.DataFrame
+    market_value: pd.Series
+    cashflow: pd.Series
+    twrr: pd.Series
+
+
+@dataclass(frozen=True)
+class WhatIfResult:
+    """Baseline vs scenario outputs from the earliest hypothetical trade onwards."""
+
+    start: pd.Timestamp
+    trades: pd.DataFrame
+    holdings: pd.DataFrame  # (baseline|scenario, ticker) columns for the traded tickers
+    market_value: pd.DataFrame
+    twrr: pd.DataFrame
+    realized_gain: Dict[str, float]
+    composition: pd.DataFrame
+
+
+def _read_parquet(path: Path, hint: str) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f'Missing {path.name}: {path}. {hint}')
+    try:
+        return pd.read_parquet(path)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+        ) from exc
+
+
+def _naive_index(frame: pd.DataFrame | pd.Series) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(pd.to_datetime(frame.index)).tz_localize(None)
+
+
+def load_baseline() -> Baseline:
+    """Load the step-02..06 checkpoints and align them to the holdings grid."""
+    transactions = _read_parquet(TRANSACTIONS_PATH, 'Run step-02 first.')
+    holdings = _read_parquet(HOLDINGS_PATH, 'Run step-04 first.')
+    prices = _read_parquet(PRICES_PATH, 'Run step-03 first.')
+    market_value = _read_parquet(MARKET_VALUE_PATH, 'Run step-04 first.')['market_value']
+    cashflow = _read_parquet(CASHFLOW_PATH, 'Run step-05 first.')['cashflow']
+    twrr = _read_parquet(TWRR_PATH, 'Run step-06 first.')['twrr']
+
+    transactions['trade_date'] = pd.to_datetime(transactions['trade_date']).dt.tz_localize(None)
+    for frame in (holdings, prices, market_value, cashflow, twrr):
+        frame.index = _naive_index(frame)
+
+    index = holdings.index
+    return Baseline(
+        transactions=transactions,
+        holdings=holdings,
+        prices=prices,
+        market_value=market_value.reindex(index).ffill().bfill(),
+        cashflow=cashflow.groupby(level=0).sum().reindex(index, fill_value=0.0),
+        twrr=twrr.reindex(index).ffill().fillna(1.0),
+    )
+
+
+def align_prices(
+    prices: pd.DataFrame, index: pd.DatetimeIndex, tickers: Iterable[str]
+) -> pd.DataFrame:
+    """Align the given tickers' prices to ``index`` exactly as step-04 does."""
+    tickers = list(tickers)
+    subset = prices.reindex(columns=[t for t in tickers if t in prices.columns])
+    aligned = subset.reindex(index).ffill().bfill()
+    return aligned.reindex(columns=tickers).fillna(0.0)
+
+
+def price_trades(trades: List[HypotheticalTrade], baseline: Baseline) -> pd.DataFrame:
+    """Return the trades as ledger rows (split-adjusted, priced at the aligned close)."""
+    index = baseline.holdings.index
+    missing = sorted({t.ticker for t in trades} - set(baseline.prices.columns))
+    if missing:
+        raise ValueError(f'No price history for {", ".join(missing)}; run step-03 with them first.')
+    for trade in trades:
+        if trade.date < index[0] or trade.date > index[-1]:
+            raise ValueError(
+                f'{trade.ticker} trade date {trade.date.date()} is outside the portfolio history '
+                f'({index[0].date()} to {index[-1].date()}).'
+            )
+
+    frame = pd.DataFrame(
+        {
+            'trade_date': [t.date for t in trades],
+            'order_type': [t.action.capitalize() for t in trades],
+            'security': [t.ticker for t in trades],
+            'quantity': [t.shares for t in trades],
+        }
+    )
+    factors = load_split_index().factors_for(frame['security'], frame['trade_date'])
+    frame['split_adjustment_factor'] = factors
+    frame['adjusted_quantity'] = frame['quantity'] * factors
+
+    aligned = align_prices(baseline.prices, index, frame['security'].unique())
+    adjusted_price = aligned.to_numpy()[
+        index.get_indexer(frame['trade_date']), aligned.columns.get_indexer(frame['security'])
+    ]
+    frame['trade_value'] = frame['adjusted_quantity'] * adjusted_price
+    frame['executed_price'] = frame['trade_value'] / frame['quantity']
+    return frame
+
+
+def holdings_delta(trades: pd.DataFrame, index: pd.DatetimeIndex) -> pd.DataFrame:
+    """Cumulative signed share change per traded ticker, on ``index``."""
+    signed = trades['adjusted_quantity'].where(
+        trades['order_type'].str.lower() == 'buy', -trades['adjusted_quantity']
+    )
+    pivot = trades.assign(delta=signed).pivot_table(
+        index='trade_date', columns='security', values='delta', aggfunc='sum', fill_value=0.0
+    )
+    return pivot.reindex(index, fill_value=0.0).cumsum()
+
+
+def trade_cashflow(trades: pd.DataFrame, index: pd.DatetimeIndex) -> pd.Series:
+    """Daily external cashflow of the trades (buys negative), as step-05 books it."""
+    signed = trades['trade_value'].where(
+        trades['order_type'].str.lower() == 'sell', -trades['trade_value']
+    )
+    daily = signed.groupby(trades['trade_date']).sum()
+    return daily.reindex(index, fill_value=0.0)
+
+
+def rechain_twrr(
+    base_twrr: pd.Series, market_value: pd.Series, cashflow: pd.Series, start: pd.Timestamp
+) -> pd.Series:
+    """Recompute the TWRR index from ``start`` on, keeping the baseline before it."""
+    position = base_twrr.index.get_loc(start)
+    lead = max(position - 1, 0)
+    mv = market_value.iloc[lead:]
+    previous = mv.shift(1).fillna(0.0)
+    denominator = previous - cashflow.iloc[lead:]
+
+    factor = pd.Series(1.0, index=mv.index, dtype='float64')
+    valid = np.abs(denominator) > DENOMINATOR_EPSILON
+    factor.loc[valid] = mv.loc[valid] / denominator.loc[valid]
+    factor.loc[~np.isfinite(factor)] = 1.0
+    factor.iloc[0] = 1.0
+
+    anchor = base_twrr.iloc[lead] if position > 0 else 1.0
+    scenario = base_twrr.copy()
+    scenario.iloc[lead:] = anchor * factor.cumprod().to_numpy()
+    return scenario
+
+
+def _realized_total(transactions: pd.DataFrame, method: str) -> float:
+    if transactions.empty:
+        return 0.0
+    return float(match_transactions(transactions, method)['realized_gain'].sum())
+
+
+def _weights(values: pd.Series) -> pd.Series:
+    values = values[values.abs() > DENOMINATOR_EPSILON]
+    total = values.sum()
+    if abs(total) <= DENOMINATOR_EPSILON:
+        return values * 0.0
+    return values / total
+
+
+def _check_sells(trades: pd.DataFrame, holdings: pd.DataFrame) -> None:
+    """Reject hypothetical sells that leave the position short on or after their date.
+
+    A sell can fit the position on its own date and still oversell once a later
+    real sell of the same security comes through, so the lowest scenario
+    holding from the trade date onwards is checked.
+    """
+    sells = trades[trades['order_type'] == 'Sell']
+    if sells.empty:
+        return
+    # Lowest holding from each date to the end of the window.
+    lowest_ahead = holdings.iloc[::-1].cummin().iloc[::-1].to_numpy()
+    rows = holdings.index.get_indexer(sells['trade_date'])
+    cols = holdings.columns.get_indexer(sells['security'])
+    for row, day, col in zip(sells.itertuples(index=False), rows, cols, strict=True):
+        shortfall = -lowest_ahead[day, col]
+        if shortfall <= SHARE_EPSILON:
+            continue
+        if -holdings.iat[day, col] > SHARE_EPSILON:
+            raise ValueError(
+                f'Cannot sell {row.quantity:g} {row.security} on {row.trade_date.date()}: '
+                f'that is {-holdings.iat[day, col]:g} more shares than held.'
+            )
+        short_on = holdings.index[day:][holdings.iloc[day:, col] < -SHARE_EPSILON][0]
+        raise ValueError(
+            f'Cannot sell {row.quantity:g} {row.security} on {row.trade_date.date()}: '
+            f'later sells in the ledger would leave the position {shortfall:g} shares short '
+            f'(from {short_on.date()}).'
+        )
+
+
+def simulate(
+    trades: List[HypotheticalTrade], baseline: Optional[Baseline] = None, method: str = 'fifo'
+) -> WhatIfResult:
+    """Apply ``trades`` to the baseline and return the changed outputs."""
+    if not trades:
+        raise ValueError('At least one hypothetical trade is required.')
+    baseline = baseline or load_baseline()
+    index = baseline.holdings.index
+
+    ledger_rows = price_trades(trades, baseline)
+    start = ledger_rows['trade_date'].min()
+    window = index[index >= start]
+    tickers = sorted(ledger_rows['security'].unique())
+
+    delta = holdings_delta(ledger_rows, window).reindex(columns=tickers, fill_value=0.0)
+    prices = align_prices(baseline.prices, index, tickers)
+    base_holdings = baseline.holdings.reindex(index=window, columns=tickers, fill_value=0.0)
+    scenario_holdings = base_holdings + delta
+    _check_sells(ledger_rows, scenario_holdings)
+    # Selling a whole position leaves float dust; report it as flat.
+    scenario_holdings = scenario_holdings.mask(scenario_holdings.abs() <= SHARE_EPSILON, 0.0)
+
+    base_mv = baseline.market_value
+    scenario_mv = base_mv.copy()
+    scenario_mv.loc[window] += (delta * prices.loc[window]).sum(axis=1)
+    scenario_cf = baseline.cashflow + trade_cashflow(ledger_rows, index)
+    scenario_twrr = rechain_twrr(baseline.twrr, scenario_mv, scenario_cf, start)
+
+    traded = baseline.transactions[baseline.transactions['security'].isin(tickers)]
+    untouched = _realized_total(
+        baseline.transactions[~baseline.transactions['security'].isin(tickers)], method
+    )
+    base_traded = _realized_total(traded, method)
+    scenario_traded = _realized_total(
+        pd.concat([traded, ledger_rows[traded.columns.intersection(ledger_rows.columns)]]),
+        method,
+    )
+
+    last_day = index[-1]
+    all_prices_last = align_prices(baseline.prices, index, baseline.holdings.columns).loc[last_day]
+    base_values = baseline.holdings.loc[last_day] * all_prices_last
+    scenario_values = base_values.reindex(base_values.index.union(tickers), fill_value=0.0)
+    scenario_values.loc[tickers] = scenario_holdings.loc[last_day] * prices.loc[last_day]
+    composition = pd.DataFrame(
+        {'baseline': _weights(base_values), 'scenario': _weights(scenario_values)}
+    ).fillna(0.0)
+    composition = composition[(composition.abs() > WEIGHT_EPSILON).any(axis=1)]
+    composition['change'] = composition['scenario'] - composition['baseline']
+
+    return WhatIfResult(
+        start=start,
+        trades=ledger_rows,
+        holdings=pd.concat({'baseline': base_holdings, 'scenario': scenario_holdings}, axis=1),
+        market_value=pd.DataFrame({'baseline': base_mv, 'scenario': scenario_mv}).loc[window],
+        twrr=pd.DataFrame({'baseline': baseline.twrr, 'scenario': scenario_twrr}).loc[window],
+        realized_gain={
+            'baseline': untouched + base_traded,
+            'scenario': untouched + scenario_traded,
+        },
+        composition=composition.sort_values('change', key=np.abs, ascending=False),
+    )
+
+
+def summarize(result: WhatIfResult, top: int = 10) -> str:
+    """Render a plain-text baseline vs scenario report."""
+    last = result.market_value.index[-1]
+    mv = result.market_value.loc[last]
+    twrr = result.twrr.loc[last] - 1.0
+    realized = result.realized_gain
+    lines = [
+        f'What-if from {result.start.date()} to {last.date()}',
+        '',
+        'Trades:',
+    ]
+    for row in result.trades.itertuples(index=False):
+        lines.append(
+            f'  {row.order_type:<4} {row.security:<8} {row.quantity:>10.4f} sh '
+            f'on {row.trade_date.date()} @ {row.executed_price:,.2f} = {row.trade_value:,.2f}'
+        )
+    lines += [
+        '',
+        f'{"":<16}{"Baseline":>16}{"Scenario":>16}{"Change":>16}',
+        f'{"Market value":<16}{mv["baseline"]:>16,.2f}{mv["scenario"]:>16,.2f}'
+        f'{mv["scenario"] - mv["baseline"]:>+16,.2f}',
+        f'{"TWRR":<16}{twrr["baseline"]:>16.2%}{twrr["scenario"]:>16.2%}'
+        f'{twrr["scenario"] - twrr["baseline"]:>+16.2%}',
+        f'{"Realized gain":<16}{realized["baseline"]:>16,.2f}{realized["scenario"]:>16,.2f}'
+        f'{realized["scenario"] - realized["baseline"]:>+16,.2f}',
+        '',
+        f'Holdings on {last.date()}:',
+    ]
+    before = result.holdings['baseline'].loc[last]
+    after = result.holdings['scenario'].loc[last]
+    for ticker in after.index:
+        lines.append(f'  {ticker:<8} {before[ticker]:>12.4f} -> {after[ticker]:>12.4f} sh')
+    lines += ['', 'Largest composition changes:']
+    for ticker, row in result.composition.head(top).iterrows():
+        lines.append(
+            f'  {ticker:<8} {row["baseline"]:>8.2%} -> {row["scenario"]:>8.2%} '
+            f'({row["change"]:+.2%})'
+        )
+    return '\n'.join(lines)
@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 """Pre-calculate statistics and ratios for the frontend terminal."""
 
-import json
+import sys
 from datetime import datetime, timedelta, timezone
-from decimal import Decimal, getcontext
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, cast
 
 import numpy as np
 import pandas as pd
 
-getcontext().prec = 12
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from scripts.portfolio.lot_engine import match_transactions, summarize_positions  # noqa: E402
+from scripts.utils.lod import downsample_records, write_lod_levels  # noqa: E402
+from scripts.utils.partitions import write_year_partitions  # noqa: E402
+from scripts.utils.precompress import export_json, export_text  # noqa: E402
+from scripts.utils.split_index import load_split_index  # noqa: E402
 
 PORTFOLIO_SERIES_KEY = '^LZ'
 
@@ -185,46 +189,8 @@ def calculate_stats(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str, A
     total_sell_amount = transactions_df.loc[sell_mask, 'trade_value'].sum()
 
     # FIFO realized gain calculation
-    from collections import deque
-
-    realized_gain_total = 0.0
-    lots_by_security: dict[str, deque[list[float]]] = {}
-
-    securities = transactions_df['security'].to_numpy()
-    qtys = transactions_df['adjusted_quantity'].to_numpy(dtype=float)
-    trade_values = transactions_df['trade_value'].to_numpy(dtype=float)
-    order_types = transactions_df['order_type'].to_numpy()
-
-    for security, qty, trade_value, order_type in zip(
-        securities, qtys, trade_values, order_types, strict=False
-    ):
-        price = trade_value / qty if qty else 0.0
-        order_type_str = str(order_type).strip().lower()
-
-        if qty <= 0 or price <= 0:
-            continue
-
-        lots = lots_by_security.setdefault(security, deque())
-
-        if order_type_str == 'buy':
-            # Store as list instead of dict for faster attribute access and mutability
-            lots.append([qty, price])
-        elif order_type_str == 'sell':
-            remaining = qty
-            while remaining > 1e-9 and lots:
-                lot = lots[0]
-                available = lot[0]
-                used = min(remaining, available)
-                realized_gain_total += (price - lot[1]) * used
-                lot[0] -= used
-                remaining -= used
-                if lot[0] <= 1e-9:
-                    lots.popleft()
-            # If sells exceed recorded lots, treat excess as zero cost basis
-            if remaining > 1e-9:
-                realized_gain_total += price * remaining
-        else:
-            continue
+    matched = match_transactions(transactions_df, 'fifo')
+    realized_gain_total = float(matched['realized_gain'].sum())
 
     net_contributions = total_buy_amount - total_sell_amount
 
@@ -269,6 +235,17 @@ def calculate_stats(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str, A
     return '\n' + table + '\n', stats_json
 
 
+def load_lot_average_costs() -> pd.Series:
+    """Average cost of open FIFO lots per security, keyed by dash-free symbol."""
+    transactions_path = DATA_DIR / 'checkpoints' / 'transactions_with_splits.parquet'
+    if not transactions_path.exists():
+        return pd.Series(dtype=float)
+    positions = summarize_positions(match_transactions(pd.read_parquet(transactions_path)))
+    average_cost = positions['average_cost'].dropna()
+    average_cost.index = average_cost.index.astype(str).str.replace('-', '', regex=False)
+    return average_cost
+
+
 def calculate_holdings(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str, Any]]:
     """Calculate current holdings directly from the transaction ledger."""
     transactions_path = DATA_DIR / 'transactions.csv'
@@ -283,56 +260,20 @@ def calculate_holdings(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str
         transactions_df['Quantity'], errors='coerce'
     ).fillna(0.0)
 
-    split_history_path = DATA_DIR / 'split_history.csv'
-    splits_by_symbol: dict[str, list[tuple[pd.Timestamp, Decimal]]] = {}
-    if split_history_path.exists():
-        splits_df = pd.read_csv(split_history_path)
-        if not splits_df.empty:
-            splits_df['Split Date'] = pd.to_datetime(splits_df['Split Date'])
-
-            sym_idx = int(splits_df.columns.get_loc('Symbol')) + 1  # type: ignore[arg-type]
-            mul_idx = int(splits_df.columns.get_loc('Split Multiplier')) + 1  # type: ignore[arg-type]
-            date_idx = int(splits_df.columns.get_loc('Split Date')) + 1  # type: ignore[arg-type]
-
-            for row in splits_df.itertuples(index=True, name=None):
-                symbol = str(row[sym_idx])
-                multiplier = Decimal(str(row[mul_idx]))
-                splits_by_symbol.setdefault(symbol, []).append((row[date_idx], multiplier))
-            for symbol_splits in splits_by_symbol.values():
-                symbol_splits.sort(key=lambda item: item[0])
-
-    share_totals: dict[str, Decimal] = {}
-
-    sec_idx = int(transactions_df.columns.get_loc('Security')) + 1  # type: ignore[arg-type]
-    qty_idx = int(transactions_df.columns.get_loc('Quantity')) + 1  # type: ignore[arg-type]
-    date_idx = int(transactions_df.columns.get_loc('Trade Date')) + 1  # type: ignore[arg-type]
-    type_idx = int(transactions_df.columns.get_loc('Order Type')) + 1  # type: ignore[arg-type]
-
-    for row in transactions_df.itertuples(index=True, name=None):
-        symbol = str(row[sec_idx])
-        quantity = Decimal(str(row[qty_idx]))
-        if quantity == 0:
-            continue
-        trade_date = row[date_idx]
-        order_type = row[type_idx]
-
-        multiplier = Decimal('1')
-        for split_date, split_multiplier in splits_by_symbol.get(symbol, []):
-            if split_date > trade_date:
-                multiplier *= split_multiplier
-
-        adjusted_quantity = quantity * multiplier
-        if order_type == 'sell':
-            adjusted_quantity = -adjusted_quantity
-
-        share_totals[symbol] = share_totals.get(symbol, Decimal('0')) + adjusted_quantity
+    split_index = load_split_index(DATA_DIR / 'split_history.csv')
+    symbols = transactions_df['Security'].astype(str)
+    adjusted_quantity = transactions_df['Quantity'] * split_index.factors_for(
+        symbols, transactions_df['Trade Date']
+    )
+    adjusted_quantity = adjusted_quantity.where(
+        transactions_df['Order Type'] != 'sell', -adjusted_quantity
+    )
+    share_totals = adjusted_quantity[transactions_df['Quantity'] != 0].groupby(symbols).sum()
 
-    if not share_totals:
+    if share_totals.empty:
         return "No current holdings.", {}
 
-    holdings_frame = pd.Series(
-        {symbol: float(total) for symbol, total in share_totals.items()}, name='shares'
-    ).to_frame()
+    holdings_frame = share_totals.astype(float).rename('shares').to_frame()
     holdings_frame.index.name = 'symbol'
     holdings_frame = holdings_frame[holdings_frame['shares'] > 0.01]
 
@@ -364,6 +305,13 @@ def calculate_holdings(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str
     holdings_frame['average_price'] = pd.to_numeric(
         holdings_frame['average_price'], errors='coerce'
     ).fillna(0.0)
+    missing_cost = holdings_frame['average_price'] <= 0
+    if missing_cost.any():
+        # Fall back to the lot engine's open cost basis for holdings the broker file lacks.
+        lot_costs = load_lot_average_costs()
+        holdings_frame.loc[missing_cost, 'average_price'] = (
+            holdings_frame.loc[missing_cost, 'normalized_symbol'].map(lot_costs).fillna(0.0)
+        )
     holdings_frame['total_cost'] = holdings_frame['shares'] * holdings_frame['average_price']
     holdings_frame = holdings_frame.sort_values(by='total_cost', ascending=False)
 
@@ -423,6 +371,19 @@ def calculate_holdings(latest_fx_rates: Dict[str, float]) -> Tuple[str, Dict[str
     return '\n' + table + '\n', holdings_json
 
 
+def write_series_levels(path: Path, series_map: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Weekly/monthly levels (period-end values) and yearly partitions of a series file."""
+    write_lod_levels(
+        path,
+        series_map,
+        lambda freq: {
+            name: downsample_records(records, {'value': 'last'}, freq)
+            for name, records in series_map.items()
+        },
+    )
+    write_year_partitions(path, series_map)
+
+
 def get_performance_series():
     prices_df = pd.read_parquet(DATA_DIR / 'historical_prices.parquet')
     twrr_df = pd.read_parquet(DATA_DIR / 'twrr_series.parquet')
@@ -677,8 +638,8 @@ def main() -> None:
             List[Dict[str, Any]], converted_df.to_dict(orient='records')
         )
 
-    with open(OUTPUT_DIR / 'balance_series.json', 'w') as f:
-        json.dump(balance_series_by_currency, f)
+    export_json(OUTPUT_DIR / 'balance_series.json', balance_series_by_currency)
+    write_series_levels(OUTPUT_DIR / 'balance_series.json', balance_series_by_currency)
     print("Successfully created balance_series.json")
 
     transactions_df = pd.read_parquet(DATA_DIR / 'checkpoints' / 'transactions_with_splits.parquet')
@@ -786,46 +747,42 @@ def main() -> None:
                 for row in converted_df.itertuples(index=True, name=None)
             ]
 
-    with open(OUTPUT_DIR / 'contribution_series.json', 'w') as f:
-        json.dump(contribution_series_by_currency, f)
+    export_json(OUTPUT_DIR / 'contribution_series.json', contribution_series_by_currency)
     print("Successfully created contribution_series.json")
 
-    with open(OUTPUT_DIR / 'fx_daily_rates.json', 'w') as f:
-        json.dump(fx_payload, f)
+    export_json(OUTPUT_DIR / 'fx_daily_rates.json', fx_payload)
     print("Successfully created fx_daily_rates.json")
 
     latest_rates = get_latest_rates(fx_df)
 
     perf_series = get_performance_series()
-    with open(OUTPUT_DIR / 'performance_series.json', 'w') as f:
-        json.dump(perf_series, f)
+    export_json(OUTPUT_DIR / 'performance_series.json', perf_series)
+    write_series_levels(OUTPUT_DIR / 'performance_series.json', perf_series)
     print("Successfully created performance_series.json")
 
     # --- Generate text files for terminal stats ---
     stats_text, stats_json = calculate_stats(latest_rates)
-    (OUTPUT_DIR / 'transaction_stats.txt').write_text(stats_text)
-    with open(OUTPUT_DIR / 'transaction_stats.json', 'w') as f:
-        json.dump(stats_json, f)
+    export_text(OUTPUT_DIR / 'transaction_stats.txt', stats_text)
+    export_json(OUTPUT_DIR / 'transaction_stats.json', stats_json)
     print("Successfully created transaction_stats.txt")
     print("Successfully created transaction_stats.json")
 
     holdings_text, holdings_json = calculate_holdings(latest_rates)
-    (OUTPUT_DIR / 'holdings.txt').write_text(holdings_text)
-    with open(OUTPUT_DIR / 'holdings.json', 'w') as f:
-        json.dump(holdings_json, f)
+    export_text(OUTPUT_DIR / 'holdings.txt', holdings_text)
+    export_json(OUTPUT_DIR / 'holdings.json', holdings_json)
     print("Successfully created holdings.txt")
     print("Successfully created holdings.json")
 
     cagr_text = calculate_cagr(perf_series)
-    (OUTPUT_DIR / 'cagr.txt').write_text(cagr_text)
+    export_text(OUTPUT_DIR / 'cagr.txt', cagr_text)
     print("Successfully created cagr.txt")
 
     annual_returns_text = calculate_annual_returns(perf_series)
-    (OUTPUT_DIR / 'annual_returns.txt').write_text(annual_returns_text)
+    export_text(OUTPUT_DIR / 'annual_returns.txt', annual_returns_text)
     print("Successfully created annual_returns.txt")
 
     ratios_text = calculate_ratios(perf_series)
-    (OUTPUT_DIR / 'ratios.txt').write_text(ratios_text)
+    export_text(OUTPUT_DIR / 'ratios.txt', ratios_text)
     print("Successfully created ratios.txt")
 
 
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Pre-calculate rolling-window performance metrics for the frontend charts.
+
+Every series (the portfolio TWRR plus each ``^`` benchmark) is laid out as one
+column of a dates x series matrix on a business-day grid, so each metric is a
+handful of whole-array operations instead of a per-window recomputation:
+
+* returns come from a single shifted division of the value matrix,
+* volatility and Sharpe come from cumulative sums of returns and squared returns,
+* max drawdown uses block prefix/suffix scans (van Herk / Gil-Werman), which
+  keeps the sliding peak-to-trough search linear in the number of dates.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, cast
+
+import numpy as np
+import pandas as pd
+
+PORTFOLIO_SERIES_KEY = '^LZ'
+PERIODS_PER_YEAR = 252
+
+# Window lengths in business days.
+ROLLING_WINDOWS = {
+    '1M': 21,
+    '3M': 63,
+    '1Y': 252,
+    '3Y': 756,
+    '5Y': 1260,
+}
+METRIC_NAMES = ('return', 'volatility', 'sharpe', 'max_drawdown')
+OUTPUT_DECIMALS = 6
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+OUTPUT_DIR = DATA_DIR / 'output'
+PRICES_PATH = DATA_DIR / 'historical_prices.parquet'
+TWRR_PATH = DATA_DIR / 'twrr_series.parquet'
+OUTPUT_PATH = OUTPUT_DIR / 'rolling_metrics.json'
+
+
+def load_series_frame() -> pd.DataFrame:
+    """Return the TWRR and benchmark levels aligned on a business-day grid."""
+    if not TWRR_PATH.exists():
+        raise FileNotFoundError(f'TWRR series not found: {TWRR_PATH}. Run step-06 first.')
+    twrr = pd.read_parquet(TWRR_PATH)['twrr']
+    frames = [twrr.rename(PORTFOLIO_SERIES_KEY)]
+
+    if PRICES_PATH.exists():
+        prices = pd.read_parquet(PRICES_PATH)
+        benchmarks = [col for col in prices.columns if str(col).startswith('^')]
+        if benchmarks:
+            frames.append(prices[benchmarks])
+
+    frame = pd.concat(frames, axis=1).sort_index()
+    frame.index = pd.to_datetime(frame.index)
+    return align_to_business_days(frame)
+
+
+def align_to_business_days(frame: pd.DataFrame) -> pd.DataFrame:
+    """Forward-fill levels onto a Monday-Friday grid without back-filling history."""
+    if frame.empty:
+        return frame
+    grid = pd.bdate_range(frame.index.min(), frame.index.max())
+    aligned = frame.reindex(frame.index.union(grid)).ffill().reindex(grid)
+    ordered = [PORTFOLIO_SERIES_KEY] if PORTFOLIO_SERIES_KEY in aligned.columns else []
+    ordered.extend(sorted(col for col in aligned.columns if col != PORTFOLIO_SERIES_KEY))
+    return aligned[ordered]
+
+
+def _invalid_mask(values: np.ndarray) -> np.ndarray:
+    return np.asarray(~np.isfinite(values) | (values <= 0))
+
+
+def _windows_with_invalid(invalid: np.ndarray, span: int) -> np.ndarray:
+    """Return, for every row, whether the trailing ``span`` rows contain an invalid cell."""
+    n_rows = invalid.shape[0]
+    counts = np.zeros((n_rows + 1, invalid.shape[1]), dtype=np.int64)
+    np.cumsum(invalid, axis=0, out=counts[1:])
+    dirty = np.ones(invalid.shape, dtype=bool)
+    if n_rows >= span:
+        dirty[span - 1 :] = (counts[span:] - counts[: n_rows - span + 1]) > 0
+    return dirty
+
+
+def rolling_returns(values: np.ndarray, window: int) -> np.ndarray:
+    """Cumulative return over the trailing ``window`` periods for each column."""
+    out = np.full(values.shape, np.nan)
+    if values.shape[0] <= window:
+        return out
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[window:] = values[window:] / values[:-window] - 1.0
+    out[_windows_with_invalid(_invalid_mask(values), window + 1)] = np.nan
+    return out
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and sample standard deviation of period returns.
+
+    Returns are demeaned per column before the cumulative sums so the
+    ``sum(x^2) - n * mean^2`` difference does not lose precision.
+    """
+    n_rows, n_cols = values.shape
+    mean = np.full((n_rows, n_cols), np.nan)
+    std = np.full((n_rows, n_cols), np.nan)
+    if n_rows <= window or window < 2:
+        return mean, std
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1.0
+    invalid = ~np.isfinite(returns)
+    shift = np.nanmean(np.where(invalid, np.nan, returns), axis=0) if returns.size else 0.0
+    shift = np.nan_to_num(shift)
+    centered = np.where(invalid, 0.0, returns - shift)
+
+    sums = np.zeros((returns.shape[0] + 1, n_cols))
+    squares = np.zeros_like(sums)
+    np.cumsum(centered, axis=0, out=sums[1:])
+    np.cumsum(centered**2, axis=0, out=squares[1:])
+
+    window_sum = sums[window:] - sums[:-window]
+    window_sq = squares[window:] - squares[:-window]
+    window_mean = window_sum / window
+    variance = (window_sq - window * window_mean**2) / (window - 1)
+    dirty = _windows_with_invalid(invalid | _invalid_mask(values[1:]), window)[window - 1 :]
+
+    mean[window:] = np.where(dirty, np.nan, window_mean + shift)
+    std[window:] = np.where(dirty, np.nan, np.sqrt(np.clip(variance, 0.0, None)))
+    return mean, std
+
+
+def rolling_max_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """Worst peak-to-trough decline across the trailing ``window + 1`` levels.
+
+    The drawdown of a window is the largest ``log(peak) - log(later trough)``,
+    which combines associatively from (max, min, worst drop) summaries. Rows are
+    cut into blocks of the window span; prefix and suffix summaries inside each
+    block are plain accumulate scans, and every window is exactly one block
+    suffix joined to the next block's prefix.
+    """
+    span = window + 1
+    n_rows, n_cols = values.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    if n_rows < span:
+        return out
+
+    invalid = _invalid_mask(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.where(invalid, 0.0, np.log(np.where(invalid, 1.0, values)))
+
+    n_blocks = -(-n_rows // span)
+    padded = np.zeros((n_blocks * span, n_cols))
+    padded[:n_rows] = logs
+    blocks = padded.reshape(n_blocks, span, n_cols)
+
+    prefix_max = np.maximum.accumulate(blocks, axis=1)
+    prefix_min = np.minimum.accumulate(blocks, axis=1)
+    prefix_drop = np.maximum.accumulate(prefix_max - blocks, axis=1)
+
+    reversed_blocks = blocks[:, ::-1]
+    reversed_min = np.minimum.accumulate(reversed_blocks, axis=1)
+    suffix_max = np.maximum.accumulate(reversed_blocks, axis=1)[:, ::-1]
+    suffix_drop = np.maximum.accumulate(reversed_blocks - reversed_min, axis=1)[:, ::-1]
+
+    def flat(arr: np.ndarray) -> np.ndarray:
+        return arr.reshape(n_blocks * span, n_cols)
+
+    prefix_min, prefix_drop = flat(prefix_min), flat(prefix_drop)
+    suffix_max, suffix_drop = flat(suffix_max), flat(suffix_drop)
+
+    ends = np.arange(span - 1, n_rows)
+    starts = ends - span + 1
+    joined = np.maximum(
+        np.maximum(suffix_drop[starts], prefix_drop[ends]),
+        suffix_max[starts] - prefix_min[ends],
+    )
+    aligned = (starts % span == 0)[:, None]
+    drop = np.where(aligned, prefix_drop[ends], joined)
+
+    out[span - 1 :] = np.expm1(-drop)
+    out[_windows_with_invalid(invalid, span)] = np.nan
+    return out
+
+
+def compute_rolling_metrics(
+    frame: pd.DataFrame,
+    windows: Optional[Dict[str, int]] = None,
+    risk_free_rate: float = 0.0,
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """Return ``{window: {metric: DataFrame(dates x series)}}``.
+
+    Returns for windows of a year or longer are annualized; shorter windows
+    report the cumulative return. Volatility and Sharpe are annualized with
+    ``PERIODS_PER_YEAR`` to match ``calculate_ratios``.
+    """
+    windows = windows or ROLLING_WINDOWS
+    values = frame.to_numpy(dtype=float)
+    results: Dict[str, Dict[str, pd.DataFrame]] = {}
+
+    for label, window in windows.items():
+        total = rolling_returns(values, window)
+        if window >= PERIODS_PER_YEAR:
+            with np.errstate(invalid='ignore'):
+                period_return = np.power(1.0 + total, PERIODS_PER_YEAR / window) - 1.0
+        else:
+            period_return = total
+
+        mean, std = rolling_mean_std(values, window)
+        volatility = std * np.sqrt(PERIODS_PER_YEAR)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = (mean * PERIODS_PER_YEAR - risk_free_rate) / volatility
+        sharpe[~(volatility > 0)] = np.nan
+
+        drawdown = rolling_max_drawdown(values, window)
+
+        metrics = {
+            'return': period_return,
+            'volatility': volatility,
+            'sharpe': sharpe,
+            'max_drawdown': drawdown,
+        }
+        results[label] = {
+            name: pd.DataFrame(data, index=frame.index, columns=frame.columns)
+            for name, data in metrics.items()
+        }
+    return results
+
+
+def _to_json_list(series: pd.Series) -> List[Optional[float]]:
+    rounded = series.round(OUTPUT_DECIMALS).astype(object)
+    valid = np.isfinite(series.to_numpy(dtype=float))
+    return cast(List[Optional[float]], rounded.where(valid, None).tolist())
+
+
+def build_rolling_payload(
+    frame: pd.DataFrame,
+    metrics: Dict[str, Dict[str, pd.DataFrame]],
+    windows: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """Shape the metric frames as ``{dates, windows, series: {name: {window: {metric: []}}}}``.
+
+    Leading dates where no window is complete for any series are dropped.
+    """
+    windows = windows or ROLLING_WINDOWS
+    if frame.empty or not metrics:
+        return {'dates': [], 'windows': {}, 'series': {}}
+
+    shortest = min(metrics, key=lambda label: windows[label])
+    first_valid = metrics[shortest]['return'].notna().any(axis=1)
+    keep = first_valid.cummax().to_numpy()
+    index = pd.DatetimeIndex(frame.index[keep])
+
+    series: Dict[str, Dict[str, Dict[str, List[Optional[float]]]]] = {}
+    for name in frame.columns:
+        series[name] = {
+            label: {metric: _to_json_list(data[metric][name][keep]) for metric in METRIC_NAMES}
+            for label, data in metrics.items()
+        }
+
+    return {
+        'dates': index.strftime('%Y-%m-%d').tolist(),
+        'windows': {label: windows[label] for label in metrics},
+        'series': series,
+    }
+
+
+def main() -> None:
+    """Generate rolling_metrics.json."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    frame = load_series_frame()
+    metrics = compute_rolling_metrics(frame)
+    payload = build_rolling_payload(frame, metrics)
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump(payload, f, separators=(',', ':'))
+    print(f"Successfully created {OUTPUT_PATH.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,9 @@ try:
 except ImportError:
     from scripts.twrr.utils import append_changelog_entry
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from scripts.utils.split_index import SplitIndex  # noqa: E402
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 CHECKPOINT_DIR = DATA_DIR / 'checkpoints'
@@ -93,39 +96,17 @@ def load_split_history() -> pd.DataFrame:
 
 def apply_split_adjustments(transactions: pd.DataFrame, splits: pd.DataFrame) -> pd.DataFrame:
     transactions = transactions.copy()
-    transactions['split_adjustment_factor'] = 1.0
 
     if splits.empty:
+        transactions['split_adjustment_factor'] = 1.0
         transactions['adjusted_quantity'] = transactions['quantity']
         return transactions
 
-    # Iterate by security to minimize repeated filtering
-    for security, sec_splits in splits.groupby('security'):
-        trade_idx = transactions.index[transactions['security'] == security]
-        if len(trade_idx) == 0:
-            continue
-
-        trade_dates = transactions.loc[trade_idx, 'trade_date'].to_numpy()
-        factors = np.ones(len(trade_idx), dtype='float64')
-
-        sec_splits = sec_splits.sort_values('split_date')
-        split_dates = sec_splits['split_date'].to_numpy()
-        split_factors = sec_splits['split_factor'].to_numpy()
-
-        # Cumulative product of factors from latest to earliest.
-        # A trade before the Nth split date is adjusted by factors of splits N, N+1, ... M.
-        rev_cum_factors = np.cumprod(split_factors[::-1])[::-1]
-
-        # Find which splits each trade is subject to.
-        # side='right' finds index i such that split_dates[i-1] <= trade_date < split_dates[i].
-        # All splits from index i onwards are applied to the trade.
-        split_indices = np.searchsorted(split_dates, trade_dates, side='right')
-
-        valid_mask = split_indices < len(rev_cum_factors)
-        factors[valid_mask] = rev_cum_factors[split_indices[valid_mask]]
-
-        transactions.loc[trade_idx, 'split_adjustment_factor'] = factors
-
+    # A trade is adjusted by every split strictly after its trade date.
+    split_index = SplitIndex.from_frame(splits)
+    transactions['split_adjustment_factor'] = split_index.factors_for(
+        transactions['security'], transactions['trade_date']
+    )
     transactions['adjusted_quantity'] = (
         transactions['quantity'] * transactions['split_adjustment_factor']
     )
@@ -13,7 +13,7 @@ from typing import Dict, Iterable, List, Optional, Sequence
 import pandas as pd
 
 sys.path.append(str(Path(__file__).parent))
-from utils import append_changelog_entry, load_delisted_tickers
+from utils import append_changelog_entry, load_delisted_tickers, uses_close_price
 
 try:
     import atexit
@@ -159,7 +159,7 @@ def fetch_yfinance_prices(tickers: List[str], date_index: pd.DatetimeIndex):
 
         for norm in batch:
             fetch_symbol = request_map[norm]
-            use_close = norm.endswith('X')
+            use_close = uses_close_price(norm)
             series = pick_series(fetch_symbol, use_close)
 
             if series is None or series.empty:
@@ -6,7 +6,7 @@ from __future__ import annotations
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
@@ -63,15 +63,23 @@ def load_series() -> tuple[pd.Series, pd.Series]:
     return market_value, cashflow
 
 
-def compute_twrr(market_value: pd.Series, cashflow: pd.Series) -> pd.Series:
+def compute_twrr(
+    market_value: pd.Series, cashflow: pd.Series, income: Optional[pd.Series] = None
+) -> pd.Series:
+    """Chain daily factors ``(MV_t + income_t) / (MV_t-1 - cashflow_t)`` into an index.
+
+    ``income`` is cash paid out of the portfolio on day t (e.g. dividends not
+    reinvested): it counts as that day's return but not as next day's capital.
+    """
     previous_mv = market_value.shift(1).fillna(0.0)
     net_flow = -cashflow  # contributions positive, withdrawals negative
     denominator = previous_mv + net_flow
+    ending_value = market_value if income is None else market_value + income
 
     daily_factor = pd.Series(1.0, index=market_value.index, dtype='float64')
 
     valid = np.abs(denominator) > 1e-9
-    daily_factor.loc[valid] = market_value.loc[valid] / denominator.loc[valid]
+    daily_factor.loc[valid] = ending_value.loc[valid] / denominator.loc[valid]
 
     daily_factor.loc[~np.isfinite(daily_factor)] = 1.0
     daily_factor = daily_factor.fillna(1.0)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3.11
+"""Step 06b: Total-return TWRR with dividends paid to cash or reinvested.
+
+step-03 stores ``Adj Close``, which folds every dividend back into earlier
+prices, while step-05's cashflows are actual trade amounts. This step rebuilds
+unadjusted closes from ``Adj Close`` and the cached dividend events, then
+models dividend cash explicitly on the same daily grid as step-06:
+
+* ``price``: price return only; dividends are ignored.
+* ``cash``: each dividend (shares held before the ex-date x amount) is paid
+  out on the ex-date. It counts as that day's return but earns nothing after.
+* ``drip``: each dividend buys more of the same security at the ex-date close,
+  so a position's shares compound by ``1 + dividend / close`` per ex-date.
+  Trades scale with the reinvested position; the extra shares traded are
+  booked as external flows at that day's close.
+
+All three are chained with step-06's ``compute_twrr`` and written to
+``data/twrr_total_return.parquet`` next to ``twrr_series.parquet``.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+from step06_compute_twrr import compute_twrr
+from utils import append_changelog_entry, uses_close_price
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from scripts.utils.dividend_cache import (  # noqa: E402
+    decode_dividend_cache,
+    dividend_matrix,
+    dividend_series,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+CHECKPOINT_DIR = DATA_DIR / 'checkpoints'
+HOLDINGS_PATH = CHECKPOINT_DIR / 'holdings_daily.parquet'
+PRICES_PATH = DATA_DIR / 'historical_prices.parquet'
+CASHFLOW_PATH = DATA_DIR / 'daily_cash_flow.parquet'
+DIVIDEND_CACHE_PATH = CHECKPOINT_DIR / 'dividend_cache.json'
+TOTAL_RETURN_PATH = DATA_DIR / 'twrr_total_return.parquet'
+
+STEP_NAME = 'step-06b_total_return'
+TOOL_NAME = 'codex'
+
+MODES = ('price', 'cash', 'drip')
+
+
+def _read_parquet(path: Path, missing_hint: str) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f'Missing {path.name}: {path}. {missing_hint}')
+    try:
+        return pd.read_parquet(path)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun step-06b.'
+        ) from exc
+
+
+def load_inputs() -> tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.DataFrame]:
+    """Holdings, aligned adjusted prices, cashflow and per-share dividends on one grid."""
+    holdings = _read_parquet(HOLDINGS_PATH, 'Run step-04 first.')
+    prices = _read_parquet(PRICES_PATH, 'Run step-03 first.')
+    cashflow_df = _read_parquet(CASHFLOW_PATH, 'Run step-05 first.')
+
+    holdings.index = pd.DatetimeIndex(holdings.index).tz_localize(None)
+    prices.index = pd.DatetimeIndex(prices.index).tz_localize(None)
+    cashflow = cashflow_df['cashflow']
+    cashflow.index = pd.DatetimeIndex(cashflow.index).tz_localize(None)
+
+    dates = holdings.index
+    # Same alignment as step-04's market value.
+    aligned_prices = prices.reindex(dates).ffill().bfill()
+    aligned_prices = aligned_prices.reindex(columns=holdings.columns).fillna(0.0)
+    cashflow = cashflow.groupby(level=0).sum().reindex(dates).fillna(0.0)
+
+    cache = {}
+    if DIVIDEND_CACHE_PATH.exists():
+        with DIVIDEND_CACHE_PATH.open('r', encoding='utf-8') as f:
+            cache = decode_dividend_cache(json.load(f))
+    else:
+        print(f'Warning: {DIVIDEND_CACHE_PATH.name} not found; run generate_yield_data.py first.')
+    dividends = dividend_matrix(dividend_series(cache, holdings.columns), dates)
+    return holdings, aligned_prices, cashflow, dividends
+
+
+def unadjusted_prices(adjusted: pd.DataFrame, dividends: pd.DataFrame) -> pd.DataFrame:
+    """Undo Yahoo's dividend adjustment of ``Adj Close``.
+
+    Yahoo scales every close before an ex-date e by ``1 - D_e / P_(e-1)``,
+    where ``P`` is the unadjusted close. Walking ex-dates from the latest back,
+    with ``F`` the product of the factors of all later ex-dates, that factor
+    is ``A_(e-1) / (A_(e-1) + D_e * F)`` in adjusted prices ``A``. Columns
+    priced from ``Close`` (see ``uses_close_price``) are returned unchanged.
+    """
+    values = adjusted.to_numpy(dtype=float)
+    divs = dividends.reindex_like(adjusted).fillna(0.0).to_numpy(dtype=float)
+    adjusts = np.array([not uses_close_price(c) for c in adjusted.columns], dtype=bool)
+
+    step = np.ones_like(values)
+    later = np.ones(values.shape[1])
+    for row in np.flatnonzero((divs[1:] > 0).any(axis=1))[::-1] + 1:
+        before, amount = values[row - 1], divs[row]
+        ok = adjusts & (amount > 0) & (before > 0)
+        factor = np.ones_like(later)
+        factor[ok] = before[ok] / (before[ok] + amount[ok] * later[ok])
+        step[row] = factor
+        later *= factor
+
+    # The factor of day t is the product over all ex-dates after t.
+    suffix = np.cumprod(step[::-1], axis=0)[::-1]
+    factor = np.vstack([suffix[1:], np.ones((1, values.shape[1]))])
+    return pd.DataFrame(values / factor, index=adjusted.index, columns=adjusted.columns)
+
+
+def compute_total_return(
+    holdings: pd.DataFrame,
+    adjusted_prices: pd.DataFrame,
+    cashflow: pd.Series,
+    dividends: pd.DataFrame,
+) -> pd.DataFrame:
+    """TWRR index per dividend treatment (one column per entry of ``MODES``)."""
+    prices = unadjusted_prices(adjusted_prices, dividends)
+    shares = holdings.reindex(columns=prices.columns).fillna(0.0)
+    per_share = dividends.reindex_like(prices).fillna(0.0)
+    market_value = (shares * prices).sum(axis=1)
+
+    # Dividends go to shares held at the close before the ex-date.
+    income = (shares.shift(1).fillna(0.0) * per_share).sum(axis=1)
+
+    # Reinvesting at the ex-date close compounds each position's shares.
+    ex_close = prices.where(prices > 0)
+    growth = (1.0 + (per_share / ex_close).fillna(0.0)).cumprod()
+    drip_shares = shares * growth
+    extra_traded = shares.diff().fillna(shares) * (growth - 1.0)
+    # Buying the extra shares is a contribution (negative cashflow, as in step-05).
+    drip_cashflow = cashflow - (extra_traded * prices).sum(axis=1)
+    drip_value = (drip_shares * prices).sum(axis=1)
+
+    result = pd.DataFrame(
+        {
+            'price': compute_twrr(market_value, cashflow),
+            'cash': compute_twrr(market_value, cashflow, income=income),
+            'drip': compute_twrr(drip_value, drip_cashflow),
+        },
+        columns=list(MODES),
+    )
+    result.index.name = 'date'
+    return result
+
+
+def write_total_return(total_return: pd.DataFrame) -> None:
+    try:
+        total_return.to_parquet(TOTAL_RETURN_PATH)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Writing parquet requires pyarrow or fastparquet. Install one of them and rerun step-06b.'
+        ) from exc
+    print(f'Total-return TWRR written to {TOTAL_RETURN_PATH}')
+
+
+def update_status(artifacts: List[str], notes: str) -> None:
+    timestamp = datetime.now(timezone.utc).isoformat()
+    print(f'[STATUS] {STEP_NAME} ({TOOL_NAME}) @ {timestamp}: {notes} -> {artifacts}')
+
+
+def summarize(total_return: pd.DataFrame) -> None:
+    print('\nTotal-return TWRR tail (last 5 rows):')
+    print(total_return.tail(5))
+    for mode in MODES:
+        print(f'  {mode:>5}: {(total_return[mode].iloc[-1] - 1.0) * 100:.2f}%')
+
+
+def main() -> None:
+    holdings, adjusted_prices, cashflow, dividends = load_inputs()
+    total_return = compute_total_return(holdings, adjusted_prices, cashflow, dividends)
+    write_total_return(total_return)
+
+    artifacts = [f"./{TOTAL_RETURN_PATH.relative_to(PROJECT_ROOT)}"]
+    update_status(artifacts, 'Computed price, cash-dividend and DRIP TWRR indices.')
+    append_changelog_entry(STEP_NAME, artifacts)
+    summarize(total_return)
+
+
+if __name__ == '__main__':
+    main()
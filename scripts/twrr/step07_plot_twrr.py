@@ -20,6 +20,9 @@ import yfinance as yf
 sys.path.append(str(Path(__file__).parent))
 from utils import append_changelog_entry  # noqa: E402
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from scripts.utils.precompress import export_text  # noqa: E402
+
 # Configure yfinance to use a temporary directory for timezone cache
 _yf_cache_dir = tempfile.mkdtemp(prefix="yf-cache-")
 yf.set_tz_cache_location(_yf_cache_dir)
@@ -173,7 +176,7 @@ def write_outputs(fig: go.Figure) -> None:
     }
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    OUTPUT_JSON.write_text(json.dumps(payload, indent=2) + '\n')
+    export_text(OUTPUT_JSON, json.dumps(payload, indent=2) + '\n')
 
     try:
         fig.write_image(OUTPUT_PNG)
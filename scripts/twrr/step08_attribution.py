@@ -0,0 +1,276 @@
+#!/usr/bin/env python3.11
+"""Step 08: Attribute daily portfolio return to individual holdings.
+
+Each holding's contribution on day t is its market value change net of its own
+trades, divided by the same denominator step-06 uses for the portfolio
+(previous market value plus external flows). Contributions therefore sum to
+the TWRR daily return exactly, and roll up to sectors and countries through a
+tickers x buckets weight matrix built from the existing allocation files.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+from utils import append_changelog_entry
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+CHECKPOINT_DIR = DATA_DIR / 'checkpoints'
+TRANSACTIONS_PATH = CHECKPOINT_DIR / 'transactions_with_splits.parquet'
+HOLDINGS_PATH = CHECKPOINT_DIR / 'holdings_daily.parquet'
+PRICES_PATH = DATA_DIR / 'historical_prices.parquet'
+METADATA_PATH = DATA_DIR / 'ticker_metadata.json'
+SECTOR_ALLOCATIONS_PATH = DATA_DIR / 'fund_sector_allocations.json'
+COUNTRY_ALLOCATIONS_PATH = DATA_DIR / 'fund_country_allocations.json'
+ATTRIBUTION_PATH = CHECKPOINT_DIR / 'attribution_daily.parquet'
+SECTOR_ATTRIBUTION_PATH = CHECKPOINT_DIR / 'attribution_sector_daily.parquet'
+COUNTRY_ATTRIBUTION_PATH = CHECKPOINT_DIR / 'attribution_country_daily.parquet'
+
+STEP_NAME = 'step-08_attribution'
+TOOL_NAME = 'codex'
+
+UNCLASSIFIED_BUCKET = 'Unclassified'
+OTHERS_BUCKET = 'Others'
+DENOMINATOR_EPSILON = 1e-9
+
+
+def ensure_directories() -> None:
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _read_parquet(path: Path, missing_hint: str) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f'Missing {path.name}: {path}. {missing_hint}')
+    try:
+        return pd.read_parquet(path)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun step-08.'
+        ) from exc
+
+
+def load_inputs() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    transactions = _read_parquet(TRANSACTIONS_PATH, 'Run step-02 first.')
+    holdings = _read_parquet(HOLDINGS_PATH, 'Run step-04 first.')
+    prices = _read_parquet(PRICES_PATH, 'Run step-03 first.')
+
+    transactions['trade_date'] = pd.to_datetime(transactions['trade_date']).dt.tz_localize(None)
+    holdings.index = pd.DatetimeIndex(holdings.index).tz_localize(None)
+    prices.index = pd.DatetimeIndex(prices.index).tz_localize(None)
+    return transactions, holdings, prices
+
+
+def load_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            data: dict = json.load(f)
+        return data
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f'Warning: could not read {path.name}: {exc}')
+        return {}
+
+
+def align_prices(prices: pd.DataFrame, holdings: pd.DataFrame) -> pd.DataFrame:
+    """Align prices to the holdings grid exactly as step-04 does."""
+    aligned = prices.reindex(holdings.index).ffill().bfill()
+    return aligned.reindex(columns=holdings.columns).fillna(0.0)
+
+
+def build_ticker_flows(transactions: pd.DataFrame, holdings: pd.DataFrame) -> pd.DataFrame:
+    """Return external flows into each holding (buys positive, sells negative).
+
+    Mirrors step-05's sign and zero-price rules so the per-ticker flows sum to
+    the negated daily cashflow series.
+    """
+    order_type = transactions['order_type'].str.lower()
+    priced = transactions['executed_price'].fillna(0) != 0
+    trade_value = transactions['trade_value'].fillna(0.0)
+
+    flow = np.where(order_type == 'buy', trade_value, 0.0)
+    flow = np.where(order_type == 'sell', -trade_value, flow)
+    flow = np.where(priced, flow, 0.0)
+
+    frame = pd.DataFrame(
+        {
+            'trade_date': transactions['trade_date'].dt.normalize(),
+            'security': transactions['security'],
+            'flow': flow,
+        }
+    )
+    pivot = frame.groupby(['trade_date', 'security'])['flow'].sum().unstack(fill_value=0.0)
+    pivot.index = pd.DatetimeIndex(pivot.index)
+    return pivot.reindex(index=holdings.index, columns=holdings.columns, fill_value=0.0)
+
+
+def compute_contributions(
+    holdings: pd.DataFrame, prices: pd.DataFrame, flows: pd.DataFrame
+) -> pd.DataFrame:
+    """Return each holding's daily contribution to the portfolio return."""
+    values = holdings.to_numpy(dtype=float) * prices.to_numpy(dtype=float)
+    flow_values = flows.to_numpy(dtype=float)
+
+    previous = np.vstack([np.zeros((1, values.shape[1])), values[:-1]])
+    gain = values - previous - flow_values
+    denominator = previous.sum(axis=1) + flow_values.sum(axis=1)
+
+    valid = np.abs(denominator) > DENOMINATOR_EPSILON
+    contributions = np.zeros_like(values)
+    contributions[valid] = gain[valid] / denominator[valid, None]
+    contributions[~np.isfinite(contributions)] = 0.0
+    contributions[0] = 0.0
+
+    return pd.DataFrame(contributions, index=holdings.index, columns=holdings.columns)
+
+
+def _normalized_weights(allocation: Dict[str, float]) -> Dict[str, float]:
+    weights = {
+        bucket: float(value)
+        for bucket, value in allocation.items()
+        if isinstance(value, (int, float)) and value > 0
+    }
+    total = sum(weights.values())
+    if total <= 0:
+        return {}
+    scale = 100.0 if total > 1.5 else 1.0
+    weights = {bucket: value / scale for bucket, value in weights.items()}
+    remainder = 1.0 - sum(weights.values())
+    if remainder > 1e-6:
+        weights[OTHERS_BUCKET] = weights.get(OTHERS_BUCKET, 0.0) + remainder
+    elif remainder < 0:
+        total = sum(weights.values())
+        weights = {bucket: value / total for bucket, value in weights.items()}
+    return weights
+
+
+def build_weight_matrix(
+    tickers: List[str],
+    fund_allocations: Dict[str, Dict[str, float]],
+    metadata: Dict[str, dict],
+    field: str,
+) -> pd.DataFrame:
+    """Return a tickers x buckets matrix whose rows sum to one.
+
+    Funds use their look-through allocation; individual securities fall back
+    to the ``field`` entry in ticker metadata, or ``Unclassified``.
+    """
+    rows: Dict[str, Dict[str, float]] = {}
+    for ticker in tickers:
+        weights = _normalized_weights(fund_allocations.get(ticker, {}))
+        if not weights:
+            bucket = (metadata.get(ticker) or {}).get(field) or UNCLASSIFIED_BUCKET
+            weights = {bucket: 1.0}
+        rows[ticker] = weights
+
+    matrix = pd.DataFrame.from_dict(rows, orient='index').fillna(0.0)
+    return matrix.reindex(index=tickers).fillna(0.0).sort_index(axis=1)
+
+
+def roll_up(contributions: pd.DataFrame, weights: pd.DataFrame) -> pd.DataFrame:
+    """Project ticker contributions onto buckets with one matrix product."""
+    aligned = weights.reindex(index=contributions.columns).fillna(0.0)
+    return pd.DataFrame(
+        contributions.to_numpy() @ aligned.to_numpy(),
+        index=contributions.index,
+        columns=aligned.columns,
+    )
+
+
+def cumulative_contribution(
+    contributions: pd.DataFrame,
+    start: Optional[str | pd.Timestamp] = None,
+    end: Optional[str | pd.Timestamp] = None,
+) -> pd.Series:
+    """Return each column's linked contribution to the return over ``[start, end]``.
+
+    A day's contribution is scaled by the portfolio growth since ``start`` so
+    the columns sum to the compounded portfolio return over the range.
+    """
+    window = contributions.loc[start:end]
+    if window.empty:
+        return pd.Series(0.0, index=contributions.columns)
+    daily_return = window.sum(axis=1).to_numpy()
+    growth_before = np.concatenate([[1.0], np.cumprod(1.0 + daily_return)[:-1]])
+    return pd.Series(
+        (window.to_numpy() * growth_before[:, None]).sum(axis=0),
+        index=contributions.columns,
+    )
+
+
+def write_frame(frame: pd.DataFrame, path: Path) -> None:
+    try:
+        frame.to_parquet(path)
+    except ImportError as exc:
+        raise RuntimeError(
+            'Writing parquet requires pyarrow or fastparquet. Install one of them and rerun step-08.'
+        ) from exc
+    print(f'Attribution written to {path}')
+
+
+def update_status(artifacts: List[str], notes: str) -> None:
+    timestamp = datetime.now(timezone.utc).isoformat()
+    print(f'[STATUS] {STEP_NAME} ({TOOL_NAME}) @ {timestamp}: {notes} -> {artifacts}')
+
+
+def summarize(contributions: pd.DataFrame, sectors: pd.DataFrame) -> None:
+    if contributions.empty:
+        print('\nNo attribution rows produced.')
+        return
+    month_start = contributions.index[-1].replace(day=1)
+    by_ticker = cumulative_contribution(contributions, start=month_start)
+    by_sector = cumulative_contribution(sectors, start=month_start)
+
+    print(f'\nMonth-to-date contribution since {month_start.date()}:')
+    print(f'  Portfolio: {by_ticker.sum() * 100:.2f}%')
+    print('  Top holdings:')
+    for ticker, value in by_ticker.sort_values(key=np.abs, ascending=False).head(5).items():
+        print(f'    {ticker:<8} {value * 100:+.2f}%')
+    print('  Top sectors:')
+    for sector, value in by_sector.sort_values(key=np.abs, ascending=False).head(5).items():
+        print(f'    {sector:<24} {value * 100:+.2f}%')
+
+
+def main() -> None:
+    ensure_directories()
+    transactions, holdings, prices = load_inputs()
+
+    aligned_prices = align_prices(prices, holdings)
+    flows = build_ticker_flows(transactions, holdings)
+    contributions = compute_contributions(holdings, aligned_prices, flows)
+
+    metadata = load_json(METADATA_PATH)
+    tickers = list(contributions.columns)
+    sector_weights = build_weight_matrix(
+        tickers, load_json(SECTOR_ALLOCATIONS_PATH), metadata, 'sector'
+    )
+    country_weights = build_weight_matrix(
+        tickers, load_json(COUNTRY_ALLOCATIONS_PATH), metadata, 'country'
+    )
+    sectors = roll_up(contributions, sector_weights)
+    countries = roll_up(contributions, country_weights)
+
+    write_frame(contributions, ATTRIBUTION_PATH)
+    write_frame(sectors, SECTOR_ATTRIBUTION_PATH)
+    write_frame(countries, COUNTRY_ATTRIBUTION_PATH)
+
+    artifacts = [
+        f"./{path.relative_to(PROJECT_ROOT)}"
+        for path in (ATTRIBUTION_PATH, SECTOR_ATTRIBUTION_PATH, COUNTRY_ATTRIBUTION_PATH)
+    ]
+    update_status(artifacts, 'Attributed daily TWRR to holdings, sectors and countries.')
+    append_changelog_entry(STEP_NAME, artifacts)
+    summarize(contributions, sectors)
+
+
+if __name__ == '__main__':
+    main()
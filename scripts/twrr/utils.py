@@ -29,6 +29,15 @@ def load_delisted_tickers() -> FrozenSet[str]:
     return frozenset(tickers)
 
 
+def uses_close_price(ticker: str) -> bool:
+    """Whether step-03 stores ``Close`` rather than ``Adj Close`` for ``ticker``.
+
+    Mutual funds (symbols ending in X) are priced from ``Close``; everything
+    else from the dividend-adjusted ``Adj Close``.
+    """
+    return ticker.upper().endswith("X")
+
+
 def append_changelog_entry(step_name: str, artifacts: List[str], notes: str = "") -> None:
     """Append a status entry to the changelog JSON file."""
     changelog = []
@@ -8,6 +8,9 @@ import json
 import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.allocation_history import record_allocation_snapshot  # noqa: E402
+
 # VT market cap breakdown based on FTSE Global All Cap Index methodology
 # Source: Vanguard VT holdings analysis, FTSE Russell index methodology
 # Updated quarterly based on global market cap distribution
@@ -55,8 +58,9 @@ def update_vt_marketcap():
     # Update VT entry
     data['VT'] = VT_MARKETCAP_BREAKDOWN.copy()
 
-    # Save updated data
+    # Save updated data; the dated copy keeps earlier breakdowns for history
     save_fund_breakdowns(data)
+    record_allocation_snapshot('marketcap', 'VT', VT_MARKETCAP_BREAKDOWN)
 
     print("VT market cap breakdown updated successfully!")
     print(f"  Mega Cap: {VT_MARKETCAP_BREAKDOWN['Mega Cap']}%")
@@ -9,6 +9,7 @@ from pathlib import Path
 import requests
 
 sys.path.append(str(Path(__file__).resolve().parent))
+from utils.allocation_history import record_allocation_snapshot
 from utils.security_utils import scrub_secrets
 
 
@@ -120,6 +121,8 @@ def update_json(new_sectors):
         data = json.load(f)
 
     data["VT"] = new_sectors
+    # Date the new breakdown so earlier days keep the one they had.
+    record_allocation_snapshot("sector", "VT", new_sectors)
 
     with open(json_path, "w") as f:
         json.dump(data, f, indent=4)
@@ -0,0 +1,129 @@
+"""Dated snapshots of fund allocations (sector, country and market-cap weights).
+
+``fund_sector_allocations.json``, ``fund_country_allocations.json`` and
+``fund_marketcap_breakdown.json`` hold each fund's current breakdown. The
+updaters that refresh them also append the new breakdown here, dated, so
+history can be classified with the weights a fund had at the time::
+
+    {"version": 1,
+     "sector": {"VT": [{"as_of": "2026-01-05", "weights": {"Technology": 23.8, ...}},
+                       {"as_of": "2026-04-06", "weights": {...}}]},
+     "country": {...},
+     "marketcap": {...}}
+
+A snapshot applies from its ``as_of`` date until the next one. The current
+file stays the latest snapshot of every fund: it replaces the weights of the
+newest dated snapshot (so hand edits still take effect), and funds without
+history use it for every date. Dates before a fund's first snapshot use that
+snapshot, as nothing older is known.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ALLOCATION_HISTORY_PATH = PROJECT_ROOT / 'data' / 'fund_allocation_history.json'
+ALLOCATION_HISTORY_VERSION = 1
+ALLOCATION_KINDS = ('sector', 'country', 'marketcap')
+
+Snapshots = List[Dict[str, Any]]
+
+
+def _weights(raw: Mapping[str, Any]) -> Dict[str, float]:
+    # Breakdown files carry notes such as "_comment" next to the weights.
+    return {
+        k: float(v)
+        for k, v in raw.items()
+        if not k.startswith('_') and isinstance(v, (int, float)) and not isinstance(v, bool)
+    }
+
+
+def load_allocation_history(
+    path: Path = ALLOCATION_HISTORY_PATH,
+) -> Dict[str, Dict[str, Snapshots]]:
+    """``{kind: {ticker: [{"as_of", "weights"}, ...]}}``, snapshots sorted by date."""
+    history: Dict[str, Dict[str, Snapshots]] = {kind: {} for kind in ALLOCATION_KINDS}
+    if not path.exists():
+        return history
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('version') != ALLOCATION_HISTORY_VERSION:
+        return history
+    for kind in ALLOCATION_KINDS:
+        for ticker, snapshots in (data.get(kind) or {}).items():
+            history[kind][ticker] = sorted(snapshots, key=lambda s: s['as_of'])
+    return history
+
+
+def save_allocation_history(
+    history: Mapping[str, Mapping[str, Snapshots]], path: Path = ALLOCATION_HISTORY_PATH
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload: Dict[str, Any] = {'version': ALLOCATION_HISTORY_VERSION}
+    payload.update({kind: dict(sorted(history.get(kind, {}).items())) for kind in ALLOCATION_KINDS})
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+def record_allocation_snapshot(
+    kind: str,
+    ticker: str,
+    weights: Mapping[str, Any],
+    as_of: Optional[date] = None,
+    path: Path = ALLOCATION_HISTORY_PATH,
+) -> bool:
+    """Append ``weights`` as ``ticker``'s ``kind`` breakdown as of ``as_of`` (default today).
+
+    Nothing is written when the weights equal the latest snapshot. A second
+    snapshot on the same day replaces the first. Returns whether the history
+    changed.
+    """
+    if kind not in ALLOCATION_KINDS:
+        raise ValueError(f"Unknown allocation kind {kind!r}; expected one of {ALLOCATION_KINDS}")
+    as_of_str = (as_of or date.today()).isoformat()
+    clean = _weights(weights)
+
+    history = load_allocation_history(path)
+    snapshots = history[kind].setdefault(ticker, [])
+    if snapshots and snapshots[-1]['weights'] == clean:
+        return False
+    if snapshots and snapshots[-1]['as_of'] == as_of_str:
+        snapshots.pop()
+    snapshots.append({'as_of': as_of_str, 'weights': clean})
+    snapshots.sort(key=lambda s: s['as_of'])
+    save_allocation_history(history, path)
+    return True
+
+
+def allocation_snapshots(
+    history: Mapping[str, Snapshots], current: Mapping[str, Any]
+) -> List[Tuple[Optional[str], Dict[str, Any]]]:
+    """Full ``{ticker: weights}`` tables, each with the date it takes effect.
+
+    The first table has no date (it also covers everything before the first
+    change); a new table starts on every date some fund's breakdown changes.
+    Tickers in ``current`` without history keep their current weights
+    throughout.
+    """
+    timelines: Dict[str, List[Tuple[str, Any]]] = {}
+    for ticker, snapshots in history.items():
+        timeline = [(s['as_of'], s['weights']) for s in snapshots]
+        if not timeline:
+            continue
+        if ticker in current:
+            timeline[-1] = (timeline[-1][0], current[ticker])
+        timelines[ticker] = timeline
+
+    change_dates = sorted({as_of for timeline in timelines.values() for as_of, _ in timeline[1:]})
+    tables: List[Tuple[Optional[str], Dict[str, Any]]] = []
+    for start in [None, *change_dates]:
+        table = dict(current)
+        for ticker, timeline in timelines.items():
+            in_effect = [w for as_of, w in timeline if start is not None and as_of <= start]
+            table[ticker] = in_effect[-1] if in_effect else timeline[0][1]
+        tables.append((start, table))
+    return tables
@@ -0,0 +1,88 @@
+"""Dividend cache codec and per-share dividend matrices.
+
+In memory the cache is ``{ticker: [[ex_date, amount], ...]}`` plus
+``FETCHED_KEY``: ``{ticker: ISO date of the last successful fetch}``. On disk
+(v2) it is stored as compact columns::
+
+    {"version": 2,
+     "tickers": {"AAPL": {"fetched": "2026-10-19", "days": [6339, 91, ...],
+                          "amounts": [0.000536, 0.000536, ...]}}}
+
+``days`` are ex-date gaps in days, the first counted from 1970-01-01. A v1
+file (plain ticker lists) decodes unchanged, without fetch dates.
+"""
+
+from __future__ import annotations
+
+import itertools
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+DIVIDEND_CACHE_VERSION = 2
+# Reserved cache key: {ticker: ISO date of the last successful fetch}.
+FETCHED_KEY = "_fetched"
+_EPOCH = date(1970, 1, 1)
+
+
+def _encode_dividends(events: List[List[Any]], fetched: Optional[str]) -> Dict[str, Any]:
+    days = [(date.fromisoformat(d) - _EPOCH).days for d, _ in events]
+    return {
+        "fetched": fetched,
+        "days": days[:1] + [b - a for a, b in itertools.pairwise(days)],
+        "amounts": [amount for _, amount in events],
+    }
+
+
+def _decode_dividends(encoded: Dict[str, Any]) -> List[List[Any]]:
+    days = itertools.accumulate(encoded.get("days", []))
+    return [
+        [(_EPOCH + timedelta(days=day)).isoformat(), amount]
+        for day, amount in zip(days, encoded.get("amounts", []), strict=True)
+    ]
+
+
+def encode_dividend_cache(cache: Dict[str, Any]) -> Dict[str, Any]:
+    fetched = cache.get(FETCHED_KEY, {})
+    return {
+        "version": DIVIDEND_CACHE_VERSION,
+        "tickers": {
+            t: _encode_dividends(events, fetched.get(t))
+            for t, events in sorted(cache.items())
+            if t != FETCHED_KEY
+        },
+    }
+
+
+def decode_dividend_cache(data: Dict[str, Any]) -> Dict[str, Any]:
+    if data.get("version") != DIVIDEND_CACHE_VERSION:
+        return dict(data)
+    cache: Dict[str, Any] = {FETCHED_KEY: {}}
+    for ticker, encoded in data.get("tickers", {}).items():
+        cache[ticker] = _decode_dividends(encoded)
+        if encoded.get("fetched"):
+            cache[FETCHED_KEY][ticker] = encoded["fetched"]
+    return cache
+
+
+def dividend_series(cache: Dict[str, Any], tickers: Iterable[str]) -> Dict[str, pd.Series]:
+    """Per-share dividend amounts by ex-date for each ticker (empty if none cached)."""
+    ticker_divs = {}
+    for t in tickers:
+        div_data = cache.get(t, [])
+        if div_data:
+            df = pd.DataFrame(div_data, columns=['date', 'amount'])
+            df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
+            ticker_divs[t] = df.set_index('date')['amount'].sort_index()
+        else:
+            ticker_divs[t] = pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+    return ticker_divs
+
+
+def dividend_matrix(ticker_divs: Dict[str, pd.Series], index: pd.DatetimeIndex) -> pd.DataFrame:
+    """Per-share dividends by ex-date (rows) and ticker (columns); zero on other dates."""
+    columns = {
+        t: s.groupby(level=0).sum().reindex(index, fill_value=0.0) for t, s in ticker_divs.items()
+    }
+    return pd.DataFrame(columns, index=index, columns=list(ticker_divs), dtype=float)
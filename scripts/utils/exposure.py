@@ -0,0 +1,305 @@
+"""Look-through exposure of portfolio market values by classification.
+
+Every breakdown chart (composition, sectors, geography, continents, market-cap
+buckets) has the same shape: value each holding per day, spread each ticker's
+value across categories with a weight table, then turn the category values
+into percentages of the day's portfolio value. Here that is::
+
+    market_values (days x tickers) @ weights (tickers x categories)
+
+with one ``Breakdown`` per classification. ``compute_exposures`` stacks every
+breakdown's weights side by side so all of them come out of one matrix
+product, then applies each breakdown's pruning and normalization:
+
+* categories under ``min_pct`` percent (or with no positive value) are dropped;
+* the kept percentages are rescaled to 100, unless ``others_below`` is set and
+  they add up to no more than that, in which case the remainder is reported
+  as ``OTHERS`` instead;
+* with ``rescale`` off, the percentages are left as they are (for weights
+  that already cover each holding, such as market-cap buckets).
+
+The result per breakdown is a frame with ``date`` and ``total_value`` columns
+followed by one column per category, NaN where a category was dropped on
+that day. ``rollup`` re-aggregates such a frame through a category mapping
+(countries to continents, tickers to cap buckets) without renormalizing.
+
+Fund breakdowns change over time, so weights may also be a ``WeightHistory``
+of dated matrices; each day is multiplied by the matrix in effect on it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+OTHERS = 'Others'
+META_COLUMNS = ('date', 'total_value')
+
+
+def price_ticker(ticker: Any) -> Any:
+    """Align a portfolio ticker with its price symbol (``BRK-B`` -> ``BRKB``)."""
+    if not isinstance(ticker, str):
+        return ticker
+    return ticker.replace('-', '').upper()
+
+
+def aligned_price_matrix(
+    prices_data: Mapping[str, Mapping[str, float]], dates: Sequence[Any], tickers: Sequence[str]
+) -> pd.DataFrame:
+    """Daily prices (``dates`` x ``tickers``); missing or zero prices fall back once.
+
+    A date without a usable price takes the last price recorded strictly
+    before it. Tickers without price data stay NaN.
+    """
+    columns = {t: prices_data[price_ticker(t)] for t in tickers if price_ticker(t) in prices_data}
+    raw = pd.DataFrame(columns, dtype=float)
+    raw.index = pd.to_datetime(raw.index)
+    day_index = pd.DatetimeIndex(dates)
+    raw = raw.reindex(raw.index.union(day_index))
+    previous = raw.ffill().shift(1)
+    raw = raw.where(raw != 0).fillna(previous.where(previous != 0))
+    return raw.reindex(index=day_index, columns=list(tickers))
+
+
+def market_value_matrix(holdings_df: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """Shares x price for held tickers with a price; zero everywhere else."""
+    shares = holdings_df.to_numpy(dtype=float)
+    price = prices.reindex(index=holdings_df.index, columns=holdings_df.columns).to_numpy(
+        dtype=float
+    )
+    counted = (shares > 0) & np.isfinite(price) & (price != 0)
+    values = np.where(counted, shares * np.where(counted, price, 0.0), 0.0)
+    return pd.DataFrame(values, index=holdings_df.index, columns=holdings_df.columns)
+
+
+def weight_matrix(
+    rows: Mapping[str, Mapping[str, float]], tickers: Iterable[str], scale: float = 1.0
+) -> pd.DataFrame:
+    """``tickers`` x categories from ``{ticker: {category: weight}}``, weights times ``scale``.
+
+    Categories keep their order of first appearance; tickers without a row get
+    all-zero weights.
+    """
+    tickers = list(tickers)
+    columns: Dict[str, int] = {}
+    for ticker in tickers:
+        for category in rows.get(ticker, {}):
+            columns.setdefault(category, len(columns))
+    values = np.zeros((len(tickers), len(columns)))
+    for i, ticker in enumerate(tickers):
+        for category, weight in rows.get(ticker, {}).items():
+            values[i, columns[category]] += weight * scale
+    return pd.DataFrame(values, index=tickers, columns=list(columns))
+
+
+def mapping_matrix(
+    mapping: Mapping[str, str], keys: Iterable[str], default: str = 'Other'
+) -> pd.DataFrame:
+    """One-hot ``keys`` x groups for a ``{key: group}`` mapping; unmapped keys go to ``default``."""
+    return weight_matrix({k: {mapping.get(k, default): 1.0} for k in keys}, keys)
+
+
+@dataclass(frozen=True)
+class WeightHistory:
+    """Piecewise-constant weights: ``matrices[i]`` applies from ``starts[i]`` on.
+
+    Dates before the first start use the first matrix, since nothing older is
+    known. ``aligned`` lays every matrix out on the same rows and columns so a
+    day's weights are a single index into a (segments x rows x columns) array.
+    """
+
+    starts: pd.DatetimeIndex
+    matrices: Tuple[pd.DataFrame, ...]
+
+    def aligned(self, index: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+        columns: Dict[str, None] = {}
+        for matrix in self.matrices:
+            columns.update(dict.fromkeys(matrix.columns))
+        stack = np.stack(
+            [
+                m.reindex(index=list(index), columns=list(columns), fill_value=0.0)
+                .fillna(0.0)
+                .to_numpy(dtype=float)
+                for m in self.matrices
+            ]
+        )
+        return stack, list(columns)
+
+    def segment_of(self, dates: Sequence[Any]) -> np.ndarray:
+        """Index of the matrix in effect on each of ``dates``."""
+        found = self.starts.searchsorted(pd.DatetimeIndex(dates), side='right') - 1
+        return np.asarray(np.clip(found, 0, None))
+
+
+Weights = Union[pd.DataFrame, WeightHistory]
+
+
+def weight_history(snapshots: Sequence[Tuple[Any, pd.DataFrame]]) -> WeightHistory:
+    """``WeightHistory`` from ``(start, matrix)`` pairs; a None start means "always"."""
+    starts = [pd.Timestamp.min if start is None else pd.Timestamp(start) for start, _ in snapshots]
+    order = sorted(range(len(snapshots)), key=starts.__getitem__)
+    return WeightHistory(
+        pd.DatetimeIndex([starts[i] for i in order]),
+        tuple(snapshots[i][1] for i in order),
+    )
+
+
+def _as_history(weights: Weights) -> WeightHistory:
+    if isinstance(weights, WeightHistory):
+        return weights
+    return WeightHistory(pd.DatetimeIndex([pd.Timestamp.min]), (weights,))
+
+
+@dataclass(frozen=True)
+class Breakdown:
+    """One classification: ``weights`` is tickers x categories (None: one per ticker).
+
+    A ``WeightHistory`` applies each day the matrix in effect on that day.
+    """
+
+    name: str
+    weights: Optional[Weights] = None
+    min_pct: float = 0.0
+    others_below: Optional[float] = None
+    rescale: bool = True
+
+
+def _weighted_sum(
+    values: np.ndarray, dates: Sequence[Any], index: Sequence[str], weights: Sequence[Weights]
+) -> Tuple[np.ndarray, List[List[str]]]:
+    """``values`` (days x ``index``) times every weight matrix, side by side.
+
+    Days sharing the same segment of every ``WeightHistory`` share one matrix
+    product, so static weights cost a single product for the whole range.
+    """
+    stacks, categories, segments = [], [], []
+    for w in weights:
+        history = _as_history(w)
+        stack, columns = history.aligned(index)
+        stacks.append(stack)
+        categories.append(columns)
+        segments.append(history.segment_of(dates))
+
+    width = sum(len(c) for c in categories)
+    result = np.zeros((len(values), width))
+    if not stacks or not len(values):
+        return result, categories
+    combos, inverse = np.unique(np.stack(segments, axis=1), axis=0, return_inverse=True)
+    for k, combo in enumerate(combos):
+        rows = inverse.reshape(-1) == k
+        blocks = [stack[segment] for stack, segment in zip(stacks, combo, strict=True)]
+        result[rows] = values[rows] @ np.hstack(blocks)
+    return result, categories
+
+
+def _first_seen_order(kept: np.ndarray) -> np.ndarray:
+    """Columns kept on some day, ordered by first day kept, then by column."""
+    seen = np.flatnonzero(kept.any(axis=0))
+    first_day = kept[:, seen].argmax(axis=0)
+    return seen[np.lexsort((seen, first_day))]
+
+
+def _normalize(
+    values: np.ndarray, totals: np.ndarray, breakdown: Breakdown
+) -> tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """Percent of ``totals`` per category, pruned and rescaled (see module docstring)."""
+    positive = totals[:, None] > 0
+    pct = np.divide(values, totals[:, None], out=np.zeros_like(values), where=positive) * 100.0
+    kept = positive & (values > 0) & (pct >= breakdown.min_pct)
+    pct = np.where(kept, pct, 0.0)
+    kept_total = pct.sum(axis=1)
+
+    others = None
+    rescale = (kept_total > 0) & breakdown.rescale
+    if breakdown.others_below is not None:
+        short = rescale & (kept_total <= breakdown.others_below)
+        rescale &= ~short
+        if short.any():
+            others = np.where(short, 100.0 - kept_total, np.nan)
+    scale = np.divide(100.0, kept_total, out=np.ones_like(kept_total), where=rescale)
+    return pct * scale[:, None], kept, others
+
+
+def _exposure_frame(
+    dates: pd.DatetimeIndex,
+    totals: np.ndarray,
+    categories: Sequence[str],
+    pct: np.ndarray,
+    kept: np.ndarray,
+    others: Optional[np.ndarray],
+) -> pd.DataFrame:
+    order = _first_seen_order(kept)
+    columns: Dict[str, Any] = {
+        'date': dates.strftime('%Y-%m-%d'),
+        'total_value': totals,
+    }
+    for col in order:
+        columns[categories[col]] = np.where(kept[:, col], pct[:, col], np.nan)
+    if others is not None:
+        previous = columns.get(OTHERS)
+        if previous is not None:
+            others = np.where(np.isnan(others), previous, np.nan_to_num(previous) + others)
+        columns[OTHERS] = others
+    return pd.DataFrame(columns)
+
+
+def compute_exposures(
+    market_values: pd.DataFrame, breakdowns: Sequence[Breakdown]
+) -> Dict[str, pd.DataFrame]:
+    """Every breakdown of ``market_values`` (days x tickers) from one matrix product."""
+    tickers = list(market_values.columns)
+    values = market_values.to_numpy(dtype=float)
+    totals = values.sum(axis=1)
+    dates = pd.DatetimeIndex(market_values.index)
+
+    identity = pd.DataFrame(np.eye(len(tickers)), index=tickers, columns=tickers)
+    weights = [identity if b.weights is None else b.weights for b in breakdowns]
+    stacked, categories = _weighted_sum(values, dates, tickers, weights)
+
+    exposures = {}
+    start = 0
+    for breakdown, names in zip(breakdowns, categories, strict=True):
+        block = stacked[:, start : start + len(names)]
+        start += len(names)
+        pct, kept, others = _normalize(block, totals, breakdown)
+        exposures[breakdown.name] = _exposure_frame(dates, totals, names, pct, kept, others)
+    return exposures
+
+
+def category_columns(frame: pd.DataFrame) -> List[str]:
+    return [c for c in frame.columns if c not in META_COLUMNS]
+
+
+def rollup(
+    frame: pd.DataFrame, mapping: Weights, categories: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """Re-aggregate an exposure frame through ``mapping`` (its categories x new categories).
+
+    Percentages are summed as they are (dropped categories count as zero and
+    negative ones are ignored); nothing is renormalized. ``categories`` fixes
+    the output columns, otherwise the mapping's columns are used.
+    """
+    source = category_columns(frame)
+    pct = frame[source].to_numpy(dtype=float)
+    pct = np.where(pct > 0, pct, 0.0)
+    values, (columns,) = _weighted_sum(pct, pd.to_datetime(frame['date']), source, [mapping])
+    result = pd.DataFrame(values, columns=columns)
+    if categories is not None:
+        result = result.reindex(columns=list(categories), fill_value=0.0)
+    return pd.concat([frame[list(META_COLUMNS)].reset_index(drop=True), result], axis=1)
+
+
+def exposure_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """One ``{date, total_value, category: pct}`` dict per day, dropped categories omitted."""
+    categories = category_columns(frame)
+    values = frame[categories].to_numpy(dtype=float)
+    records = []
+    for date, total, row in zip(frame['date'], frame['total_value'], values, strict=True):
+        record: Dict[str, Any] = {'date': date, 'total_value': float(total)}
+        for col in np.flatnonzero(~np.isnan(row)):
+            record[categories[col]] = float(row[col])
+        records.append(record)
+    return records
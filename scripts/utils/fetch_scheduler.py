@@ -0,0 +1,127 @@
+"""One shared fetch pool per run: global concurrency, per-host limits, de-duplication.
+
+``FetchScheduler.submit(key, fn)`` runs ``fn`` on the shared pool at most once
+per ``key``. Later stages that ask for the same key get the same future, so a
+ticker's ``info`` fetched for ETF P/E is reused by forward P/E. Each task holds
+its host's semaphore while it runs, which caps simultaneous requests per host
+below the global worker count.
+
+Only leaf requests run on the pool. Callers assemble results on their own
+thread, so a task never waits on another task and the pool cannot deadlock.
+
+``TickerRequests`` layers yfinance-style access on top. Each attribute
+(``info``, ``splits``, ...) or method call (``get_earnings_dates``) is one
+request. ``fetch`` fans out all of a ticker's requests at once.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_HOST = "default"
+YAHOO_HOST = "yahoo"
+# Yahoo throttles bursts well before 16 parallel requests from one client.
+DEFAULT_HOST_LIMITS: Dict[str, int] = {YAHOO_HOST: 8}
+
+
+class FetchScheduler:
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        host_limits: Optional[Mapping[str, int]] = None,
+    ):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+        limits = dict(DEFAULT_HOST_LIMITS if host_limits is None else host_limits)
+        self._host_limits = {host: threading.Semaphore(n) for host, n in limits.items()}
+        self._futures: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "FetchScheduler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, host: str, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            return fn(*args)
+        with limit:
+            return fn(*args)
+
+    def submit(
+        self, key: Hashable, fn: Callable[..., Any], *args: Any, host: str = DEFAULT_HOST
+    ) -> concurrent.futures.Future:
+        """Schedule ``fn(*args)`` unless ``key`` was already requested this run."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(self._run, host, fn, args)
+                self._futures[key] = future
+            return future
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+
+# A request is an attribute name, or (method name, kwargs) for a method call.
+Request = Any
+
+
+def _request_key(request: Request) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    if isinstance(request, str):
+        return request, ()
+    name, kwargs = request
+    return name, tuple(sorted(kwargs.items()))
+
+
+class TickerRequests:
+    """Per-ticker vendor requests routed through a ``FetchScheduler``.
+
+    ``ticker_factory`` builds a fresh client per request (e.g. ``yf.Ticker``)
+    so parallel sub-requests for one symbol never share mutable client state.
+    """
+
+    def __init__(
+        self,
+        scheduler: FetchScheduler,
+        ticker_factory: Callable[[str], Any],
+        host: str = YAHOO_HOST,
+    ):
+        self.scheduler = scheduler
+        self.ticker_factory = ticker_factory
+        self.host = host
+
+    def _load(self, symbol: str, request: Request) -> Any:
+        client = self.ticker_factory(symbol)
+        if isinstance(request, str):
+            return getattr(client, request)
+        name, kwargs = request
+        return getattr(client, name)(**kwargs)
+
+    def request(self, symbol: str, request: Request) -> concurrent.futures.Future:
+        key = (self.host, symbol, _request_key(request))
+        return self.scheduler.submit(key, self._load, symbol, request, host=self.host)
+
+    def fetch(
+        self, symbol: str, requests: Iterable[Request]
+    ) -> Dict[str, concurrent.futures.Future]:
+        """Fan out ``requests`` for ``symbol``; futures keyed by attribute/method name."""
+        return {_request_key(r)[0]: self.request(symbol, r) for r in requests}
+
+    def prefetch(self, symbols: Iterable[str], requests: Iterable[Request]) -> None:
+        requests = list(requests)
+        for symbol in symbols:
+            self.fetch(symbol, requests)
+
+    def get(self, symbol: str, request: Request) -> Any:
+        """Blocking read; re-raises the request's exception."""
+        return self.request(symbol, request).result()
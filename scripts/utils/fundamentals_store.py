@@ -0,0 +1,334 @@
+"""Append-only, point-in-time fundamentals store.
+
+Every fetched or hand-patched fundamental (today: trailing EPS anchors) is one
+row of ``data/checkpoints/fundamentals.parquet``::
+
+    ticker | as_of_date | report_date | metric | value | source | currency
+
+Rows are never rewritten. Recording a snapshot appends only what changed
+since the latest revision of the same (ticker, metric, source): new or revised
+report dates, plus a NaN tombstone for report dates the source no longer
+returns. Dated scalars (``record_value``) get a tombstone when the source stops
+returning them. Reading therefore works at any knowledge date (``known_by``),
+and the full revision history stays available for audits.
+
+Where sources disagree on a report date, ``SOURCE_PRIORITY`` decides: manual
+patches override vendor data, as ``manual_eps_patch.json`` always has.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+FUNDAMENTALS_PATH = PROJECT_ROOT / 'data' / 'checkpoints' / 'fundamentals.parquet'
+
+COLUMNS = ['ticker', 'as_of_date', 'report_date', 'metric', 'value', 'source', 'currency']
+
+EPS_TTM = 'eps_ttm'
+EPS_TTM_CURRENT = 'eps_ttm_current'
+
+SOURCE_VENDOR = 'yfinance'
+SOURCE_MANUAL = 'manual'
+# Later entries win when two sources report the same (ticker, report_date).
+SOURCE_PRIORITY = (SOURCE_VENDOR, SOURCE_MANUAL)
+
+VALUE_TOLERANCE = 1e-9
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            'ticker': pd.Series(dtype='string'),
+            'as_of_date': pd.Series(dtype='datetime64[ns]'),
+            'report_date': pd.Series(dtype='datetime64[ns]'),
+            'metric': pd.Series(dtype='string'),
+            'value': pd.Series(dtype='float64'),
+            'source': pd.Series(dtype='string'),
+            'currency': pd.Series(dtype='string'),
+        }
+    )
+
+
+def _day(value: object) -> pd.Timestamp:
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp.normalize()
+
+
+class FundamentalsStore:
+    """In-memory view of the store; ``save()`` persists appended rows."""
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self._frame = _empty_frame() if frame is None else frame.reset_index(drop=True)
+        self._pending: List[dict] = []
+
+    @classmethod
+    def load(cls, path: Path = FUNDAMENTALS_PATH) -> 'FundamentalsStore':
+        path = Path(path)
+        if not path.exists():
+            return cls(path=path)
+        try:
+            frame = pd.read_parquet(path)
+        except ImportError as exc:
+            raise RuntimeError(
+                'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+            ) from exc
+        return cls(frame[COLUMNS], path=path)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """All rows in append order."""
+        if self._pending:
+            appended = pd.DataFrame(self._pending, columns=COLUMNS)
+            self._pending = []
+            appended = appended.astype(_empty_frame().dtypes.to_dict())
+            frames = [f for f in (self._frame, appended) if not f.empty]
+            self._frame = pd.concat(frames, ignore_index=True) if frames else _empty_frame()
+        return self._frame
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        target = Path(path or self.path or FUNDAMENTALS_PATH)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.frame.to_parquet(target, index=False)
+        except ImportError as exc:
+            raise RuntimeError(
+                'Writing parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+            ) from exc
+        return target
+
+    def _append(self, rows: Iterable[dict]) -> int:
+        rows = list(rows)
+        self._pending.extend(rows)
+        return len(rows)
+
+    def _latest_by_report_date(
+        self, ticker: str, metric: str, source: str, known_by: Optional[pd.Timestamp] = None
+    ) -> pd.Series:
+        frame = self.frame
+        mask = (
+            (frame['ticker'] == ticker) & (frame['metric'] == metric) & (frame['source'] == source)
+        )
+        if known_by is not None:
+            mask &= frame['as_of_date'] <= known_by
+        # drop_duplicates, not groupby().last(): the latter skips NaN tombstones.
+        rows = frame.loc[mask].drop_duplicates('report_date', keep='last')
+        return rows.set_index('report_date')['value'].sort_index()
+
+    def record_snapshot(
+        self,
+        ticker: str,
+        metric: str,
+        values: Mapping[object, Optional[float]],
+        source: str,
+        as_of: object,
+        currency: Optional[str] = None,
+    ) -> int:
+        """Append the revisions implied by a full ``{report_date: value}`` snapshot."""
+        as_of_day = _day(as_of)
+        snapshot = pd.Series(
+            {_day(d): (np.nan if v is None else float(v)) for d, v in values.items()},
+            dtype='float64',
+        ).sort_index()
+        snapshot = snapshot[~snapshot.index.duplicated(keep='last')]
+        current = self._latest_by_report_date(ticker, metric, source)
+
+        aligned = current.reindex(snapshot.index)
+        changed = ~(
+            (aligned.isna() & snapshot.isna())
+            | (np.abs(aligned - snapshot) <= VALUE_TOLERANCE).to_numpy()
+        )
+        retracted = current[current.notna() & ~current.index.isin(snapshot.index)]
+
+        tombstones = pd.Series(np.nan, index=retracted.index, dtype='float64')
+        parts = [part for part in (snapshot[changed], tombstones) if not part.empty]
+        revisions = pd.concat(parts) if parts else tombstones
+        return self._append(
+            {
+                'ticker': ticker,
+                'as_of_date': as_of_day,
+                'report_date': report_date,
+                'metric': metric,
+                'value': value,
+                'source': source,
+                'currency': currency,
+            }
+            for report_date, value in revisions.sort_index().items()
+        )
+
+    def record_value(
+        self,
+        ticker: str,
+        metric: str,
+        value: Optional[float],
+        source: str,
+        as_of: object,
+        currency: Optional[str] = None,
+    ) -> int:
+        """Append a dated scalar (e.g. the vendor's current TTM EPS) if it changed.
+
+        A missing ``value`` appends a NaN tombstone once, so a figure the source
+        no longer returns stops being current.
+        """
+        previous = self.current_value(ticker, metric, sources=(source,))
+        if value is None or not np.isfinite(value):
+            if previous is None:
+                return 0
+            value = np.nan
+        elif previous is not None and abs(previous - float(value)) <= VALUE_TOLERANCE:
+            return 0
+        as_of_day = _day(as_of)
+        return self._append(
+            [
+                {
+                    'ticker': ticker,
+                    'as_of_date': as_of_day,
+                    'report_date': as_of_day,
+                    'metric': metric,
+                    'value': float(value),
+                    'source': source,
+                    'currency': currency,
+                }
+            ]
+        )
+
+    def revisions(self, ticker: Optional[str] = None, metric: Optional[str] = None) -> pd.DataFrame:
+        """Every row for ``ticker``/``metric`` in append order, tombstones included."""
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        if ticker is not None:
+            mask &= frame['ticker'] == ticker
+        if metric is not None:
+            mask &= frame['metric'] == metric
+        return frame.loc[mask].reset_index(drop=True)
+
+    def latest(
+        self,
+        metric: str,
+        known_by: Optional[object] = None,
+        sources: Iterable[str] = SOURCE_PRIORITY,
+    ) -> pd.DataFrame:
+        """Latest live value per (ticker, report_date), highest-priority source first.
+
+        Only rows recorded on or before ``known_by`` are considered, so the
+        result is what the store knew at that date.
+        """
+        sources = list(sources)
+        frame = self.frame
+        mask = (frame['metric'] == metric) & frame['source'].isin(sources)
+        if known_by is not None:
+            mask &= frame['as_of_date'] <= _day(known_by)
+        rows = frame.loc[mask]
+        if rows.empty:
+            return rows[['ticker', 'report_date', 'value', 'source', 'currency']]
+
+        latest = rows.drop_duplicates(['ticker', 'report_date', 'source'], keep='last')
+        latest = latest.dropna(subset=['value'])
+        rank = {source: i for i, source in enumerate(sources)}
+        latest = latest.assign(_rank=latest['source'].map(rank))
+        latest = latest.sort_values(['ticker', 'report_date', '_rank'], kind='stable')
+        latest = latest.drop_duplicates(['ticker', 'report_date'], keep='last')
+        return latest[['ticker', 'report_date', 'value', 'source', 'currency']].reset_index(
+            drop=True
+        )
+
+    def latest_value(
+        self,
+        ticker: str,
+        metric: str,
+        known_by: Optional[object] = None,
+        sources: Iterable[str] = SOURCE_PRIORITY,
+    ) -> Optional[float]:
+        """Value at the most recent report date for ``ticker``, or None."""
+        latest = self.latest(metric, known_by=known_by, sources=sources)
+        rows = latest[latest['ticker'] == ticker]
+        if rows.empty:
+            return None
+        return float(rows.sort_values('report_date')['value'].iloc[-1])
+
+    def current_values(
+        self,
+        metric: str,
+        known_by: Optional[object] = None,
+        sources: Iterable[str] = SOURCE_PRIORITY,
+    ) -> pd.Series:
+        """Latest ``record_value`` scalar per ticker; a trailing tombstone drops the ticker."""
+        sources = list(sources)
+        frame = self.frame
+        mask = (frame['metric'] == metric) & frame['source'].isin(sources)
+        if known_by is not None:
+            mask &= frame['as_of_date'] <= _day(known_by)
+        rows = frame.loc[mask]
+        # Keep tombstones here: the newest row decides, live or not.
+        rows = rows.sort_values('report_date', kind='stable')
+        rows = rows.drop_duplicates(['ticker', 'source'], keep='last')
+        rank = {source: i for i, source in enumerate(sources)}
+        rows = rows.assign(_rank=rows['source'].map(rank)).sort_values(
+            ['ticker', '_rank'], kind='stable'
+        )
+        rows = rows.drop_duplicates('ticker', keep='last')
+        return rows.set_index('ticker')['value'].dropna().astype(float)
+
+    def current_value(
+        self,
+        ticker: str,
+        metric: str,
+        known_by: Optional[object] = None,
+        sources: Iterable[str] = SOURCE_PRIORITY,
+    ) -> Optional[float]:
+        """Latest live ``record_value`` scalar for ``ticker``, or None."""
+        values = self.current_values(metric, known_by=known_by, sources=sources)
+        return float(values[ticker]) if ticker in values.index else None
+
+    def first_report_dates(self, metric: str) -> pd.Series:
+        """Earliest live report date per ticker (data coverage start)."""
+        latest = self.latest(metric)
+        return latest.groupby('ticker')['report_date'].min()
+
+    def as_of_matrix(
+        self,
+        metric: str,
+        tickers: List[str],
+        dates: pd.DatetimeIndex,
+        known_by: Optional[object] = None,
+        current_metric: Optional[str] = None,
+        today: Optional[object] = None,
+    ) -> pd.DataFrame:
+        """Dates x tickers step function: each date takes the latest report on or before it.
+
+        Dates before a ticker's first report stay NaN. With ``current_metric``,
+        the live value of that metric (or else the last report) is anchored
+        at ``today`` so the tail reflects the vendor's current figure.
+        """
+        dates = pd.DatetimeIndex(dates)
+        latest = self.latest(metric, known_by=known_by)
+        latest = latest[latest['ticker'].isin(tickers)]
+        anchors = latest.pivot_table(
+            index='report_date', columns='ticker', values='value', aggfunc='last'
+        )
+        if current_metric is not None and not anchors.empty:
+            today_day = _day(today if today is not None else pd.Timestamp.now())
+            current = self.current_values(current_metric, known_by=known_by)
+            current = current[current.index.isin(anchors.columns)]
+            tail = anchors.ffill().iloc[-1].copy()
+            tail.update(current)
+            anchors = anchors.reindex(anchors.index.union([today_day]))
+            anchors.loc[today_day] = tail
+        if anchors.empty:
+            return pd.DataFrame(np.nan, index=dates, columns=list(tickers))
+        full = anchors.reindex(anchors.index.union(dates)).ffill()
+        return full.reindex(index=dates, columns=list(tickers))
+
+
+def load_fundamentals_store(path: Path = FUNDAMENTALS_PATH) -> FundamentalsStore:
+    return FundamentalsStore.load(path)
@@ -0,0 +1,174 @@
+"""Persistent FX history and vectorized as-of currency conversion.
+
+Rates are quoted like Yahoo pairs: ``CNYUSD=X`` is USD per 1 CNY.
+
+* Pairs between currencies in ``data/fx_daily_rates.csv`` (units per USD,
+  maintained by ``scripts/data/fetch_fx_history.py``) are derived from it.
+* Any other pair is downloaded once through the injected ``fetcher`` and kept
+  in ``data/checkpoints/fx_history.parquet``. Later runs fetch only the days
+  after the last stored close (plus a short overlap for late revisions).
+
+``convert_asof`` converts a whole date-indexed series with one as-of join.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+FX_HISTORY_PATH = PROJECT_ROOT / 'data' / 'checkpoints' / 'fx_history.parquet'
+FX_DAILY_RATES_PATH = PROJECT_ROOT / 'data' / 'fx_daily_rates.csv'
+
+# A stored pair counts as current if its last close is this recent (weekends).
+FX_STALE_DAYS = 3
+# Refetch a few days already stored so late vendor corrections land.
+FX_REFRESH_OVERLAP_DAYS = 7
+
+_PAIR_RE = re.compile(r'^([A-Za-z]{3})([A-Za-z]{3})=X$')
+
+# (pair, start or None for full history) -> close series, or None on failure
+FxFetcher = Callable[[str, Optional[pd.Timestamp]], Optional[pd.Series]]
+
+
+def fx_pair(base: str, quote: str) -> str:
+    return f"{base}{quote}=X"
+
+
+def _clean(series: pd.Series) -> pd.Series:
+    series = pd.Series(series, dtype=float).dropna()
+    index = pd.DatetimeIndex(series.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    series.index = index.normalize()
+    series = series[~series.index.duplicated(keep='last')].sort_index()
+    return series[series > 0]
+
+
+def convert_asof(values: pd.Series, rates: Optional[pd.Series]) -> pd.Series:
+    """Multiply date-indexed ``values`` by the rate on or before each date.
+
+    Dates before the first rate use the first rate; with no rates at all the
+    values are returned unchanged.
+    """
+    if rates is None or rates.empty or values.empty:
+        return values.astype(float)
+    rates = _clean(rates)
+    if rates.empty:
+        return values.astype(float)
+    keys = pd.DatetimeIndex(values.index)
+    positions = rates.index.searchsorted(keys, side='right') - 1
+    positions = np.clip(positions, 0, len(rates) - 1)
+    converted = values.to_numpy(dtype=float) * rates.to_numpy()[positions]
+    return pd.Series(converted, index=values.index, name=values.name)
+
+
+class FxHistory:
+    """Pair histories backed by the daily-rates CSV and a parquet store."""
+
+    def __init__(
+        self,
+        stored: Optional[pd.DataFrame] = None,
+        daily_rates: Optional[pd.DataFrame] = None,
+        path: Path = FX_HISTORY_PATH,
+        fetcher: Optional[FxFetcher] = None,
+        today: Optional[date] = None,
+    ):
+        self.path = Path(path)
+        self.fetcher = fetcher
+        self.today = pd.Timestamp(today or date.today())
+        self._stored: Dict[str, pd.Series] = {}
+        if stored is not None:
+            for pair in stored.columns:
+                self._stored[pair] = _clean(stored[pair])
+        self._daily = daily_rates if daily_rates is not None else pd.DataFrame()
+        self._checked: Set[str] = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(
+        cls,
+        path: Path = FX_HISTORY_PATH,
+        daily_rates_path: Path = FX_DAILY_RATES_PATH,
+        fetcher: Optional[FxFetcher] = None,
+    ) -> 'FxHistory':
+        stored = None
+        if Path(path).exists():
+            try:
+                stored = pd.read_parquet(path)
+            except ImportError as exc:
+                raise RuntimeError(
+                    'Reading parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+                ) from exc
+        daily = None
+        if Path(daily_rates_path).exists():
+            daily = pd.read_csv(daily_rates_path, index_col='date', parse_dates=['date'])
+        return cls(stored, daily, path=path, fetcher=fetcher)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def _from_daily_rates(self, base: str, quote: str) -> Optional[pd.Series]:
+        if base not in self._daily.columns or quote not in self._daily.columns:
+            return None
+        # Columns are units per USD, so quote-per-base = quote/USD / base/USD.
+        return _clean(self._daily[quote] / self._daily[base])
+
+    def _refresh(self, pair: str) -> None:
+        existing = self._stored.get(pair)
+        if existing is not None and not existing.empty:
+            if existing.index[-1] >= self.today - pd.Timedelta(days=FX_STALE_DAYS):
+                return
+            start = existing.index[-1] - pd.Timedelta(days=FX_REFRESH_OVERLAP_DAYS)
+        else:
+            start = None
+        if self.fetcher is None:
+            return
+        fetched = self.fetcher(pair, start)
+        if fetched is None or fetched.empty:
+            return
+        fetched = _clean(fetched)
+        merged = fetched if existing is None else fetched.combine_first(existing)
+        self._stored[pair] = merged.sort_index()
+        self._dirty = True
+
+    def history(self, pair: str) -> Optional[pd.Series]:
+        """Close history for ``pair`` (quote per 1 base), or None if unknown."""
+        match = _PAIR_RE.match(pair)
+        if match is None:
+            return None
+        base, quote = match.group(1), match.group(2)
+        derived = self._from_daily_rates(base, quote)
+        if derived is not None and not derived.empty:
+            return derived
+        with self._lock:
+            if pair not in self._checked:
+                self._checked.add(pair)
+                self._refresh(pair)
+            series = self._stored.get(pair)
+        return series if series is not None and not series.empty else None
+
+    def save(self, path: Optional[Path] = None) -> Optional[Path]:
+        """Persist fetched pairs; a no-op when nothing new was downloaded."""
+        if not self._dirty:
+            return None
+        target = Path(path or self.path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        frame = pd.DataFrame(self._stored).sort_index()
+        frame.index.name = 'date'
+        try:
+            frame.to_parquet(target)
+        except ImportError as exc:
+            raise RuntimeError(
+                'Writing parquet requires pyarrow or fastparquet. Install one of them and rerun.'
+            ) from exc
+        self._dirty = False
+        return target
@@ -0,0 +1,229 @@
+"""Weekly and monthly levels of detail (LOD) for daily chart artifacts.
+
+Every chart artifact is daily over the full history, which a zoomed-out view
+does not need. Next to ``<name>.json`` the exporters also write
+``<name>.weekly.json`` and ``<name>.monthly.json`` in the same shape and
+encoding, one point per calendar week (Monday to Sunday) or month, dated by
+the last day present in it. Each series is reduced according to what it
+measures:
+
+* ``last``: levels and indices (portfolio value, TWRR, prices);
+* ``mean``: ratios and weights (P/E, yield, allocation percentages; the mean
+  of rows that add up to 100 still adds up to 100);
+* ``sum``: flows (dividends received).
+
+Nulls are skipped; a period without any value stays null.
+
+``lod_manifest.json`` in each output directory lists the levels written per
+artifact, coarsest last, so the frontend can fetch a coarse level first and
+refine when zooming::
+
+    {"composition.json": {"daily": {"path": "composition.json", "points": 2249},
+                          "weekly": {"path": "composition.weekly.json", "points": 322},
+                          "monthly": {"path": "composition.monthly.json", "points": 75}}}
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .precompress import export_json
+
+# Level name -> pandas period frequency.
+LEVELS: Dict[str, str] = {'weekly': 'W', 'monthly': 'M'}
+AGGREGATIONS = ('last', 'mean', 'sum')
+MANIFEST_NAME = 'lod_manifest.json'
+
+# Stacked-area payloads (composition, sectors, geography, market cap).
+STACKED_AGGREGATIONS = {'series': 'mean', 'total_values': 'last'}
+
+
+def _column(values: Sequence[Any]) -> pd.Series:
+    return pd.Series(
+        [
+            v if isinstance(v, (int, float)) and not isinstance(v, bool) else math.nan
+            for v in values
+        ],
+        dtype=float,
+    )
+
+
+def _reduce(frame: pd.DataFrame, periods: pd.PeriodIndex, how: str) -> pd.DataFrame:
+    grouped = frame.groupby(periods.to_numpy(), sort=False)
+    if how == 'last':
+        return grouped.last()
+    if how == 'mean':
+        return grouped.mean()
+    if how == 'sum':
+        return grouped.sum(min_count=1)
+    raise ValueError(f"Unknown aggregation {how!r}; expected one of {AGGREGATIONS}")
+
+
+def _values(series: pd.Series) -> List[Any]:
+    return [None if math.isnan(v) else float(v) for v in series.to_numpy(dtype=float)]
+
+
+def downsample_columns(
+    dates: Sequence[str],
+    columns: Mapping[str, Sequence[Any]],
+    how: Mapping[str, str],
+    freq: str,
+) -> Tuple[List[str], Dict[str, List[Any]]]:
+    """Reduce daily ``columns`` (each aligned with ``dates``) to one value per period.
+
+    ``how`` gives each column's aggregation. Returns the period dates (the last
+    input date in each period) and the reduced columns.
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(list(dates)))
+    periods = index.to_period(freq)
+    labels = pd.Series(list(dates)).groupby(periods.to_numpy(), sort=False).last().tolist()
+    reduced: Dict[str, List[Any]] = {}
+    for aggregation in dict.fromkeys(how.values()):
+        names = [name for name in columns if how[name] == aggregation]
+        if not names:
+            continue
+        frame = pd.DataFrame({name: _column(columns[name]) for name in names})
+        result = _reduce(frame, periods, aggregation)
+        reduced.update({name: _values(result[name]) for name in names})
+    return labels, {name: reduced[name] for name in columns}
+
+
+def downsample_payload(payload: Mapping[str, Any], how: Mapping[str, str], freq: str) -> Dict:
+    """Downsample a columnar (v1) payload: ``dates`` plus per-key lists or ``{name: list}``.
+
+    Keys in ``how`` are reduced with the given aggregation (a ``{name: list}``
+    key applies it to every name); other keys are copied as they are.
+    """
+    columns: Dict[Tuple[str, Optional[str]], Sequence[Any]] = {}
+    for key in how:
+        value = payload.get(key)
+        if isinstance(value, list):
+            columns[(key, None)] = value
+        elif isinstance(value, dict):
+            columns.update({(key, name): v for name, v in value.items() if isinstance(v, list)})
+
+    flat = {f'{i}': values for i, values in enumerate(columns.values())}
+    flat_how = {f'{i}': how[key] for i, (key, _) in enumerate(columns)}
+    dates, reduced = downsample_columns(payload['dates'], flat, flat_how, freq)
+
+    result: Dict[str, Any] = {}
+    for key, value in payload.items():
+        if key == 'dates':
+            result[key] = dates
+        elif key in how and isinstance(value, (list, dict)):
+            result[key] = [] if isinstance(value, list) else {}
+        else:
+            result[key] = value
+    for i, (key, name) in enumerate(columns):
+        if name is None:
+            result[key] = reduced[f'{i}']
+        else:
+            result[key][name] = reduced[f'{i}']
+    return result
+
+
+def downsample_records(
+    records: Sequence[Mapping[str, Any]],
+    how: Mapping[str, str],
+    freq: str,
+    date_key: str = 'date',
+    decimals: Optional[Mapping[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Downsample ``[{date, field: value}]`` records, one per day, to one per period.
+
+    Fields in ``how`` are reduced with the given aggregation; a field holding
+    ``{name: number}`` is reduced per name and keeps only names with a value.
+    Other fields are left out. ``decimals`` rounds the reduced fields.
+    """
+    decimals = decimals or {}
+    if not records:
+        return []
+    columns: Dict[Tuple[str, Optional[str]], List[Any]] = {}
+    nested = {f for f in how if any(isinstance(r.get(f), dict) for r in records)}
+    for field in how:
+        if field in nested:
+            names = dict.fromkeys(n for r in records for n in (r.get(field) or {}))
+            for name in names:
+                columns[(field, name)] = [(r.get(field) or {}).get(name) for r in records]
+        else:
+            columns[(field, None)] = [r.get(field) for r in records]
+
+    flat = {f'{i}': values for i, values in enumerate(columns.values())}
+    flat_how = {f'{i}': how[field] for i, (field, _) in enumerate(columns)}
+    dates, reduced = downsample_columns([r[date_key] for r in records], flat, flat_how, freq)
+
+    result: List[Dict[str, Any]] = []
+    for row, day in enumerate(dates):
+        record: Dict[str, Any] = {date_key: day}
+        record.update({field: {} if field in nested else None for field in how})
+        for i, (field, name) in enumerate(columns):
+            value = reduced[f'{i}'][row]
+            if value is not None and field in decimals:
+                value = round(value, decimals[field])
+            if name is None:
+                record[field] = value
+            elif value is not None:
+                record[field][name] = value
+        result.append(record)
+    return result
+
+
+def lod_path(path: Path, level: str) -> Path:
+    """``composition.json`` -> ``composition.weekly.json``."""
+    return path.with_name(f'{path.stem}.{level}{path.suffix}')
+
+
+def point_count(payload: Any) -> int:
+    """Dates in a columnar payload (plain or v2), records in a list, or the longest of a dict."""
+    if isinstance(payload, list):
+        return len(payload)
+    if isinstance(payload, dict):
+        dates = payload.get('dates')
+        if isinstance(dates, dict):
+            return int(dates.get('count', 0))
+        if isinstance(dates, list):
+            return len(dates)
+        return max((point_count(v) for v in payload.values() if isinstance(v, list)), default=0)
+    return 0
+
+
+def update_manifest(directory: Path, name: str, levels: Mapping[str, Mapping[str, Any]]) -> None:
+    manifest_path = directory / MANIFEST_NAME
+    manifest: Dict[str, Any] = {}
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            manifest = {}
+    manifest[name] = dict(levels)
+    export_json(manifest_path, dict(sorted(manifest.items())), indent=2)
+
+
+def write_lod_levels(
+    path: Path,
+    daily: Any,
+    build: Callable[[str], Any],
+    dump_kwargs: Optional[Mapping[str, Any]] = None,
+) -> List[Path]:
+    """Write every level of ``path`` (already written with ``daily``) and list them in the manifest.
+
+    ``build(freq)`` returns the payload of one level, encoded like the daily
+    file; ``dump_kwargs`` are passed to ``json.dump`` (compact by default).
+    """
+    dump_kwargs = dict(dump_kwargs or {'separators': (',', ':')})
+    levels: Dict[str, Dict[str, Any]] = {'daily': {'path': path.name, 'points': point_count(daily)}}
+    written = []
+    for level, freq in LEVELS.items():
+        payload = build(freq)
+        level_path = lod_path(path, level)
+        export_json(level_path, payload, **dump_kwargs)
+        levels[level] = {'path': level_path.name, 'points': point_count(payload)}
+        written.append(level_path)
+    update_manifest(path.parent, path.name, levels)
+    return written
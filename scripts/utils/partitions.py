@@ -0,0 +1,151 @@
+"""Per-year partitions of daily chart artifacts for lazy loading.
+
+A daily artifact grows with every trading day and has to be downloaded whole
+before anything renders. Next to ``<name>.json`` the exporters also write one
+file per calendar year plus a small index in a ``<name>/`` directory::
+
+    figures/composition/index.json
+    figures/composition/2024.json
+    figures/composition/2025.json
+
+Every partition has the same shape and encoding as the full file, restricted
+to the dates of its year, so the existing decoders read it unchanged. The
+index lists the years in order::
+
+    {"artifact": "composition.json",
+     "years": [{"year": "2024", "path": "2024.json", "points": 366,
+                "start": "2024-01-01", "end": "2024-12-31"}, ...]}
+
+A partition is only rewritten when its content changes, so a daily refresh
+touches the current year's file and the index; closed years keep their bytes
+and HTTP validators. Partitions of years no longer in the data are removed.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from .lod import point_count
+from .precompress import export_text_if_changed, remove_precompressed
+
+INDEX_NAME = 'index.json'
+_PARTITION_NAME = re.compile(r'^\d{4}\.json$')
+
+
+def _year(day: str) -> str:
+    return str(day)[:4]
+
+
+def _split_records(records: List[Mapping[str, Any]], date_key: str) -> Dict[str, List[Any]]:
+    years: Dict[str, List[Any]] = {}
+    for record in records:
+        years.setdefault(_year(record[date_key]), []).append(record)
+    return years
+
+
+def _split_columns(payload: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    dates = list(payload['dates'])
+    bounds: Dict[str, List[int]] = {}
+    for i, day in enumerate(dates):
+        bounds.setdefault(_year(day), [i, i])[1] = i + 1
+
+    def _aligned(value: Any) -> bool:
+        return isinstance(value, list) and len(value) == len(dates)
+
+    years: Dict[str, Dict[str, Any]] = {}
+    for year, (lo, hi) in bounds.items():
+        part: Dict[str, Any] = {}
+        for key, value in payload.items():
+            if key == 'dates' or _aligned(value):
+                part[key] = value[lo:hi]
+            elif isinstance(value, dict) and value and all(map(_aligned, value.values())):
+                part[key] = {name: series[lo:hi] for name, series in value.items()}
+            else:
+                part[key] = value
+        years[year] = part
+    return years
+
+
+def split_by_year(data: Any, date_key: str = 'date') -> Dict[str, Any]:
+    """Split a daily artifact into ``{year: artifact restricted to that year}``.
+
+    ``data`` is a columnar (v1) payload with a ``dates`` list, whose
+    date-aligned lists and ``{name: list}`` keys are sliced and other keys
+    copied into every year; a list of ``{date_key: ...}`` records; or
+    ``{name: records}``, split per name.
+    """
+    if isinstance(data, list):
+        return _split_records(data, date_key)
+    if isinstance(data, dict) and isinstance(data.get('dates'), list):
+        return _split_columns(data)
+    if isinstance(data, dict):
+        years: Dict[str, Dict[str, Any]] = {}
+        for name, records in data.items():
+            for year, part in _split_records(records, date_key).items():
+                years.setdefault(year, {})[name] = part
+        return dict(sorted(years.items()))
+    raise TypeError(f"Cannot partition {type(data).__name__} by year")
+
+
+def _span(part: Any, date_key: str) -> List[Optional[str]]:
+    if isinstance(part, dict) and isinstance(part.get('dates'), list):
+        days = part['dates']
+    elif isinstance(part, list):
+        days = [r[date_key] for r in part]
+    else:
+        days = [r[date_key] for records in part.values() for r in records]
+    return [min(days), max(days)] if days else [None, None]
+
+
+def partition_dir(path: Path) -> Path:
+    """``figures/composition.json`` -> ``figures/composition/``."""
+    return path.with_name(path.stem)
+
+
+def write_year_partitions(
+    path: Path,
+    data: Any,
+    encode: Optional[Callable[[Any], Any]] = None,
+    dump_kwargs: Optional[Mapping[str, Any]] = None,
+    date_key: str = 'date',
+) -> List[Path]:
+    """Write ``data`` (the daily artifact behind ``path``) as per-year partitions and an index.
+
+    ``encode`` turns a year of ``data`` into the stored payload (e.g.
+    ``encode_stacked_payload``); ``dump_kwargs`` are passed to ``json.dumps``
+    (compact by default). Returns the partitions that were (re)written.
+    """
+    dump_kwargs = dict(dump_kwargs or {'separators': (',', ':')})
+    directory = partition_dir(path)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    entries = []
+    written = []
+    for year, part in split_by_year(data, date_key).items():
+        payload = encode(part) if encode else part
+        part_path = directory / f'{year}.json'
+        if export_text_if_changed(part_path, json.dumps(payload, **dump_kwargs)):
+            written.append(part_path)
+        start, end = _span(part, date_key)
+        entries.append(
+            {
+                'year': year,
+                'path': part_path.name,
+                'points': point_count(payload),
+                'start': start,
+                'end': end,
+            }
+        )
+
+    years = {entry['path'] for entry in entries}
+    for stale in directory.iterdir():
+        if _PARTITION_NAME.match(stale.name) and stale.name not in years:
+            stale.unlink()
+            remove_precompressed(stale)
+
+    index = {'artifact': path.name, 'years': entries}
+    export_text_if_changed(directory / INDEX_NAME, json.dumps(index, indent=2))
+    return written
@@ -0,0 +1,158 @@
+"""Write pipeline artifacts atomically, with precompressed ``.gz`` / ``.br`` siblings.
+
+Every JSON/CSV/text output goes through ``export_text`` / ``export_json``:
+the file is written to a temporary name in the same directory and renamed
+into place, so a reader (the dev server, a deploy mid-run) never sees a
+half-written file. A static host (or ``scripts/dev_server.py``) can then
+serve a sibling with ``Content-Encoding`` instead of compressing multi-MB
+chart files per request.
+
+Compression is opt-in, per call or for the whole run through the
+environment::
+
+    PRECOMPRESS_ARTIFACTS=1 PRECOMPRESS_GZIP_LEVEL=6 make twrr-refresh
+
+``PRECOMPRESS_GZIP_LEVEL`` (1-9, default 9) and ``PRECOMPRESS_BROTLI_QUALITY``
+(0-11, default 11) set the levels. When an artifact is written without
+compression, its existing siblings are removed so they can't go stale;
+``export_text_if_changed`` does the same for a file whose text is unchanged.
+Brotli is optional: without the ``brotli`` package only ``.gz`` is written.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, List, Mapping, Optional, Union
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+PRECOMPRESS_ENV = 'PRECOMPRESS_ARTIFACTS'
+GZIP_LEVEL_ENV = 'PRECOMPRESS_GZIP_LEVEL'
+BROTLI_QUALITY_ENV = 'PRECOMPRESS_BROTLI_QUALITY'
+DEFAULT_GZIP_LEVEL = 9
+DEFAULT_BROTLI_QUALITY = 11
+# Content-Encoding -> sibling suffix.
+SIBLING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def precompress_enabled(environ: Mapping[str, str] = os.environ) -> bool:
+    return environ.get(PRECOMPRESS_ENV, '').strip().lower() not in ('', '0', 'false', 'no')
+
+
+def _level(name: str, default: int, environ: Mapping[str, str]) -> int:
+    value = environ.get(name, '').strip()
+    return int(value) if value else default
+
+
+def sibling_path(path: Path, encoding: str) -> Path:
+    """``pe_ratio.json`` -> ``pe_ratio.json.gz`` for ``gzip``."""
+    return path.with_name(path.name + SIBLING_SUFFIXES[encoding])
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temporary file next to ``path`` and rename it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_precompressed(
+    path: Path, gzip_level: Optional[int] = None, brotli_quality: Optional[int] = None
+) -> List[Path]:
+    """Compress ``path`` into ``path.gz`` (and ``path.br``); return the files written.
+
+    Levels default to the environment, then to the maximum.
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    if gzip_level is None:
+        gzip_level = _level(GZIP_LEVEL_ENV, DEFAULT_GZIP_LEVEL, os.environ)
+    if brotli_quality is None:
+        brotli_quality = _level(BROTLI_QUALITY_ENV, DEFAULT_BROTLI_QUALITY, os.environ)
+    written: List[Path] = []
+
+    gz_path = sibling_path(path, 'gzip')
+    # mtime=0 keeps the archive byte-stable across runs with identical input.
+    write_atomic(gz_path, gzip.compress(data, compresslevel=gzip_level, mtime=0))
+    written.append(gz_path)
+
+    br_path = sibling_path(path, 'br')
+    if brotli is not None:
+        write_atomic(br_path, brotli.compress(data, quality=brotli_quality))
+        written.append(br_path)
+    else:
+        br_path.unlink(missing_ok=True)
+    return written
+
+
+def remove_precompressed(path: Path) -> None:
+    for encoding in SIBLING_SUFFIXES:
+        sibling_path(Path(path), encoding).unlink(missing_ok=True)
+
+
+def export_text(
+    path: Path, content: Union[str, bytes], precompress: Optional[bool] = None
+) -> List[Path]:
+    """Write ``content`` to ``path`` atomically; return every file written.
+
+    ``precompress`` defaults to ``PRECOMPRESS_ARTIFACTS``; when set, ``.gz``
+    and ``.br`` siblings are written too, otherwise stale ones are removed.
+    """
+    path = Path(path)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    write_atomic(path, data)
+    if precompress is None:
+        precompress = precompress_enabled()
+    if not precompress:
+        remove_precompressed(path)
+        return [path]
+    return [path, *write_precompressed(path)]
+
+
+def _siblings_present(path: Path) -> bool:
+    encodings = SIBLING_SUFFIXES if brotli is not None else ('gzip',)
+    return all(sibling_path(path, encoding).exists() for encoding in encodings)
+
+
+def export_text_if_changed(
+    path: Path, content: Union[str, bytes], precompress: Optional[bool] = None
+) -> bool:
+    """``export_text`` unless ``path`` already holds ``content``; return whether it was written.
+
+    An unchanged file still gets its siblings added or removed to match
+    ``precompress``.
+    """
+    path = Path(path)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    if not path.exists() or path.read_bytes() != data:
+        export_text(path, data, precompress=precompress)
+        return True
+    if precompress is None:
+        precompress = precompress_enabled()
+    if not precompress:
+        remove_precompressed(path)
+    elif not _siblings_present(path):
+        write_precompressed(path)
+    return False
+
+
+def export_json(
+    path: Path, payload: Any, precompress: Optional[bool] = None, **dump_kwargs: Any
+) -> List[Path]:
+    """``export_text`` of ``json.dumps(payload, **dump_kwargs)``."""
+    return export_text(path, json.dumps(payload, **dump_kwargs), precompress=precompress)
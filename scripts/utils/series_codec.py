@@ -0,0 +1,196 @@
+"""Compact columnar encoding for date-indexed chart series.
+
+Chart payloads (``pe_ratio.json`` and friends) store one list per series on a
+shared date axis. Most per-ticker lists are ``null`` before the ticker was
+bought and after it was sold, so a v2 payload stores each series as dense runs
+instead::
+
+    {"version": 2,
+     "dates": {"start": "2020-06-25", "count": 2249},
+     "ticker_pe": {"decimals": 2, "series": {"AAPL": [[12, [2731, 2744, ...]], ...]}}}
+
+* ``dates`` is ``{"start", "count"}`` when the axis is consecutive days,
+  otherwise the plain list.
+* A series is a list of ``[offset, values]`` runs; dates outside every run are
+  ``null``.
+* Values are integers at ``decimals`` precision (``2731`` -> ``27.31``).
+* Stacked-area payloads (composition, sectors, geography) also set
+  ``"fill": 0``: zeros are gaps too and decode back to 0 instead of ``null``.
+  They also set ``"delta": true``: each run stores its first value, then
+  differences between neighbours, which are small for slowly moving weights.
+
+``encode_payload`` converts the listed keys of a v1 payload and leaves the rest
+untouched; ``decode_payload`` restores the v1 shape. The browser-side decoder
+lives in ``js/utils/seriesCodec.js``.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+CODEC_VERSION = 2
+# Stacked percentages: 0.001 percentage points.
+STACKED_DECIMALS = 3
+
+
+def _is_value(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def encode_dates(dates: Sequence[str]) -> Any:
+    """Return ``{"start", "count"}`` for a consecutive daily axis, else the list."""
+    dates = list(dates)
+    if not dates:
+        return []
+    try:
+        start = date.fromisoformat(dates[0])
+        consecutive = all(
+            date.fromisoformat(d) == start + timedelta(days=i) for i, d in enumerate(dates)
+        )
+    except (TypeError, ValueError):
+        consecutive = False
+    if consecutive:
+        return {"start": dates[0], "count": len(dates)}
+    return dates
+
+
+def decode_dates(encoded: Any) -> List[str]:
+    if isinstance(encoded, dict):
+        start = date.fromisoformat(encoded["start"])
+        return [(start + timedelta(days=i)).isoformat() for i in range(int(encoded["count"]))]
+    return list(encoded or [])
+
+
+def encode_series(
+    values: Sequence[Any], decimals: int, fill: Any = None, delta: bool = False
+) -> List[List[Any]]:
+    """Split ``values`` into ``[offset, quantized values]`` runs of non-null entries.
+
+    With a numeric ``fill``, entries that quantize to it are gaps too (zeros
+    of a stacked series). With ``delta``, each run holds its first value
+    followed by the differences between neighbours.
+    """
+    scale = 10**decimals
+    skip = int(round(fill * scale)) if _is_value(fill) else None
+    runs: List[List[Any]] = []
+    current: Optional[List[int]] = None
+    for i, value in enumerate(values):
+        quantized = int(round(value * scale)) if _is_value(value) else None
+        if quantized is None or quantized == skip:
+            current = None
+            continue
+        if current is None:
+            current = []
+            runs.append([i, current])
+        current.append(quantized)
+    if delta:
+        for run in runs:
+            run[1] = run[1][:1] + [b - a for a, b in itertools.pairwise(run[1])]
+    return runs
+
+
+def decode_series(
+    runs: Sequence[Sequence[Any]],
+    length: int,
+    decimals: int,
+    fill: Any = None,
+    delta: bool = False,
+) -> List[Any]:
+    scale = 10**decimals
+    values: List[Any] = [fill] * length
+    for offset, run in runs:
+        quantized = itertools.accumulate(run) if delta else run
+        for i, q in enumerate(quantized):
+            values[offset + i] = q / scale
+    return values
+
+
+def encode_payload(
+    payload: Dict[str, Any],
+    decimals: Mapping[str, int],
+    fill: Any = None,
+    delta: bool = False,
+) -> Dict[str, Any]:
+    """Return a v2 copy of ``payload``.
+
+    ``decimals`` maps each series key to its precision; a key holding a list
+    becomes ``{"decimals", "runs"}`` and a key holding ``{name: list}`` becomes
+    ``{"decimals", "series"}``. ``fill`` and ``delta`` (see ``encode_series``)
+    are recorded next to ``decimals`` when set. Other keys are copied as-is.
+    """
+    options: Dict[str, Any] = {}
+    if fill is not None:
+        options["fill"] = fill
+    if delta:
+        options["delta"] = True
+
+    def _encode(values: Sequence[Any], key: str) -> List[List[Any]]:
+        return encode_series(values, decimals[key], fill=fill, delta=delta)
+
+    encoded: Dict[str, Any] = {"version": CODEC_VERSION}
+    for key, value in payload.items():
+        if key == "dates":
+            encoded[key] = encode_dates(value)
+        elif key in decimals and isinstance(value, list):
+            encoded[key] = {"decimals": decimals[key], **options, "runs": _encode(value, key)}
+        elif key in decimals and isinstance(value, dict):
+            encoded[key] = {
+                "decimals": decimals[key],
+                **options,
+                "series": {
+                    name: _encode(series, key)
+                    for name, series in value.items()
+                    if isinstance(series, list)
+                },
+            }
+        else:
+            encoded[key] = value
+    return encoded
+
+
+def encode_stacked_payload(payload: Dict[str, Any], delta: bool = True) -> Dict[str, Any]:
+    """v2 copy of a stacked-area payload (``dates``, ``total_values``, ``series``).
+
+    Percentages keep ``STACKED_DECIMALS`` places and zeros are left out, so a
+    ticker held for a few months costs a few months of values.
+    """
+    return encode_payload(
+        payload,
+        {"series": STACKED_DECIMALS, "total_values": 2},
+        fill=0,
+        delta=delta,
+    )
+
+
+def decode_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore the v1 shape of a v2 payload (v1 payloads are returned unchanged)."""
+    if not isinstance(payload, dict) or payload.get("version") != CODEC_VERSION:
+        return payload
+    dates = decode_dates(payload.get("dates"))
+    length = len(dates)
+    decoded: Dict[str, Any] = {}
+    for key, value in payload.items():
+        if key == "version":
+            continue
+        if key == "dates":
+            decoded[key] = dates
+            continue
+        if not isinstance(value, dict) or "decimals" not in value:
+            decoded[key] = value
+            continue
+        fill, delta = value.get("fill"), bool(value.get("delta"))
+        if "runs" in value:
+            decoded[key] = decode_series(
+                value["runs"], length, value["decimals"], fill=fill, delta=delta
+            )
+        elif "series" in value:
+            decoded[key] = {
+                name: decode_series(runs, length, value["decimals"], fill=fill, delta=delta)
+                for name, runs in value["series"].items()
+            }
+        else:
+            decoded[key] = value
+    return decoded
@@ -0,0 +1,214 @@
+"""Shared stock-split factor index.
+
+Every consumer of ``data/split_history.csv`` asks the same question: how many
+shares today correspond to one share held on a given date? ``SplitIndex``
+answers it for whole date arrays at once. Each ticker keeps its split dates
+sorted next to the reverse cumulative product of its split factors, so a lookup
+is one ``searchsorted`` plus a gather.
+
+``load_split_index()`` builds the index from the CSV once per process; vendor
+split series (e.g. yfinance ``Ticker.splits``) can be merged on top without
+overriding the curated CSV entries.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+SPLIT_HISTORY_PATH = PROJECT_ROOT / 'data' / 'split_history.csv'
+
+# Vendor split dates within this many days of a curated split are treated as
+# the same event (vendors sometimes key on the record date, not the ex-date).
+VENDOR_MATCH_TOLERANCE = pd.Timedelta(days=5)
+
+_SYMBOL_STRIP = re.compile(r'[\s\-\.]+')
+
+
+def normalize_split_symbol(symbol: object) -> str:
+    """Upper-case a ticker and drop spaces, dashes and dots (BRK-B == BRK.B == BRKB)."""
+    return _SYMBOL_STRIP.sub('', str(symbol or '').strip().upper())
+
+
+def parse_split_ratio(value: object) -> float:
+    """Parse a ``"4:1"`` ratio into the share multiplier ``4.0``."""
+    text = str(value).strip()
+    if ':' not in text:
+        raise ValueError(f'Invalid split ratio format: {value!r}')
+    numerator, denominator = text.split(':', 1)
+    factor = float(numerator) / float(denominator)
+    if factor <= 0:
+        raise ValueError(f'Split ratio must be positive: {value!r}')
+    return factor
+
+
+def _to_naive_datetimes(dates: object) -> np.ndarray:
+    index = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(np.asarray(dates, dtype=object))))
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return np.asarray(index.normalize(), dtype='datetime64[ns]')
+
+
+class SplitIndex:
+    """Per-ticker split dates with precomputed cumulative share multipliers."""
+
+    def __init__(self, events: Optional[Dict[str, Iterable[Tuple[object, float]]]] = None):
+        self._dates: Dict[str, np.ndarray] = {}
+        self._multipliers: Dict[str, np.ndarray] = {}
+        for symbol, rows in (events or {}).items():
+            rows = list(rows)
+            if rows:
+                dates, factors = zip(*rows, strict=True)
+                self._store(normalize_split_symbol(symbol), _to_naive_datetimes(dates), factors)
+
+    def _store(self, key: str, dates: np.ndarray, factors: Iterable[float]) -> None:
+        factors = np.asarray(list(factors), dtype=float)
+        order = np.argsort(dates, kind='stable')
+        dates, factors = dates[order], factors[order]
+        self._dates[key] = dates
+        # multipliers[i] = product of factors[i:], with a trailing 1.0 for
+        # dates on or after the last split.
+        self._multipliers[key] = np.append(np.cumprod(factors[::-1])[::-1], 1.0)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        symbol_col: str = 'security',
+        date_col: str = 'split_date',
+        factor_col: str = 'split_factor',
+    ) -> 'SplitIndex':
+        """Build from a frame with one row per split."""
+        index = cls()
+        if df is None or df.empty:
+            return index
+        frame = pd.DataFrame(
+            {
+                'key': df[symbol_col].map(normalize_split_symbol),
+                'date': _to_naive_datetimes(df[date_col]),
+                'factor': pd.to_numeric(df[factor_col], errors='coerce'),
+            }
+        ).dropna()
+        frame = frame[frame['factor'] > 0]
+        for key, rows in frame.groupby('key', sort=False):
+            index._store(str(key), rows['date'].to_numpy(), rows['factor'].to_numpy())
+        return index
+
+    @classmethod
+    def from_csv(cls, path: Path = SPLIT_HISTORY_PATH) -> 'SplitIndex':
+        """Build from split_history.csv (``Symbol``, ``Split Date`` and a multiplier or ratio)."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        df = pd.read_csv(path, dtype={'Symbol': 'string', 'Split Ratio': 'string'})
+        if df.empty:
+            return cls()
+        if 'Split Multiplier' in df.columns:
+            factors = pd.to_numeric(df['Split Multiplier'], errors='coerce')
+        else:
+            factors = pd.Series(np.nan, index=df.index)
+        if 'Split Ratio' in df.columns:
+            missing = factors.isna() & df['Split Ratio'].notna()
+            factors[missing] = df.loc[missing, 'Split Ratio'].map(parse_split_ratio)
+        frame = pd.DataFrame(
+            {
+                'security': df['Symbol'],
+                'split_date': pd.to_datetime(df['Split Date'], errors='coerce'),
+                'split_factor': factors,
+            }
+        ).dropna()
+        return cls.from_frame(frame)
+
+    @classmethod
+    def from_series(cls, symbol: str, splits: Optional[pd.Series]) -> 'SplitIndex':
+        """Build a one-ticker index from a vendor series (split date -> ratio)."""
+        index = cls()
+        index.merge_vendor_splits(symbol, splits)
+        return index
+
+    def merge_vendor_splits(self, symbol: str, splits: Optional[pd.Series]) -> None:
+        """Add vendor splits that the curated history does not already cover."""
+        if splits is None or len(splits) == 0:
+            return
+        key = normalize_split_symbol(symbol)
+        vendor_dates = _to_naive_datetimes(splits.index)
+        vendor_factors = np.asarray(splits.to_numpy(), dtype=float)
+        keep = np.isfinite(vendor_factors) & (vendor_factors > 0) & (vendor_factors != 1.0)
+
+        known = self._dates.get(key)
+        if known is not None and len(known):
+            gaps = np.abs(vendor_dates[:, None] - known[None, :]).min(axis=1)
+            keep &= gaps > VENDOR_MATCH_TOLERANCE.to_timedelta64()
+        if not keep.any():
+            return
+
+        dates = vendor_dates[keep]
+        factors = vendor_factors[keep]
+        if known is not None:
+            multipliers = self._multipliers[key]
+            existing = multipliers[:-1] / multipliers[1:]
+            dates = np.concatenate([known, dates])
+            factors = np.concatenate([existing, factors])
+        self._store(key, dates, factors)
+
+    def __contains__(self, symbol: object) -> bool:
+        return normalize_split_symbol(symbol) in self._dates
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    @property
+    def symbols(self) -> list[str]:
+        return sorted(self._dates)
+
+    def split_dates(self, symbol: str) -> np.ndarray:
+        return self._dates.get(normalize_split_symbol(symbol), np.array([], dtype='datetime64[ns]'))
+
+    def last_split_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        dates = self.split_dates(symbol)
+        return pd.Timestamp(dates[-1]) if len(dates) else None
+
+    def factor(self, symbol: str, dates: object) -> np.ndarray:
+        """Shares today per share held on each date (product of splits strictly after it)."""
+        key = normalize_split_symbol(symbol)
+        lookup = _to_naive_datetimes(dates)
+        split_dates = self._dates.get(key)
+        if split_dates is None:
+            return np.ones(len(lookup), dtype=float)
+        positions = np.searchsorted(split_dates, lookup, side='right')
+        return self._multipliers[key][positions]
+
+    def factor_at(self, symbol: str, date: object) -> float:
+        return float(self.factor(symbol, [date])[0])
+
+    def factors_for(self, symbols: Iterable[object], dates: object) -> np.ndarray:
+        """Row-wise factors for parallel ``symbols``/``dates`` arrays (e.g. a trade ledger)."""
+        keys = pd.Series([normalize_split_symbol(s) for s in symbols], dtype=object)
+        lookup = _to_naive_datetimes(dates)
+        out = np.ones(len(keys), dtype=float)
+        for key, positions in keys.groupby(keys).indices.items():
+            if key in self._dates:
+                out[positions] = self.factor(key, lookup[positions])
+        return out
+
+
+@lru_cache(maxsize=None)
+def _cached_index(path: str, mtime_ns: int) -> SplitIndex:
+    return SplitIndex.from_csv(Path(path))
+
+
+def load_split_index(path: Path = SPLIT_HISTORY_PATH) -> SplitIndex:
+    """Return the CSV-backed index, built once per process (and again if the file changes).
+
+    Callers that merge vendor splits should do so on their own copy via
+    ``SplitIndex.from_csv`` so the shared instance stays curated-only.
+    """
+    path = Path(path)
+    mtime_ns = path.stat().st_mtime_ns if path.exists() else -1
+    return _cached_index(str(path.resolve()), mtime_ns)
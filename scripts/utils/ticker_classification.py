@@ -0,0 +1,150 @@
+"""Ticker classification (sector, country, quote type) with a TTL.
+
+Composition, geography and attribution all classify the same tickers.
+``classify_tickers`` resolves them together: ``data/ticker_metadata.json``
+entries older than their TTL have their ``info`` refetched concurrently on a
+``FetchScheduler``, the store is saved if anything was fetched, and the whole
+``{ticker: attributes}`` table is returned. Generators read that table
+(``load_ticker_metadata``) instead of calling the vendor themselves.
+
+Each entry records when each request last ran::
+
+    "VT": {"sector": null, "quoteType": "ETF", ..., "fetched": {"info": "2026-10-19"}}
+
+Fund country allocations are not fetched here: yfinance's ``funds_data`` has
+no country breakdown, so ``generate_geography_data`` reads
+``fund_country_allocations.json`` instead.
+
+A failed request keeps the previous attributes, stores its message under
+``errors`` and is retried after ``ERROR_RETRY_DAYS``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
+
+from .fetch_scheduler import FetchScheduler, TickerRequests
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+METADATA_PATH = PROJECT_ROOT / 'data' / 'ticker_metadata.json'
+
+FETCHED_KEY = 'fetched'
+INFO_REQUEST = 'info'
+# Sector, country and quote type rarely change.
+TTL_DAYS = {INFO_REQUEST: 90}
+ERROR_RETRY_DAYS = 1
+
+INFO_FIELDS = ('sector', 'industry', 'country', 'quoteType', 'longName')
+
+# Internal ticker names that differ from yfinance symbols.
+TICKER_MAP = {
+    'BRKB': 'BRK-B',
+    'BRK.B': 'BRK-B',
+    'BFB': 'BF-B',
+}
+
+Metadata = Dict[str, Dict[str, Any]]
+
+
+def load_ticker_metadata(path: Path = METADATA_PATH) -> Metadata:
+    """The stored ``{ticker: attributes}`` table; no fetching."""
+    if not path.exists():
+        return {}
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            metadata: Metadata = json.load(f)
+        return metadata
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Error loading ticker metadata: {e}")
+        return {}
+
+
+def save_ticker_metadata(metadata: Mapping[str, Any], path: Path = METADATA_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=4, ensure_ascii=False)
+
+
+def refresh_reason(entry: Optional[Mapping[str, Any]], request: str, today: date) -> Optional[str]:
+    """Why ``request`` should be refetched for ``entry``, or None while it is fresh."""
+    if entry is None:
+        return 'missing'
+    fetched = (entry.get(FETCHED_KEY) or {}).get(request)
+    if not fetched:
+        return 'untracked'
+    ttl = ERROR_RETRY_DAYS if request in (entry.get('errors') or {}) else TTL_DAYS[request]
+    if (today - date.fromisoformat(fetched)).days >= ttl:
+        return 'expired'
+    return None
+
+
+def _yf_ticker(symbol: str) -> Any:
+    # Imported here so generators that only read the table don't need yfinance.
+    import yfinance as yf
+
+    return yf.Ticker(symbol)
+
+
+@contextlib.contextmanager
+def _ticker_requests(yahoo: Optional[TickerRequests]) -> Iterator[TickerRequests]:
+    """Use the run's shared requests, or a private scheduler for a standalone call."""
+    if yahoo is not None:
+        yield yahoo
+        return
+    with FetchScheduler() as scheduler:
+        yield TickerRequests(scheduler, _yf_ticker)
+
+
+def _record(entry: Dict[str, Any], request: str, today: date, error: Optional[str]) -> None:
+    entry.setdefault(FETCHED_KEY, {})[request] = today.isoformat()
+    errors = entry.pop('errors', {})
+    errors.pop(request, None)
+    if error is not None:
+        errors[request] = error
+    if errors:
+        entry['errors'] = errors
+
+
+def classify_tickers(
+    tickers: Iterable[str],
+    today: Optional[date] = None,
+    yahoo: Optional[TickerRequests] = None,
+    skip: Iterable[str] = (),
+    path: Path = METADATA_PATH,
+) -> Metadata:
+    """Refresh stale classifications of ``tickers`` and return the full table.
+
+    Tickers in ``skip`` (e.g. delisted ones) are never fetched.
+    """
+    today = today or date.today()
+    metadata = load_ticker_metadata(path)
+    skipped = set(skip)
+    tickers = [t for t in dict.fromkeys(tickers) if t not in skipped]
+
+    stale = [t for t in tickers if refresh_reason(metadata.get(t), INFO_REQUEST, today)]
+    logging.info(f"Classification: {len(tickers) - len(stale)} cached, {len(stale)} to fetch")
+
+    with _ticker_requests(yahoo) as requests:
+        requests.prefetch([TICKER_MAP.get(t, t) for t in stale], [INFO_REQUEST])
+        for t in stale:
+            yf_symbol = TICKER_MAP.get(t, t)
+            entry = metadata.setdefault(t, {'symbol': t})
+            try:
+                info = requests.get(yf_symbol, INFO_REQUEST) or {}
+                entry.update({field: info.get(field) for field in INFO_FIELDS})
+                entry.update({'symbol': t, 'yf_symbol': yf_symbol})
+                entry.pop('error', None)  # single error field of older entries
+                _record(entry, INFO_REQUEST, today, None)
+                logging.info(f"Success: {t} -> {entry['sector'] or entry['quoteType']}")
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(f"Error fetching {t}: {e}")
+                _record(entry, INFO_REQUEST, today, str(e))
+
+    if stale:
+        save_ticker_metadata(metadata, path)
+    return metadata
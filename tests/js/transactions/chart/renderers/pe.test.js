@@ -49,6 +49,34 @@ describe('loadPEData', () => {
         expect(data.forward_pe.target_date).toBe('2024-01-03');
     });
 
+    it('decodes the v2 columnar pe_ratio.json before merging', async () => {
+        const mockPEData = {
+            version: 2,
+            dates: { start: '2023-01-01', count: 2 },
+            portfolio_pe: { decimals: 2, runs: [[0, [1500, 1600]]] },
+            ticker_pe: { decimals: 2, series: { AAPL: [[1, [2100]]] } },
+            ticker_weights: { decimals: 5, series: { AAPL: [[1, [50000]]] } },
+        };
+
+        jest.doMock('../../../../../js/transactions/realtimeData.js', () => ({
+            fetchRealTimeData: jest.fn().mockResolvedValue(null),
+        }));
+
+        global.fetch = jest.fn().mockResolvedValue({
+            ok: true,
+            json: () => Promise.resolve(mockPEData),
+        });
+
+        const peModule = await import('../../../../../js/transactions/chart/renderers/pe.js');
+        const data = await peModule.loadPEData();
+
+        expect(data.version).toBeUndefined();
+        expect(data.dates).toEqual(['2023-01-01', '2023-01-02']);
+        expect(data.portfolio_pe).toEqual([15, 16]);
+        expect(data.ticker_pe.AAPL).toEqual([null, 21]);
+        expect(data.ticker_weights.AAPL).toEqual([null, 0.5]);
+    });
+
     it('preserves existing target_date when merging realtime data', async () => {
         const mockPEData = {
             dates: ['2023-01-01', '2023-01-02'],
@@ -73,6 +73,29 @@ describe('dataLoader basic history loaders', () => {
             expect(result).toBeNull();
         });
 
+        it('loadSectorsSnapshotData decodes the compact stacked-series encoding', async () => {
+            mockFetch.mockResolvedValueOnce(
+                createMockResponse({
+                    version: 2,
+                    dates: { start: '2024-01-01', count: 2 },
+                    total_values: { decimals: 2, fill: 0, delta: true, runs: [[0, [10000, 0]]] },
+                    series: {
+                        decimals: 3,
+                        fill: 0,
+                        delta: true,
+                        series: { Technology: [[1, [25000]]], ETF: [[0, [100000, -25000]]] },
+                    },
+                })
+            );
+            await loadModule();
+            const result = await loadSectorsSnapshotData();
+            expect(result).toEqual({
+                dates: ['2024-01-01', '2024-01-02'],
+                total_values: [100, 100],
+                series: { Technology: [0, 25], ETF: [100, 75] },
+            });
+        });
+
         it('loadGeographySnapshotData handles success', async () => {
             mockFetch.mockResolvedValueOnce(createMockResponse({ some: 'data' }));
             await loadModule();
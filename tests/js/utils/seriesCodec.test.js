@@ -0,0 +1,95 @@
+import {
+    SERIES_CODEC_VERSION,
+    decodeDates,
+    decodeSeries,
+    decodeSeriesPayload,
+} from '@utils/seriesCodec.js';
+
+describe('Series codec', () => {
+    describe('decodeDates', () => {
+        it('expands a start/count axis across month and leap-day boundaries', () => {
+            expect(decodeDates({ start: '2024-02-28', count: 3 })).toEqual([
+                '2024-02-28',
+                '2024-02-29',
+                '2024-03-01',
+            ]);
+        });
+
+        it('returns explicit date lists unchanged', () => {
+            const dates = ['2024-01-01', '2024-01-03'];
+            expect(decodeDates(dates)).toBe(dates);
+        });
+
+        it('returns an empty axis for malformed input', () => {
+            expect(decodeDates(null)).toEqual([]);
+            expect(decodeDates({ start: 'bad', count: 2 })).toEqual([]);
+        });
+    });
+
+    describe('decodeSeries', () => {
+        it('fills runs at their offsets and leaves gaps null', () => {
+            expect(decodeSeries([[1, [125, 150]], [4, [200]]], 6, 2)).toEqual([
+                null,
+                1.25,
+                1.5,
+                null,
+                2,
+                null,
+            ]);
+        });
+
+        it('accumulates delta runs and fills gaps with the fill value', () => {
+            expect(decodeSeries([[1, [10000, 500]], [5, [12250]]], 6, 3, 0, true)).toEqual([
+                0, 10, 10.5, 0, 0, 12.25,
+            ]);
+        });
+    });
+
+    describe('decodeSeriesPayload', () => {
+        it('restores the v1 shape and keeps non-series keys', () => {
+            const payload = {
+                version: SERIES_CODEC_VERSION,
+                dates: { start: '2024-01-01', count: 3 },
+                portfolio_pe: { decimals: 2, runs: [[0, [2137]], [2, [2205]]] },
+                ticker_weights: {
+                    decimals: 5,
+                    series: { AAPL: [[1, [12345, 50000]]] },
+                },
+                forward_pe: { portfolio_forward_pe: 19.8 },
+            };
+
+            expect(decodeSeriesPayload(payload)).toEqual({
+                dates: ['2024-01-01', '2024-01-02', '2024-01-03'],
+                portfolio_pe: [21.37, null, 22.05],
+                ticker_weights: { AAPL: [null, 0.12345, 0.5] },
+                forward_pe: { portfolio_forward_pe: 19.8 },
+            });
+        });
+
+        it('decodes stacked-area payloads to zero-filled arrays', () => {
+            const payload = {
+                version: SERIES_CODEC_VERSION,
+                dates: { start: '2024-01-01', count: 2 },
+                total_values: { decimals: 2, fill: 0, delta: true, runs: [[0, [100012, 1038]]] },
+                series: {
+                    decimals: 3,
+                    fill: 0,
+                    delta: true,
+                    series: { AAPL: [[1, [40000]]], VT: [[0, [100000, -40000]]] },
+                },
+            };
+
+            expect(decodeSeriesPayload(payload)).toEqual({
+                dates: ['2024-01-01', '2024-01-02'],
+                total_values: [1000.12, 1010.5],
+                series: { AAPL: [0, 40], VT: [100, 60] },
+            });
+        });
+
+        it('passes v1 payloads through untouched', () => {
+            const payload = { dates: ['2024-01-01'], portfolio_pe: [20] };
+            expect(decodeSeriesPayload(payload)).toBe(payload);
+            expect(decodeSeriesPayload(null)).toBeNull();
+        });
+    });
+});
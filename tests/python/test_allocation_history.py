@@ -0,0 +1,46 @@
+from datetime import date
+
+from scripts.utils.allocation_history import (
+    allocation_snapshots,
+    load_allocation_history,
+    record_allocation_snapshot,
+)
+
+
+def test_record_keeps_one_snapshot_per_change(tmp_path):
+    path = tmp_path / 'history.json'
+
+    assert record_allocation_snapshot(
+        'sector', 'VT', {'Technology': 20, '_comment': 'x'}, date(2026, 1, 5), path
+    )
+    # Unchanged weights are not stored again.
+    assert not record_allocation_snapshot(
+        'sector', 'VT', {'Technology': 20}, date(2026, 2, 2), path
+    )
+    assert record_allocation_snapshot('sector', 'VT', {'Technology': 25}, date(2026, 3, 2), path)
+    # A second update on the same day replaces that day's snapshot.
+    assert record_allocation_snapshot('sector', 'VT', {'Technology': 26}, date(2026, 3, 2), path)
+
+    history = load_allocation_history(path)
+    assert history['sector']['VT'] == [
+        {'as_of': '2026-01-05', 'weights': {'Technology': 20.0}},
+        {'as_of': '2026-03-02', 'weights': {'Technology': 26.0}},
+    ]
+    assert history['country'] == {}
+
+
+def test_snapshots_switch_tables_on_each_change_date():
+    history = {
+        'VT': [
+            {'as_of': '2026-01-05', 'weights': {'Technology': 20.0}},
+            {'as_of': '2026-03-02', 'weights': {'Technology': 26.0}},
+        ]
+    }
+    # The current file wins for VT's latest snapshot; VOO has no history.
+    current = {'VT': {'Technology': 27.0}, 'VOO': {'Technology': 30.0}}
+
+    assert allocation_snapshots(history, current) == [
+        (None, {'VT': {'Technology': 20.0}, 'VOO': {'Technology': 30.0}}),
+        ('2026-03-02', {'VT': {'Technology': 27.0}, 'VOO': {'Technology': 30.0}}),
+    ]
+    assert allocation_snapshots({}, current) == [(None, current)]
@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+from scripts.artifact_manifest import build_manifest, hashed_path, write_manifest
+from scripts.utils.precompress import PRECOMPRESS_ENV
+
+
+def _data_dir(tmp_path):
+    figures = tmp_path / 'output' / 'figures'
+    figures.mkdir(parents=True)
+    (figures / 'pe_ratio.json').write_text('{"dates":[]}')
+    (figures / 'pe_ratio.json.gz').write_bytes(b'gz')
+    (tmp_path / 'yield_data.json').write_text('[]')
+    (tmp_path / 'transactions.csv').write_text('not an artifact')
+    return tmp_path
+
+
+def test_every_artifact_is_listed_with_its_hash_size_and_encodings(tmp_path):
+    manifest = build_manifest(_data_dir(tmp_path))
+
+    assert manifest['version'] == 1
+    assert sorted(manifest['artifacts']) == ['output/figures/pe_ratio.json', 'yield_data.json']
+    assert manifest['artifacts']['output/figures/pe_ratio.json'] == {
+        'sha256': hashlib.sha256(b'{"dates":[]}').hexdigest(),
+        'size': 12,
+        'encodings': {'gzip': 2},
+    }
+
+
+def test_hashed_copies_follow_the_content(tmp_path):
+    data_dir = _data_dir(tmp_path)
+    pe_path = data_dir / 'output' / 'figures' / 'pe_ratio.json'
+
+    first = build_manifest(data_dir, hashed_copies=True)['artifacts'][
+        'output/figures/pe_ratio.json'
+    ]
+    old_copy = data_dir / first['hashed']
+    assert old_copy.read_text() == '{"dates":[]}'
+
+    pe_path.write_text('{"dates":["2024-01-02"]}')
+    second = build_manifest(data_dir, hashed_copies=True)
+    entry = second['artifacts']['output/figures/pe_ratio.json']
+
+    assert data_dir / entry['hashed'] == hashed_path(pe_path, entry['sha256'])
+    assert not old_copy.exists()
+    # Hashed copies are never listed as artifacts of their own.
+    assert len(second['artifacts']) == 2
+
+
+def test_manifest_is_only_rewritten_when_it_changes(tmp_path, monkeypatch):
+    data_dir = _data_dir(tmp_path)
+    path = data_dir / 'manifest.json'
+    monkeypatch.delenv(PRECOMPRESS_ENV, raising=False)
+
+    assert write_manifest(build_manifest(data_dir), path)
+    assert not write_manifest(build_manifest(data_dir), path)
+    assert 'manifest.json' not in json.loads(path.read_text())['artifacts']
+
+    # An unchanged manifest still gets its compressed copy once enabled.
+    monkeypatch.setenv(PRECOMPRESS_ENV, '1')
+    assert not write_manifest(build_manifest(data_dir), path)
+    assert (data_dir / 'manifest.json.gz').exists()
@@ -4,6 +4,31 @@ import pandas as pd
 import pytest
 
 import scripts.audit_eps_gaps as audit_eps_gaps
+from scripts.utils.fundamentals_store import EPS_TTM, SOURCE_VENDOR, FundamentalsStore
+
+
+@pytest.fixture(autouse=True)
+def empty_store(monkeypatch):
+    store = FundamentalsStore()
+    monkeypatch.setattr(audit_eps_gaps, 'load_fundamentals_store', lambda: store)
+    return store
+
+
+def test_main_reads_coverage_from_store(empty_store, capsys):
+    empty_store.record_snapshot('AAPL', EPS_TTM, {'2020-06-30': 1.0}, SOURCE_VENDOR, '2020-07-01')
+    with (
+        patch('scripts.audit_eps_gaps.pd.read_parquet') as mock_read_parquet,
+        patch('scripts.audit_eps_gaps.yf.Ticker') as mock_ticker,
+    ):
+        dates = pd.date_range(start='2020-01-01', periods=3)
+        mock_read_parquet.return_value = pd.DataFrame({'AAPL': [10, 20, 0]}, index=dates)
+
+        audit_eps_gaps.main()
+
+        mock_ticker.assert_not_called()
+        assert "[PARTIAL GAP] AAPL: Held from 2020-01-01 | Data starts 2020-06-30" in (
+            capsys.readouterr().out
+        )
 
 
 def test_main_wide_format(capsys):
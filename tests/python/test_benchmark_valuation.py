@@ -0,0 +1,110 @@
+import json
+
+import pandas as pd
+import pytest
+
+from scripts.benchmark_valuation import BenchmarkValuation, compute_benchmark_pe
+
+DATES = pd.date_range('2024-06-01', '2024-06-10')
+CLOSES = pd.Series([530, 532, 528, 535, 531, 540, 538, 542, 537, 545], index=DATES, dtype=float)
+
+
+def _valuation(tmp_path, **overrides):
+    calls = {'eps': [], 'info': [], 'prices': []}
+
+    def fetch_eps(proxies):
+        calls['eps'].append(list(proxies))
+        return {'SPY': {'points': [{'date': DATES[0], 'eps': 20.0}], 'current_ttm': 21.0}}
+
+    def fetch_info(proxy):
+        calls['info'].append(proxy)
+        return {'trailingPE': 26.0, 'forwardPE': 22.5}
+
+    def fetch_prices(proxy, start, end):
+        calls['prices'].append((proxy, start, end))
+        return CLOSES
+
+    kwargs = {
+        'benchmarks': {'^GSPC': 'SPY'},
+        'dates': DATES,
+        'manual_curves': {},
+        'fetch_eps': fetch_eps,
+        'fetch_info': fetch_info,
+        'fetch_prices': fetch_prices,
+        'stored_prices': pd.DataFrame({'SPY': CLOSES}),
+        'history_path': tmp_path / 'benchmark_history.json',
+    }
+    kwargs.update(overrides)
+    return BenchmarkValuation(**kwargs), calls
+
+
+def test_stored_prices_and_shared_eps_avoid_downloads(tmp_path):
+    valuation, calls = _valuation(tmp_path)
+
+    series = valuation.compute()['^GSPC']
+
+    assert calls['prices'] == []
+    assert calls['eps'] == [['SPY']]
+    assert len(series) == len(DATES)
+    assert series.iloc[0] == pytest.approx(530 / 20.0)
+    assert series.nunique() > 5
+    assert valuation.forward_pe('SPY') == 22.5
+    assert calls['info'] == ['SPY']
+
+
+def test_only_the_uncovered_tail_is_downloaded(tmp_path):
+    stored = pd.DataFrame({'SPY': CLOSES.iloc[:6]})
+    valuation, calls = _valuation(tmp_path, stored_prices=stored)
+
+    prices = valuation.proxy_prices()
+
+    assert calls['prices'][0][1] == DATES[6]
+    pd.testing.assert_series_equal(prices['^GSPC'], CLOSES, check_names=False, check_freq=False)
+
+
+def test_pe_anchors_imply_eps_without_eps_points(tmp_path):
+    valuation, _ = _valuation(
+        tmp_path,
+        fetch_eps=lambda proxies: {},
+        fetch_info=lambda proxy: {},
+        manual_curves={'^GSPC': {'2024-06-01': 26.5}},
+    )
+
+    series = valuation.compute()['^GSPC']
+
+    assert series.iloc[0] == pytest.approx(26.5)
+    # EPS is held flat, so P/E tracks price.
+    assert series.iloc[-1] == pytest.approx(26.5 * 545 / 530)
+
+
+def test_live_pe_is_recorded_in_one_history_write(tmp_path):
+    history_path = tmp_path / 'benchmark_history.json'
+    history_path.write_text(json.dumps({'^GSPC': {'2024-06-05': 25.0}}))
+    valuation, _ = _valuation(
+        tmp_path,
+        fetch_eps=lambda proxies: {},
+        fetch_prices=lambda proxy, start, end: None,
+        stored_prices=None,
+    )
+
+    series = valuation.compute()['^GSPC']
+
+    # Without prices, the P/E curve runs through the recorded anchors.
+    assert series.iloc[4] == pytest.approx(25.0)
+    saved = json.loads(history_path.read_text())['^GSPC']
+    assert saved['2024-06-05'] == 25.0
+    assert saved[pd.Timestamp.now().strftime('%Y-%m-%d')] == 26.0
+
+
+def test_compute_benchmark_pe_handles_columns_together():
+    prices = pd.DataFrame({'A': CLOSES, 'B': CLOSES * 2, 'C': float('nan')})
+    eps = {
+        'A': [{'date': DATES[0], 'eps': 10.0}, {'date': DATES[-1], 'eps': 20.0}],
+        'B': [{'date': DATES[0], 'eps': 10.0}],
+    }
+
+    frame = compute_benchmark_pe(prices, eps, DATES)
+
+    assert list(frame.columns) == ['A', 'B']
+    assert frame['A'].iloc[-1] == pytest.approx(545 / 20.0)
+    assert frame['B'].iloc[-1] == pytest.approx(2 * 545 / 10.0)
@@ -114,15 +114,15 @@ class TestCIParity:
 
         Regression: geography and marketcap plots were stale because their
         generation scripts were only in the weekly VT workflow, not in the
-        main TWRR pipeline.  All generate_*_data.py / generate_*_from_*.py
-        scripts that produce figures must run on every twrr-refresh.
+        main TWRR pipeline.  All generate_*_data.py scripts that produce
+        figures must run on every twrr-refresh (market caps are written by
+        generate_composition_data.py).
         """
         content = get_makefile_content()
 
         required_scripts = [
             "scripts/generate_composition_data.py",
             "scripts/generate_geography_data.py",
-            "scripts/generate_marketcap_from_composition.py",
         ]
         for script in required_scripts:
             assert script in content, (
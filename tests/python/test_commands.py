@@ -16,6 +16,7 @@ from scripts.commands import (
     holdings,
     tickers,
     update_all,
+    whatif,
 )
 
 project_root = Path(__file__).parent.parent.parent
@@ -772,6 +773,29 @@ class TestCLIEdgeCases(unittest.TestCase):
         with patch.dict(sys.modules, {"argcomplete": None}):
             cli_main()
 
+    @patch('scripts.portfolio.whatif.simulate')
+    @patch('scripts.portfolio.whatif.summarize', return_value='report')
+    def test_whatif_run_collects_trades(self, mock_summarize, mock_simulate):
+        parser = create_parser()
+        args = parser.parse_args(
+            ['whatif', '--buy', 'NVDA', '10', '2023-01-05', '--sell', 'VT', '5', '2024-03-01']
+        )
+        self.assertEqual(args.func, whatif._run)
+        args.func(args)
+        trades = mock_simulate.call_args.args[0]
+        self.assertEqual(
+            [(t.action, t.ticker, t.shares) for t in trades],
+            [('buy', 'NVDA', 10.0), ('sell', 'VT', 5.0)],
+        )
+        self.assertEqual(mock_simulate.call_args.kwargs['method'], 'fifo')
+
+    @patch('scripts.commands.whatif.sys.exit', side_effect=SystemExit(1))
+    def test_whatif_run_without_trades_exits(self, mock_exit):
+        args = create_parser().parse_args(['whatif'])
+        with self.assertRaises(SystemExit):
+            whatif._run(args)
+        mock_exit.assert_called_with(1)
+
     def test_cli_module_execution(self):
         import runpy
 
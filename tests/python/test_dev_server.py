@@ -1,8 +1,12 @@
+import gzip
+import os
 import runpy
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import ANY, MagicMock, patch
 
-from scripts.dev_server import NoCacheHandler
+from scripts.dev_server import NoCacheHandler, accepts_encoding
 
 
 class TestDevServer(unittest.TestCase):
@@ -18,6 +22,34 @@ class TestDevServer(unittest.TestCase):
             )
             mock_super_end_headers.assert_called_once()
 
+    def test_accepts_encoding(self):
+        self.assertTrue(accepts_encoding("gzip, deflate, br", "br"))
+        self.assertTrue(accepts_encoding("*", "gzip"))
+        self.assertFalse(accepts_encoding("gzip;q=0, *", "gzip"))
+        self.assertFalse(accepts_encoding("identity", "gzip"))
+        self.assertFalse(accepts_encoding(None, "gzip"))
+
+    def test_precompressed_variant_is_chosen_when_fresh_and_accepted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "chart.json"
+            path.write_text("{}")
+            gz_path = Path(tmp) / "chart.json.gz"
+            gz_path.write_bytes(gzip.compress(b"{}"))
+            with patch('http.server.SimpleHTTPRequestHandler.__init__', return_value=None):
+                handler = NoCacheHandler(None, None, None)
+            handler.headers = {"Accept-Encoding": "gzip, br"}
+
+            self.assertEqual(handler.precompressed_variant(str(path)), ("gzip", str(gz_path)))
+
+            handler.headers = {"Accept-Encoding": "identity"}
+            self.assertIsNone(handler.precompressed_variant(str(path)))
+
+            # A sibling older than its source is stale and ignored.
+            handler.headers = {"Accept-Encoding": "gzip"}
+            stat = path.stat()
+            os.utime(gz_path, (stat.st_atime, stat.st_mtime - 10))
+            self.assertIsNone(handler.precompressed_variant(str(path)))
+
     @patch('scripts.dev_server.http.server.ThreadingHTTPServer')
     @patch('sys.argv', ['dev_server.py'])
     def test_main_default_port(self, mock_server):
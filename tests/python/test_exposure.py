@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.utils.exposure import (
+    Breakdown,
+    compute_exposures,
+    exposure_records,
+    mapping_matrix,
+    rollup,
+    weight_history,
+    weight_matrix,
+)
+
+DATES = pd.date_range('2024-01-01', periods=2)
+
+
+def _market_values():
+    # Day 1: AAPL 60, VT 40. Day 2: AAPL 30, VT 70.
+    return pd.DataFrame({'AAPL': [60.0, 30.0], 'VT': [40.0, 70.0]}, index=DATES)
+
+
+def test_every_breakdown_shares_one_pass_and_total():
+    countries = weight_matrix(
+        {'AAPL': {'United States': 100.0}, 'VT': {'United States': 60.0, 'Japan': 40.0}},
+        ['AAPL', 'VT'],
+        scale=0.01,
+    )
+    exposures = compute_exposures(
+        _market_values(), [Breakdown('tickers'), Breakdown('countries', countries)]
+    )
+
+    tickers, geo = exposures['tickers'], exposures['countries']
+    assert tickers['date'].tolist() == ['2024-01-01', '2024-01-02']
+    assert tickers['total_value'].tolist() == geo['total_value'].tolist() == [100.0, 100.0]
+    assert tickers['AAPL'].tolist() == pytest.approx([60.0, 30.0])
+    assert geo['United States'].tolist() == pytest.approx([84.0, 72.0])
+    assert geo['Japan'].tolist() == pytest.approx([16.0, 28.0])
+
+
+def test_small_categories_are_dropped_and_the_rest_rescaled():
+    countries = weight_matrix({'VT': {'United States': 0.99, 'Japan': 0.01}}, ['AAPL', 'VT'])
+    geo = compute_exposures(_market_values(), [Breakdown('geo', countries, min_pct=0.5)])['geo']
+
+    # AAPL is unclassified, so VT's countries are rescaled to 100%. Day 1:
+    # Japan is 0.4% of the portfolio and is dropped; day 2 it is 0.7% of 70%.
+    assert np.isnan(geo['Japan'].iloc[0])
+    assert geo['United States'].iloc[0] == pytest.approx(100.0)
+    assert geo['Japan'].iloc[1] == pytest.approx(1.0)
+    assert exposure_records(geo)[0] == {
+        'date': '2024-01-01',
+        'total_value': 100.0,
+        'United States': pytest.approx(100.0),
+    }
+
+
+def test_a_large_uncovered_share_is_reported_as_others():
+    # AAPL only has 50% of its value classified.
+    sectors = weight_matrix({'AAPL': {'Technology': 0.5}, 'VT': {'ETF': 1.0}}, ['AAPL', 'VT'])
+    result = compute_exposures(_market_values(), [Breakdown('s', sectors, others_below=99.0)])['s']
+
+    assert result['Technology'].tolist() == pytest.approx([30.0, 15.0])
+    assert result['ETF'].tolist() == pytest.approx([40.0, 70.0])
+    assert result['Others'].tolist() == pytest.approx([30.0, 15.0])
+
+
+def test_rollup_sums_percentages_through_a_mapping():
+    frame = pd.DataFrame(
+        {
+            'date': ['2024-01-01'],
+            'total_value': [100.0],
+            'United States': [70.0],
+            'Japan': [20.0],
+            'Atlantis': [10.0],
+        }
+    )
+    mapping = mapping_matrix(
+        {'United States': 'North America', 'Japan': 'Asia'}, ['United States', 'Japan', 'Atlantis']
+    )
+
+    result = rollup(frame, mapping)
+
+    assert result.iloc[0].to_dict() == {
+        'date': '2024-01-01',
+        'total_value': 100.0,
+        'North America': 70.0,
+        'Asia': 20.0,
+        'Other': 10.0,
+    }
+
+
+def test_weight_history_applies_the_matrix_in_effect_each_day():
+    before = weight_matrix({'VT': {'United States': 1.0}}, ['AAPL', 'VT'])
+    after = weight_matrix({'VT': {'United States': 0.5, 'Japan': 0.5}}, ['AAPL', 'VT'])
+    countries = weight_history([(None, before), ('2024-01-02', after)])
+
+    geo = compute_exposures(_market_values(), [Breakdown('geo', countries)])['geo']
+
+    assert np.isnan(geo['Japan'].iloc[0])
+    assert geo['United States'].tolist() == pytest.approx([100.0, 50.0])
+    assert geo['Japan'].iloc[1] == pytest.approx(50.0)
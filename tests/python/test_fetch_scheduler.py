@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from scripts.utils.fetch_scheduler import FetchScheduler, TickerRequests
+
+
+class FakeTicker:
+    calls: list[tuple[str, str]] = []
+    lock = threading.Lock()
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def _record(self, name):
+        with self.lock:
+            self.calls.append((self.symbol, name))
+
+    @property
+    def info(self):
+        self._record('info')
+        return {'symbol': self.symbol}
+
+    @property
+    def splits(self):
+        self._record('splits')
+        raise ValueError('no splits')
+
+    def get_earnings_dates(self, limit):
+        self._record(('get_earnings_dates', limit))
+        return limit
+
+
+@pytest.fixture
+def yahoo():
+    FakeTicker.calls = []
+    with FetchScheduler(max_workers=4) as scheduler:
+        yield TickerRequests(scheduler, FakeTicker)
+
+
+def test_identical_requests_across_stages_run_once(yahoo):
+    yahoo.prefetch(['VT', 'VOO'], ['info'])
+
+    assert yahoo.get('VT', 'info') == {'symbol': 'VT'}
+    assert yahoo.get('VOO', 'info') == {'symbol': 'VOO'}
+    assert sorted(FakeTicker.calls) == [('VOO', 'info'), ('VT', 'info')]
+    assert len(yahoo.scheduler) == 2
+
+
+def test_fetch_fans_out_and_keeps_errors_per_request(yahoo):
+    fetched = yahoo.fetch('AAPL', ['info', 'splits', ('get_earnings_dates', {'limit': 40})])
+
+    assert set(fetched) == {'info', 'splits', 'get_earnings_dates'}
+    assert fetched['info'].result() == {'symbol': 'AAPL'}
+    assert fetched['get_earnings_dates'].result() == 40
+    with pytest.raises(ValueError):
+        fetched['splits'].result()
+    # Different kwargs are a different request.
+    assert yahoo.get('AAPL', ('get_earnings_dates', {'limit': 8})) == 8
+
+
+def test_host_limit_caps_concurrency_below_the_pool_size():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    with FetchScheduler(max_workers=8, host_limits={'slow': 2}) as scheduler:
+        futures = [scheduler.submit(i, task, host='slow') for i in range(8)]
+        for future in futures:
+            future.result()
+
+    assert peak == 2
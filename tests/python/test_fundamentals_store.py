@@ -0,0 +1,172 @@
+import math
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from scripts.analysis import sync_configs
+from scripts.utils.fundamentals_store import (
+    EPS_TTM,
+    EPS_TTM_CURRENT,
+    SOURCE_MANUAL,
+    SOURCE_VENDOR,
+    FundamentalsStore,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FundamentalsStore.load(tmp_path / 'fundamentals.parquet')
+
+
+def test_snapshots_append_only_revisions(store):
+    first = {'2024-03-31': 1.0, '2024-06-30': 1.2}
+    assert store.record_snapshot('ACME', EPS_TTM, first, SOURCE_VENDOR, '2024-07-01') == 2
+    assert store.record_snapshot('ACME', EPS_TTM, first, SOURCE_VENDOR, '2024-07-02') == 0
+
+    # Q2 restated, Q3 added, Q1 no longer returned by the vendor.
+    revised = {'2024-06-30': 1.1, '2024-09-30': 1.4}
+    assert store.record_snapshot('ACME', EPS_TTM, revised, SOURCE_VENDOR, '2024-10-01') == 3
+
+    history = store.revisions('ACME', EPS_TTM)
+    assert len(history) == 5
+    q2 = history[history['report_date'] == pd.Timestamp('2024-06-30')]
+    assert q2['value'].tolist() == [1.2, 1.1]
+
+    latest = store.latest(EPS_TTM).set_index('report_date')['value']
+    assert latest.to_dict() == {pd.Timestamp('2024-06-30'): 1.1, pd.Timestamp('2024-09-30'): 1.4}
+
+
+def test_known_by_reads_the_store_as_it_was(store):
+    store.record_snapshot('ACME', EPS_TTM, {'2024-06-30': 1.2}, SOURCE_VENDOR, '2024-07-01')
+    store.record_snapshot('ACME', EPS_TTM, {'2024-06-30': 1.1}, SOURCE_VENDOR, '2024-08-01')
+
+    assert store.latest_value('ACME', EPS_TTM, known_by='2024-07-15') == 1.2
+    assert store.latest_value('ACME', EPS_TTM) == 1.1
+    assert store.latest_value('ACME', EPS_TTM, known_by='2024-06-01') is None
+
+
+def test_manual_source_overrides_vendor(store):
+    store.record_snapshot(
+        'ACME', EPS_TTM, {'2024-03-31': 1.0, '2024-06-30': 1.2}, SOURCE_VENDOR, '2024-07-01'
+    )
+    store.record_snapshot('ACME', EPS_TTM, {'2024-03-31': 0.9}, SOURCE_MANUAL, '2024-07-01')
+
+    latest = store.latest(EPS_TTM).set_index('report_date')
+    assert latest.loc[pd.Timestamp('2024-03-31'), 'value'] == 0.9
+    assert latest.loc[pd.Timestamp('2024-03-31'), 'source'] == SOURCE_MANUAL
+    assert latest.loc[pd.Timestamp('2024-06-30'), 'source'] == SOURCE_VENDOR
+
+
+def test_save_round_trips(store):
+    store.record_snapshot('ACME', EPS_TTM, {'2024-03-31': 1.0}, SOURCE_VENDOR, '2024-04-01', 'USD')
+    store.record_value('ACME', EPS_TTM_CURRENT, 1.05, SOURCE_VENDOR, '2024-04-01', 'USD')
+    path = store.save()
+
+    reloaded = FundamentalsStore.load(path)
+    pd.testing.assert_frame_equal(reloaded.frame, store.frame)
+    assert reloaded.record_value('ACME', EPS_TTM_CURRENT, 1.05, SOURCE_VENDOR, '2024-04-02') == 0
+
+
+def test_as_of_matrix_is_a_point_in_time_step_function(store):
+    store.record_snapshot(
+        'ACME', EPS_TTM, {'2024-01-03': 1.0, '2024-01-06': 2.0}, SOURCE_VENDOR, '2024-01-10'
+    )
+    store.record_snapshot('BOLT', EPS_TTM, {'2024-01-02': 5.0}, SOURCE_VENDOR, '2024-01-10')
+    store.record_value('BOLT', EPS_TTM_CURRENT, 6.0, SOURCE_VENDOR, '2024-01-10')
+    dates = pd.date_range('2024-01-01', '2024-01-10')
+
+    matrix = store.as_of_matrix(
+        EPS_TTM,
+        ['ACME', 'BOLT', 'NONE'],
+        dates,
+        current_metric=EPS_TTM_CURRENT,
+        today='2024-01-09',
+    )
+
+    acme = matrix['ACME']
+    assert math.isnan(acme['2024-01-02'])
+    assert acme['2024-01-05'] == 1.0
+    assert acme['2024-01-10'] == 2.0
+    # BOLT's current TTM takes over from "today" onwards.
+    assert matrix['BOLT']['2024-01-08'] == 5.0
+    assert matrix['BOLT']['2024-01-09'] == 6.0
+    assert matrix['NONE'].isna().all()
+
+
+def test_first_report_dates_ignore_retracted_points(store):
+    store.record_snapshot(
+        'ACME', EPS_TTM, {'2023-12-31': 0.8, '2024-03-31': 1.0}, SOURCE_VENDOR, '2024-04-01'
+    )
+    store.record_snapshot('ACME', EPS_TTM, {'2024-03-31': 1.0}, SOURCE_VENDOR, '2024-05-01')
+
+    assert store.first_report_dates(EPS_TTM).to_dict() == {'ACME': pd.Timestamp('2024-03-31')}
+
+
+def test_record_eps_fundamentals_mirrors_cache_and_patch(store):
+    from scripts.generate_pe_data import record_eps_fundamentals
+
+    cache = {
+        'ACME': {
+            'points': {'2024-03-31': 1.0, '2024-06-30': 1.2},
+            'current_ttm': 1.3,
+            'currency': 'USD',
+        }
+    }
+    patch = {'ACME': {'2024-03-31': 0.9}}
+
+    appended = record_eps_fundamentals(store, ['ACME'], cache, patch, date(2024, 7, 1))
+    assert appended == 4
+    assert record_eps_fundamentals(store, ['ACME'], cache, patch, date(2024, 7, 2)) == 0
+
+    assert store.latest_value('ACME', EPS_TTM_CURRENT) == 1.3
+    latest = store.latest(EPS_TTM).set_index('report_date')['value']
+    assert latest[pd.Timestamp('2024-03-31')] == 0.9
+
+
+def test_removed_manual_patch_lets_the_vendor_value_win_again(store):
+    from scripts.generate_pe_data import record_eps_fundamentals
+
+    cache = {'ACME': {'points': {'2024-03-31': 1.0}, 'current_ttm': None, 'currency': 'USD'}}
+    record_eps_fundamentals(store, ['ACME'], cache, {'ACME': {'2024-03-31': 5.0}}, date(2024, 4, 1))
+    assert store.latest_value('ACME', EPS_TTM) == 5.0
+
+    assert record_eps_fundamentals(store, ['ACME'], cache, {}, date(2024, 4, 2)) == 1
+    assert record_eps_fundamentals(store, ['ACME'], cache, {}, date(2024, 4, 3)) == 0
+
+    assert store.latest_value('ACME', EPS_TTM) == 1.0
+    matrix = store.as_of_matrix(EPS_TTM, ['ACME'], pd.date_range('2024-04-01', '2024-04-02'))
+    assert matrix['ACME'].tolist() == [1.0, 1.0]
+    # The patch stays in the history as of the days it was in effect.
+    assert store.latest_value('ACME', EPS_TTM, known_by='2024-04-01') == 5.0
+
+
+def test_sync_configs_falls_back_to_stored_eps(store):
+    assert sync_configs.stored_eps(None, 'ACME') is None
+    store.record_snapshot('ACME', EPS_TTM, {'2024-03-31': 1.0}, SOURCE_VENDOR, '2024-04-01')
+    assert sync_configs.stored_eps(store, 'ACME') == 1.0
+    store.record_value('ACME', EPS_TTM_CURRENT, 1.1, SOURCE_VENDOR, '2024-05-01')
+    assert sync_configs.stored_eps(store, 'ACME') == 1.1
+
+
+def test_withdrawn_current_value_stops_overriding_new_reports(store):
+    store.record_snapshot('ACME', EPS_TTM, {'2024-03-31': 1.0}, SOURCE_VENDOR, '2024-04-01')
+    store.record_value('ACME', EPS_TTM_CURRENT, 1.1, SOURCE_VENDOR, '2024-04-01')
+    # The vendor stops returning a current TTM, then a new report lands.
+    assert store.record_value('ACME', EPS_TTM_CURRENT, None, SOURCE_VENDOR, '2024-05-01') == 1
+    assert store.record_value('ACME', EPS_TTM_CURRENT, None, SOURCE_VENDOR, '2024-05-02') == 0
+    store.record_snapshot(
+        'ACME', EPS_TTM, {'2024-03-31': 1.0, '2024-06-30': 1.4}, SOURCE_VENDOR, '2024-07-01'
+    )
+    dates = pd.date_range('2024-07-01', '2024-07-03')
+
+    matrix = store.as_of_matrix(
+        EPS_TTM, ['ACME'], dates, current_metric=EPS_TTM_CURRENT, today='2024-07-02'
+    )
+
+    assert matrix['ACME'].tolist() == [1.4, 1.4, 1.4]
+    assert store.current_value('ACME', EPS_TTM_CURRENT) is None
+    assert store.current_value('ACME', EPS_TTM_CURRENT, known_by='2024-04-15') == 1.1
+    assert sync_configs.stored_eps(store, 'ACME') == 1.4
+    # A returning figure is recorded again even if it matches the old one.
+    assert store.record_value('ACME', EPS_TTM_CURRENT, 1.1, SOURCE_VENDOR, '2024-07-05') == 1
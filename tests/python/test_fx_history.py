@@ -0,0 +1,73 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from scripts.utils.fx_history import FxHistory, convert_asof
+
+DAILY = pd.DataFrame(
+    {'USD': [1.0, 1.0, 1.0], 'CNY': [7.0, 7.2, 7.1], 'JPY': [140.0, 150.0, 145.0]},
+    index=pd.DatetimeIndex(['2024-01-02', '2024-01-03', '2024-01-05'], name='date'),
+)
+
+
+def test_convert_asof_pads_then_backfills_before_the_first_rate():
+    rates = pd.Series([1.2, 1.3], index=pd.to_datetime(['2023-01-01', '2023-01-05']))
+    values = pd.Series(
+        [10.0, 10.0, 10.0, 10.0],
+        index=pd.to_datetime(['2022-12-31', '2023-01-01', '2023-01-03', '2023-01-09']),
+    )
+
+    converted = convert_asof(values, rates)
+
+    assert converted.tolist() == pytest.approx([12.0, 12.0, 12.0, 13.0])
+    assert convert_asof(values, None).equals(values)
+    assert convert_asof(values, pd.Series(dtype=float)).equals(values)
+
+
+def test_pairs_between_daily_rate_currencies_are_derived():
+    fetcher = pytest.fail  # must not be called
+    fx = FxHistory(daily_rates=DAILY, fetcher=fetcher)
+
+    cny_usd = fx.history('CNYUSD=X')
+    assert cny_usd.tolist() == pytest.approx([1 / 7.0, 1 / 7.2, 1 / 7.1])
+    jpy_cny = fx.history('JPYCNY=X')
+    assert jpy_cny.iloc[1] == pytest.approx(7.2 / 150.0)
+    assert fx.history('not-a-pair') is None
+
+
+def test_other_pairs_are_fetched_once_and_persisted(tmp_path):
+    calls = []
+
+    def fetcher(pair, start):
+        calls.append((pair, start))
+        index = pd.to_datetime(['2024-01-02', '2024-01-03'], utc=True)
+        return pd.Series([1.10, 1.11], index=index)
+
+    path = tmp_path / 'fx.parquet'
+    fx = FxHistory(daily_rates=DAILY, path=path, fetcher=fetcher, today=date(2024, 1, 4))
+    assert fx.history('EURUSD=X').tolist() == [1.10, 1.11]
+    assert fx.history('EURUSD=X') is not None
+    assert calls == [('EURUSD=X', None)]
+    assert fx.save() == path
+    assert fx.save() is None
+
+    reloaded = FxHistory.load(path, daily_rates_path=tmp_path / 'missing.csv', fetcher=fetcher)
+    reloaded.today = pd.Timestamp('2024-01-05')
+    assert reloaded.history('EURUSD=X').index[-1] == pd.Timestamp('2024-01-03')
+    assert len(calls) == 1
+
+
+def test_stale_pairs_fetch_only_the_tail(tmp_path):
+    stored = pd.DataFrame(
+        {'EURUSD=X': [1.05, 1.06]}, index=pd.to_datetime(['2024-01-01', '2024-01-20'])
+    )
+
+    def fetcher(pair, start):
+        assert start == pd.Timestamp('2024-01-13')
+        return pd.Series([1.07, 1.08], index=pd.to_datetime(['2024-01-20', '2024-02-01']))
+
+    fx = FxHistory(stored, path=tmp_path / 'fx.parquet', fetcher=fetcher, today=date(2024, 2, 1))
+
+    assert fx.history('EURUSD=X').tolist() == [1.05, 1.07, 1.08]
+    assert fx.dirty
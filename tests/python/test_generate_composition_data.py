@@ -8,7 +8,13 @@ import pytest
 
 # Add scripts directory to path to import generate_composition_data
 sys.path.append(str(Path(__file__).parent.parent.parent / "scripts"))
-from generate_composition_data import calculate_daily_composition, save_json_data
+from generate_composition_data import (
+    MARKET_CAP_CATEGORIES,
+    calculate_daily_composition,
+    calculate_daily_exposures,
+    save_json_data,
+)
+from utils.series_codec import decode_payload
 
 
 @pytest.fixture
@@ -137,13 +143,84 @@ def test_calculate_daily_composition_missing_ticker():
     assert "UNKNOWN" not in comp_df.columns
 
 
+def test_calculate_daily_exposures_marketcap_buckets():
+    """Funds spread by their breakdown; stocks go to their cap bucket."""
+    dates = [datetime(2023, 1, 1), datetime(2023, 1, 2)]
+    holdings_df = pd.DataFrame(
+        {"VT": [5.0, 5.0], "AAPL": [4.0, 4.0], "MID": [0.0, 9.0], "UNKNOWN": [1.0, 1.0]},
+        index=dates,
+    )
+    prices_data = {
+        "VT": {"2023-01-01": 10.0, "2023-01-02": 10.0},
+        "AAPL": {"2023-01-01": 10.0, "2023-01-02": 10.0},
+        "MID": {"2023-01-01": 10.0, "2023-01-02": 10.0},
+        "UNKNOWN": {"2023-01-01": 10.0, "2023-01-02": 10.0},
+    }
+    fund_market_caps = {"VT": {"Mega Cap": 50, "Large Cap": 30, "Mid Cap": 20, "_note": "x"}}
+    market_caps = {"AAPL": 2500e9, "MID": 5e9}
+
+    exposures = calculate_daily_exposures(
+        holdings_df,
+        prices_data,
+        {},
+        {},
+        fund_market_caps=fund_market_caps,
+        market_caps=market_caps,
+    )
+    marketcap = exposures["marketcap"]
+
+    assert list(marketcap.columns) == ["date", "total_value", *MARKET_CAP_CATEGORIES]
+    assert marketcap["total_value"].tolist() == [100.0, 190.0]
+    # Day 1: VT 50%, AAPL 40%, UNKNOWN 10% (counted as large cap).
+    assert marketcap["Mega Cap"].tolist() == pytest.approx([65.0, 65.0 / 1.9])
+    assert marketcap["Large Cap"].tolist() == pytest.approx([25.0, 25.0 / 1.9])
+    assert marketcap["Mid Cap"].tolist() == pytest.approx([10.0, 100.0 / 1.9])
+    assert marketcap["Bond"].tolist() == [0.0, 0.0]
+
+
+def test_calculate_daily_exposures_historical_caps_move_buckets():
+    """With historical caps a stock is bucketed by price x shares each day."""
+    dates = [datetime(2023, 1, 1), datetime(2023, 1, 2)]
+    holdings_df = pd.DataFrame({"XYZ": [1.0, 1.0]}, index=dates)
+    # 15B today at $150 implies 100M shares, so $10 was a 1B (small) cap.
+    prices_data = {"XYZ": {"2023-01-01": 10.0, "2023-01-02": 150.0}}
+    market_caps = {"XYZ": 15e9}
+
+    static = calculate_daily_exposures(
+        holdings_df, prices_data, {}, {}, fund_market_caps={}, market_caps=market_caps
+    )["marketcap"]
+    historical = calculate_daily_exposures(
+        holdings_df,
+        prices_data,
+        {},
+        {},
+        fund_market_caps={},
+        market_caps=market_caps,
+        historical_caps=True,
+    )["marketcap"]
+
+    assert static["Large Cap"].tolist() == [100.0, 100.0]
+    assert historical["Small Cap"].tolist() == [100.0, 0.0]
+    assert historical["Large Cap"].tolist() == [0.0, 100.0]
+
+
+def test_calculate_daily_exposures_without_fund_breakdowns_skips_marketcap():
+    dates = [datetime(2023, 1, 1)]
+    holdings_df = pd.DataFrame({"AAPL": [1.0]}, index=dates)
+
+    exposures = calculate_daily_exposures(holdings_df, {"AAPL": {"2023-01-01": 1.0}}, {}, {})
+
+    assert set(exposures) == {"composition", "sectors"}
+
+
 def test_save_json_data_writes_compact_json(tmp_path):
-    """save_json_data writes compact JSON that round-trips to the same data."""
+    """save_json_data writes compact v2 JSON that decodes to the same data."""
     df = pd.DataFrame(
         {
-            "date": ["2023-01-01", "2023-01-02"],
-            "total_value": [100.0, 200.0],
-            "AAPL": [60.0, 55.0],
+            "date": ["2023-01-01", "2023-01-02", "2023-01-03"],
+            "total_value": [100.0, 200.0, 150.0],
+            "AAPL": [60.0, 55.0, None],
+            "VT": [40.0, 45.0, 100.0],
         }
     )
     out = tmp_path / "composition.json"
@@ -152,6 +229,13 @@ def test_save_json_data_writes_compact_json(tmp_path):
     text = out.read_text()
     assert "\n" not in text  # compact: single line
     parsed = json.loads(text)
-    assert parsed["dates"] == ["2023-01-01", "2023-01-02"]
-    assert parsed["total_values"] == [100.0, 200.0]
-    assert parsed["series"] == {"AAPL": [60.0, 55.0]}
+    assert parsed["version"] == 2
+    assert parsed["dates"] == {"start": "2023-01-01", "count": 3}
+    # Zeros are left out; runs hold the first value, then deltas.
+    assert parsed["series"]["series"]["AAPL"] == [[0, [60000, -5000]]]
+    assert parsed["series"]["series"]["VT"] == [[0, [40000, 5000, 55000]]]
+
+    decoded = decode_payload(parsed)
+    assert decoded["dates"] == ["2023-01-01", "2023-01-02", "2023-01-03"]
+    assert decoded["total_values"] == [100.0, 200.0, 150.0]
+    assert decoded["series"] == {"AAPL": [60.0, 55.0, 0.0], "VT": [40.0, 45.0, 100.0]}
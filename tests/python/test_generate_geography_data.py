@@ -1,6 +1,7 @@
 import json
 
 import pandas as pd
+import pytest
 
 from scripts.generate_geography_data import calculate_daily_geography, save_chart_json
 
@@ -59,3 +60,63 @@ def test_save_chart_json_writes_compact_json(tmp_path):
     text = out.read_text()
     assert "\n" not in text  # compact: single line
     assert json.loads(text) == payload
+
+
+def test_aligned_price_matrix_falls_back_to_the_last_earlier_price():
+    from scripts.generate_geography_data import aligned_price_matrix
+
+    dates = pd.date_range('2023-01-01', periods=4)
+    prices_data = {
+        'BRKB': {'2022-12-30': 300.0, '2023-01-02': 0.0, '2023-01-03': 310.0},
+        'ZERO': {'2023-01-01': 0.0},
+    }
+
+    prices = aligned_price_matrix(prices_data, dates, ['BRK-B', 'ZERO', 'NOPRICE'])
+
+    assert prices['BRK-B'].tolist() == [300.0, 300.0, 310.0, 310.0]
+    assert prices['ZERO'].isna().all()
+    assert prices['NOPRICE'].isna().all()
+
+
+def test_country_values_are_market_values_times_the_allocation_matrix(monkeypatch):
+    import scripts.generate_geography_data as ggd
+
+    monkeypatch.setattr(ggd, 'load_country_allocations', lambda: {})
+    monkeypatch.setattr(
+        ggd, 'get_country_for_ticker', lambda t, m: 'Fund' if t == 'VXUS' else 'United States'
+    )
+    monkeypatch.setattr(
+        ggd,
+        'get_etf_country_allocation',
+        lambda t: {'Japan': 50.0, 'United Kingdom': 49.995},
+    )
+    dates = pd.date_range('2023-01-01', periods=2)
+    holdings_df = pd.DataFrame({'AAPL': [1, 0], 'VXUS': [1, 1]}, index=dates)
+    prices_data = {
+        'AAPL': {'2023-01-01': 100.0, '2023-01-02': 100.0},
+        'VXUS': {'2023-01-01': 100.0, '2023-01-02': 100.0},
+    }
+
+    result = calculate_daily_geography(holdings_df, prices_data, {})
+
+    assert result[0]['total_value'] == 200.0
+    assert result[0]['United States'] == pytest.approx(100 * 100 / 199.995)
+    assert result[0]['Japan'] == pytest.approx(50 * 100 / 199.995)
+    # Day 2 is all VXUS: shares sum to 100% after rescaling.
+    assert set(result[1]) == {'date', 'total_value', 'Japan', 'United Kingdom'}
+    assert result[1]['Japan'] + result[1]['United Kingdom'] == pytest.approx(100.0)
+
+
+def test_countries_come_from_the_ticker_metadata(monkeypatch):
+    import scripts.generate_geography_data as ggd
+
+    monkeypatch.setattr(ggd, 'load_country_allocations', lambda: {})
+    metadata = {
+        'ASML': {'quoteType': 'EQUITY', 'country': 'netherlands'},
+        'NEWFUND': {'quoteType': 'ETF'},
+    }
+
+    assert ggd.get_country_for_ticker('ASML', metadata) == 'Netherlands'
+    assert ggd.get_country_for_ticker('NEWFUND', metadata) == 'Fund'
+    # Funds missing from fund_country_allocations.json have no allocation.
+    assert ggd.get_etf_country_allocation('NEWFUND') == {}
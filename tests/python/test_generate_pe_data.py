@@ -1,7 +1,9 @@
+import gzip
 import json
 import sys
 import tempfile
 import unittest
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict
 from unittest.mock import MagicMock, patch
@@ -17,12 +19,16 @@ from scripts.generate_pe_data import (  # noqa: E402
     EXEMPT_TICKERS,
     build_point_in_time_eps_series,
     calculate_harmonic_pe,
+    compute_portfolio_pe,
     cumulative_forward_split_factor,
+    eps_refresh_reason,
     fetch_stock_eps_data,
     is_etf,
+    next_report_date,
     write_pe_outputs,
     yf_symbol,
 )
+from scripts.utils.series_codec import decode_payload  # noqa: E402
 
 
 class TestGeneratePEData(unittest.TestCase):
@@ -111,6 +117,34 @@ class TestGeneratePEData(unittest.TestCase):
         assert pe is not None
         self.assertLess(pe, 50.0)
 
+    def test_compute_portfolio_pe_matrix(self) -> None:
+        """Weights, ticker P/E and the harmonic mean come out of one matrix pass."""
+        dates = pd.date_range("2024-01-01", periods=3)
+        holdings = pd.DataFrame(
+            {"VT": [10.0, 10.0, 10.0], "BRK-B": [0.0, 2.0, 2.0], "TINY": [0.01, 0.01, 0.01]},
+            index=dates,
+        )
+        prices = pd.DataFrame(
+            {"VT": [100.0, 100.0, 100.0], "BRKB": [None, 500.0, 500.0], "TINY": [5.0] * 3},
+            index=dates,
+        )
+        etf_pe = pd.DataFrame({"VT": [20.0, 20.0, 20.0]}, index=dates)
+        stock_eps = pd.DataFrame({"BRK-B": [25.0, -1.0, 25.0]}, index=dates)
+
+        result = compute_portfolio_pe(holdings, prices, ["VT", "BRK-B", "TINY"], etf_pe, stock_eps)
+
+        self.assertEqual(result["dates"], ["2024-01-01", "2024-01-02", "2024-01-03"])
+        # Day 3: VT 1000 @ 20x, BRK-B 1000 @ 500/25 = 20x; TINY ($0.05) is ignored.
+        expected = calculate_harmonic_pe(
+            {"VT": 1000.0, "BRK-B": 1000.0}, {"VT": 20.0, "BRK-B": 20.0}
+        )
+        assert expected is not None
+        self.assertEqual(result["portfolio_pe"], [20.0, 20.0, round(expected, 2)])
+        self.assertEqual(result["ticker_pe"]["BRK-B"], [None, None, 20.0])
+        self.assertEqual(result["ticker_weights"]["BRK-B"], [None, 0.5, 0.5])
+        self.assertEqual(result["ticker_weights"]["VT"], [1.0, 0.5, 0.5])
+        self.assertNotIn("TINY", result["ticker_pe"])
+
     def test_exempt_tickers_presence(self) -> None:
         """Verify that known non-equity assets are in the exempt list."""
         self.assertIn("SH", EXEMPT_TICKERS)
@@ -285,6 +319,80 @@ class TestGeneratePEData(unittest.TestCase):
         # Deep-history annual anchor (no quarterly coverage) kept as fallback.
         self.assertAlmostEqual(points["2010-12-31"], 3.0)
 
+    def test_eps_refresh_reason(self) -> None:
+        """Cached EPS is refetched only after a report, a split or the TTL."""
+        today = date(2024, 5, 10)
+        fresh = {"fetched_at": "2024-05-01", "next_report_date": "2024-07-25"}
+        self.assertIsNone(eps_refresh_reason(fresh, today))
+        self.assertEqual(eps_refresh_reason(None, today), "uncached")
+        self.assertEqual(eps_refresh_reason({"points": {}}, today), "uncached")
+        # Reported on 5/8, so the figure is posted by 5/9 and the 5/1 fetch is stale.
+        reported = {"fetched_at": "2024-05-01", "next_report_date": "2024-05-08"}
+        self.assertEqual(eps_refresh_reason(reported, today), "reported")
+        # Already refetched after that report: the stale calendar date is not re-triggered.
+        refetched = {"fetched_at": "2024-05-09", "next_report_date": "2024-05-08"}
+        self.assertIsNone(eps_refresh_reason(refetched, today))
+        self.assertEqual(eps_refresh_reason(fresh, today, pd.Timestamp("2024-05-05")), "split")
+        old = {"fetched_at": "2024-04-01", "next_report_date": "2024-07-25"}
+        self.assertEqual(eps_refresh_reason(old, today), "expired")
+        no_calendar = {"fetched_at": "2024-05-01", "next_report_date": None}
+        self.assertEqual(eps_refresh_reason(no_calendar, today), "expired")
+
+    def test_next_report_date_prefers_earnings_calendar(self) -> None:
+        today = date(2024, 5, 10)
+        calendar = pd.DataFrame(
+            {"Reported EPS": [None, None, 1.5]},
+            index=pd.to_datetime(["2024-10-24", "2024-07-25", "2024-04-25"]).tz_localize(
+                "America/New_York"
+            ),
+        )
+        self.assertEqual(next_report_date(calendar, {}, today), "2024-07-25")
+        stamp = datetime(2024, 8, 1, 12).timestamp()
+        self.assertEqual(
+            next_report_date(pd.DataFrame(), {"earningsTimestamp": stamp}, today), "2024-08-01"
+        )
+        self.assertIsNone(next_report_date(None, {}, today))
+
+    @patch("scripts.generate_pe_data.yf.Ticker")
+    @patch("scripts.generate_pe_data.load_eps_cache")
+    @patch("scripts.generate_pe_data.load_manual_patch")
+    @patch("scripts.generate_pe_data.save_eps_cache")
+    def test_fetch_eps_skips_fresh_cache_entries(
+        self, mock_save, mock_patch, mock_cache, mock_ticker
+    ) -> None:
+        """Fresh cache entries are served without touching yfinance unless forced."""
+        today = date.today().isoformat()
+        next_report = (date.today() + timedelta(days=30)).isoformat()
+        mock_cache.return_value = {
+            "AAPL": {
+                "points": {"2024-03-30": 6.4},
+                "current_ttm": 6.5,
+                "currency": "USD",
+                "fetched_at": today,
+                "next_report_date": next_report,
+            }
+        }
+        mock_patch.return_value = {}
+        mock_stock = MagicMock()
+        mock_stock.info = {"currency": "USD", "trailingEps": 7.0}
+        mock_stock.splits = pd.Series(dtype=float)
+        mock_stock.income_stmt = pd.DataFrame({"2023-12-31": [6.0]}, index=["Basic EPS"])
+        mock_stock.quarterly_income_stmt = pd.DataFrame()
+        mock_stock.get_earnings_dates.return_value = pd.DataFrame()
+        mock_ticker.return_value = mock_stock
+
+        results = fetch_stock_eps_data(["AAPL"])
+        mock_ticker.assert_not_called()
+        self.assertEqual(results["AAPL"]["current_ttm"], 6.5)
+
+        results = fetch_stock_eps_data(["AAPL"], force=True)
+        # One client per fanned-out sub-request, all for AAPL.
+        self.assertEqual({c.args for c in mock_ticker.call_args_list}, {("AAPL",)})
+        self.assertEqual(results["AAPL"]["current_ttm"], 7.0)
+        saved = mock_save.call_args.args[0]["AAPL"]
+        self.assertEqual(saved["fetched_at"], today)
+        self.assertIsNone(saved["next_report_date"])
+
     @patch("scripts.generate_pe_data.yf.Ticker")
     @patch("scripts.generate_pe_data.load_eps_cache")
     @patch("scripts.generate_pe_data.load_manual_patch")
@@ -340,10 +448,8 @@ class TestGeneratePEData(unittest.TestCase):
         self.assertNotIn("http://api.scraperapi.com", url)
 
     @patch("scripts.generate_pe_data.yf.Ticker")
-    def test_get_fx_history_success(self, mock_ticker):
-        from scripts.generate_pe_data import FX_CACHE, get_fx_history
-
-        FX_CACHE.clear()
+    def test_download_fx_pair_success(self, mock_ticker):
+        from scripts.generate_pe_data import _download_fx_pair
 
         mock_stock = MagicMock()
         mock_hist = pd.DataFrame(
@@ -352,47 +458,33 @@ class TestGeneratePEData(unittest.TestCase):
         mock_stock.history.return_value = mock_hist
         mock_ticker.return_value = mock_stock
 
-        result = get_fx_history("EURUSD=X")
-
-        self.assertIsNotNone(result)
-        self.assertEqual(len(result), 2)
+        result = _download_fx_pair("EURUSD=X", None)
         self.assertEqual(list(result), [1.2, 1.3])
-        # Check that index is normalized and tz-naive
-        self.assertIsNone(result.index.tz)
+        mock_stock.history.assert_called_once_with(period="max")
 
-        # Check cache hit
-        mock_ticker.reset_mock()
-        get_fx_history("EURUSD=X")
-        mock_ticker.assert_not_called()
+        _download_fx_pair("EURUSD=X", pd.Timestamp("2023-01-02"))
+        mock_stock.history.assert_called_with(start="2023-01-02")
 
     @patch("scripts.generate_pe_data.yf.Ticker")
-    def test_get_fx_history_exception(self, mock_ticker):
-        from scripts.generate_pe_data import FX_CACHE, get_fx_history
-
-        FX_CACHE.clear()
+    def test_download_fx_pair_exception(self, mock_ticker):
+        from scripts.generate_pe_data import _download_fx_pair
 
         mock_ticker.side_effect = Exception("Failed")
 
-        result = get_fx_history("EURUSD=X")
-
-        self.assertIsNone(result)
-
-    def test_get_closest_fx(self):
-        from scripts.generate_pe_data import get_closest_fx
-
-        fx_series = pd.Series([1.2, 1.3], index=pd.to_datetime(["2023-01-01", "2023-01-05"]))
-
-        # Exact match
-        self.assertEqual(get_closest_fx(fx_series, pd.Timestamp("2023-01-01")), 1.2)
+        self.assertIsNone(_download_fx_pair("EURUSD=X", None))
 
-        # Pad (forward fill)
-        self.assertEqual(get_closest_fx(fx_series, pd.Timestamp("2023-01-03")), 1.2)
+    def test_get_fx_history_uses_shared_store(self):
+        import scripts.generate_pe_data as module
+        from scripts.utils.fx_history import FxHistory
 
-        # Backfill
-        self.assertEqual(get_closest_fx(fx_series, pd.Timestamp("2022-12-31")), 1.2)
-
-        # Exception handling
-        self.assertEqual(get_closest_fx(pd.Series(dtype=float), pd.Timestamp("2023-01-01")), 1.0)
+        fetcher = MagicMock(return_value=pd.Series([1.2], index=pd.to_datetime(["2023-01-02"])))
+        store = FxHistory(path=Path(tempfile.mkdtemp()) / "fx.parquet", fetcher=fetcher)
+        with patch.object(module, "FX_STORE", store):
+            self.assertEqual(list(module.get_fx_history("EURUSD=X")), [1.2])
+            module.get_fx_history("EURUSD=X")
+            module.save_fx_history()
+        fetcher.assert_called_once_with("EURUSD=X", None)
+        self.assertTrue(store.path.exists())
 
     @patch("scripts.generate_pe_data.EPS_CACHE_PATH")
     def test_load_eps_cache_exists(self, mock_path):
@@ -558,13 +650,6 @@ class TestGeneratePEData(unittest.TestCase):
 
         self.assertIsNone(calculate_harmonic_pe({"A": 100}, {"A": 0}))
 
-    def test_get_closest_fx_exception(self):
-        from scripts.generate_pe_data import get_closest_fx
-
-        fx_series = pd.Series([1.2], index=pd.to_datetime(["2023-01-01"]))
-        with patch.object(pd.Index, 'get_indexer', side_effect=Exception("Failed")):
-            self.assertEqual(get_closest_fx(fx_series, pd.Timestamp("2023-01-01")), 1.0)
-
     @patch("scripts.generate_pe_data.HOLDINGS_DETAILS_PATH")
     def test_fetch_forward_pe_no_holdings_file(self, mock_path):
         from scripts.generate_pe_data import fetch_forward_pe
@@ -984,75 +1069,6 @@ class TestGeneratePEData(unittest.TestCase):
         self.assertEqual(res.iloc[1], 1.0)
 
 
-class TestFetchBenchmarkPEDaily(unittest.TestCase):
-    """Tests for fetch_benchmark_pe_daily — the orchestrator that fetches
-    proxy price/EPS and calls compute_benchmark_pe_from_proxy."""
-
-    @patch("scripts.generate_pe_data.yf.Ticker")
-    def test_produces_daily_granularity(self, mock_ticker) -> None:
-        """End-to-end: fetched proxy data produces daily PE variation."""
-        from scripts.generate_pe_data import fetch_benchmark_pe_daily
-
-        dates = pd.date_range("2024-06-01", "2024-06-10")
-
-        # Mock SPY price history
-        mock_stock = MagicMock()
-        price_data = pd.DataFrame(
-            {"Close": [530, 532, 528, 535, 531, 540, 538, 542, 537, 545]},
-            index=dates,
-        )
-        mock_stock.history.return_value = price_data
-        mock_stock.info = {"trailingPE": 27.0, "trailingEps": 20.0}
-        mock_stock.income_stmt = pd.DataFrame()
-        mock_stock.quarterly_income_stmt = pd.DataFrame()
-        mock_stock.splits = pd.Series(dtype=float)
-        mock_stock.get_earnings_dates.return_value = pd.DataFrame()
-        mock_ticker.return_value = mock_stock
-
-        result = fetch_benchmark_pe_daily("SPY", dates)
-
-        self.assertIsNotNone(result)
-        assert result is not None
-        self.assertEqual(len(result), 10)
-        # Should have daily variation (not flat stretches)
-        self.assertGreater(result.nunique(), 5)
-
-    @patch("scripts.generate_pe_data.yf.Ticker")
-    def test_fallback_to_manual_when_no_history(self, mock_ticker) -> None:
-        """When yfinance history fails, falls back to manual anchors."""
-        from scripts.generate_pe_data import fetch_benchmark_pe_daily
-
-        dates = pd.date_range("2024-01-01", "2024-01-05")
-
-        mock_stock = MagicMock()
-        mock_stock.history.return_value = pd.DataFrame()  # No history
-        mock_stock.info = {"trailingPE": 25.0, "trailingEps": None}
-        mock_stock.income_stmt = pd.DataFrame()
-        mock_stock.quarterly_income_stmt = pd.DataFrame()
-        mock_stock.splits = pd.Series(dtype=float)
-        mock_stock.get_earnings_dates.return_value = pd.DataFrame()
-        mock_ticker.return_value = mock_stock
-
-        manual = {"2024-01-01": 24.0, "2024-01-05": 25.0}
-        result = fetch_benchmark_pe_daily("SPY", dates, manual_anchors=manual)
-
-        self.assertIsNotNone(result)
-        assert result is not None
-        self.assertAlmostEqual(result.iloc[0], 24.0, places=1)
-        self.assertAlmostEqual(result.iloc[4], 25.0, places=1)
-
-    @patch("scripts.generate_pe_data.yf.Ticker")
-    def test_returns_none_on_total_failure(self, mock_ticker) -> None:
-        """Returns None when both proxy fetch and manual anchors fail."""
-        from scripts.generate_pe_data import fetch_benchmark_pe_daily
-
-        dates = pd.date_range("2024-01-01", "2024-01-05")
-        mock_ticker.side_effect = Exception("Network error")
-
-        result = fetch_benchmark_pe_daily("SPY", dates)
-        self.assertIsNone(result)
-
-
 class TestComputeBenchmarkPEFromProxy(unittest.TestCase):
     """Tests for compute_benchmark_pe_from_proxy — derives daily benchmark PE
     from a proxy ETF's price history and EPS, replacing the old approach of
@@ -1253,9 +1269,37 @@ class TestWritePeOutputs(unittest.TestCase):
             sidecar = Path(tmp) / "forward_pe.json"
             self.assertTrue(pe_file.exists())
             self.assertTrue(sidecar.exists())
-            self.assertEqual(json.loads(pe_file.read_text()), final_output)
+            written = json.loads(pe_file.read_text())
+            self.assertEqual(written["version"], 2)
+            self.assertEqual(decode_payload(written), final_output)
             self.assertEqual(json.loads(sidecar.read_text()), final_output["forward_pe"])
 
+    def test_precompress_writes_gzip_sibling(self) -> None:
+        final_output = {"dates": ["2024-01-02", "2024-01-03"], "portfolio_pe": [25.0, None]}
+        with tempfile.TemporaryDirectory() as tmp:
+            write_pe_outputs(final_output, Path(tmp), precompress=True)
+            pe_file = Path(tmp) / "pe_ratio.json"
+            gz_file = Path(tmp) / "pe_ratio.json.gz"
+            self.assertTrue(gz_file.exists())
+            self.assertEqual(gzip.decompress(gz_file.read_bytes()), pe_file.read_bytes())
+
+    def test_lod_levels_keep_non_series_keys(self) -> None:
+        final_output = {
+            "dates": ["2024-01-02", "2024-01-03", "2024-02-01"],
+            "portfolio_pe": [25.0, 27.0, 30.0],
+            "ticker_pe": {"AAPL": [30.0, 32.0, 34.0]},
+            "ticker_prices": {"AAPL": 190.5},
+            "forward_pe": {"ticker_forward_pe": {"AAPL": 30.1}},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            write_pe_outputs(final_output, Path(tmp))
+            monthly = decode_payload(json.loads((Path(tmp) / "pe_ratio.monthly.json").read_text()))
+            weekly = decode_payload(json.loads((Path(tmp) / "pe_ratio.weekly.json").read_text()))
+        self.assertEqual(monthly["portfolio_pe"], [26.0, 30.0])
+        for level in (weekly, monthly):
+            self.assertEqual(level["ticker_prices"], final_output["ticker_prices"])
+            self.assertEqual(level["forward_pe"], final_output["forward_pe"])
+
     def test_skips_sidecar_when_forward_pe_missing(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
             write_pe_outputs({"dates": ["2024-01-02"]}, Path(tmp))
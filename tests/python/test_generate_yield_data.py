@@ -1,4 +1,5 @@
 import json
+from datetime import date
 from unittest.mock import MagicMock, patch
 
 import numpy as np
@@ -52,12 +53,24 @@ def test_load_dividend_cache(mock_dirs):
 
 
 def test_save_dividend_cache(mock_dirs):
-    cache = {'AAPL': [['2020-01-01', 0.5]]}
+    cache = {
+        'AAPL': [['2020-01-01', 0.5], ['2020-04-01', 0.6]],
+        'TSLA': [],
+        '_fetched': {'AAPL': '2024-01-02'},
+    }
     generate_yield_data.save_dividend_cache(cache)
 
     with open(generate_yield_data.DIVIDEND_CACHE_PATH, 'r') as f:
-        data = json.load(f)
-    assert data == cache
+        raw = f.read()
+    assert '\n' not in raw
+    data = json.loads(raw)
+    assert data['version'] == 2
+    assert data['tickers']['AAPL'] == {
+        'fetched': '2024-01-02',
+        'days': [18262, 91],
+        'amounts': [0.5, 0.6],
+    }
+    assert generate_yield_data.load_dividend_cache() == cache
 
 
 def test_save_dividend_cache_error(mock_dirs):
@@ -294,3 +307,105 @@ def test_fetch_dividends_updates_stale():
             mock_ticker.assert_called_once_with('VT')
             assert updated_cache['VT'] == [['2020-01-01', 1.5], ['2026-03-20', 2.0]]
             mock_save.assert_called_once()
+
+
+def test_ttm_income_uses_shares_held_on_each_ex_date(mock_dirs):
+    """TTM income sums cash collected over (d - 365 days, d]; forward uses today's shares."""
+    generate_yield_data.HOLDINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    dates = pd.date_range(start='2020-01-01', end='2021-01-10')
+    shares = pd.Series(10.0, index=dates)
+    shares[dates >= '2020-06-01'] = 20.0
+    pd.DataFrame({'AAPL': shares}).to_parquet(generate_yield_data.HOLDINGS_PATH)
+    pd.DataFrame({'AAPL': 100.0}, index=dates).to_parquet(generate_yield_data.PRICES_PATH)
+
+    with (
+        patch('scripts.generate_yield_data.load_dividend_cache', return_value={}),
+        patch(
+            'scripts.generate_yield_data.fetch_dividends',
+            return_value={'AAPL': [['2019-12-01', 0.5], ['2020-01-05', 1.0], ['2020-07-01', 1.0]]},
+        ),
+    ):
+        generate_yield_data.calculate_yield_data()
+
+    with open(generate_yield_data.OUTPUT_FILE, 'r') as f:
+        data = {row['date']: row for row in json.load(f)}
+
+    # The pre-history 2019-12-01 dividend counts per share, but was never collected.
+    assert data['2020-01-04']['ttm_income'] == 0.0
+    assert data['2020-01-04']['forward_yield'] == pytest.approx(0.5)
+    assert data['2020-07-01']['ttm_income'] == 30.0  # 10 x 1.0 + 20 x 1.0
+    assert data['2020-07-01']['forward_yield'] == pytest.approx(2.5)
+    # 2020-01-05 has rolled out of the window.
+    assert data['2021-01-05']['ttm_income'] == 20.0
+    assert data['2021-01-05']['forward_yield'] == pytest.approx(1.0)
+
+
+def test_fetch_dividends_skips_fresh_closed_positions_and_tops_up_held():
+    today = date(2024, 6, 3)
+    cache = {
+        'OLD': [['2020-01-01', 1.0]],
+        'VT': [['2024-01-02', 0.2], ['2024-03-20', 0.3]],
+        '_fetched': {'OLD': '2024-05-20', 'VT': '2024-06-01'},
+    }
+    tail = pd.DataFrame(
+        {'Dividends': [0.31, 0.0, 0.25], 'Stock Splits': [0.0, 0.0, 0.0]},
+        index=pd.to_datetime(['2024-03-20', '2024-04-01', '2024-06-03']),
+    )
+
+    with (
+        patch('scripts.generate_yield_data.yf.Ticker') as mock_ticker,
+        patch('scripts.generate_yield_data.save_dividend_cache') as mock_save,
+    ):
+        mock_ticker.return_value.history.return_value = tail
+        res = generate_yield_data.fetch_dividends(['OLD', 'VT'], cache, held=['VT'], today=today)
+
+    mock_ticker.assert_called_once_with('VT')
+    mock_ticker.return_value.history.assert_called_once_with(start='2024-03-20', actions=True)
+    assert res['OLD'] == [['2020-01-01', 1.0]]
+    assert res['VT'] == [['2024-01-02', 0.2], ['2024-03-20', 0.31], ['2024-06-03', 0.25]]
+    assert res['_fetched'] == {'OLD': '2024-05-20', 'VT': '2024-06-03'}
+    mock_save.assert_called_once()
+
+
+def test_fetch_dividends_keeps_cache_when_tail_is_empty():
+    today = date(2024, 6, 3)
+    events = [['2024-01-02', 0.2], ['2024-03-20', 0.3]]
+    cache = {'VT': list(events), '_fetched': {'VT': '2024-06-01'}}
+
+    with (
+        patch('scripts.generate_yield_data.yf.Ticker') as mock_ticker,
+        patch('scripts.generate_yield_data.save_dividend_cache'),
+    ):
+        mock_ticker.return_value.history.return_value = pd.DataFrame()
+        res = generate_yield_data.fetch_dividends(['VT'], cache, today=today)
+
+    assert res['VT'] == events
+    assert res['_fetched'] == {'VT': '2024-06-01'}
+
+
+def test_fetch_dividends_refetches_history_after_split_or_ttl():
+    today = date(2024, 6, 3)
+    cache = {
+        'NVDA': [['2024-03-05', 0.04]],
+        'OLD': [['2020-01-01', 1.0]],
+        '_fetched': {'NVDA': '2024-06-01', 'OLD': '2024-01-01'},
+    }
+    full = pd.Series([0.004, 0.01], index=pd.to_datetime(['2024-03-05', '2024-06-11']))
+
+    with (
+        patch('scripts.generate_yield_data.yf.Ticker') as mock_ticker,
+        patch('scripts.generate_yield_data.save_dividend_cache'),
+    ):
+        mock_ticker.return_value.history.return_value = pd.DataFrame(
+            {'Dividends': [0.0], 'Stock Splits': [10.0]}, index=pd.to_datetime(['2024-06-10'])
+        )
+        mock_ticker.return_value.dividends = full
+        res = generate_yield_data.fetch_dividends(
+            ['NVDA', 'OLD'], cache, held=['NVDA'], today=today
+        )
+
+    assert res['NVDA'] == [['2024-03-05', 0.004], ['2024-06-11', 0.01]]
+    assert res['OLD'] == [['2024-03-05', 0.004], ['2024-06-11', 0.01]]
+    assert res['_fetched'] == {'NVDA': '2024-06-03', 'OLD': '2024-06-03'}
+    assert generate_yield_data.dividend_refresh_reason(None, False, today) == 'uncached'
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from scripts.utils.lod import (
+    MANIFEST_NAME,
+    downsample_payload,
+    downsample_records,
+    lod_path,
+    write_lod_levels,
+)
+
+# Mon 2024-01-01 .. Sun 2024-01-07 is one week; 2024-01-08 starts the next.
+DATES = ['2024-01-01', '2024-01-02', '2024-01-07', '2024-01-08', '2024-02-01']
+
+
+def test_payload_series_are_reduced_per_period_by_their_semantics():
+    payload = {
+        'dates': DATES,
+        'total_values': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'series': {'AAPL': [100.0, 50.0, 0.0, 0.0, 0.0], 'VT': [0.0, 50.0, 100.0, 100.0, 100.0]},
+        'ticker_pe': {'AAPL': [20.0, None, 30.0, None, None]},
+        'forward_pe': {'portfolio_forward_pe': 18.0},
+    }
+    how = {'total_values': 'last', 'series': 'mean', 'ticker_pe': 'mean'}
+
+    weekly = downsample_payload(payload, how, 'W')
+    monthly = downsample_payload(payload, how, 'M')
+
+    assert weekly['dates'] == ['2024-01-07', '2024-01-08', '2024-02-01']
+    assert weekly['total_values'] == [3.0, 4.0, 5.0]
+    assert weekly['series'] == {'AAPL': [50.0, 0.0, 0.0], 'VT': [50.0, 100.0, 100.0]}
+    # Nulls are skipped; a period without values stays null.
+    assert weekly['ticker_pe'] == {'AAPL': [25.0, None, None]}
+    assert weekly['forward_pe'] == payload['forward_pe']
+    assert monthly['dates'] == ['2024-01-08', '2024-02-01']
+    assert monthly['series']['AAPL'] == [37.5, 0.0]
+
+
+def test_records_sum_flows_per_name():
+    records = [
+        {'date': d, 'value': float(i), 'dividend': 1.0, 'by_ticker': {'KO': 0.5} if i < 2 else {}}
+        for i, d in enumerate(DATES)
+    ]
+    how = {'value': 'last', 'dividend': 'sum', 'by_ticker': 'sum'}
+
+    weekly = downsample_records(records, how, 'W')
+
+    assert weekly[0] == {
+        'date': '2024-01-07',
+        'value': 2.0,
+        'dividend': 3.0,
+        'by_ticker': {'KO': 1.0},
+    }
+    assert weekly[1] == {'date': '2024-01-08', 'value': 3.0, 'dividend': 1.0, 'by_ticker': {}}
+
+
+def test_levels_are_written_next_to_the_file_and_listed_in_the_manifest(tmp_path):
+    daily = [{'date': d, 'value': 1.0} for d in DATES]
+    path = tmp_path / 'balance.json'
+    path.write_text(json.dumps(daily))
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({'other.json': {}}))
+
+    written = write_lod_levels(
+        path, daily, lambda freq: downsample_records(daily, {'value': 'last'}, freq)
+    )
+
+    assert written == [lod_path(path, 'weekly'), lod_path(path, 'monthly')]
+    assert len(json.loads((tmp_path / 'balance.monthly.json').read_text())) == 2
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert manifest['other.json'] == {}
+    assert manifest['balance.json'] == {
+        'daily': {'path': 'balance.json', 'points': 5},
+        'weekly': {'path': 'balance.weekly.json', 'points': 3},
+        'monthly': {'path': 'balance.monthly.json', 'points': 2},
+    }
+
+
+def test_unknown_aggregation_is_rejected():
+    with pytest.raises(ValueError, match='Unknown aggregation'):
+        downsample_records([{'date': DATES[0], 'value': 1.0}], {'value': 'median'}, 'W')
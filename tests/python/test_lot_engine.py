@@ -0,0 +1,136 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scripts.portfolio.lot_engine as lot_engine
+
+
+def _transactions(rows):
+    """Build a split-adjusted frame: (day, order_type, security, qty, price)."""
+    return pd.DataFrame(
+        {
+            'trade_date': pd.to_datetime([r[0] for r in rows]),
+            'order_type': [r[1] for r in rows],
+            'security': [r[2] for r in rows],
+            'adjusted_quantity': [float(r[3]) for r in rows],
+            'trade_value': [float(r[3]) * float(r[4]) for r in rows],
+        }
+    )
+
+
+LADDER = _transactions(
+    [
+        ('2024-01-01', 'Buy', 'ACME', 10, 10.0),
+        ('2024-01-02', 'Buy', 'ACME', 10, 30.0),
+        ('2024-01-03', 'Buy', 'ACME', 10, 20.0),
+        ('2024-01-04', 'Sell', 'ACME', 15, 25.0),
+    ]
+)
+
+
+@pytest.mark.parametrize(
+    'method, expected_realized, expected_cost',
+    [
+        # FIFO: 10 @ 10 + 5 @ 30 = 250 cost; 375 - 250 = 125; left 5 @ 30 + 10 @ 20.
+        ('fifo', 125.0, 350.0),
+        # LIFO: 10 @ 20 + 5 @ 30 = 350 cost; left 10 @ 10 + 5 @ 30.
+        ('lifo', 25.0, 250.0),
+        # HIFO: 10 @ 30 + 5 @ 20 = 400 cost; left 10 @ 10 + 5 @ 20.
+        ('hifo', -25.0, 200.0),
+        # Average: 600 / 30 = 20 per share, 15 shares relieve 300.
+        ('average', 75.0, 300.0),
+    ],
+)
+def test_relief_methods(method, expected_realized, expected_cost):
+    matched = lot_engine.match_transactions(LADDER, method)
+
+    assert matched['realized_gain'].sum() == pytest.approx(expected_realized)
+    positions = lot_engine.summarize_positions(matched)
+    assert positions.loc['ACME', 'shares'] == pytest.approx(15.0)
+    assert positions.loc['ACME', 'cost_basis'] == pytest.approx(expected_cost)
+
+
+@pytest.mark.parametrize('method', lot_engine.LOT_METHODS)
+def test_oversold_shares_have_zero_cost_and_do_not_consume_later_buys(method):
+    transactions = _transactions(
+        [
+            ('2024-01-01', 'Buy', 'ACME', 5, 10.0),
+            ('2024-01-02', 'Sell', 'ACME', 8, 12.0),
+            ('2024-01-03', 'Buy', 'ACME', 4, 11.0),
+        ]
+    )
+
+    matched = lot_engine.match_transactions(transactions, method)
+
+    # 5 shares at cost 10 plus 3 unmatched shares at zero cost: 96 - 50.
+    assert matched['realized_gain'].tolist() == pytest.approx([0.0, 46.0, 0.0])
+    assert matched['open_shares'].tolist() == pytest.approx([5.0, 0.0, 4.0])
+    assert matched['open_cost'].tolist() == pytest.approx([50.0, 0.0, 44.0])
+
+
+@pytest.mark.parametrize('method', lot_engine.LOT_METHODS)
+def test_zero_value_trades_are_ignored(method):
+    # calculate_stats skipped trades with a zero price; they must not relieve lots.
+    result = lot_engine.match_lots(
+        ['A'] * 4, [10, 5, 3, 5], [100, 0, 0, 60], [True, False, True, False], method
+    )
+
+    assert result.realized.tolist() == pytest.approx([0.0, 0.0, 0.0, 10.0])
+    assert result.open_shares.tolist() == pytest.approx([10.0, 10.0, 10.0, 5.0])
+    assert result.open_cost.tolist() == pytest.approx([100.0, 100.0, 100.0, 50.0])
+
+
+def test_fifo_matches_a_reference_deque_on_random_trades():
+    rng = np.random.default_rng(11)
+    n_rows = 3000
+    securities = rng.integers(0, 12, n_rows)
+    quantities = rng.uniform(1, 50, n_rows)
+    values = quantities * rng.uniform(5, 15, n_rows)
+    is_buy = rng.random(n_rows) < 0.55
+
+    result = lot_engine.match_lots(securities, quantities, values, is_buy, 'fifo')
+
+    lots: dict = {}
+    expected = np.zeros(n_rows)
+    for row in range(n_rows):
+        book = lots.setdefault(securities[row], deque())
+        if is_buy[row]:
+            book.append([quantities[row], values[row] / quantities[row]])
+            continue
+        remaining, cost = quantities[row], 0.0
+        while remaining > 1e-9 and book:
+            used = min(remaining, book[0][0])
+            cost += used * book[0][1]
+            book[0][0] -= used
+            remaining -= used
+            if book[0][0] <= 1e-9:
+                book.popleft()
+        expected[row] = values[row] - cost
+
+    np.testing.assert_allclose(result.realized, expected, atol=1e-6)
+
+
+def test_match_lots_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        lot_engine.match_lots(['ACME'], [1.0], [1.0], [True], 'random')
+
+
+def test_build_daily_pnl_splits_realized_and_unrealized():
+    transactions = _transactions(
+        [
+            ('2024-01-01', 'Buy', 'ACME', 10, 10.0),
+            ('2024-01-02', 'Sell', 'ACME', 4, 12.0),
+        ]
+    )
+    prices = pd.DataFrame(
+        {'ACME': [10.0, 12.0, 15.0]}, index=pd.date_range('2024-01-01', periods=3)
+    )
+
+    matched = lot_engine.match_transactions(transactions)
+    realized, unrealized = lot_engine.build_daily_pnl(matched, prices, prices.index)
+
+    assert realized['ACME'].tolist() == pytest.approx([0.0, 8.0, 8.0])
+    # 6 remaining shares cost 60: worth 72 on day 2 and 90 on day 3.
+    assert unrealized['ACME'].tolist() == pytest.approx([0.0, 12.0, 30.0])
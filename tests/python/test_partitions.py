@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from scripts.utils.partitions import INDEX_NAME, split_by_year, write_year_partitions
+from scripts.utils.precompress import PRECOMPRESS_ENV
+from scripts.utils.series_codec import decode_payload, encode_stacked_payload
+
+PAYLOAD = {
+    'dates': ['2023-12-30', '2023-12-31', '2024-01-01'],
+    'total_values': [1.0, 2.0, 3.0],
+    'series': {'AAPL': [100.0, 60.0, 0.0], 'VT': [0.0, 40.0, 100.0]},
+    'forward_pe': {'portfolio_forward_pe': 18.0},
+}
+
+
+def test_columnar_payloads_are_sliced_and_other_keys_copied():
+    years = split_by_year(PAYLOAD)
+
+    assert list(years) == ['2023', '2024']
+    assert years['2024'] == {
+        'dates': ['2024-01-01'],
+        'total_values': [3.0],
+        'series': {'AAPL': [0.0], 'VT': [100.0]},
+        'forward_pe': {'portfolio_forward_pe': 18.0},
+    }
+
+
+def test_named_record_series_are_split_per_name():
+    series = {
+        'USD': [{'date': '2023-12-31', 'value': 1}, {'date': '2024-01-02', 'value': 2}],
+        'JPY': [{'date': '2024-01-02', 'value': 3}],
+    }
+
+    assert split_by_year(series) == {
+        '2023': {'USD': [{'date': '2023-12-31', 'value': 1}]},
+        '2024': {
+            'USD': [{'date': '2024-01-02', 'value': 2}],
+            'JPY': [{'date': '2024-01-02', 'value': 3}],
+        },
+    }
+
+
+def test_only_changed_years_are_rewritten(tmp_path):
+    path = tmp_path / 'composition.json'
+    directory = tmp_path / 'composition'
+
+    written = write_year_partitions(path, PAYLOAD, encode_stacked_payload)
+    assert written == [directory / '2023.json', directory / '2024.json']
+    assert decode_payload(json.loads((directory / '2024.json').read_text()))['series'] == {
+        'AAPL': [0.0],
+        'VT': [100.0],
+    }
+
+    extended = {
+        **PAYLOAD,
+        'dates': PAYLOAD['dates'] + ['2024-01-02'],
+        'total_values': [1.0, 2.0, 3.0, 4.0],
+        'series': {'AAPL': [100.0, 60.0, 0.0, 0.0], 'VT': [0.0, 40.0, 100.0, 100.0]},
+    }
+    assert write_year_partitions(path, extended, encode_stacked_payload) == [
+        directory / '2024.json'
+    ]
+
+    index = json.loads((directory / INDEX_NAME).read_text())
+    assert index['artifact'] == 'composition.json'
+    assert index['years'][-1] == {
+        'year': '2024',
+        'path': '2024.json',
+        'points': 2,
+        'start': '2024-01-01',
+        'end': '2024-01-02',
+    }
+
+
+def test_enabling_compression_adds_siblings_to_unchanged_partitions(tmp_path, monkeypatch):
+    path = tmp_path / 'composition.json'
+    directory = tmp_path / 'composition'
+    monkeypatch.delenv(PRECOMPRESS_ENV, raising=False)
+    write_year_partitions(path, PAYLOAD, encode_stacked_payload)
+
+    monkeypatch.setenv(PRECOMPRESS_ENV, '1')
+    assert write_year_partitions(path, PAYLOAD, encode_stacked_payload) == []
+
+    for name in ('2023.json', '2024.json', INDEX_NAME):
+        assert (directory / f'{name}.gz').exists()
+
+
+def test_years_no_longer_present_are_removed(tmp_path):
+    path = tmp_path / 'yield_data.json'
+    (tmp_path / 'yield_data').mkdir()
+    (tmp_path / 'yield_data' / '2019.json').write_text('[]')
+
+    write_year_partitions(path, [{'date': '2024-05-01', 'forward_yield': 1.5}])
+
+    assert sorted(p.name for p in (tmp_path / 'yield_data').iterdir()) == ['2024.json', INDEX_NAME]
+
+
+def test_unsupported_data_is_rejected():
+    with pytest.raises(TypeError, match='Cannot partition'):
+        split_by_year('2024')
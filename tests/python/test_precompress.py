@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+
+from scripts.utils.precompress import (
+    GZIP_LEVEL_ENV,
+    PRECOMPRESS_ENV,
+    export_json,
+    export_text,
+    export_text_if_changed,
+    write_precompressed,
+)
+
+
+def test_gzip_sibling_is_deterministic(tmp_path):
+    path = tmp_path / 'chart.json'
+    path.write_text('{"dates":[]}' * 100)
+
+    first = write_precompressed(path)
+    blob = (tmp_path / 'chart.json.gz').read_bytes()
+    write_precompressed(path)
+
+    assert tmp_path / 'chart.json.gz' in first
+    assert gzip.decompress(blob) == path.read_bytes()
+    assert (tmp_path / 'chart.json.gz').read_bytes() == blob
+
+
+def test_export_writes_siblings_only_when_enabled(tmp_path, monkeypatch):
+    path = tmp_path / 'chart.json'
+
+    written = export_json(path, {'dates': []}, precompress=True, separators=(',', ':'))
+    assert written[:2] == [path, tmp_path / 'chart.json.gz']
+    assert gzip.decompress((tmp_path / 'chart.json.gz').read_bytes()) == b'{"dates":[]}'
+
+    # A later write without compression removes the now stale sibling.
+    monkeypatch.delenv(PRECOMPRESS_ENV, raising=False)
+    assert export_text(path, 'changed') == [path]
+    assert not (tmp_path / 'chart.json.gz').exists()
+
+    monkeypatch.setenv(PRECOMPRESS_ENV, '1')
+    monkeypatch.setenv(GZIP_LEVEL_ENV, '1')
+    assert tmp_path / 'chart.json.gz' in export_text(path, 'changed')
+    assert not list(tmp_path.glob('.*.tmp'))
+
+
+def test_unchanged_files_still_follow_the_compression_setting(tmp_path):
+    path = tmp_path / '2023.json'
+    gz_path = tmp_path / '2023.json.gz'
+
+    assert export_text_if_changed(path, 'closed year', precompress=False)
+    assert not gz_path.exists()
+
+    # Enabling compression later adds siblings although the text is the same...
+    assert not export_text_if_changed(path, 'closed year', precompress=True)
+    assert gzip.decompress(gz_path.read_bytes()) == b'closed year'
+
+    # ...and disabling it removes them again.
+    assert not export_text_if_changed(path, 'closed year', precompress=False)
+    assert not gz_path.exists()
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = tmp_path / 'chart.json'
+    path.write_text('old')
+
+    with pytest.raises(TypeError):
+        export_json(path, {'bad': object()})
+
+    assert path.read_text() == 'old'
+    assert [p.name for p in tmp_path.iterdir()] == ['chart.json']
@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scripts.ratios.rolling_metrics as rm
+
+
+def _brute_force_drawdown(column, span):
+    out = np.full(len(column), np.nan)
+    for end in range(span - 1, len(column)):
+        window = column[end - span + 1 : end + 1]
+        peaks = np.maximum.accumulate(window)
+        out[end] = (window / peaks - 1.0).min()
+    return out
+
+
+def _brute_force_std(column, window):
+    returns = column[1:] / column[:-1] - 1.0
+    out = np.full(len(column), np.nan)
+    for end in range(window, len(column)):
+        out[end] = returns[end - window : end].std(ddof=1)
+    return out
+
+
+@pytest.fixture
+def random_levels():
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.012, size=(300, 3))
+    return np.cumprod(1.0 + returns, axis=0)
+
+
+def test_rolling_returns_matches_shifted_ratio(random_levels):
+    result = rm.rolling_returns(random_levels, 5)
+    assert np.isnan(result[:5]).all()
+    np.testing.assert_allclose(result[5:], random_levels[5:] / random_levels[:-5] - 1.0)
+
+
+@pytest.mark.parametrize('window', [2, 7, 21, 63])
+def test_rolling_max_drawdown_matches_brute_force(random_levels, window):
+    result = rm.rolling_max_drawdown(random_levels, window)
+    for col in range(random_levels.shape[1]):
+        expected = _brute_force_drawdown(random_levels[:, col], window + 1)
+        np.testing.assert_allclose(result[:, col], expected, equal_nan=True, atol=1e-12)
+
+
+@pytest.mark.parametrize('window', [2, 21, 63])
+def test_rolling_std_matches_brute_force(random_levels, window):
+    _, std = rm.rolling_mean_std(random_levels, window)
+    for col in range(random_levels.shape[1]):
+        expected = _brute_force_std(random_levels[:, col], window)
+        np.testing.assert_allclose(std[:, col], expected, equal_nan=True, atol=1e-12)
+
+
+def test_windows_touching_missing_history_are_blank():
+    values = np.array([[np.nan], [np.nan], [100.0], [110.0], [99.0], [120.0]])
+    returns = rm.rolling_returns(values, 2)
+    drawdown = rm.rolling_max_drawdown(values, 2)
+    _, std = rm.rolling_mean_std(values, 2)
+
+    assert np.isnan(returns[:4, 0]).all()
+    assert returns[4, 0] == pytest.approx(-0.01)
+    assert drawdown[4, 0] == pytest.approx(-0.1)
+    assert np.isnan(std[:4, 0]).all()
+    assert np.isfinite(std[4:, 0]).all()
+
+
+def test_compute_rolling_metrics_annualizes_long_windows():
+    index = pd.bdate_range('2020-01-01', periods=300)
+    levels = pd.DataFrame({'^LZ': 1.0005 ** np.arange(300)}, index=index)
+
+    metrics = rm.compute_rolling_metrics(levels, windows={'1M': 21, '1Y': 252})
+
+    assert metrics['1M']['return']['^LZ'].iloc[-1] == pytest.approx(1.0005**21 - 1.0)
+    assert metrics['1Y']['return']['^LZ'].iloc[-1] == pytest.approx(1.0005**252 - 1.0)
+    assert metrics['1Y']['max_drawdown']['^LZ'].iloc[-1] == pytest.approx(0.0)
+    assert metrics['1Y']['volatility']['^LZ'].iloc[-1] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_align_to_business_days_forward_fills_without_backfill():
+    frame = pd.DataFrame(
+        {'^GSPC': [np.nan, 10.0, 11.0], '^LZ': [1.0, 1.1, 1.2]},
+        index=pd.to_datetime(['2024-01-05', '2024-01-06', '2024-01-08']),
+    )
+
+    aligned = rm.align_to_business_days(frame)
+
+    assert list(aligned.columns) == ['^LZ', '^GSPC']
+    assert list(aligned.index.strftime('%Y-%m-%d')) == ['2024-01-05', '2024-01-08']
+    assert np.isnan(aligned.loc['2024-01-05', '^GSPC'])
+    assert aligned.loc['2024-01-08', '^LZ'] == pytest.approx(1.2)
+
+
+def test_main_writes_payload(tmp_path, monkeypatch):
+    index = pd.date_range('2023-01-02', periods=60, freq='D')
+    pd.DataFrame({'twrr': np.linspace(1.0, 1.3, 60)}, index=index).to_parquet(
+        tmp_path / 'twrr_series.parquet'
+    )
+    pd.DataFrame(
+        {'^GSPC': np.linspace(100.0, 90.0, 60), 'AAPL': np.linspace(1.0, 2.0, 60)},
+        index=index,
+    ).to_parquet(tmp_path / 'historical_prices.parquet')
+
+    monkeypatch.setattr(rm, 'TWRR_PATH', tmp_path / 'twrr_series.parquet')
+    monkeypatch.setattr(rm, 'PRICES_PATH', tmp_path / 'historical_prices.parquet')
+    monkeypatch.setattr(rm, 'OUTPUT_DIR', tmp_path / 'output')
+    monkeypatch.setattr(rm, 'OUTPUT_PATH', tmp_path / 'output' / 'rolling_metrics.json')
+
+    rm.main()
+
+    payload = json.loads((tmp_path / 'output' / 'rolling_metrics.json').read_text())
+    assert set(payload['series']) == {'^LZ', '^GSPC'}
+    assert payload['windows']['1M'] == 21
+    one_month = payload['series']['^GSPC']['1M']
+    assert len(one_month['return']) == len(payload['dates'])
+    assert one_month['return'][0] is not None and one_month['return'][0] < 0
+    assert all(value is None for value in payload['series']['^LZ']['1Y']['return'])
+
+
+def test_load_series_frame_requires_twrr(tmp_path, monkeypatch):
+    monkeypatch.setattr(rm, 'TWRR_PATH', tmp_path / 'missing.parquet')
+    with pytest.raises(FileNotFoundError):
+        rm.load_series_frame()
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from scripts.utils import series_codec as codec
+
+
+def test_series_become_offset_runs_of_quantized_values():
+    runs = codec.encode_series([None, None, 1.25, 1.5, None, 2.0, float('nan')], 2)
+
+    assert runs == [[2, [125, 150]], [5, [200]]]
+    assert codec.decode_series(runs, 7, 2) == [None, None, 1.25, 1.5, None, 2.0, None]
+
+
+def test_consecutive_dates_collapse_to_start_and_count():
+    dates = ['2024-02-28', '2024-02-29', '2024-03-01']
+
+    assert codec.encode_dates(dates) == {'start': '2024-02-28', 'count': 3}
+    assert codec.decode_dates(codec.encode_dates(dates)) == dates
+    gapped = ['2024-01-01', '2024-01-03']
+    assert codec.encode_dates(gapped) == gapped
+
+
+def test_payload_round_trip_is_exact_at_the_declared_precision():
+    payload = {
+        'dates': ['2024-01-01', '2024-01-02', '2024-01-03'],
+        'portfolio_pe': [21.37, None, 22.05],
+        'ticker_weights': {'AAPL': [None, 0.12345, 0.5], 'VT': [1.0, 0.87655, 0.5]},
+        'forward_pe': {'portfolio_forward_pe': 19.8},
+    }
+
+    encoded = codec.encode_payload(payload, {'portfolio_pe': 2, 'ticker_weights': 5})
+    decoded = codec.decode_payload(json.loads(json.dumps(encoded)))
+
+    assert encoded['version'] == codec.CODEC_VERSION
+    assert encoded['ticker_weights']['series']['AAPL'] == [[1, [12345, 50000]]]
+    assert encoded['forward_pe'] == payload['forward_pe']
+    assert decoded == payload
+
+
+def test_v1_payloads_pass_through_decode():
+    payload = {'dates': ['2024-01-01'], 'portfolio_pe': [20.0]}
+
+    assert codec.decode_payload(payload) is payload
+
+
+@pytest.mark.parametrize('value', [True, 'x', float('inf')])
+def test_non_numeric_values_are_gaps(value):
+    assert codec.encode_series([1.0, value, 2.0], 1) == [[0, [10]], [2, [20]]]
+
+
+def test_stacked_series_drop_zeros_and_store_deltas():
+    values = [0.0, 10.0, 10.5, 0.0004, 0.0, 12.25]
+
+    runs = codec.encode_series(values, 3, fill=0, delta=True)
+
+    assert runs == [[1, [10000, 500]], [5, [12250]]]
+    assert codec.decode_series(runs, 6, 3, fill=0, delta=True) == [
+        0,
+        10.0,
+        10.5,
+        0,
+        0,
+        12.25,
+    ]
+
+
+def test_stacked_payload_round_trip():
+    payload = {
+        'dates': ['2024-01-01', '2024-01-02'],
+        'total_values': [1000.123, 1010.5],
+        'series': {'AAPL': [0.0, 40.0], 'VT': [100.0, 60.0]},
+    }
+
+    encoded = json.loads(json.dumps(codec.encode_stacked_payload(payload)))
+
+    assert encoded['series']['fill'] == 0 and encoded['series']['delta'] is True
+    assert encoded['series']['series']['VT'] == [[0, [100000, -40000]]]
+    decoded = codec.decode_payload(encoded)
+    assert decoded['series'] == payload['series']
+    assert decoded['total_values'] == [1000.12, 1010.5]
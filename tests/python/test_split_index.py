@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.utils import split_index as si
+
+CSV = """Symbol,Split Date,Split Ratio,Split Multiplier,Notes
+NVDA,2021-07-20,4:1,4.0,4-for-1 split
+NVDA,2024-06-10,10:1,10.0,10-for-1 split
+BRK-B,2010-01-21,50:1,,ratio only
+"""
+
+
+@pytest.fixture
+def split_csv(tmp_path):
+    path = tmp_path / 'split_history.csv'
+    path.write_text(CSV)
+    return path
+
+
+def test_factor_compounds_every_split_strictly_after_the_date(split_csv):
+    index = si.SplitIndex.from_csv(split_csv)
+
+    factors = index.factor(
+        'NVDA', pd.to_datetime(['2021-01-01', '2021-07-20', '2022-01-01', '2024-06-10'])
+    )
+
+    # A trade on the split date itself is already in the post-split basis.
+    np.testing.assert_allclose(factors, [40.0, 10.0, 10.0, 1.0])
+
+
+def test_ratio_column_is_used_when_multiplier_is_blank(split_csv):
+    index = si.SplitIndex.from_csv(split_csv)
+
+    assert index.factor_at('BRKB', '2009-12-31') == pytest.approx(50.0)
+    assert index.factor_at('BRK.B', '2009-12-31') == pytest.approx(50.0)
+
+
+def test_unknown_symbols_and_missing_files_are_neutral(tmp_path):
+    index = si.SplitIndex.from_csv(tmp_path / 'missing.csv')
+
+    assert len(index) == 0
+    np.testing.assert_allclose(index.factor('AAPL', ['2020-01-01', '2021-01-01']), [1.0, 1.0])
+
+
+def test_factors_for_matches_each_row_to_its_symbol(split_csv):
+    index = si.SplitIndex.from_csv(split_csv)
+
+    factors = index.factors_for(
+        ['NVDA', 'AAPL', 'nvda', 'NVDA'],
+        pd.to_datetime(['2020-01-01', '2020-01-01', '2023-01-01', '2025-01-01']),
+    )
+
+    np.testing.assert_allclose(factors, [40.0, 1.0, 10.0, 1.0])
+
+
+def test_vendor_splits_fill_gaps_without_duplicating_curated_events(split_csv):
+    index = si.SplitIndex.from_csv(split_csv)
+    vendor = pd.Series(
+        [4.0, 10.0, 2.0],
+        index=pd.to_datetime(['2021-07-20', '2024-06-11', '2026-01-05']).tz_localize(
+            'America/New_York'
+        ),
+    )
+
+    index.merge_vendor_splits('NVDA', vendor)
+
+    # The 2024 vendor date is a day off the curated one and is treated as the same split.
+    assert index.factor_at('NVDA', '2021-01-01') == pytest.approx(80.0)
+    assert index.last_split_date('NVDA') == pd.Timestamp('2026-01-05')
+
+
+def test_load_split_index_is_cached_until_the_file_changes(split_csv):
+    first = si.load_split_index(split_csv)
+    assert si.load_split_index(split_csv) is first
+
+    split_csv.write_text(CSV + 'ANET,2024-12-04,4:1,4.0,\n')
+    stat = split_csv.stat()
+    os.utime(split_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    refreshed = si.load_split_index(split_csv)
+    assert refreshed is not first
+    assert 'ANET' in refreshed
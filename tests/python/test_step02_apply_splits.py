@@ -71,7 +71,7 @@ class TestStep02ApplySplits(unittest.TestCase):
 
     def test_apply_split_adjustments_vectorized(self):
         """
-        Verify the vectorized logic of apply_split_adjustments using mocks.
+        Verify apply_split_adjustments delegates to the shared split index using mocks.
         """
         # We must patch sys.modules BEFORE importing the script because it has top-level imports
         # Using a new name to avoid conflict with class-level mocks if any
@@ -81,60 +81,34 @@ class TestStep02ApplySplits(unittest.TestCase):
             # Ensure the module is reloaded with our mocks
             if "scripts.twrr.step02_apply_splits" in sys.modules:
                 del sys.modules["scripts.twrr.step02_apply_splits"]
-            from scripts.twrr.step02_apply_splits import apply_split_adjustments
+            import scripts.twrr.step02_apply_splits as step02
 
             # Setup mock transactions and splits
             transactions = MagicMock()
             transactions.copy.return_value = transactions
-            transactions.__getitem__.side_effect = lambda key: MagicMock()
-            transactions.index = MagicMock()
+            security_column = MagicMock()
+            trade_date_column = MagicMock()
+            transactions.__getitem__.side_effect = lambda key: {
+                'security': security_column,
+                'trade_date': trade_date_column,
+            }.get(key, MagicMock())
 
             splits = MagicMock()
             splits.empty = False
 
-            # Mock groupby
-            sec_splits = MagicMock()
-            splits.groupby.return_value = [("AAPL", sec_splits)]
-
-            # Mock transaction indexing
-            transactions.index.__getitem__.return_value = [0, 1, 2]
-
-            # Mock trade_dates
-            trade_dates = MagicMock()
-            transactions.loc.__getitem__.return_value.to_numpy.return_value = trade_dates
-
-            # Mock np.ones
-            factors = MagicMock()
-            local_mock_np.ones.return_value = factors
-
-            # Mock sec_splits sort and to_numpy
-            sec_splits.sort_values.return_value = sec_splits
-            split_dates = MagicMock()
-            split_factors = MagicMock()
-            sec_splits.__getitem__.side_effect = lambda key: {
-                'split_date': MagicMock(to_numpy=lambda: split_dates),
-                'split_factor': MagicMock(to_numpy=lambda: split_factors),
-            }[key]
-
-            # Mock np.cumprod and np.searchsorted
-            rev_cum_factors = MagicMock()
-            local_mock_np.cumprod.return_value = rev_cum_factors
-            rev_cum_factors.__getitem__.return_value = rev_cum_factors
-
-            split_indices = MagicMock()
-            local_mock_np.searchsorted.return_value = split_indices
-
-            # Mock valid_mask
-            valid_mask = MagicMock()
-            split_indices.__lt__.return_value = valid_mask
-
-            # Run the function
-            apply_split_adjustments(transactions, splits)
-
-            # Assertions to ensure vectorized calls were made
-            local_mock_np.cumprod.assert_called()
-            local_mock_np.searchsorted.assert_called_with(split_dates, trade_dates, side='right')
-            transactions.loc.__setitem__.assert_called()
+            with patch.object(step02, 'SplitIndex') as mock_split_index:
+                factors = MagicMock()
+                mock_split_index.from_frame.return_value.factors_for.return_value = factors
+
+                # Run the function
+                step02.apply_split_adjustments(transactions, splits)
+
+            # The index is built once and queried with whole columns, not per row.
+            mock_split_index.from_frame.assert_called_once_with(splits)
+            mock_split_index.from_frame.return_value.factors_for.assert_called_once_with(
+                security_column, trade_date_column
+            )
+            transactions.__setitem__.assert_any_call('split_adjustment_factor', factors)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+TWRR_DIR = PROJECT_ROOT / 'scripts' / 'twrr'
+
+
+def _load_step06b():
+    """Load step-06b by path with scripts/twrr/utils.py bound as 'utils' (see test_twrr_acceptance)."""
+    utils_spec = importlib.util.spec_from_file_location('twrr_step06b_utils', TWRR_DIR / 'utils.py')
+    twrr_utils = importlib.util.module_from_spec(utils_spec)
+    utils_spec.loader.exec_module(twrr_utils)
+
+    spec = importlib.util.spec_from_file_location(
+        'twrr_step06b_total_return', TWRR_DIR / 'step06b_total_return.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    previous_utils = sys.modules.get('utils')
+    sys.modules['utils'] = twrr_utils
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        if previous_utils is None:
+            del sys.modules['utils']
+        else:
+            sys.modules['utils'] = previous_utils
+    return module
+
+
+step06b = _load_step06b()
+
+DATES = pd.date_range('2024-01-01', periods=4)
+# ACME closes 10, 10, 9.50, 10 and pays $0.50 with ex-date day 3. Yahoo scales
+# the closes before day 3 by 1 - 0.50/10 = 0.95.
+CLOSES = [10.0, 10.0, 9.5, 10.0]
+ADJ_CLOSES = [9.5, 9.5, 9.5, 10.0]
+DIVIDENDS = pd.DataFrame({'ACME': [0.0, 0.0, 0.5, 0.0]}, index=DATES)
+
+
+def test_unadjusted_prices_undo_the_dividend_adjustment():
+    adjusted = pd.DataFrame({'ACME': ADJ_CLOSES, 'FUNDX': CLOSES}, index=DATES)
+    dividends = DIVIDENDS.assign(FUNDX=[0.0, 0.0, 0.5, 0.0])
+
+    prices = step06b.unadjusted_prices(adjusted, dividends)
+
+    assert prices['ACME'].tolist() == pytest.approx(CLOSES)
+    # Mutual funds are stored as Close already.
+    assert prices['FUNDX'].tolist() == pytest.approx(CLOSES)
+
+
+def test_dividends_count_as_return_when_paid_out_or_reinvested():
+    # Buy 10 ACME at $10 on day 1 and hold through the ex-date.
+    holdings = pd.DataFrame({'ACME': [10.0] * 4}, index=DATES)
+    adjusted = pd.DataFrame({'ACME': ADJ_CLOSES}, index=DATES)
+    cashflow = pd.Series([-100.0, 0.0, 0.0, 0.0], index=DATES)
+
+    result = step06b.compute_total_return(holdings, adjusted, cashflow, DIVIDENDS)
+
+    # Price only: $100 -> $100.
+    assert result['price'].iloc[-1] == pytest.approx(1.0)
+    # Cash: day 3 is (95 + 5) / 100 = 1, day 4 is 100 / 95.
+    assert result['cash'].tolist() == pytest.approx([1.0, 1.0, 1.0, 100 / 95])
+    # DRIP: $5 buys 5/9.5 shares, so 10.526 shares are worth $105.26 on day 4.
+    assert result['drip'].iloc[-1] == pytest.approx(100 / 95)
+
+
+def test_drip_books_the_extra_shares_of_a_sale_as_a_withdrawal():
+    # Same position, half sold at $10 on day 4 for $50.
+    holdings = pd.DataFrame({'ACME': [10.0, 10.0, 10.0, 5.0]}, index=DATES)
+    adjusted = pd.DataFrame({'ACME': ADJ_CLOSES}, index=DATES)
+    cashflow = pd.Series([-100.0, 0.0, 0.0, 50.0], index=DATES)
+
+    result = step06b.compute_total_return(holdings, adjusted, cashflow, DIVIDENDS)
+
+    # Cash: day 4 is 5 x $10 / (95 - 50). DRIP sells half of its 10.526
+    # shares, the extra 0.263 as a further $2.63 withdrawal:
+    # 52.63 / (100 - 52.63) is the same factor.
+    assert result['cash'].iloc[-1] == pytest.approx(50 / 45)
+    assert result['drip'].iloc[-1] == pytest.approx(50 / 45)
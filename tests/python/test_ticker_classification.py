@@ -0,0 +1,101 @@
+import json
+import threading
+from datetime import date
+
+import pytest
+
+from scripts.utils.fetch_scheduler import FetchScheduler, TickerRequests
+from scripts.utils.ticker_classification import (
+    INFO_REQUEST,
+    classify_tickers,
+    refresh_reason,
+)
+
+TODAY = date(2026, 1, 10)
+
+INFO = {
+    'AAPL': {'sector': 'Technology', 'country': 'United States', 'quoteType': 'EQUITY'},
+    'BRK-B': {'sector': 'Financial Services', 'country': 'United States', 'quoteType': 'EQUITY'},
+    'VT': {'sector': None, 'quoteType': 'ETF', 'longName': 'Vanguard Total World Stock'},
+}
+
+
+class FakeTicker:
+    calls: list[tuple[str, str]] = []
+    lock = threading.Lock()
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def _record(self, name):
+        with self.lock:
+            self.calls.append((self.symbol, name))
+
+    @property
+    def info(self):
+        self._record('info')
+        if self.symbol not in INFO:
+            raise ValueError('404')
+        return INFO[self.symbol]
+
+
+@pytest.fixture
+def yahoo():
+    FakeTicker.calls = []
+    with FetchScheduler(max_workers=4) as scheduler:
+        yield TickerRequests(scheduler, FakeTicker)
+
+
+def test_stale_tickers_are_fetched_and_stored_with_their_dates(tmp_path, yahoo):
+    path = tmp_path / 'ticker_metadata.json'
+    fresh = {'sector': 'Healthcare', 'quoteType': 'EQUITY', 'fetched': {'info': '2026-01-01'}}
+    path.write_text(json.dumps({'JNJ': fresh}))
+
+    table = classify_tickers(['AAPL', 'BRKB', 'VT', 'JNJ'], today=TODAY, yahoo=yahoo, path=path)
+
+    assert sorted(FakeTicker.calls) == [
+        ('AAPL', 'info'),
+        ('BRK-B', 'info'),
+        ('VT', 'info'),
+    ]
+    assert table['JNJ'] == fresh
+    assert table['BRKB']['sector'] == 'Financial Services'
+    assert table['BRKB']['yf_symbol'] == 'BRK-B'
+    assert table['VT']['quoteType'] == 'ETF'
+    assert table['VT']['fetched'] == {'info': '2026-01-10'}
+    assert json.loads(path.read_text()) == table
+
+
+def test_fresh_table_is_returned_without_fetching(tmp_path, yahoo):
+    path = tmp_path / 'ticker_metadata.json'
+    classify_tickers(['AAPL', 'VT'], today=TODAY, yahoo=yahoo, path=path)
+    FakeTicker.calls = []
+
+    table = classify_tickers(['AAPL', 'VT'], today=date(2026, 2, 1), yahoo=yahoo, path=path)
+
+    assert FakeTicker.calls == []
+    assert table['AAPL']['country'] == 'United States'
+
+
+def test_failures_keep_what_was_known_and_retry_sooner(tmp_path, yahoo):
+    path = tmp_path / 'ticker_metadata.json'
+    old = {'sector': 'Technology', 'quoteType': 'EQUITY', 'fetched': {'info': '2025-01-01'}}
+    path.write_text(json.dumps({'GONE': old, 'DELISTED': {}}))
+
+    table = classify_tickers(
+        ['GONE', 'DELISTED'], today=TODAY, yahoo=yahoo, skip=['DELISTED'], path=path
+    )
+
+    assert FakeTicker.calls == [('GONE', 'info')]
+    assert table['GONE']['sector'] == 'Technology'
+    assert table['GONE']['errors'] == {'info': '404'}
+    assert refresh_reason(table['GONE'], INFO_REQUEST, TODAY) is None
+    assert refresh_reason(table['GONE'], INFO_REQUEST, date(2026, 1, 11)) == 'expired'
+
+
+def test_refresh_reason():
+    entry = {'fetched': {'info': '2026-01-01'}}
+    assert refresh_reason(None, INFO_REQUEST, TODAY) == 'missing'
+    assert refresh_reason({'sector': 'Technology'}, INFO_REQUEST, TODAY) == 'untracked'
+    assert refresh_reason(entry, INFO_REQUEST, TODAY) is None
+    assert refresh_reason(entry, INFO_REQUEST, date(2026, 4, 1)) == 'expired'
@@ -62,6 +62,7 @@ step02 = _load_twrr_module('step02_apply_splits')
 step04 = _load_twrr_module('step04_compute_holdings')
 step05 = _load_twrr_module('step05_cashflows')
 step06 = _load_twrr_module('step06_compute_twrr')
+step08 = _load_twrr_module('step08_attribution')
 
 
 def _transactions(rows):
@@ -241,3 +242,99 @@ def test_a_zero_price_transaction_creates_no_external_cashflow():
     # Then day 1's cashflow is exactly the $100 paid for ACME (contributions
     # are negative); the zero-price shares contribute nothing.
     assert daily_cashflow.tolist() == [-100.0]
+
+
+def _attribute(transactions, prices_by_day):
+    """Run steps 02 -> 06, then step 08's attribution on the same inputs."""
+    adjusted, holdings, _, twrr_index = _run_pipeline(transactions, prices_by_day)
+    prices = pd.DataFrame(prices_by_day, dtype='float64').T
+    prices.index = pd.DatetimeIndex(prices.index)
+    aligned_prices = step08.align_prices(prices, holdings)
+    flows = step08.build_ticker_flows(adjusted, holdings)
+    contributions = step08.compute_contributions(holdings, aligned_prices, flows)
+    return contributions, twrr_index
+
+
+def test_holding_contributions_add_up_to_the_portfolio_return():
+    # Given $100 in ACME and $100 in BETA on day 1; on day 2 ACME rises
+    # $10 -> $12 while BETA falls $10 -> $9.
+    transactions = _transactions(
+        [
+            ('2024-01-01', 'BUY', 'ACME', 10, 10.0),
+            ('2024-01-01', 'BUY', 'BETA', 10, 10.0),
+        ]
+    )
+    prices = {
+        '2024-01-01': {'ACME': 10.0, 'BETA': 10.0},
+        '2024-01-02': {'ACME': 12.0, 'BETA': 9.0},
+    }
+
+    # When step 08 attributes the day-2 return to holdings.
+    contributions, twrr_index = _attribute(transactions, prices)
+
+    # Then ACME adds +20/200 = +10%, BETA adds -10/200 = -5%, and together
+    # they are the portfolio's +5% day.
+    assert contributions.loc['2024-01-02', 'ACME'] == pytest.approx(0.10)
+    assert contributions.loc['2024-01-02', 'BETA'] == pytest.approx(-0.05)
+    assert twrr_index.iloc[-1] == pytest.approx(1.05)
+
+
+def test_a_purchase_is_not_attributed_as_return_to_the_bought_holding():
+    # Given $100 in ACME; on day 2 the investor deposits $100 to buy BETA at
+    # $10 while ACME stays flat, and on day 3 BETA rises to $11.
+    transactions = _transactions(
+        [
+            ('2024-01-01', 'BUY', 'ACME', 10, 10.0),
+            ('2024-01-02', 'BUY', 'BETA', 10, 10.0),
+        ]
+    )
+    prices = {
+        '2024-01-01': {'ACME': 10.0, 'BETA': 10.0},
+        '2024-01-02': {'ACME': 10.0, 'BETA': 10.0},
+        '2024-01-03': {'ACME': 10.0, 'BETA': 11.0},
+    }
+
+    # When step 08 attributes each day.
+    contributions, twrr_index = _attribute(transactions, prices)
+
+    # Then day 2 shows no contribution for BETA (its $100 arrived as a flow),
+    # day 3 credits BETA with +10/200 = +5%, and the linked cumulative
+    # contribution over the range equals the +5% TWRR.
+    assert contributions.loc['2024-01-02'].tolist() == pytest.approx([0.0, 0.0])
+    assert contributions.loc['2024-01-03', 'BETA'] == pytest.approx(0.05)
+    total = step08.cumulative_contribution(contributions, '2024-01-02', '2024-01-03')
+    assert total['BETA'] == pytest.approx(0.05)
+    assert total.sum() == pytest.approx(twrr_index.iloc[-1] - 1.0)
+
+
+def test_cumulative_contribution_links_days_through_portfolio_growth():
+    # Given a one-holding portfolio that gains +10% and then +10% again.
+    index = pd.date_range('2024-01-01', periods=3, freq='D')
+    contributions = pd.DataFrame({'ACME': [0.0, 0.10, 0.10]}, index=index)
+
+    # When the contribution is linked over the whole range.
+    total = step08.cumulative_contribution(contributions)
+
+    # Then the second day's +10% is earned on a base that already grew 10%:
+    # 0.10 + 0.10 * 1.10 = 0.21, the compounded 1.1 * 1.1 - 1.
+    assert total['ACME'] == pytest.approx(0.21)
+
+
+def test_fund_contributions_roll_up_through_their_allocations():
+    # Given a fund split 60/40 between two sectors and a stock in one sector,
+    # each contributing +1% on the day.
+    index = pd.date_range('2024-01-01', periods=1, freq='D')
+    contributions = pd.DataFrame({'FUND': [0.01], 'ACME': [0.01]}, index=index)
+    weights = step08.build_weight_matrix(
+        ['FUND', 'ACME'],
+        {'FUND': {'Technology': 60.0, 'Energy': 40.0}},
+        {'ACME': {'sector': 'Technology'}},
+        'sector',
+    )
+
+    # When the contributions roll up to sectors.
+    sectors = step08.roll_up(contributions, weights)
+
+    # Then Technology gets 0.6% + 1% and Energy gets 0.4%.
+    assert sectors.loc[index[0], 'Technology'] == pytest.approx(0.016)
+    assert sectors.loc[index[0], 'Energy'] == pytest.approx(0.004)
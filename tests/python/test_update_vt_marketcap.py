@@ -32,9 +32,10 @@ class TestUpdateVTMarketcap(unittest.TestCase):
         mock_file.assert_called_once_with(Path('data/fund_marketcap_breakdown.json'), 'w')
         mock_json_dump.assert_called_once_with(test_data, mock_file(), indent=2)
 
+    @patch('scripts.update_vt_marketcap.record_allocation_snapshot')
     @patch('scripts.update_vt_marketcap.load_fund_breakdowns')
     @patch('scripts.update_vt_marketcap.save_fund_breakdowns')
-    def test_update_vt_marketcap(self, mock_save, mock_load):
+    def test_update_vt_marketcap(self, mock_save, mock_load, mock_record):
         mock_load.return_value = {"other": "data"}
         result = update_vt_marketcap.update_vt_marketcap()
         self.assertTrue(result)
@@ -44,6 +45,9 @@ class TestUpdateVTMarketcap(unittest.TestCase):
         self.assertEqual(saved_data['other'], "data")
         self.assertIn('VT', saved_data)
         self.assertEqual(saved_data['VT'], update_vt_marketcap.VT_MARKETCAP_BREAKDOWN)
+        mock_record.assert_called_once_with(
+            'marketcap', 'VT', update_vt_marketcap.VT_MARKETCAP_BREAKDOWN
+        )
 
     @patch('scripts.update_vt_marketcap.update_vt_marketcap')
     @patch('sys.exit')
@@ -67,7 +71,7 @@ class TestUpdateVTMarketcap(unittest.TestCase):
         mock_exit.assert_called_once_with(0)
 
     def test_module_execution(self):
-        with patch('sys.exit'):
+        with patch('sys.exit'), patch('utils.allocation_history.save_allocation_history'):
             with open('scripts/update_vt_marketcap.py', 'r') as f:
                 code = f.read()
             # use a local dict with mocked name and the module's actual contents
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import scripts.portfolio.whatif as whatif
+from scripts.utils.split_index import SplitIndex
+
+DAYS = pd.date_range('2024-01-01', periods=6, freq='D')
+PRICES = pd.DataFrame(
+    {
+        'ACME': [10.0, 11.0, 12.0, 12.0, 13.0, 15.0],
+        'BOLT': [20.0, 20.0, 19.0, 21.0, 22.0, 22.0],
+    },
+    index=DAYS,
+)
+
+
+def _ledger(rows):
+    """(day, order_type, security, adjusted_quantity) rows priced at PRICES."""
+    frame = pd.DataFrame(rows, columns=['trade_date', 'order_type', 'security', 'quantity'])
+    frame['trade_date'] = pd.to_datetime(frame['trade_date'])
+    frame['adjusted_quantity'] = frame['quantity'].astype(float)
+    prices = [PRICES.at[d, s] for d, s in zip(frame['trade_date'], frame['security'], strict=True)]
+    frame['executed_price'] = prices
+    frame['trade_value'] = frame['adjusted_quantity'] * frame['executed_price']
+    return frame
+
+
+def _full_run(transactions):
+    """Independent re-implementation of steps 04-06 on the tiny fixture."""
+    signed = np.where(
+        transactions['order_type'] == 'Buy',
+        transactions['adjusted_quantity'],
+        -transactions['adjusted_quantity'],
+    )
+    holdings = (
+        transactions.assign(delta=signed)
+        .pivot_table(index='trade_date', columns='security', values='delta', aggfunc='sum')
+        .reindex(DAYS, fill_value=0.0)
+        .fillna(0.0)
+        .cumsum()
+    )
+    market_value = (holdings * PRICES.reindex(columns=holdings.columns)).sum(axis=1)
+    flows = np.where(
+        transactions['order_type'] == 'Buy',
+        -transactions['trade_value'],
+        transactions['trade_value'],
+    )
+    cashflow = pd.Series(flows).groupby(transactions['trade_date'].to_numpy()).sum()
+    cashflow = cashflow.reindex(DAYS, fill_value=0.0)
+
+    factors = [1.0]
+    for day in range(1, len(DAYS)):
+        denominator = market_value.iloc[day - 1] - cashflow.iloc[day]
+        factors.append(market_value.iloc[day] / denominator if abs(denominator) > 1e-9 else 1.0)
+    twrr = pd.Series(np.cumprod(factors), index=DAYS)
+    return holdings, market_value, cashflow, twrr
+
+
+REAL = _ledger(
+    [
+        ('2024-01-01', 'Buy', 'ACME', 10),
+        ('2024-01-01', 'Buy', 'BOLT', 5),
+        ('2024-01-04', 'Sell', 'ACME', 4),
+    ]
+)
+
+
+@pytest.fixture
+def baseline():
+    holdings, market_value, cashflow, twrr = _full_run(REAL)
+    return whatif.Baseline(REAL, holdings, PRICES, market_value, cashflow, twrr)
+
+
+@pytest.fixture(autouse=True)
+def no_splits(monkeypatch):
+    monkeypatch.setattr(whatif, 'load_split_index', lambda: SplitIndex())
+
+
+def test_scenario_matches_a_full_recompute_of_the_edited_ledger(baseline):
+    trades = [
+        whatif.HypotheticalTrade.parse('buy', 'bolt', 3, '2024-01-03'),
+        whatif.HypotheticalTrade.parse('sell', 'ACME', 2, '2024-01-05'),
+    ]
+
+    result = whatif.simulate(trades, baseline)
+
+    edited = pd.concat(
+        [REAL, _ledger([('2024-01-03', 'Buy', 'BOLT', 3), ('2024-01-05', 'Sell', 'ACME', 2)])]
+    )
+    holdings, market_value, _, twrr = _full_run(edited)
+
+    assert result.start == pd.Timestamp('2024-01-03')
+    pd.testing.assert_series_equal(
+        result.market_value['scenario'], market_value.loc['2024-01-03':], check_names=False
+    )
+    pd.testing.assert_series_equal(
+        result.twrr['scenario'], twrr.loc['2024-01-03':], check_names=False
+    )
+    assert result.holdings['scenario'].iloc[-1].to_dict() == {'ACME': 4.0, 'BOLT': 8.0}
+    # Baseline TWRR before the first hypothetical trade is reused untouched.
+    assert result.twrr['baseline'].iloc[0] == pytest.approx(baseline.twrr.loc['2024-01-03'])
+
+
+def test_realized_gain_adds_only_the_hypothetical_sale(baseline):
+    trades = [whatif.HypotheticalTrade.parse('sell', 'ACME', 2, '2024-01-05')]
+
+    result = whatif.simulate(trades, baseline)
+
+    # Real sale: 4 @ 12 against cost 10 -> 8. Hypothetical: 2 @ 13 against 10 -> 6.
+    assert result.realized_gain == pytest.approx({'baseline': 8.0, 'scenario': 14.0})
+
+
+def test_composition_reports_final_weights(baseline):
+    trades = [whatif.HypotheticalTrade.parse('buy', 'BOLT', 5, '2024-01-02')]
+
+    result = whatif.simulate(trades, baseline)
+
+    # Final day: ACME 6 x 15 = 90, BOLT 5 x 22 = 110 -> 10 x 22 = 220.
+    composition = result.composition
+    assert composition.loc['ACME', 'baseline'] == pytest.approx(90 / 200)
+    assert composition.loc['BOLT', 'scenario'] == pytest.approx(220 / 310)
+    assert composition['scenario'].sum() == pytest.approx(1.0)
+
+
+def test_shares_are_split_adjusted_from_the_trade_date(baseline, monkeypatch):
+    splits = SplitIndex({'ACME': [('2024-01-04', 2.0)]})
+    monkeypatch.setattr(whatif, 'load_split_index', lambda: splits)
+
+    trades = [whatif.HypotheticalTrade.parse('buy', 'ACME', 1, '2024-01-02')]
+
+    result = whatif.simulate(trades, baseline)
+
+    trade = result.trades.iloc[0]
+    assert trade['adjusted_quantity'] == pytest.approx(2.0)
+    # Two post-split shares at the adjusted close of 11 cost 22, i.e. 22 per pre-split share.
+    assert trade['executed_price'] == pytest.approx(22.0)
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ('hold', 'ACME', 1, '2024-01-02'),
+        ('buy', 'ACME', 0, '2024-01-02'),
+        ('buy', 'ACME', 'ten', '2024-01-02'),
+    ],
+)
+def test_parse_rejects_bad_input(args):
+    with pytest.raises(ValueError):
+        whatif.HypotheticalTrade.parse(*args)
+
+
+def test_unknown_ticker_and_out_of_range_dates_are_rejected(baseline):
+    with pytest.raises(ValueError, match='No price history'):
+        whatif.simulate([whatif.HypotheticalTrade.parse('buy', 'ZZZZ', 1, '2024-01-02')], baseline)
+    with pytest.raises(ValueError, match='outside the portfolio history'):
+        whatif.simulate([whatif.HypotheticalTrade.parse('buy', 'ACME', 1, '2023-12-01')], baseline)
+
+
+def test_sells_beyond_the_position_are_rejected(baseline):
+    with pytest.raises(ValueError, match='Cannot sell 7 ACME on 2024-01-04'):
+        whatif.simulate([whatif.HypotheticalTrade.parse('sell', 'ACME', 7, '2024-01-04')], baseline)
+    with pytest.raises(ValueError, match='that is 1 more shares than held'):
+        whatif.simulate([whatif.HypotheticalTrade.parse('sell', 'BOLT', 6, '2024-01-02')], baseline)
+
+    # Selling exactly what is held (including a same-scenario buy) is allowed.
+    result = whatif.simulate(
+        [
+            whatif.HypotheticalTrade.parse('buy', 'BOLT', 1, '2024-01-02'),
+            whatif.HypotheticalTrade.parse('sell', 'BOLT', 6, '2024-01-03'),
+        ],
+        baseline,
+    )
+    assert (result.holdings[('scenario', 'BOLT')].loc['2024-01-03':] == 0.0).all()
+
+
+def test_sells_that_a_later_real_sell_would_overdraw_are_rejected(baseline):
+    # 10 ACME are held on 2024-01-02, but the real ledger sells 4 on 2024-01-04.
+    with pytest.raises(ValueError, match='leave the position 1 shares short'):
+        whatif.simulate([whatif.HypotheticalTrade.parse('sell', 'ACME', 7, '2024-01-02')], baseline)
+
+    result = whatif.simulate(
+        [whatif.HypotheticalTrade.parse('sell', 'ACME', 6, '2024-01-02')], baseline
+    )
+    assert (result.holdings['scenario'].to_numpy() >= 0).all()
+    assert result.holdings[('scenario', 'ACME')].iloc[-1] == 0.0